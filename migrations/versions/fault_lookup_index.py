@@ -0,0 +1,24 @@
+"""故障表增加设备、类型、状态联合索引
+
+Revision ID: d8a4b2c6e179
+Revises: c5f1a8e2b736
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4b2c6e179'
+down_revision = 'c5f1a8e2b736'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 巡检故障去重查询 ###
+    op.create_index('ix_faults_device_type_status', 'faults', ['device_id', 'fault_type', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_faults_device_type_status', table_name='faults')
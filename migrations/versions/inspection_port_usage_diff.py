@@ -0,0 +1,34 @@
+"""巡检项接口信息按差异保存
+
+Revision ID: c5f1a8e2b736
+Revises: b7e3c9a1d254
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f1a8e2b736'
+down_revision = 'b7e3c9a1d254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 接口差异基准 ###
+    with op.batch_alter_table('inspection_items') as batch_op:
+        batch_op.add_column(sa.Column('port_usage_base_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_inspection_items_port_usage_base', 'inspection_items',
+                                    ['port_usage_base_id'], ['id'])
+
+    op.create_index('ix_inspection_items_device_id', 'inspection_items', ['device_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_inspection_items_device_id', table_name='inspection_items')
+
+    with op.batch_alter_table('inspection_items') as batch_op:
+        batch_op.drop_constraint('fk_inspection_items_port_usage_base', type_='foreignkey')
+        batch_op.drop_column('port_usage_base_id')
@@ -0,0 +1,35 @@
+"""巡检报告增加进度和断点字段
+
+Revision ID: b7e3c9a1d254
+Revises: a4d2f6c8e913
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c9a1d254'
+down_revision = 'a4d2f6c8e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 巡检进度与断点 ###
+    with op.batch_alter_table('inspection_reports') as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=True, server_default='completed'))
+        batch_op.add_column(sa.Column('completed_devices', sa.Integer(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('device_ids', sa.Text(), nullable=True))
+
+    op.create_index('ix_inspection_items_report_device', 'inspection_items', ['report_id', 'device_id'])
+
+
+def downgrade():
+    op.drop_index('ix_inspection_items_report_device', table_name='inspection_items')
+
+    with op.batch_alter_table('inspection_reports') as batch_op:
+        batch_op.drop_column('device_ids')
+        batch_op.drop_column('completed_devices')
+        batch_op.drop_column('status')
@@ -0,0 +1,43 @@
+"""接口表增加SNMP计数器字段
+
+Revision ID: 3c1d8e7f6a42
+Revises: 9f73b4e2a5c2
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d8e7f6a42'
+down_revision = '9f73b4e2a5c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 接口计数器字段 ###
+    with op.batch_alter_table('interfaces') as batch_op:
+        batch_op.add_column(sa.Column('if_index', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('speed', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('in_octets', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('out_octets', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('in_errors', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('out_errors', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('input_rate', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('output_rate', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('stats_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('interfaces') as batch_op:
+        batch_op.drop_column('stats_updated_at')
+        batch_op.drop_column('output_rate')
+        batch_op.drop_column('input_rate')
+        batch_op.drop_column('out_errors')
+        batch_op.drop_column('in_errors')
+        batch_op.drop_column('out_octets')
+        batch_op.drop_column('in_octets')
+        batch_op.drop_column('speed')
+        batch_op.drop_column('if_index')
@@ -0,0 +1,34 @@
+"""性能记录和告警表增加复合索引
+
+Revision ID: 5e8a1c3b7d20
+Revises: 7b2e4d9c1f35
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a1c3b7d20'
+down_revision = '7b2e4d9c1f35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 性能记录：按设备和时间范围查询（覆盖指标列），按时间清理 ###
+    op.create_index('ix_performance_records_device_time', 'performance_records',
+                    ['device_id', 'recorded_at', 'cpu_usage', 'memory_usage', 'bandwidth_usage'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_performance_records_recorded_at', 'performance_records', ['recorded_at'],
+                    unique=False, if_not_exists=True)
+
+    # ### 告警：活跃告警查询 ###
+    op.create_index('ix_alerts_ack_device_created', 'alerts', ['acknowledged', 'device_id', 'created_at'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_alerts_ack_device_created', table_name='alerts', if_exists=True)
+    op.drop_index('ix_performance_records_recorded_at', table_name='performance_records', if_exists=True)
+    op.drop_index('ix_performance_records_device_time', table_name='performance_records', if_exists=True)
@@ -0,0 +1,56 @@
+"""增加性能时序数据表（指标采样和降采样）
+
+Revision ID: 7b2e4d9c1f35
+Revises: 3c1d8e7f6a42
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4d9c1f35'
+down_revision = '3c1d8e7f6a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 原始指标采样（接口速率等） ###
+    op.create_table('metric_samples',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.Float(), nullable=True),
+    sa.Column('recorded_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_metric_samples_device_metric_time', 'metric_samples', ['device_id', 'metric', 'recorded_at'], unique=False)
+    op.create_index('ix_metric_samples_recorded_at', 'metric_samples', ['recorded_at'], unique=False)
+
+    # ### 降采样数据（1分钟/5分钟/1小时） ###
+    op.create_table('performance_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=64), nullable=False),
+    sa.Column('resolution', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('min_value', sa.Float(), nullable=True),
+    sa.Column('avg_value', sa.Float(), nullable=True),
+    sa.Column('max_value', sa.Float(), nullable=True),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id', 'metric', 'resolution', 'bucket_start', name='uq_performance_rollup_bucket')
+    )
+    op.create_index('ix_performance_rollups_resolution_bucket', 'performance_rollups', ['resolution', 'bucket_start'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_performance_rollups_resolution_bucket', table_name='performance_rollups')
+    op.drop_table('performance_rollups')
+    op.drop_index('ix_metric_samples_recorded_at', table_name='metric_samples')
+    op.drop_index('ix_metric_samples_device_metric_time', table_name='metric_samples')
+    op.drop_table('metric_samples')
@@ -0,0 +1,42 @@
+"""增加设备配置快照表（内容哈希寻址，压缩差异存储）
+
+Revision ID: a4d2f6c8e913
+Revises: 5e8a1c3b7d20
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d2f6c8e913'
+down_revision = '5e8a1c3b7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 设备配置快照 ###
+    op.create_table('config_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('config_hash', sa.String(length=64), nullable=False),
+    sa.Column('base_id', sa.Integer(), nullable=True),
+    sa.Column('chain_length', sa.Integer(), nullable=False),
+    sa.Column('content', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('line_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['devices.id'], ),
+    sa.ForeignKeyConstraint(['base_id'], ['config_snapshot.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id', 'config_hash', name='uq_config_snapshot_device_hash')
+    )
+    op.create_index('ix_config_snapshot_device_seen', 'config_snapshot', ['device_id', 'last_seen_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_config_snapshot_device_seen', table_name='config_snapshot')
+    op.drop_table('config_snapshot')
@@ -0,0 +1,25 @@
+"""清空未脱敏的设备配置快照（快照改为保存前替换密钥，下一个同步周期重新读取配置）
+
+Revision ID: e2b7c4f9a358
+Revises: d8a4b2c6e179
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4f9a358'
+down_revision = 'd8a4b2c6e179'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ### 旧快照包含明文或加密后的密钥，无法就地脱敏（差异链依赖原始内容），直接删除 ###
+    op.execute('UPDATE config_snapshot SET base_id = NULL')
+    op.execute('DELETE FROM config_snapshot')
+
+
+def downgrade():
+    pass
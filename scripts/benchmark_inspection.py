@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量巡检执行方式基准测试脚本
+用模拟设备（建立连接和执行命令只等待固定时间）比较进程池和I/O线程池的巡检耗时：
+- 进程池：原实现，multiprocessing.Pool + imap_unordered，子进程中建立的会话随子进程退出而丢失
+- 线程池：iter_inspection_results，与监控共用进程内的SSH会话池，第二轮巡检复用已有会话
+
+用法:
+    python scripts/benchmark_inspection.py --sizes 50,500,5000 --process-workers 8 --thread-workers 64
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+# 确保脚本可以在任何目录下运行
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.core.ssh_pool import get_ssh_pool
+from src.modules.maintenance.inspection_service import iter_inspection_results
+
+CONNECT_COST = 0.05  # 模拟建立SSH连接的耗时（秒）
+COMMAND_COST = 0.02  # 模拟执行巡检命令的耗时（秒）
+
+
+def simulated_collect(device_info):
+    """模拟单台设备巡检：从SSH会话池租用会话（新建会话需要等待CONNECT_COST），执行命令"""
+    def connect():
+        time.sleep(CONNECT_COST)
+        return object()
+
+    with get_ssh_pool().lease(device_info['id'], connect):
+        time.sleep(COMMAND_COST)
+    return {'device_id': device_info['id'], 'status': '正常'}
+
+
+def make_devices(count):
+    types = ['路由器', '交换机', '防火墙']
+    return [{'id': i, 'name': f'device-{i}', 'type': types[i % len(types)]} for i in range(1, count + 1)]
+
+
+def run_process_pool(devices, workers):
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes=workers) as pool:
+        results = list(pool.imap_unordered(simulated_collect, devices))
+    return time.perf_counter() - started, len(results)
+
+
+def run_thread_pool(devices, workers):
+    started = time.perf_counter()
+    results = list(iter_inspection_results(devices, workers, device_timeout=60, collect=simulated_collect))
+    return time.perf_counter() - started, len(results)
+
+
+def main():
+    global CONNECT_COST, COMMAND_COST
+
+    parser = argparse.ArgumentParser(description='批量巡检执行方式基准测试')
+    parser.add_argument('--sizes', default='50,500,5000', help='模拟设备数量，逗号分隔')
+    parser.add_argument('--process-workers', type=int, default=8, help='进程池进程数')
+    parser.add_argument('--thread-workers', type=int, default=64, help='线程池并发数')
+    parser.add_argument('--connect-cost', type=float, default=CONNECT_COST, help='建立连接耗时（秒）')
+    parser.add_argument('--command-cost', type=float, default=COMMAND_COST, help='执行巡检命令耗时（秒）')
+    parser.add_argument('--skip-process', action='store_true', help='不运行进程池（设备数很大时进程池耗时很长）')
+    args = parser.parse_args()
+
+    CONNECT_COST = args.connect_cost
+    COMMAND_COST = args.command_cost
+    get_ssh_pool().configure(idle_timeout=3600, probe_interval=3600)
+
+    print(f'{"设备数":>8} {"进程池(秒)":>12} {"线程池首轮(秒)":>16} {"线程池复用会话(秒)":>20}')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        devices = make_devices(size)
+        process_time = '-'
+        if not args.skip_process:
+            elapsed, count = run_process_pool(devices, args.process_workers)
+            assert count == size
+            process_time = f'{elapsed:.2f}'
+
+        get_ssh_pool().close_all()
+        cold, count = run_thread_pool(devices, args.thread_workers)
+        assert count == size
+        warm, count = run_thread_pool(devices, args.thread_workers)
+        assert count == size
+        print(f'{size:>8} {process_time:>12} {cold:>16.2f} {warm:>20.2f}')
+
+    stats = get_ssh_pool().get_stats()
+    print(f'SSH会话池: {stats}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能记录/告警查询基准测试脚本
+在临时SQLite数据库中写入指定行数的性能记录和告警，分别在没有和有复合索引的情况下
+执行性能模块的主要查询路径，对比查询耗时
+
+用法:
+    python scripts/benchmark_performance_queries.py --rows 10000000 --devices 200
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# 确保脚本可以在任何目录下运行
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+from flask import Flask
+
+from src.core.db import db
+from src.models.device import Device, DeviceType
+from src.models.performance import PerformanceRecord
+from src.modules.performance.models import Alert
+
+SAMPLE_INTERVAL = 10  # 采样间隔(秒)
+CHUNK_SIZE = 50000
+
+
+def create_app(db_path):
+    """创建只用于基准测试的应用"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(db_path, rows, devices, now):
+    """用sqlite3批量写入测试数据（不建索引）"""
+    per_device = rows // devices
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+
+    conn.executemany(
+        'INSERT INTO devices (id, name, ip_address, status) VALUES (?, ?, ?, ?)',
+        [(i, f'device-{i}', f'10.{i // 256}.{i % 256}.1', 'online') for i in range(1, devices + 1)]
+    )
+
+    start = now - timedelta(seconds=per_device * SAMPLE_INTERVAL)
+
+    def generate():
+        for step in range(per_device):
+            recorded_at = (start + timedelta(seconds=step * SAMPLE_INTERVAL)).strftime('%Y-%m-%d %H:%M:%S.%f')
+            for device_id in range(1, devices + 1):
+                yield (device_id, random.uniform(5, 95), random.uniform(20, 90), random.uniform(1, 80),
+                       recorded_at, recorded_at, recorded_at)
+
+    sql = ('INSERT INTO performance_records (device_id, cpu_usage, memory_usage, bandwidth_usage, '
+           'recorded_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)')
+    batch = []
+    written = 0
+    for row in generate():
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            conn.executemany(sql, batch)
+            written += len(batch)
+            batch = []
+            print(f'\r写入性能记录 {written}/{per_device * devices}', end='', flush=True)
+    if batch:
+        conn.executemany(sql, batch)
+        written += len(batch)
+    print(f'\r写入性能记录 {written}/{per_device * devices}')
+
+    # 告警约为性能记录的1%，其中5%未确认
+    alerts = []
+    for i in range(max(rows // 100, 1)):
+        created_at = (now - timedelta(seconds=random.randint(0, per_device * SAMPLE_INTERVAL))).strftime('%Y-%m-%d %H:%M:%S.%f')
+        alerts.append((random.randint(1, devices), 'cpu_usage', '警告', 'CPU使用率过高', 80.0, 75.0,
+                       created_at, 1 if random.random() > 0.05 else 0))
+    conn.executemany(
+        'INSERT INTO alerts (device_id, alert_type, alert_level, message, value, threshold, created_at, acknowledged) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', alerts
+    )
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    print(f'写入告警 {len(alerts)}')
+
+
+def measure(label, func, repeat):
+    """执行多次取最短耗时"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return label, best, result
+
+
+def run_queries(device_id, repeat):
+    """执行性能模块的主要查询路径"""
+    from src.modules.performance.services import PerformanceAnalyzer, get_historical_data
+    from src.modules.performance.threshold import ThresholdManager
+    from src.modules.performance.timeseries import get_timeseries_store
+
+    now = datetime.now()
+    store = get_timeseries_store()
+    queries = [
+        ('/performance/data 1小时原始数据',
+         lambda: len(store.query(device_id, ['cpu_usage', 'memory_usage', 'bandwidth_usage'],
+                                 now - timedelta(hours=1), now, resolution=0)['timestamps'])),
+        ('get_historical_data 24小时', lambda: len(get_historical_data(device_id, 24))),
+        ('analyze_device_performance 7天',
+         lambda: PerformanceAnalyzer.analyze_device_performance(device_id, 7).get('record_count')),
+        ('get_active_alerts 单设备', lambda: len(ThresholdManager.get_active_alerts(device_id))),
+        ('get_active_alerts 全部', lambda: len(ThresholdManager.get_active_alerts())),
+    ]
+    results = []
+    for label, func in queries:
+        results.append(measure(label, func, repeat))
+        db.session.remove()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能记录/告警查询基准测试')
+    parser.add_argument('--rows', type=int, default=10000000, help='性能记录行数')
+    parser.add_argument('--devices', type=int, default=200, help='设备数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每个查询执行次数（取最短耗时）')
+    parser.add_argument('--db', help='数据库文件路径，默认使用临时文件')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite')
+    app = create_app(db_path)
+    now = datetime.now()
+
+    with app.app_context():
+        tables = [DeviceType.__table__, Device.__table__, PerformanceRecord.__table__, Alert.__table__]
+        db.metadata.create_all(db.engine, tables=tables)
+        # 先删除模型中定义的索引，得到改动前的表结构
+        for table in (PerformanceRecord.__table__, Alert.__table__):
+            for index in table.indexes:
+                index.drop(bind=db.engine, checkfirst=True)
+
+    print(f'数据库: {db_path}')
+    seed(db_path, args.rows, args.devices, now)
+
+    device_id = args.devices // 2 or 1
+    with app.app_context():
+        before = run_queries(device_id, args.repeat)
+
+        print('创建复合索引...')
+        started = time.perf_counter()
+        for table in (PerformanceRecord.__table__, Alert.__table__):
+            for index in table.indexes:
+                index.create(bind=db.engine)
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        print(f'创建索引耗时 {time.perf_counter() - started:.1f} 秒')
+
+        after = run_queries(device_id, args.repeat)
+
+    print()
+    print(f'{"查询":<36}{"结果":>10}{"无索引(ms)":>14}{"有索引(ms)":>14}{"加速":>10}')
+    for (label, t_before, result), (_, t_after, _) in zip(before, after):
+        print(f'{label:<36}{str(result):>10}{t_before * 1000:>14.1f}{t_after * 1000:>14.1f}'
+              f'{t_before / t_after if t_after else 0:>9.0f}x')
+
+    if not args.db:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+阈值判断引擎基准测试脚本
+模拟指定数量的设备，每批判断一秒的采样量，输出每秒可判断的采样数
+
+用法:
+    python scripts/benchmark_threshold_engine.py --devices 5000 --rate 10000 --seconds 30
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# 确保脚本可以在任何目录下运行
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.modules.performance.threshold import ThresholdEngine, ThresholdManager, ThresholdRule, ThresholdType
+
+
+def main():
+    parser = argparse.ArgumentParser(description='阈值判断引擎基准测试')
+    parser.add_argument('--devices', type=int, default=5000, help='设备数量')
+    parser.add_argument('--rate', type=int, default=10000, help='每秒采样数（每批大小）')
+    parser.add_argument('--seconds', type=int, default=30, help='模拟的秒数（批次数）')
+    parser.add_argument('--groups', type=int, default=20, help='设备类型数量')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    engine = ThresholdEngine(silence_period=ThresholdManager.alert_silence_period)
+    custom_rules = [
+        ThresholdRule(ThresholdType.CPU, 60.0, 80.0, 30, device_type_id=group, hysteresis=3.0)
+        for group in range(0, args.groups, 2)
+    ] + [
+        ThresholdRule(ThresholdType.MEMORY, 85.0, 95.0, 0, device_id=device_id)
+        for device_id in range(1, args.devices + 1, 10)
+    ]
+    engine.compile(ThresholdManager.default_rules, custom_rules)
+
+    started = time.perf_counter()
+    engine.register_devices(
+        list(range(1, args.devices + 1)),
+        {device_id: (f'device-{device_id}', device_id % args.groups) for device_id in range(1, args.devices + 1)}
+    )
+    print(f'登记 {args.devices} 台设备、编译规则耗时 {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    batches = []
+    for second in range(args.seconds):
+        device_ids = rng.integers(1, args.devices + 1, args.rate)
+        batches.append((
+            device_ids,
+            {metric: rng.uniform(0, 100, args.rate) for metric in ('cpu_usage', 'memory_usage', 'bandwidth_usage')},
+            np.full(args.rate, float(second)) + rng.uniform(0, 1, args.rate)
+        ))
+
+    events = 0
+    elapsed = []
+    for device_ids, values, timestamps in batches:
+        started = time.perf_counter()
+        events += len(engine.evaluate(device_ids, values, timestamps))
+        elapsed.append(time.perf_counter() - started)
+
+    total = sum(elapsed)
+    samples = args.rate * args.seconds
+    print(f'判断 {samples} 个采样（{args.seconds} 批），产生 {events} 个告警事件')
+    print(f'每批耗时: 平均 {np.mean(elapsed) * 1000:.1f} ms，最大 {np.max(elapsed) * 1000:.1f} ms')
+    print(f'吞吐量: {samples / total:,.0f} 采样/秒（目标 {args.rate:,} 采样/秒）')
+
+
+if __name__ == '__main__':
+    main()
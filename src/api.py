@@ -12,6 +12,7 @@ import threading
 import queue
 import logging
 from flask import Blueprint, jsonify, request
+from flask_login import login_required
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -254,4 +255,74 @@ def delete_maintenance_record(record_id):
         return jsonify({
             'success': False,
             'message': f'删除维护记录失败: {str(e)}'
-        }), 500 
\ No newline at end of file
+        }), 500
+
+# 后台任务（巡检、策略下发、性能采集等）的状态查询与取消
+@api_bp.route('/jobs', methods=['GET'])
+@login_required
+def list_jobs():
+    """API端点：按提交时间倒序列出后台任务，可按 kind 过滤"""
+    from src.core.job_queue import get_job_queue
+    try:
+        jobs = get_job_queue().list_jobs(kind=request.args.get('kind'),
+                                         limit=request.args.get('limit', 50, type=int))
+        return jsonify({
+            'success': True,
+            'message': '',
+            'data': jobs
+        })
+    except Exception as e:
+        logger.error(f"获取后台任务列表时出错: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'获取后台任务列表失败: {str(e)}'
+        }), 500
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """API端点：获取后台任务的状态、进度和结果"""
+    from src.core.job_queue import get_job_queue
+    try:
+        job = get_job_queue().get(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'message': '任务不存在或已过期'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': '',
+            'data': job
+        })
+    except Exception as e:
+        logger.error(f"获取后台任务 {job_id} 时出错: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'获取后台任务失败: {str(e)}'
+        }), 500
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    """API端点：取消后台任务（排队中的任务不再执行，运行中的任务在下一个检查点停止）"""
+    from src.core.job_queue import get_job_queue
+    try:
+        if not get_job_queue().cancel(job_id):
+            return jsonify({
+                'success': False,
+                'message': '任务不存在或已结束'
+            }), 409
+        
+        return jsonify({
+            'success': True,
+            'message': '已请求取消任务',
+            'data': get_job_queue().get(job_id)
+        })
+    except Exception as e:
+        logger.error(f"取消后台任务 {job_id} 时出错: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'取消后台任务失败: {str(e)}'
+        }), 500
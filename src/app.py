@@ -135,6 +135,38 @@ def create_app(config_name=None):
     app.register_blueprint(system_bp, url_prefix='/system')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # 本机多进程共享状态（告警静默、阈值变更通知）
+    from src.core.local_store import init_local_store
+    init_local_store(app)
+    
+    # 进程内共享的SSH会话池
+    from src.core.ssh_pool import init_ssh_pool
+    init_ssh_pool(app)
+    
+    # SSH采集后端（netmiko 或 asyncssh）
+    from src.modules.performance.enhanced_ssh_monitor import init_collect_backend
+    init_collect_backend(app)
+    
+    # 后台任务队列
+    from src.core.job_queue import init_job_queue
+    init_job_queue(app)
+    
+    # 启动性能采样和告警的批量写入缓冲
+    from src.modules.performance.write_buffer import init_write_buffer
+    init_write_buffer(app)
+    
+    # 注册性能时序数据降采样任务
+    from src.modules.performance.timeseries import init_timeseries
+    init_timeseries(app)
+    
+    # 跨进程共享的实时指标缓存
+    from src.modules.performance.shared_cache import init_shared_cache
+    init_shared_cache(app)
+    
+    # 从阈值表加载告警规则
+    from src.modules.performance.threshold import init_thresholds
+    init_thresholds(app)
+    
     # 初始化策略管理模块
     init_policy(app)
     logger.info("已注册IPSec与防火墙联动策略管理模块")
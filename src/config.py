@@ -37,6 +37,71 @@ class Config:
     DEVICE_TIMEOUT = 5  # 设备通信超时时间（秒）
     DEVICE_RETRY = 3    # 设备通信重试次数
     
+    # 性能监控轮询调度配置
+    MONITOR_POLL_WORKERS = int(os.environ.get('MONITOR_POLL_WORKERS') or 8)  # 共享轮询线程池大小
+    
+    # SSH会话池配置（监控、巡检、策略下发共用）
+    SSH_POOL_MAX_SESSIONS_PER_DEVICE = int(os.environ.get('SSH_POOL_MAX_SESSIONS_PER_DEVICE') or 2)  # 每台设备最多同时打开的会话数
+    SSH_POOL_IDLE_TIMEOUT = int(os.environ.get('SSH_POOL_IDLE_TIMEOUT') or 300)  # 空闲会话保留时间（秒）
+    SSH_POOL_PROBE_INTERVAL = int(os.environ.get('SSH_POOL_PROBE_INTERVAL') or 60)  # 空闲会话健康探测间隔（秒）
+    SSH_POOL_LEASE_TIMEOUT = int(os.environ.get('SSH_POOL_LEASE_TIMEOUT') or 30)  # 等待可用会话的时间（秒）
+    
+    # 策略批量下发配置
+    POLICY_DEPLOY_MAX_WORKERS = int(os.environ.get('POLICY_DEPLOY_MAX_WORKERS') or 16)  # 同时下发的设备数
+    POLICY_DEPLOY_CANARY_SIZE = int(os.environ.get('POLICY_DEPLOY_CANARY_SIZE') or 1)  # 金丝雀批次设备数
+    POLICY_DEPLOY_WAVE_SIZE = int(os.environ.get('POLICY_DEPLOY_WAVE_SIZE') or 0)  # 每个波次的设备数，0表示其余设备一次下发
+    POLICY_DEPLOY_FAILURE_THRESHOLD = float(os.environ.get('POLICY_DEPLOY_FAILURE_THRESHOLD') or 0.2)  # 波次失败比例阈值
+    POLICY_SYNC_MAX_WORKERS = int(os.environ.get('POLICY_SYNC_MAX_WORKERS') or 8)  # 策略状态同步时并行查询的设备数
+    
+    # 批量巡检配置（巡检线程与性能监控共用SSH会话池）
+    INSPECTION_MAX_WORKERS = int(os.environ.get('INSPECTION_MAX_WORKERS') or 32)  # 同时巡检的设备数
+    INSPECTION_TYPE_CONCURRENCY = os.environ.get('INSPECTION_TYPE_CONCURRENCY') or ''  # 按设备类型限制并发，如 "防火墙:4,交换机:32"
+    INSPECTION_DEVICE_TIMEOUT = int(os.environ.get('INSPECTION_DEVICE_TIMEOUT') or 120)  # 单台设备巡检超时时间（秒）
+    INSPECTION_INCREMENTAL = os.environ.get('INSPECTION_INCREMENTAL', 'true').lower() in ['true', 'on', '1']  # 增量巡检
+    INSPECTION_FACT_TTL = int(os.environ.get('INSPECTION_FACT_TTL') or 86400)  # 固件版本等慢变信息及接口基准的有效期（秒）
+    
+    # SNMP配置
+    SNMP_COMMUNITY = os.environ.get('SNMP_COMMUNITY') or 'public'  # 只读团体名
+    INTERFACE_COLLECT_METHOD = os.environ.get('INTERFACE_COLLECT_METHOD') or 'snmp'  # 接口采集方式: snmp 或 ssh
+    
+    # SSH采集后端: netmiko（同步阻塞）或 asyncssh（单事件循环并发采集）
+    SSH_COLLECT_BACKEND = (os.environ.get('SSH_COLLECT_BACKEND') or 'netmiko').lower()
+    
+    # 性能时序数据配置
+    TIMESERIES_RAW_RETENTION_HOURS = int(os.environ.get('TIMESERIES_RAW_RETENTION_HOURS') or 168)  # 原始采样保留时间（小时）
+    TIMESERIES_ROLLUP_ENABLED = os.environ.get('TIMESERIES_ROLLUP_ENABLED', 'true').lower() in ['true', 'on', '1']
+    TIMESERIES_ROLLUP_INTERVAL = int(os.environ.get('TIMESERIES_ROLLUP_INTERVAL') or 60)  # 降采样任务间隔（秒）
+    
+    # 批量写入缓冲配置
+    WRITE_BUFFER_ENABLED = os.environ.get('WRITE_BUFFER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    WRITE_BUFFER_BATCH_SIZE = int(os.environ.get('WRITE_BUFFER_BATCH_SIZE') or 500)  # 达到该行数立即写入
+    WRITE_BUFFER_FLUSH_INTERVAL = float(os.environ.get('WRITE_BUFFER_FLUSH_INTERVAL') or 2.0)  # 最长写入间隔（秒）
+    WRITE_BUFFER_MAX_PENDING = int(os.environ.get('WRITE_BUFFER_MAX_PENDING') or 20000)  # 队列最大行数
+    WRITE_BUFFER_SPILL_PATH = os.environ.get('WRITE_BUFFER_SPILL_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'data', 'write_buffer_spill.jsonl')
+    
+    # 本机多进程共享状态（告警静默、阈值变更通知）
+    LOCAL_STORE_PATH = os.environ.get('LOCAL_STORE_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'data', 'local_store.sqlite')
+    
+    # 实时监控在进程内保留的样本数（环形缓冲深度，1秒采样保留1小时）
+    REALTIME_HISTORY_DEPTH = int(os.environ.get('REALTIME_HISTORY_DEPTH', 3600))
+    
+    # 跨进程共享的实时指标缓存（最新值和短期历史），默认放在 /dev/shm
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH') or \
+        ('/dev/shm/csms_metrics.cache' if os.path.isdir('/dev/shm') else
+         os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'data', 'metrics.cache'))
+    SHARED_CACHE_MAX_DEVICES = int(os.environ.get('SHARED_CACHE_MAX_DEVICES', 2048))
+    SHARED_CACHE_HISTORY_DEPTH = int(os.environ.get('SHARED_CACHE_HISTORY_DEPTH', 360))  # 每台设备保留的样本数
+    SHARED_CACHE_DOC_SIZE = int(os.environ.get('SHARED_CACHE_DOC_SIZE', 8192))  # 每台设备附加信息的字节数
+    SHARED_CACHE_MAX_AGE = int(os.environ.get('SHARED_CACHE_MAX_AGE', 60))  # 最新值超过该秒数未更新视为采集已停止
+    
+    # 后台任务队列（巡检、策略下发、性能采集等耗时操作不在请求线程中执行）
+    JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'data', 'jobs.sqlite')
+    JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS') or 4)  # 每个进程同时执行的任务数
+    JOB_RESULT_RETENTION = int(os.environ.get('JOB_RESULT_RETENTION') or 86400)  # 已结束任务的保留时间（秒）
+    
     # 任务队列配置
     CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL') or 'redis://localhost:6379/1'
     CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND') or 'redis://localhost:6379/2'
@@ -84,6 +149,11 @@ class TestingConfig(Config):
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'data', 'test.sqlite')
     WTF_CSRF_ENABLED = False  # 测试环境关闭CSRF保护
     CACHE_TYPE = 'simple'     # 测试环境使用简单缓存
+    TIMESERIES_ROLLUP_ENABLED = False  # 测试环境不启动降采样任务
+    WRITE_BUFFER_ENABLED = False       # 测试环境直接写入数据库
+    LOCAL_STORE_PATH = None            # 测试环境使用进程内存中的共享状态
+    JOB_QUEUE_PATH = None              # 测试环境后台任务状态只保存在进程内存中
+    SHARED_CACHE_PATH = None           # 测试环境使用进程内的指标缓存
     
 
 class ProductionConfig(Config):
@@ -12,7 +12,8 @@ from abc import ABC, abstractmethod
 
 import paramiko
 from netmiko import ConnectHandler
-from pysnmp.hlapi import *
+
+from src.core.snmp_client import get_snmp_client
 
 logger = logging.getLogger(__name__)
 
@@ -256,31 +257,11 @@ class SNMPConnector(DeviceConnector):
         Returns:
             查询结果
         """
-        try:
-            error_indication, error_status, error_index, var_binds = next(
-                getCmd(SnmpEngine(),
-                       CommunityData(self.community, mpModel=0 if self.version == 1 else 1),
-                       UdpTransportTarget((self.ip, self.port), timeout=self.timeout),
-                       ContextData(),
-                       ObjectType(ObjectIdentity(oid)))
-            )
-            
-            if error_indication:
-                logger.error(f"SNMP error for {self.ip}: {error_indication}")
-                return None
-            elif error_status:
-                logger.error(f"SNMP error for {self.ip}: {error_status.prettyPrint()} at {var_binds[int(error_index) - 1][0] if error_index else '?'}")
-                return None
-            else:
-                for var_bind in var_binds:
-                    return var_bind[1].prettyPrint()
-        except Exception as e:
-            logger.error(f"Failed to get SNMP data from {self.ip}: {str(e)}")
-            return None
+        return self.get_bulk([oid]).get(oid)
     
     def get_bulk(self, oids):
         """
-        批量获取SNMP数据
+        批量获取SNMP数据，多个OID打包到同一个GET请求中
         
         Args:
             oids: OID列表
@@ -288,42 +269,30 @@ class SNMPConnector(DeviceConnector):
         Returns:
             查询结果字典
         """
-        results = {}
-        for oid in oids:
-            result = self.get(oid)
-            results[oid] = result
-        return results
+        try:
+            return get_snmp_client().get(self.ip, self.community, list(oids), port=self.port,
+                                         version=self.version, timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Failed to get SNMP data from {self.ip}: {str(e)}")
+            return {oid: None for oid in oids}
     
-    def walk(self, oid):
+    def walk(self, oid, max_repetitions=None):
         """
-        SNMP遍历
+        SNMP遍历（GETBULK）
         
         Args:
-            oid: OID标识符
+            oid: OID标识符，或多个OID列表（同一请求中并行遍历多列）
+            max_repetitions: GETBULK每列返回的行数，默认使用客户端配置
             
         Returns:
-            遍历结果列表
+            遍历结果列表；传入OID列表时返回 {oid: 结果列表}
         """
-        results = []
         try:
-            for error_indication, error_status, error_index, var_binds in nextCmd(
-                    SnmpEngine(),
-                    CommunityData(self.community, mpModel=0 if self.version == 1 else 1),
-                    UdpTransportTarget((self.ip, self.port), timeout=self.timeout),
-                    ContextData(),
-                    ObjectType(ObjectIdentity(oid)),
-                    lexicographicMode=False
-            ):
-                if error_indication:
-                    logger.error(f"SNMP error for {self.ip}: {error_indication}")
-                    break
-                elif error_status:
-                    logger.error(f"SNMP error for {self.ip}: {error_status.prettyPrint()} at {var_binds[int(error_index) - 1][0] if error_index else '?'}")
-                    break
-                else:
-                    for var_bind in var_binds:
-                        results.append((var_bind[0].prettyPrint(), var_bind[1].prettyPrint()))
-            return results
+            oids = [oid] if isinstance(oid, str) else list(oid)
+            results = get_snmp_client().walk(self.ip, self.community, oids, port=self.port,
+                                             version=self.version, max_repetitions=max_repetitions,
+                                             timeout=self.timeout)
+            return results[oid] if isinstance(oid, str) else results
         except Exception as e:
             logger.error(f"Failed to walk SNMP data from {self.ip}: {str(e)}")
             return None
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+后台任务队列 - 将耗时的设备操作（批量巡检、策略下发、性能采集）移出请求线程
+
+- 路由提交任务后立即返回任务ID，前端轮询 /api/jobs/<任务ID> 获取进度和结果
+- 任务状态保存在本地SQLite文件中，同一台服务器上的任意工作进程都能查询和取消任务
+- 任务在提交它的进程的工作线程中执行；取消为协作式：排队中的任务不再执行，
+  运行中的任务在下一个检查点（JobContext.check_cancelled）停止
+- 已结束的任务保留 retention 秒后清理
+- 每个任务记录执行进程的标识（pid和进程启动时间），进程重启后按标识判断任务是否已失去执行进程，
+  即使新进程恰好得到相同的pid也能识别
+
+未配置文件路径时使用进程内存数据库，只在本进程内可见。
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app, has_app_context
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4  # 同时执行的任务数
+DEFAULT_RETENTION = 86400  # 已结束任务的保留时间(秒)
+BUSY_TIMEOUT = 5.0  # 等待其他进程释放写锁的时间(秒)
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    description TEXT,
+    owner TEXT,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    data TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL,
+    worker TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_kind_created ON jobs (kind, created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_finished ON jobs (status, finished_at);
+"""
+
+COLUMNS = ('id', 'kind', 'description', 'owner', 'status', 'progress', 'message', 'data', 'result', 'error',
+           'cancel_requested', 'pid', 'created_at', 'started_at', 'finished_at', 'updated_at')
+
+
+class JobCancelled(Exception):
+    """任务被取消（由 JobContext.check_cancelled 抛出）"""
+    pass
+
+
+class JobContext:
+    """传给任务函数的句柄，用于报告进度和检查取消请求"""
+
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.id = job_id
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None, data: Any = None):
+        """
+        更新任务进度
+
+        Args:
+            progress: 进度(0-1)
+            message: 当前进度说明
+            data: 阶段性数据（可JSON序列化），如已完成的设备数、报告ID
+        """
+        self.queue._update(self.id, progress=progress, message=message, data=data)
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self.queue._cancel_requested(self.id)
+
+    def check_cancelled(self):
+        """已请求取消时抛出 JobCancelled"""
+        if self.cancelled:
+            raise JobCancelled(f"任务 {self.id} 已取消")
+
+
+class JobQueue:
+    """后台任务队列"""
+
+    def __init__(self, path: Optional[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 retention: float = DEFAULT_RETENTION):
+        """
+        初始化
+
+        Args:
+            path: 任务状态SQLite文件路径，为None时使用进程内存数据库
+            max_workers: 同时执行的任务数
+            retention: 已结束任务的保留时间(秒)
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self.retention = retention
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures = {}
+
+    def configure(self, path: Optional[str] = None, max_workers: Optional[int] = None,
+                  retention: Optional[float] = None):
+        """修改配置（路径变化时已打开的连接在下次使用时重新打开，工作线程数在下次提交任务时生效）"""
+        with self._lock:
+            # 同一进程中可能多次创建应用，路径不变时保留连接，避免丢失内存数据库中的任务
+            if path != self.path:
+                self.path = path
+                self._memory_conn = None
+                self._local = threading.local()
+            if retention is not None:
+                self.retention = retention
+            if max_workers and max_workers != self.max_workers:
+                self.max_workers = max_workers
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的连接，文件数据库每个线程一个连接，内存数据库所有线程共用一个连接"""
+        if not self.path:
+            with self._lock:
+                if self._memory_conn is None:
+                    self._memory_conn = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+                    self._memory_conn.executescript(SCHEMA)
+                return self._memory_conn
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """为旧版本创建的任务文件补充新增的列"""
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if 'worker' not in columns:
+            conn.execute('ALTER TABLE jobs ADD COLUMN worker TEXT')
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        if not self.path:
+            with self._lock:
+                return self._connect().execute(sql, params)
+        return self._connect().execute(sql, params)
+
+    # ---------- 提交与执行 ----------
+
+    def submit(self, kind: str, func: Callable[..., Any], *args, description: str = '',
+               owner: Optional[str] = None, **kwargs) -> str:
+        """
+        提交任务，立即返回任务ID
+
+        任务函数以 func(job, *args, **kwargs) 方式调用，job 为 JobContext；返回值（可JSON序列化）
+        保存为任务结果，抛出异常时任务失败。在应用上下文中提交时，任务在同一应用的上下文中执行。
+
+        Args:
+            kind: 任务类型，如 'inspection'、'policy_deploy'
+            func: 任务函数
+            description: 任务说明
+            owner: 提交人
+
+        Returns:
+            任务ID
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            'INSERT INTO jobs (id, kind, description, owner, status, pid, worker, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, description, owner, 'queued', os.getpid(), _worker_token(), now, now)
+        )
+        self.purge(now)
+
+        app = current_app._get_current_object() if has_app_context() else None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._futures[job_id] = self._executor.submit(self._run, job_id, app, func, args, kwargs)
+        logger.info(f"已提交任务 {kind} ({job_id}): {description}")
+        return job_id
+
+    def _run(self, job_id: str, app, func: Callable[..., Any], args: tuple, kwargs: dict):
+        """在工作线程中执行任务"""
+        try:
+            now = time.time()
+            # 排队期间被取消的任务不再执行
+            cursor = self._execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued' AND cancel_requested = 0",
+                (now, now, job_id)
+            )
+            if not cursor.rowcount:
+                self._finish(job_id, 'cancelled', message='任务已取消')
+                return
+
+            try:
+                with app.app_context() if app is not None else nullcontext():
+                    result = func(JobContext(self, job_id), *args, **kwargs)
+                self._finish(job_id, 'succeeded', progress=1.0, result=result)
+            except JobCancelled:
+                logger.info(f"任务 {job_id} 已取消")
+                self._finish(job_id, 'cancelled', message='任务已取消')
+            except Exception as e:
+                logger.exception(f"任务 {job_id} 执行失败: {str(e)}")
+                self._finish(job_id, 'failed', error=str(e))
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+    def _update(self, job_id: str, progress: Optional[float] = None, message: Optional[str] = None,
+                data: Any = None):
+        sets, params = ['updated_at = ?'], [time.time()]
+        if progress is not None:
+            sets.append('progress = ?')
+            params.append(max(0.0, min(1.0, float(progress))))
+        if message is not None:
+            sets.append('message = ?')
+            params.append(message)
+        if data is not None:
+            sets.append('data = ?')
+            params.append(json.dumps(data, ensure_ascii=False, default=str))
+        try:
+            self._execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", tuple(params) + (job_id,))
+        except sqlite3.Error as e:
+            # 进度更新失败不影响任务执行
+            logger.error(f"更新任务 {job_id} 进度失败: {str(e)}")
+
+    def _finish(self, job_id: str, status: str, progress: Optional[float] = None, message: Optional[str] = None,
+                result: Any = None, error: Optional[str] = None):
+        now = time.time()
+        self._execute(
+            'UPDATE jobs SET status = ?, progress = COALESCE(?, progress), message = COALESCE(?, message), '
+            'result = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?',
+            (status, progress, message,
+             json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+             error, now, now, job_id)
+        )
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = self._execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    # ---------- 查询与管理 ----------
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """获取任务状态，任务不存在或已清理时返回None"""
+        row = self._execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, kind: Optional[str] = None, owner: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """按提交时间倒序列出任务"""
+        conditions, params = [], []
+        if kind:
+            conditions.append('kind = ?')
+            params.append(kind)
+        if owner:
+            conditions.append('owner = ?')
+            params.append(owner)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._execute(
+            f"SELECT {', '.join(COLUMNS)} FROM jobs {where} ORDER BY created_at DESC LIMIT ?",
+            tuple(params) + (limit,)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        请求取消任务（任意进程都可以调用）
+
+        Returns:
+            任务存在且尚未结束时返回True
+        """
+        now = time.time()
+        cursor = self._execute(
+            f"UPDATE jobs SET cancel_requested = 1, updated_at = ? "
+            f"WHERE id = ? AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+            (now, job_id) + ACTIVE_STATUSES
+        )
+        if not cursor.rowcount:
+            return False
+
+        # 排队中的任务直接标记为已取消
+        self._execute(
+            "UPDATE jobs SET status = 'cancelled', message = '任务已取消', finished_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'queued'",
+            (now, now, job_id)
+        )
+        logger.info(f"已请求取消任务 {job_id}")
+        return True
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """清理超过保留时间的已结束任务，返回清理数量"""
+        now = time.time() if now is None else now
+        try:
+            cursor = self._execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+                FINISHED_STATUSES + (now - self.retention,)
+            )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"清理过期任务失败: {str(e)}")
+            return 0
+
+    def recover(self) -> int:
+        """将执行进程已退出的未结束任务标记为失败（进程重启后调用），返回处理数量"""
+        rows = self._execute(
+            f"SELECT id, pid, worker FROM jobs WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+            ACTIVE_STATUSES
+        ).fetchall()
+        now = time.time()
+        recovered = 0
+        for job_id, pid, worker in rows:
+            if _worker_alive(pid, worker):
+                continue
+            self._execute(
+                "UPDATE jobs SET status = 'failed', error = '执行任务的进程已退出', finished_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (now, now, job_id)
+            )
+            recovered += 1
+        if recovered:
+            logger.warning(f"{recovered} 个任务因执行进程退出被标记为失败")
+        return recovered
+
+    def shutdown(self, wait: bool = False):
+        """停止工作线程"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    @staticmethod
+    def _to_dict(row: tuple) -> Dict:
+        job = dict(zip(COLUMNS, row))
+        for field in ('data', 'result'):
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['done'] = job['status'] in FINISHED_STATUSES
+        return job
+
+
+_token_pid: Optional[int] = None
+_token: Optional[str] = None
+
+
+def _process_start_time(pid: int) -> Optional[str]:
+    """读取进程启动时间（/proc/<pid>/stat 第22项，系统启动后的时钟周期数），无法读取时返回None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+        return stat.rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _worker_token() -> str:
+    """本进程的标识：pid:进程启动时间（无法读取启动时间时用随机值），fork出的子进程重新生成"""
+    global _token_pid, _token
+    pid = os.getpid()
+    if _token_pid != pid:
+        _token_pid = pid
+        _token = f'{pid}:{_process_start_time(pid) or uuid.uuid4().hex}'
+    return _token
+
+
+def _worker_alive(pid: Optional[int], worker: Optional[str]) -> bool:
+    """判断记录的执行进程是否仍在运行：pid相同但启动时间不同的是重启后复用了pid的新进程"""
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return worker == _worker_token()
+    start_time = _process_start_time(pid)
+    if worker and start_time is not None:
+        return worker == f'{pid}:{start_time}'
+    return _process_alive(pid)
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """判断本机进程是否存在"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 全局任务队列实例
+_job_queue = JobQueue()
+
+
+def get_job_queue() -> JobQueue:
+    """获取全局任务队列"""
+    return _job_queue
+
+
+def init_job_queue(app):
+    """
+    按应用配置初始化全局任务队列
+
+    Args:
+        app: Flask应用实例
+    """
+    _job_queue.configure(
+        path=app.config.get('JOB_QUEUE_PATH'),
+        max_workers=app.config.get('JOB_QUEUE_WORKERS'),
+        retention=app.config.get('JOB_RESULT_RETENTION')
+    )
+    try:
+        _job_queue.recover()
+    except sqlite3.Error as e:
+        logger.error(f"恢复任务状态失败: {str(e)}")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本机共享状态存储 - 同一台服务器上的多个工作进程（如gunicorn worker）通过一个本地SQLite文件共享少量状态
+
+- claim: 带有效期的互斥声明，用于告警静默/去重，多个进程同时判断出同一告警时只有一个能声明成功；
+  声明后的操作失败时用 release 撤销
+- 变更日志: 一个进程修改了配置后追加一条变更，其他进程按序号增量读取并应用
+
+只保存小而频繁访问的状态，不替代业务数据库。未配置文件路径时使用进程内存数据库，只在本进程内共享。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+CHANGELOG_RETENTION = 86400  # 变更日志保留时间(秒)
+BUSY_TIMEOUT = 5.0  # 等待其他进程释放写锁的时间(秒)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    owner INTEGER,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS changelog (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    owner INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_changelog_topic_seq ON changelog (topic, seq);
+"""
+
+
+class LocalStore:
+    """本机多进程共享的SQLite状态存储"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化
+
+        Args:
+            path: SQLite文件路径，为None时使用进程内存数据库
+        """
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._memory_conn: Optional[sqlite3.Connection] = None
+
+    def configure(self, path: Optional[str]):
+        """修改文件路径（已打开的连接在下次使用时重新打开）"""
+        with self._lock:
+            self.path = path
+            self._memory_conn = None
+            self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的连接，文件数据库每个线程一个连接，内存数据库所有线程共用一个连接"""
+        if not self.path:
+            with self._lock:
+                if self._memory_conn is None:
+                    self._memory_conn = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+                    self._memory_conn.executescript(SCHEMA)
+                return self._memory_conn
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        if not self.path:
+            with self._lock:
+                return self._connect().execute(sql, params)
+        return self._connect().execute(sql, params)
+
+    # ---------- 声明 ----------
+
+    def claim(self, namespace: str, key: str, now: Optional[float] = None, ttl: float = 0) -> Tuple[bool, float]:
+        """
+        声明一个键，上一次声明距今不足 ttl 秒时声明失败
+
+        Args:
+            namespace: 命名空间，如 'alert_silence'
+            key: 键
+            now: 声明时间(秒)，默认为当前时间
+            ttl: 有效期(秒)
+
+        Returns:
+            (是否声明成功, 当前有效的声明时间)
+        """
+        now = time.time() if now is None else now
+        try:
+            cursor = self._execute(
+                'INSERT INTO claims (namespace, key, claimed_at, owner) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (namespace, key) DO UPDATE SET claimed_at = excluded.claimed_at, owner = excluded.owner '
+                'WHERE excluded.claimed_at - claims.claimed_at >= ?',
+                (namespace, key, now, os.getpid(), ttl)
+            )
+            if cursor.rowcount:
+                return True, now
+            row = self._execute('SELECT claimed_at FROM claims WHERE namespace = ? AND key = ?',
+                                (namespace, key)).fetchone()
+            return False, row[0] if row else now
+        except sqlite3.Error as e:
+            # 共享存储不可用时不阻塞告警
+            logger.error(f"本地共享存储声明失败: {str(e)}")
+            return True, now
+
+    def release(self, namespace: str, key: str, claimed_at: float) -> bool:
+        """
+        撤销声明（只撤销声明时间为 claimed_at 的声明，其他进程之后的声明不受影响）
+
+        Returns:
+            是否撤销成功
+        """
+        try:
+            cursor = self._execute('DELETE FROM claims WHERE namespace = ? AND key = ? AND claimed_at = ?',
+                                   (namespace, key, claimed_at))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"本地共享存储撤销声明失败: {str(e)}")
+            return False
+
+    def get_claims(self, namespace: str) -> Dict[str, float]:
+        """获取命名空间下所有声明 {键: 声明时间}"""
+        try:
+            return dict(self._execute('SELECT key, claimed_at FROM claims WHERE namespace = ?', (namespace,)).fetchall())
+        except sqlite3.Error as e:
+            logger.error(f"读取本地共享存储失败: {str(e)}")
+            return {}
+
+    # ---------- 变更日志 ----------
+
+    def append_change(self, topic: str, payload: Dict) -> Optional[int]:
+        """
+        追加一条变更，并清理过期的变更
+
+        Returns:
+            变更序号，失败时返回None
+        """
+        now = time.time()
+        try:
+            cursor = self._execute(
+                'INSERT INTO changelog (topic, payload, owner, created_at) VALUES (?, ?, ?, ?)',
+                (topic, json.dumps(payload, ensure_ascii=False), os.getpid(), now)
+            )
+            self._execute('DELETE FROM changelog WHERE created_at < ?', (now - CHANGELOG_RETENTION,))
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            logger.error(f"写入本地共享存储变更日志失败: {str(e)}")
+            return None
+
+    def changes_since(self, topic: str, seq: int) -> List[Tuple[int, Dict]]:
+        """读取序号大于 seq 的变更 [(序号, 内容)]"""
+        try:
+            rows = self._execute(
+                'SELECT seq, payload FROM changelog WHERE topic = ? AND seq > ? ORDER BY seq', (topic, seq)
+            ).fetchall()
+            return [(row[0], json.loads(row[1])) for row in rows]
+        except sqlite3.Error as e:
+            logger.error(f"读取本地共享存储变更日志失败: {str(e)}")
+            return []
+
+    def last_seq(self, topic: str) -> int:
+        """获取主题当前最大的变更序号"""
+        try:
+            row = self._execute('SELECT MAX(seq) FROM changelog WHERE topic = ?', (topic,)).fetchone()
+            return row[0] or 0
+        except sqlite3.Error as e:
+            logger.error(f"读取本地共享存储变更日志失败: {str(e)}")
+            return 0
+
+
+# 全局本地共享存储实例
+_local_store = LocalStore()
+
+
+def get_local_store() -> LocalStore:
+    """获取全局本地共享存储"""
+    return _local_store
+
+
+def init_local_store(app):
+    """
+    按应用配置初始化全局本地共享存储
+
+    Args:
+        app: Flask应用实例
+    """
+    _local_store.configure(app.config.get('LOCAL_STORE_PATH'))
@@ -98,13 +98,28 @@ class Interface(db.Model):
     mac_address = db.Column(db.String(17))
     status = db.Column(db.String(16), default='unknown')  # up, down, error
     
+    # SNMP采集的接口计数器（IF-MIB）
+    if_index = db.Column(db.Integer, nullable=True)
+    speed = db.Column(db.Integer, nullable=True)  # 接口速率(Mbps)，ifHighSpeed
+    in_octets = db.Column(db.BigInteger, nullable=True)
+    out_octets = db.Column(db.BigInteger, nullable=True)
+    in_errors = db.Column(db.BigInteger, nullable=True)
+    out_errors = db.Column(db.BigInteger, nullable=True)
+    input_rate = db.Column(db.BigInteger, nullable=True)  # 输入速率(bps)
+    output_rate = db.Column(db.BigInteger, nullable=True)  # 输出速率(bps)
+    stats_updated_at = db.Column(db.DateTime, nullable=True)
+    
     def __repr__(self):
         return f'<Interface {self.name} ({self.device.name})>'
 
 
 # 故障模型
 class Fault(db.Model):
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # 巡检生成故障时按设备和故障类型查询未关闭的故障
+        db.Index('ix_faults_device_type_status', 'device_id', 'fault_type', 'status'),
+        {'extend_existing': True}
+    )
     """故障模型"""
     __tablename__ = 'faults'
     
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SNMP批量采集客户端 - 复用SnmpEngine和传输目标，批量GET和GETBULK遍历
+
+- 每个线程复用一个SnmpEngine，按 (ip, port) 缓存传输目标、按团体名缓存认证数据
+- 多个OID打包到同一个GET PDU中（按 max_oids_per_pdu 分片）
+- 表遍历使用GETBULK，多列同时遍历，max_repetitions可调
+- get_multi/walk_multi 将多台设备的请求同时发出，由同一个分发器并发等待响应
+"""
+
+import os
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+try:
+    from pysnmp.hlapi.asyncore import (
+        SnmpEngine, CommunityData, UdpTransportTarget, ContextData,
+        ObjectType, ObjectIdentity, getCmd, nextCmd, bulkCmd
+    )
+    from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchObject, NoSuchInstance
+    from pyasn1.type.univ import Null
+    SNMP_CLIENT_AVAILABLE = True
+except ImportError:
+    SNMP_CLIENT_AVAILABLE = False
+    logging.warning("PySnmp未安装，SNMP批量采集客户端将不可用")
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 2.0  # 单次请求超时(秒)
+DEFAULT_RETRIES = 1  # 重试次数
+DEFAULT_MAX_OIDS_PER_PDU = 40  # 每个GET PDU中最多的OID数
+DEFAULT_MAX_REPETITIONS = int(os.environ.get('SNMP_MAX_REPETITIONS') or 25)  # GETBULK每列返回的行数
+DEFAULT_MAX_INFLIGHT = 256  # 同时进行中的设备请求数
+MAX_WALK_REQUESTS = 10000  # 单次遍历的最大请求数，防止设备返回异常数据导致死循环
+
+
+def _normalize_oid(oid: str) -> str:
+    """去掉OID开头的点"""
+    return oid.lstrip('.')
+
+
+def _oid_tuple(oid: str) -> Tuple[int, ...]:
+    """OID字符串转为整数元组，便于比较前缀和大小"""
+    return tuple(int(x) for x in _normalize_oid(oid).split('.') if x)
+
+
+def _format_oid(name: Any, like: str) -> str:
+    """将响应中的OID格式化为与请求OID相同的风格（是否带前导点）"""
+    text = '.'.join(str(x) for x in tuple(name))
+    return '.' + text if like.startswith('.') else text
+
+
+def _is_missing(value: Any) -> bool:
+    """值是否表示对象不存在或遍历结束"""
+    return isinstance(value, (EndOfMibView, NoSuchObject, NoSuchInstance, Null))
+
+
+class _GetJob:
+    """单台设备的批量GET任务"""
+
+    def __init__(self, target: Dict, oids: List[str], max_oids_per_pdu: int):
+        self.target = target
+        self.oids = list(oids)
+        self.results: Dict[str, Optional[str]] = {oid: None for oid in self.oids}
+        self.chunks = [self.oids[i:i + max_oids_per_pdu] for i in range(0, len(self.oids), max_oids_per_pdu)]
+        self.pending = len(self.chunks)
+        self.error = None
+
+
+class _WalkJob:
+    """单台设备的GETBULK多列遍历任务"""
+
+    def __init__(self, target: Dict, oids: List[str], max_repetitions: int):
+        self.target = target
+        self.bases = list(oids)
+        self.base_tuples = [_oid_tuple(oid) for oid in self.bases]
+        self.results: Dict[str, List[Tuple[str, str]]] = {oid: [] for oid in self.bases}
+        self.max_repetitions = max_repetitions
+        # 每列当前遍历到的位置，None表示该列已结束
+        self.cursors: List[Optional[Tuple[int, ...]]] = list(self.base_tuples)
+        self.requests = 0
+        self.error = None
+
+    def active_columns(self) -> List[int]:
+        """尚未结束的列"""
+        return [i for i, cursor in enumerate(self.cursors) if cursor is not None]
+
+
+class SnmpClient:
+    """复用SnmpEngine的SNMP批量采集客户端（非线程安全，每个线程使用自己的实例）"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 max_oids_per_pdu: int = DEFAULT_MAX_OIDS_PER_PDU,
+                 max_repetitions: int = DEFAULT_MAX_REPETITIONS,
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT):
+        """
+        初始化客户端
+
+        Args:
+            timeout: 单次请求超时(秒)
+            retries: 重试次数
+            max_oids_per_pdu: 每个GET PDU中最多的OID数
+            max_repetitions: GETBULK每列返回的行数
+            max_inflight: 同时进行中的设备请求数
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.max_oids_per_pdu = max(1, int(max_oids_per_pdu))
+        self.max_repetitions = max(1, int(max_repetitions))
+        self.max_inflight = max(1, int(max_inflight))
+
+        self._engine = SnmpEngine()
+        self._context = ContextData()
+        self._targets: Dict[tuple, Any] = {}
+        self._auth: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.stats = {'requests': 0, 'timeouts': 0, 'errors': 0}
+
+        # 当前批次的调度状态
+        self._queue = deque()
+        self._inflight = 0
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+
+    def get(self, ip: str, community: str, oids: List[str], port: int = 161,
+            version: int = 2, timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        获取单台设备的多个OID，多个OID打包到同一个PDU中
+
+        Returns:
+            {oid: 值字符串}，不存在或失败的OID值为None
+        """
+        target = self._make_target(ip, community, port, version, timeout, oids=oids)
+        return self.get_multi([target])[0]
+
+    def walk(self, ip: str, community: str, oids: List[str], port: int = 161,
+             version: int = 2, max_repetitions: Optional[int] = None,
+             timeout: Optional[float] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        遍历单台设备的一个或多个子树，多个子树在同一个GETBULK请求中并行遍历
+
+        Returns:
+            {起始oid: [(oid, 值字符串), ...]}
+        """
+        if isinstance(oids, str):
+            oids = [oids]
+        target = self._make_target(ip, community, port, version, timeout, oids=oids,
+                                   max_repetitions=max_repetitions)
+        return self.walk_multi([target])[0]
+
+    def get_multi(self, targets: List[Dict]) -> List[Dict[str, Optional[str]]]:
+        """
+        并发获取多台设备的OID
+
+        Args:
+            targets: 目标列表，每项包含 ip/community/oids，可选 port/version/timeout
+
+        Returns:
+            与targets顺序一致的结果列表
+        """
+        jobs = [_GetJob(target, target['oids'], self.max_oids_per_pdu) for target in targets]
+        self._run(jobs, self._start_get)
+        return [job.results for job in jobs]
+
+    def walk_multi(self, targets: List[Dict]) -> List[Dict[str, List[Tuple[str, str]]]]:
+        """
+        并发遍历多台设备
+
+        Args:
+            targets: 目标列表，每项包含 ip/community/oids，可选 port/version/timeout/max_repetitions
+
+        Returns:
+            与targets顺序一致的结果列表
+        """
+        jobs = [
+            _WalkJob(target, [target['oids']] if isinstance(target['oids'], str) else target['oids'],
+                     target.get('max_repetitions') or self.max_repetitions)
+            for target in targets
+        ]
+        self._run(jobs, self._start_walk)
+        return [job.results for job in jobs]
+
+    def close(self):
+        """关闭分发器，释放套接字"""
+        try:
+            self._engine.transportDispatcher.closeDispatcher()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+
+    def _make_target(self, ip: str, community: str, port: int, version: int,
+                     timeout: Optional[float], **extra) -> Dict:
+        target = {'ip': ip, 'community': community, 'port': port, 'version': version, 'timeout': timeout}
+        target.update(extra)
+        return target
+
+    def _get_transport(self, target: Dict):
+        """获取缓存的传输目标"""
+        timeout = target.get('timeout') or self.timeout
+        key = (target['ip'], target.get('port', 161), timeout)
+        transport = self._targets.get(key)
+        if transport is None:
+            transport = UdpTransportTarget((key[0], key[1]), timeout=timeout, retries=self.retries)
+            self._targets[key] = transport
+        return transport
+
+    def _get_auth(self, target: Dict):
+        """获取缓存的认证数据"""
+        mp_model = 0 if target.get('version', 2) == 1 else 1
+        key = (target['community'], mp_model)
+        auth = self._auth.get(key)
+        if auth is None:
+            auth = CommunityData(target['community'], mpModel=mp_model)
+            self._auth[key] = auth
+        return auth
+
+    def _run(self, jobs: List[Any], starter: Callable):
+        """调度一批任务并运行分发器直到全部完成"""
+        if not jobs:
+            return
+        with self._lock:
+            self._queue = deque((job, starter) for job in jobs)
+            self._inflight = 0
+            self._fill()
+            try:
+                self._engine.transportDispatcher.runDispatcher()
+            except Exception as e:
+                logger.error(f"SNMP分发器运行出错: {str(e)}")
+                for job in jobs:
+                    job.error = job.error or str(e)
+
+    def _fill(self):
+        """在并发上限内启动排队的任务"""
+        while self._queue and self._inflight < self.max_inflight:
+            job, starter = self._queue.popleft()
+            self._inflight += 1
+            try:
+                starter(job)
+            except Exception as e:
+                logger.error(f"SNMP请求 {job.target['ip']} 发送失败: {str(e)}")
+                job.error = str(e)
+                self._job_done()
+
+    def _job_done(self):
+        """任务完成，启动下一个排队任务"""
+        self._inflight -= 1
+        self._fill()
+
+    def _record_error(self, job: Any, error_indication: Any, error_status: Any) -> bool:
+        """记录请求错误，返回是否有错误"""
+        if error_indication:
+            job.error = str(error_indication)
+            if 'timeout' in job.error.lower() or 'timed out' in job.error.lower():
+                self.stats['timeouts'] += 1
+            else:
+                self.stats['errors'] += 1
+            logger.warning(f"SNMP错误 {job.target['ip']}: {error_indication}")
+            return True
+        if error_status:
+            job.error = error_status.prettyPrint()
+            self.stats['errors'] += 1
+            logger.warning(f"SNMP错误状态 {job.target['ip']}: {error_status.prettyPrint()}")
+            return True
+        return False
+
+    def _start_get(self, job: _GetJob):
+        """发送GET任务的所有分片"""
+        if not job.chunks:
+            self._job_done()
+            return
+        for chunk in job.chunks:
+            self.stats['requests'] += 1
+            getCmd(
+                self._engine, self._get_auth(job.target), self._get_transport(job.target), self._context,
+                *[ObjectType(ObjectIdentity(_normalize_oid(oid))) for oid in chunk],
+                cbFun=self._on_get, cbCtx=(job, chunk), lookupMib=False
+            )
+
+    def _on_get(self, snmp_engine, send_request_handle, error_indication, error_status,
+                error_index, var_binds, cb_ctx):
+        """GET响应回调"""
+        job, chunk = cb_ctx
+        try:
+            if not self._record_error(job, error_indication, error_status):
+                for oid, (name, value) in zip(chunk, var_binds):
+                    job.results[oid] = None if _is_missing(value) else value.prettyPrint()
+        except Exception as e:
+            logger.error(f"处理SNMP响应 {job.target['ip']} 出错: {str(e)}")
+            job.error = str(e)
+        finally:
+            job.pending -= 1
+            if job.pending == 0:
+                self._job_done()
+
+    def _start_walk(self, job: _WalkJob):
+        """发送遍历任务的下一个请求（v2c使用GETBULK，v1使用GETNEXT）"""
+        columns = job.active_columns()
+        if not columns or job.requests >= MAX_WALK_REQUESTS:
+            self._job_done()
+            return
+
+        job.requests += 1
+        self.stats['requests'] += 1
+        var_binds = [ObjectType(ObjectIdentity('.'.join(str(x) for x in job.cursors[i]))) for i in columns]
+        auth = self._get_auth(job.target)
+        transport = self._get_transport(job.target)
+
+        if job.target.get('version', 2) == 1:
+            nextCmd(self._engine, auth, transport, self._context, *var_binds,
+                    cbFun=self._on_walk, cbCtx=(job, columns), lookupMib=False)
+        else:
+            bulkCmd(self._engine, auth, transport, self._context, 0, job.max_repetitions, *var_binds,
+                    cbFun=self._on_walk, cbCtx=(job, columns), lookupMib=False)
+
+    def _on_walk(self, snmp_engine, send_request_handle, error_indication, error_status,
+                 error_index, var_bind_table, cb_ctx):
+        """遍历响应回调：记录子树内的结果并继续请求未结束的列"""
+        job, columns = cb_ctx
+        try:
+            if self._record_error(job, error_indication, error_status):
+                self._job_done()
+                return
+
+            for row in var_bind_table:
+                for position, (name, value) in enumerate(row[:len(columns)]):
+                    column = columns[position]
+                    cursor = job.cursors[column]
+                    if cursor is None:
+                        continue
+                    name_tuple = tuple(name)
+                    base = job.base_tuples[column]
+                    # 超出子树、遍历结束或OID未递增时结束该列
+                    if _is_missing(value) or name_tuple[:len(base)] != base or name_tuple <= cursor:
+                        job.cursors[column] = None
+                        continue
+                    base_oid = job.bases[column]
+                    job.results[base_oid].append((_format_oid(name, base_oid), value.prettyPrint()))
+                    job.cursors[column] = name_tuple
+
+            if not var_bind_table:
+                job.cursors = [None] * len(job.cursors)
+        except Exception as e:
+            logger.error(f"处理SNMP遍历响应 {job.target['ip']} 出错: {str(e)}")
+            job.error = str(e)
+            self._job_done()
+            return
+
+        # 继续请求未结束的列，或结束任务
+        self._start_walk(job)
+
+
+# 每个线程一个客户端实例，线程内复用SnmpEngine和传输目标
+_local = threading.local()
+
+
+def get_snmp_client() -> Optional[SnmpClient]:
+    """获取当前线程的SNMP客户端，PySnmp不可用时返回None"""
+    if not SNMP_CLIENT_AVAILABLE:
+        return None
+    client = getattr(_local, 'client', None)
+    if client is None:
+        client = SnmpClient()
+        _local.client = client
+    return client
@@ -96,8 +96,11 @@ try:
     import pyasn1
     logger.info("pyasn1导入成功")
     
-    # 尝试导入pysnmp
-    from pysnmp.hlapi import *
+    # 尝试导入pysnmp（SNMP客户端导入失败时只记录标志，这里转为ImportError）
+    from src.core import snmp_client
+    if not snmp_client.SNMP_CLIENT_AVAILABLE:
+        raise ImportError("No module named 'pysnmp'")
+    from src.core.snmp_client import get_snmp_client
     SNMP_AVAILABLE = True
     logger.info("成功加载PySnmp模块")
 except ImportError as e:
@@ -110,7 +113,11 @@ except ImportError as e:
                 importlib.reload(sys.modules['pyasn1'])
             
             # 尝试导入PySnmp
-            from pysnmp.hlapi import *
+            from src.core import snmp_client
+            importlib.reload(snmp_client)
+            if not snmp_client.SNMP_CLIENT_AVAILABLE:
+                raise ImportError("No module named 'pysnmp'")
+            from src.core.snmp_client import get_snmp_client
             SNMP_AVAILABLE = True
             logger.info("安装依赖后成功加载PySnmp模块")
         except ImportError as e2:
@@ -201,31 +208,8 @@ def get_snmp_data(ip, community, oid):
     if not SNMP_AVAILABLE:
         return generate_mock_data(oid)
         
-    try:
-        # 使用PySnmp获取真实数据
-        iterator = getCmd(
-            SnmpEngine(),
-            CommunityData(community),
-            UdpTransportTarget((ip, 161), timeout=2.0, retries=1),
-            ContextData(),
-            ObjectType(ObjectIdentity(oid))
-        )
-        
-        error_indication, error_status, error_index, var_binds = next(iterator)
-        
-        if error_indication:
-            logger.warning(f"SNMP错误: {error_indication}")
-            return generate_mock_data(oid)
-        elif error_status:
-            logger.warning(f"SNMP错误状态: {error_status.prettyPrint()} at {var_binds[int(error_index) - 1][0] if error_index else '?'}")
-            return generate_mock_data(oid)
-        else:
-            # 成功获取数据
-            for var_bind in var_binds:
-                return var_bind[1].prettyPrint()
-    except Exception as e:
-        logger.error(f"SNMP查询错误: {str(e)}")
-        return generate_mock_data(oid)
+    result = get_snmp_bulk(ip, community, [oid])
+    return result[oid]
 
 def get_snmp_bulk(ip, community, oids):
     """
@@ -239,9 +223,20 @@ def get_snmp_bulk(ip, community, oids):
     Returns:
         查询结果字典
     """
+    if not SNMP_AVAILABLE:
+        return {oid: generate_mock_data(oid) for oid in oids}
+        
+    try:
+        # 所有OID打包到同一个GET请求中，复用当前线程的SnmpEngine
+        values = get_snmp_client().get(ip, community, list(oids))
+    except Exception as e:
+        logger.error(f"SNMP查询错误: {str(e)}")
+        values = {}
+    
     results = {}
     for oid in oids:
-        results[oid] = get_snmp_data(ip, community, oid)
+        value = values.get(oid)
+        results[oid] = value if value is not None else generate_mock_data(oid)
     return results
 
 def snmp_walk(ip, community, oid):
@@ -260,24 +255,8 @@ def snmp_walk(ip, community, oid):
         return generate_mock_walk_data(oid)
         
     try:
-        results = []
-        for (error_indication, error_status, error_index, var_binds) in nextCmd(
-            SnmpEngine(),
-            CommunityData(community),
-            UdpTransportTarget((ip, 161), timeout=2.0, retries=1),
-            ContextData(),
-            ObjectType(ObjectIdentity(oid)),
-            lexicographicMode=False
-        ):
-            if error_indication:
-                logger.warning(f"SNMP错误: {error_indication}")
-                break
-            elif error_status:
-                logger.warning(f"SNMP错误状态: {error_status.prettyPrint()} at {var_binds[int(error_index) - 1][0] if error_index else '?'}")
-                break
-            else:
-                for var_bind in var_binds:
-                    results.append((var_bind[0].prettyPrint(), var_bind[1].prettyPrint()))
+        # 使用GETBULK遍历
+        results = get_snmp_client().walk(ip, community, [oid])[oid]
         
         if not results:
             return generate_mock_walk_data(oid)
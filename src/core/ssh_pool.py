@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+进程内共享的SSH会话池 - 性能监控、巡检、策略下发和自定义命令共用同一组到设备的SSH会话
+
+- 租用: 调用方通过 lease()/acquire() 独占一个会话，用完归还，归还前其他调用方不会使用它
+- 每台设备会话数上限: 设备的VTY线路通常只有几条，达到上限时等待其他调用方归还
+- 空闲回收: 空闲超过 idle_timeout 的会话由后台线程关闭
+- 健康探测: 后台线程定期探测空闲会话（同时起到保活作用），不再为每台设备单独运行保活任务
+- 统计: get_stats() 返回会话数、复用率、等待时间等指标
+
+会话对象由调用方提供的工厂函数创建，可以是Netmiko连接，也可以是其他提供
+disconnect()/close() 和 is_alive() 的对象。同一设备可以有不同种类(kind)的会话，例如CLI和交互式shell，
+种类不同的会话不会互相复用，但共同计入该设备的会话数上限。
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS_PER_DEVICE = 2
+DEFAULT_IDLE_TIMEOUT = 300  # 空闲会话保留时间(秒)
+DEFAULT_PROBE_INTERVAL = 60  # 空闲会话探测间隔(秒)
+DEFAULT_LEASE_TIMEOUT = 30  # 等待可用会话的时间(秒)
+MAINTENANCE_INTERVAL = 10  # 后台维护线程的检查间隔(秒)
+
+
+class SSHPoolError(Exception):
+    """SSH会话池错误（连接失败或等待会话超时）"""
+    pass
+
+
+class PooledSession:
+    """池中的一个会话"""
+
+    def __init__(self, device_id: int, kind: str, conn: Any):
+        self.device_id = device_id
+        self.kind = kind
+        self.conn = conn
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.last_probe = self.created_at
+        self.uses = 0
+        self.in_use = False
+        self.discard = False  # 归还时关闭
+
+
+class SSHSessionPool:
+    """按设备租用的SSH会话池"""
+
+    def __init__(self, max_sessions_per_device: int = DEFAULT_MAX_SESSIONS_PER_DEVICE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT):
+        """
+        初始化
+
+        Args:
+            max_sessions_per_device: 每台设备的会话数上限
+            idle_timeout: 空闲会话保留时间(秒)
+            probe_interval: 空闲会话探测间隔(秒)
+            lease_timeout: 默认等待可用会话的时间(秒)
+        """
+        self.max_sessions_per_device = max_sessions_per_device
+        self.idle_timeout = idle_timeout
+        self.probe_interval = probe_interval
+        self.lease_timeout = lease_timeout
+        self._cond = threading.Condition()
+        self._sessions: Dict[int, List[PooledSession]] = {}
+        self._opening: Dict[int, int] = {}  # 正在建立的会话数
+        self._factories: Dict[Tuple[int, str], Callable[[], Any]] = {}
+        self._maintainer: Optional[threading.Thread] = None
+        self._maintainer_pid = None
+        self._stats = {
+            'leases': 0, 'created': 0, 'reused': 0, 'closed': 0, 'idle_evicted': 0,
+            'probe_failures': 0, 'broken': 0, 'connect_failures': 0, 'wait_timeouts': 0,
+            'waits': 0, 'wait_time': 0.0
+        }
+
+    def configure(self, max_sessions_per_device: Optional[int] = None, idle_timeout: Optional[float] = None,
+                  probe_interval: Optional[float] = None, lease_timeout: Optional[float] = None):
+        """修改配置"""
+        with self._cond:
+            self.max_sessions_per_device = max_sessions_per_device or self.max_sessions_per_device
+            self.idle_timeout = idle_timeout or self.idle_timeout
+            self.probe_interval = probe_interval or self.probe_interval
+            self.lease_timeout = lease_timeout or self.lease_timeout
+            self._cond.notify_all()
+
+    # ---------- 租用 ----------
+
+    def register(self, device_id: int, factory: Callable[[], Any], kind: str = 'cli'):
+        """登记设备会话的工厂函数，之后 lease(device_id) 可以不再传入工厂函数"""
+        with self._cond:
+            self._factories[(device_id, kind)] = factory
+
+    def has_factory(self, device_id: int, kind: str = 'cli') -> bool:
+        return (device_id, kind) in self._factories
+
+    def acquire(self, device_id: int, factory: Optional[Callable[[], Any]] = None, kind: str = 'cli',
+                timeout: Optional[float] = None) -> PooledSession:
+        """
+        租用设备的一个会话：优先复用空闲会话，未达上限时新建，否则等待其他调用方归还
+
+        Args:
+            device_id: 设备ID
+            factory: 新建会话的工厂函数，为None时使用已登记的工厂函数
+            kind: 会话种类
+            timeout: 等待可用会话的时间(秒)，默认使用 lease_timeout
+
+        Returns:
+            租用的会话，用完后必须调用 release()
+
+        Raises:
+            SSHPoolError: 没有工厂函数、等待超时或建立连接失败
+        """
+        self._ensure_maintainer()
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+        waited = False
+        start = time.time()
+
+        with self._cond:
+            if factory is not None:
+                self._factories[(device_id, kind)] = factory
+            factory = self._factories.get((device_id, kind))
+            if factory is None:
+                raise SSHPoolError(f"设备 {device_id} 没有可用的连接参数")
+
+            while True:
+                sessions = self._sessions.setdefault(device_id, [])
+                for session in sessions:
+                    if not session.in_use and not session.discard and session.kind == kind:
+                        session.in_use = True
+                        session.uses += 1
+                        self._stats['leases'] += 1
+                        self._stats['reused'] += 1
+                        self._record_wait(waited, start)
+                        return session
+
+                total = len(sessions) + self._opening.get(device_id, 0)
+                if total >= self.max_sessions_per_device:
+                    # 会话数已满时，关闭一个其他种类的空闲会话腾出位置
+                    idle_other = next((s for s in sessions if not s.in_use and s.kind != kind), None)
+                    if idle_other is not None:
+                        sessions.remove(idle_other)
+                        self._close_later(idle_other)
+                        total -= 1
+
+                if total < self.max_sessions_per_device:
+                    self._opening[device_id] = self._opening.get(device_id, 0) + 1
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._stats['wait_timeouts'] += 1
+                    raise SSHPoolError(f"等待设备 {device_id} 的可用会话超时（上限 {self.max_sessions_per_device}）")
+                waited = True
+                self._cond.wait(remaining)
+
+        # 在锁外建立连接，避免阻塞其他设备的租用
+        try:
+            conn = factory()
+            if conn is None:
+                raise SSHPoolError(f"无法连接设备 {device_id}")
+        except Exception as e:
+            with self._cond:
+                self._opening[device_id] -= 1
+                self._stats['connect_failures'] += 1
+                self._cond.notify_all()
+            if isinstance(e, SSHPoolError):
+                raise
+            raise SSHPoolError(f"连接设备 {device_id} 失败: {str(e)}") from e
+
+        session = PooledSession(device_id, kind, conn)
+        session.in_use = True
+        session.uses = 1
+        with self._cond:
+            self._opening[device_id] -= 1
+            self._sessions.setdefault(device_id, []).append(session)
+            self._stats['leases'] += 1
+            self._stats['created'] += 1
+            self._record_wait(waited, start)
+        return session
+
+    def release(self, session: PooledSession, broken: bool = False):
+        """
+        归还会话
+
+        Args:
+            session: acquire() 返回的会话
+            broken: 会话在使用中出错，状态不确定，直接关闭
+        """
+        with self._cond:
+            session.in_use = False
+            session.last_used = time.time()
+            if broken or session.discard:
+                if broken:
+                    self._stats['broken'] += 1
+                self._remove(session)
+            self._cond.notify_all()
+        if broken or session.discard:
+            self._close(session)
+
+    @contextmanager
+    def lease(self, device_id: int, factory: Optional[Callable[[], Any]] = None, kind: str = 'cli',
+              timeout: Optional[float] = None):
+        """
+        以上下文管理器方式租用会话，块内抛出异常时会话视为损坏并关闭
+
+        Yields:
+            连接对象
+        """
+        session = self.acquire(device_id, factory, kind, timeout)
+        broken = False
+        try:
+            yield session.conn
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(session, broken=broken)
+
+    def close_device(self, device_id: int):
+        """关闭设备的全部空闲会话，正在使用的会话在归还时关闭"""
+        with self._cond:
+            idle = []
+            for session in list(self._sessions.get(device_id, [])):
+                if session.in_use:
+                    session.discard = True
+                else:
+                    self._remove(session)
+                    idle.append(session)
+            for key in [key for key in self._factories if key[0] == device_id]:
+                del self._factories[key]
+        for session in idle:
+            self._close(session)
+
+    def close_all(self):
+        """关闭全部会话"""
+        for device_id in list(self._sessions):
+            self.close_device(device_id)
+
+    # ---------- 维护 ----------
+
+    def maintain(self, now: Optional[float] = None):
+        """回收空闲超时的会话，探测长时间未使用的会话（后台线程定期调用）"""
+        now = time.time() if now is None else now
+        expired, to_probe = [], []
+        with self._cond:
+            for sessions in self._sessions.values():
+                for session in list(sessions):
+                    if session.in_use:
+                        continue
+                    if now - session.last_used >= self.idle_timeout:
+                        sessions.remove(session)
+                        expired.append(session)
+                    elif now - max(session.last_used, session.last_probe) >= self.probe_interval:
+                        # 探测期间标记为使用中，避免被同时租出
+                        session.in_use = True
+                        to_probe.append(session)
+            self._stats['idle_evicted'] += len(expired)
+
+        for session in expired:
+            logger.debug(f"关闭设备 {session.device_id} 空闲的SSH会话")
+            self._close(session)
+
+        for session in to_probe:
+            alive = _probe(session.conn)
+            with self._cond:
+                session.in_use = False
+                session.last_probe = now
+                if not alive:
+                    self._stats['probe_failures'] += 1
+                # 探测期间设备被关闭（close_device）的会话与 release() 一样直接关闭
+                if not alive or session.discard:
+                    self._remove(session)
+                self._cond.notify_all()
+            if not alive:
+                logger.warning(f"设备 {session.device_id} 的SSH会话探测失败，已关闭")
+            if not alive or session.discard:
+                self._close(session)
+
+    def _ensure_maintainer(self):
+        """按需启动后台维护线程（在fork出的工作进程中首次租用时启动）"""
+        if self._maintainer_pid == os.getpid() and self._maintainer and self._maintainer.is_alive():
+            return
+        with self._cond:
+            if self._maintainer_pid == os.getpid() and self._maintainer and self._maintainer.is_alive():
+                return
+            self._maintainer_pid = os.getpid()
+            self._maintainer = threading.Thread(target=self._maintain_loop, name='ssh-pool-maintainer', daemon=True)
+            self._maintainer.start()
+
+    def _maintain_loop(self):
+        while True:
+            time.sleep(MAINTENANCE_INTERVAL)
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"SSH会话池维护出错: {str(e)}")
+
+    # ---------- 统计 ----------
+
+    def get_stats(self) -> Dict:
+        """获取会话池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            sessions = [s for device_sessions in self._sessions.values() for s in device_sessions]
+            stats['sessions'] = len(sessions)
+            stats['in_use'] = sum(1 for s in sessions if s.in_use)
+            stats['idle'] = stats['sessions'] - stats['in_use']
+            stats['devices'] = sum(1 for device_sessions in self._sessions.values() if device_sessions)
+            stats['max_sessions_per_device'] = self.max_sessions_per_device
+            stats['reuse_ratio'] = round(stats['reused'] / stats['leases'], 3) if stats['leases'] else 0.0
+            stats['avg_wait'] = round(stats['wait_time'] / stats['waits'], 3) if stats['waits'] else 0.0
+            return stats
+
+    def device_sessions(self, device_id: int) -> List[Dict]:
+        """获取设备的会话列表"""
+        with self._cond:
+            return [{
+                'kind': s.kind,
+                'in_use': s.in_use,
+                'uses': s.uses,
+                'age': round(time.time() - s.created_at, 1),
+                'idle': 0 if s.in_use else round(time.time() - s.last_used, 1)
+            } for s in self._sessions.get(device_id, [])]
+
+    # ---------- 内部方法 ----------
+
+    def _record_wait(self, waited: bool, start: float):
+        if waited:
+            self._stats['waits'] += 1
+            self._stats['wait_time'] += time.time() - start
+
+    def _remove(self, session: PooledSession):
+        sessions = self._sessions.get(session.device_id, [])
+        if session in sessions:
+            sessions.remove(session)
+        if not sessions:
+            self._sessions.pop(session.device_id, None)
+
+    def _close_later(self, session: PooledSession):
+        threading.Thread(target=self._close, args=(session,), daemon=True).start()
+
+    def _close(self, session: PooledSession):
+        with self._cond:
+            self._stats['closed'] += 1
+        try:
+            if hasattr(session.conn, 'disconnect'):
+                session.conn.disconnect()
+            elif hasattr(session.conn, 'close'):
+                session.conn.close()
+        except Exception as e:
+            logger.debug(f"关闭设备 {session.device_id} 的SSH会话出错: {str(e)}")
+
+
+def _probe(conn: Any) -> bool:
+    """探测会话是否可用"""
+    try:
+        if hasattr(conn, 'is_alive'):
+            return bool(conn.is_alive())
+        if hasattr(conn, 'find_prompt'):
+            conn.find_prompt()
+        return True
+    except Exception:
+        return False
+
+
+# 全局SSH会话池实例
+_ssh_pool = SSHSessionPool()
+
+
+def get_ssh_pool() -> SSHSessionPool:
+    """获取全局SSH会话池"""
+    return _ssh_pool
+
+
+def init_ssh_pool(app):
+    """
+    按应用配置初始化全局SSH会话池
+
+    Args:
+        app: Flask应用实例
+    """
+    _ssh_pool.configure(
+        max_sessions_per_device=app.config.get('SSH_POOL_MAX_SESSIONS_PER_DEVICE'),
+        idle_timeout=app.config.get('SSH_POOL_IDLE_TIMEOUT'),
+        probe_interval=app.config.get('SSH_POOL_PROBE_INTERVAL'),
+        lease_timeout=app.config.get('SSH_POOL_LEASE_TIMEOUT')
+    )
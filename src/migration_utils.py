@@ -224,6 +224,34 @@ def add_missing_columns():
         else:
             logger.warning("performance_records表不存在，无法添加列")
         
+        # 检查interfaces表结构（SNMP接口计数器字段）
+        if 'interfaces' in inspector.get_table_names():
+            existing_columns = {col['name'] for col in inspector.get_columns('interfaces')}
+            
+            columns_to_add = {
+                'if_index': 'INTEGER',
+                'speed': 'INTEGER',
+                'in_octets': 'BIGINT',
+                'out_octets': 'BIGINT',
+                'in_errors': 'BIGINT',
+                'out_errors': 'BIGINT',
+                'input_rate': 'BIGINT',
+                'output_rate': 'BIGINT',
+                'stats_updated_at': 'DATETIME'
+            }
+            
+            for col_name, col_type in columns_to_add.items():
+                if col_name not in existing_columns:
+                    sql_text = text(f"ALTER TABLE interfaces ADD COLUMN {col_name} {col_type}")
+                    try:
+                        with db.engine.connect() as conn:
+                            conn.execute(sql_text)
+                            conn.commit()
+                        added_columns.append(f"interfaces.{col_name}")
+                        logger.info(f"成功添加列 {col_name} 到 interfaces 表")
+                    except Exception as e:
+                        logger.error(f"添加列 {col_name} 时出错: {str(e)}")
+        
         return {
             'status': 'ok',
             'added_columns': added_columns
@@ -236,6 +264,51 @@ def add_missing_columns():
             'message': str(e)
         }
 
+def add_missing_indexes():
+    """
+    为已存在的表创建模型中定义但数据库中缺少的索引（create_all 不会为已有表补建索引）
+    
+    Returns:
+        dict: 创建结果
+    """
+    try:
+        from sqlalchemy import inspect
+        from src.modules.performance.models import Alert
+        
+        created_indexes = []
+        inspector = inspect(db.engine)
+        table_names = inspector.get_table_names()
+        
+        for table in (PerformanceRecord.__table__, Alert.__table__):
+            if table.name not in table_names:
+                continue
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if any(column.name not in existing_columns for column in index.columns):
+                    logger.warning(f"表 {table.name} 缺少索引 {index.name} 所需的列，跳过")
+                    continue
+                try:
+                    index.create(bind=db.engine)
+                    created_indexes.append(index.name)
+                    logger.info(f"成功创建索引 {index.name}")
+                except Exception as e:
+                    logger.error(f"创建索引 {index.name} 时出错: {str(e)}")
+        
+        return {
+            'status': 'ok',
+            'created_indexes': created_indexes
+        }
+        
+    except Exception as e:
+        logger.error(f"创建缺少索引时出错: {str(e)}")
+        return {
+            'status': 'error',
+            'message': str(e)
+        }
+
 def run_compatibility_fixes():
     """
     运行兼容性修复，确保系统正常运行
@@ -266,6 +339,10 @@ def run_compatibility_fixes():
         columns_result = add_missing_columns()
         logger.info(f"添加缺少列结果: {columns_result}")
         
+        # 创建缺少的索引
+        indexes_result = add_missing_indexes()
+        logger.info(f"创建缺少索引结果: {indexes_result}")
+        
         # 2. 检查如果旧数据存在但新表为空，则迁移数据
         old_count = 0
         new_count = 0
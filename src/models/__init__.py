@@ -9,7 +9,7 @@
 from src.models.device import Device, DeviceType
 
 # 导入性能相关模型
-from src.models.performance import PerformanceRecord, Threshold
+from src.models.performance import PerformanceRecord, Threshold, MetricSample, PerformanceRollup
 
 # 导入维护相关模型
 from src.models.maintenance import MaintenanceRecord, InspectionReport, InspectionItem
@@ -23,6 +23,8 @@ __all__ = [
     'DeviceType',
     'PerformanceRecord',
     'Threshold',
+    'MetricSample',
+    'PerformanceRollup',
     'MaintenanceRecord',
     'InspectionReport',
     'InspectionItem'
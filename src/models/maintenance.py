@@ -5,6 +5,7 @@
 维护记录相关模型
 """
 
+import json
 from datetime import datetime
 from src.core.db import db
 from src.models.base import BaseModel
@@ -56,6 +57,9 @@ class InspectionReport(BaseModel):
     abnormal_devices = db.Column(db.Integer, default=0)  # 异常设备数
     summary = db.Column(db.Text)  # 巡检总结
     operator = db.Column(db.String(50))  # 操作人
+    status = db.Column(db.String(20), default='completed')  # 巡检状态：running、completed、interrupted
+    completed_devices = db.Column(db.Integer, default=0)  # 已完成巡检的设备数（进度）
+    device_ids = db.Column(db.Text)  # 计划巡检的设备ID列表(JSON)，用于中断后继续巡检
     
     # 关联关系
     inspection_items = db.relationship('InspectionItem', backref='report', lazy=True, cascade='all, delete-orphan')
@@ -76,6 +80,10 @@ class InspectionReport(BaseModel):
             'abnormal_devices': self.abnormal_devices,
             'summary': self.summary,
             'operator': self.operator,
+            'status': self.status,
+            'completed_devices': self.completed_devices,
+            'progress': round(self.completed_devices / self.total_devices * 100, 1)
+                if self.total_devices and self.completed_devices is not None else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -83,6 +91,13 @@ class InspectionReport(BaseModel):
 class InspectionItem(BaseModel):
     """设备巡检项模型"""
     __tablename__ = 'inspection_items'
+    __table_args__ = (
+        # 继续中断的巡检时按报告查询已完成的设备
+        db.Index('ix_inspection_items_report_device', 'report_id', 'device_id'),
+        # 增量巡检时查询各设备最近一次巡检项
+        db.Index('ix_inspection_items_device_id', 'device_id', 'id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     report_id = db.Column(db.Integer, db.ForeignKey('inspection_reports.id'), nullable=False)
@@ -92,17 +107,31 @@ class InspectionItem(BaseModel):
     memory_usage = db.Column(db.Float)  # 内存使用率
     uptime = db.Column(db.String(100))  # 设备运行时间
     firmware_version = db.Column(db.String(50))  # 固件版本
-    port_usage = db.Column(db.Text)  # 端口使用情况(JSON)
+    port_usage = db.Column(db.Text)  # 端口使用情况(JSON)，port_usage_base_id 不为空时为相对基准记录的差异
+    port_usage_base_id = db.Column(db.Integer, db.ForeignKey('inspection_items.id'), nullable=True)  # 接口差异的基准巡检项，为空表示完整记录
     system_load = db.Column(db.Float)  # 系统负载
     error_message = db.Column(db.Text)  # 错误信息
     inspection_results = db.Column(db.Text)  # 巡检结果详情(JSON)
     
     # 关联关系
     device = db.relationship('Device', backref='inspection_items')
+    port_usage_base = db.relationship('InspectionItem', remote_side=[id])
     
     def __repr__(self):
         return f'<InspectionItem {self.id} for device {self.device_id}>'
     
+    def get_port_usage(self):
+        """获取完整的端口使用情况(JSON)，差异记录与基准记录合并"""
+        if self.port_usage_base_id is None or not self.port_usage:
+            return self.port_usage
+        base = self.port_usage_base
+        interfaces = json.loads(base.port_usage) if base and base.port_usage else {}
+        diff = json.loads(self.port_usage)
+        for name in diff.get('removed', []):
+            interfaces.pop(name, None)
+        interfaces.update(diff.get('changed', {}))
+        return json.dumps(interfaces, ensure_ascii=False)
+    
     def to_dict(self):
         """转换为字典"""
         device_name = self.device.name if self.device else '未知设备'
@@ -118,7 +147,7 @@ class InspectionItem(BaseModel):
             'memory_usage': self.memory_usage,
             'uptime': self.uptime,
             'firmware_version': self.firmware_version,
-            'port_usage': self.port_usage,
+            'port_usage': self.get_port_usage(),
             'system_load': self.system_load,
             'error_message': self.error_message,
             'inspection_results': self.inspection_results,
@@ -13,7 +13,14 @@ from src.models.device import Device
 class PerformanceRecord(BaseModel):
     """性能记录模型"""
     __tablename__ = 'performance_records'
-    __table_args__ = {'extend_existing': True}  # 添加此参数解决表重复定义问题
+    __table_args__ = (
+        # 按设备和时间范围查询并排序；包含指标列，趋势/统计查询只读索引即可完成
+        db.Index('ix_performance_records_device_time', 'device_id', 'recorded_at',
+                 'cpu_usage', 'memory_usage', 'bandwidth_usage'),
+        # 按时间清理过期数据
+        db.Index('ix_performance_records_recorded_at', 'recorded_at'),
+        {'extend_existing': True}  # 添加此参数解决表重复定义问题
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
@@ -69,4 +76,56 @@ class Threshold(BaseModel):
             'critical_threshold': self.critical_threshold,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        } 
+class MetricSample(db.Model):
+    """原始指标采样模型（性能记录表之外的指标，如接口速率）"""
+    __tablename__ = 'metric_samples'
+    __table_args__ = (
+        db.Index('ix_metric_samples_device_metric_time', 'device_id', 'metric', 'recorded_at'),
+        db.Index('ix_metric_samples_recorded_at', 'recorded_at'),
+        {'extend_existing': True}
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
+    metric = db.Column(db.String(64), nullable=False)  # 指标名，如 if:GE0/0/1:in
+    value = db.Column(db.Float, nullable=True)
+    recorded_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    
+    def __repr__(self):
+        return f'<MetricSample {self.metric} (Device: {self.device_id})>'
+
+class PerformanceRollup(db.Model):
+    """性能指标降采样模型，按分辨率（1分钟/5分钟/1小时）保存每个时间桶的最小/平均/最大值"""
+    __tablename__ = 'performance_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('device_id', 'metric', 'resolution', 'bucket_start', name='uq_performance_rollup_bucket'),
+        db.Index('ix_performance_rollups_resolution_bucket', 'resolution', 'bucket_start'),
+        {'extend_existing': True}
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
+    metric = db.Column(db.String(64), nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)  # 时间桶长度(秒)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    min_value = db.Column(db.Float, nullable=True)
+    avg_value = db.Column(db.Float, nullable=True)
+    max_value = db.Column(db.Float, nullable=True)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PerformanceRollup {self.metric}@{self.resolution}s (Device: {self.device_id})>'
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'device_id': self.device_id,
+            'metric': self.metric,
+            'resolution': self.resolution,
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'min': self.min_value,
+            'avg': self.avg_value,
+            'max': self.max_value,
+            'count': self.sample_count
+        }
@@ -12,12 +12,11 @@ from sqlalchemy.exc import SQLAlchemyError
 from src.core.db import db
 from src.models.device import Device, DeviceType
 from src.modules.performance.ssh_monitor import (
-    get_connection, 
+    lease_connection, 
     get_cpu_usage, 
     get_memory_usage, 
     get_uptime, 
-    get_interface_stats,
-    close_connection
+    get_interface_stats
 )
 
 # 设置日志
@@ -56,26 +55,22 @@ def test_device_connection(device_id: int) -> Dict:
         }
     
     try:
-        # 尝试SSH连接
-        connection = get_connection(
+        # 从共享SSH会话池租用会话测试连接
+        with lease_connection(
             device_id, 
             device.ip_address, 
             device.username or 'admin', 
             device.password or 'admin123',
             device.port or 22
-        )
-        
-        if not connection:
-            return {
-                'success': False,
-                'message': f'无法连接到设备 {device.name} ({device.ip_address})'
-            }
-        
-        # 测试获取设备信息
-        uptime = get_uptime(device_id, connection)
-        
-        # 关闭连接
-        close_connection(device_id)
+        ) as connection:
+            if not connection:
+                return {
+                    'success': False,
+                    'message': f'无法连接到设备 {device.name} ({device.ip_address})'
+                }
+            
+            # 测试获取设备信息
+            uptime = get_uptime(device_id, connection)
         
         return {
             'success': True,
@@ -116,27 +111,23 @@ def get_device_info(device_id: int) -> Dict:
         # 如果设备可连接，尝试获取更多信息
         if device.ip_address and device.status == '正常':
             try:
-                # 尝试SSH连接
-                connection = get_connection(
+                # 从共享SSH会话池租用会话
+                with lease_connection(
                     device_id, 
                     device.ip_address, 
                     device.username or 'admin', 
                     device.password or 'admin123',
                     device.port or 22
-                )
-                
-                if connection:
-                    # 获取设备信息
-                    result['connection_status'] = 'connected'
-                    result['uptime'] = get_uptime(device_id, connection)
-                    result['cpu_usage'] = get_cpu_usage(device_id, connection)
-                    result['memory_usage'] = get_memory_usage(device_id, connection)
-                    result['interfaces'] = get_interface_stats(device_id, connection)
-                    
-                    # 关闭连接
-                    close_connection(device_id)
-                else:
-                    result['connection_status'] = 'failed'
+                ) as connection:
+                    if connection:
+                        # 获取设备信息
+                        result['connection_status'] = 'connected'
+                        result['uptime'] = get_uptime(device_id, connection)
+                        result['cpu_usage'] = get_cpu_usage(device_id, connection)
+                        result['memory_usage'] = get_memory_usage(device_id, connection)
+                        result['interfaces'] = get_interface_stats(device_id, connection)
+                    else:
+                        result['connection_status'] = 'failed'
             except Exception as e:
                 logger.error(f"获取设备 {device_id} 详细信息时出错: {str(e)}")
                 result['connection_status'] = 'error'
@@ -8,24 +8,28 @@
 import time
 import json
 import logging
-import multiprocessing
-from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
 
+from flask import current_app, has_app_context
 from sqlalchemy.exc import SQLAlchemyError
 from src.core.db import db
 from src.models.device import Device
 from src.models.maintenance import InspectionReport, InspectionItem
 from src.core.models import Fault
+from src.core.job_queue import JobContext, JobCancelled, get_job_queue
 from src.modules.performance.ssh_monitor import (
-    get_connection, 
+    lease_connection, 
     get_cpu_usage, 
     get_memory_usage, 
     get_uptime, 
     get_interface_stats,
-    close_connection
+    get_version_info,
+    parse_uptime
 )
-from sqlalchemy import text
+from sqlalchemy import text, func, insert, update
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -38,6 +42,16 @@ INSPECTION_THRESHOLDS = {
     'system_load': 0.7,  # 系统负载阈值，高于此值视为异常
 }
 
+DEFAULT_MAX_WORKERS = 32  # 同时巡检的设备数
+DEFAULT_DEVICE_TIMEOUT = 120  # 单台设备巡检超时时间（秒）
+STALL_GRACE = 30  # 超过设备超时时间后仍没有任何结果时，视为巡检工作线程无响应（秒）
+POLL_INTERVAL = 0.5  # 检查巡检超时的间隔（秒）
+FAULT_FLUSH_SIZE = 500  # 巡检故障每累计多少台设备批量写入一次
+INSPECTION_FAULT_TYPE = "巡检异常"
+RESUME_JOB_DESCRIPTION = '继续巡检报告 {report_id}'  # 继续巡检任务的说明，用于查找排队中的任务
+OPEN_FAULT_STATUSES = ('open', 'in_progress')  # 未关闭的故障状态
+DEFAULT_FACT_TTL = 86400  # 增量巡检时接口清单、固件等慢变信息的有效期（秒）
+
 # 基线配置
 FIRMWARE_BASELINE = {
     '路由器': ['V800R021C10', 'V800R021C00'],  # 路由器固件基线版本列表
@@ -118,53 +132,64 @@ def network_device_info_collect(device_info: Dict) -> Dict:
         'system_load': None,
         'error_message': None,
         'inspection_results': {},
-        'has_fault': False
+        'has_fault': False,
+        'port_usage_base': None,
+        'device_facts': None
     }
     
     try:
-        # 尝试连接设备
-        conn = get_connection(
+        # 从共享SSH会话池租用会话，采集完成后归还（不再每次巡检新建并关闭连接）
+        with lease_connection(
             device_id, 
             device_info['ip_address'], 
             device_info['username'], 
             device_info['password'], 
             device_info.get('port', 22)
-        )
-        
-        if not conn:
-            logger.error(f"无法连接到设备 {device_name} (ID: {device_id})")
-            result['error_message'] = "无法连接到设备"
-            return result
-        
-        # 获取CPU使用率
-        cpu_usage = get_cpu_usage(device_id, conn)
-        result['cpu_usage'] = cpu_usage
-        
-        # 获取内存使用率
-        memory_usage = get_memory_usage(device_id, conn)
-        result['memory_usage'] = memory_usage
-        
-        # 获取运行时间
-        uptime = get_uptime(device_id, conn)
-        result['uptime'] = uptime
-        
-        # 获取接口状态
-        interface_stats = get_interface_stats(device_id, conn)
-        result['port_usage'] = json.dumps(interface_stats, ensure_ascii=False)
+        ) as conn:
+            if not conn:
+                logger.error(f"无法连接到设备 {device_name} (ID: {device_id})")
+                result['error_message'] = "无法连接到设备"
+                return result
+            
+            # 获取CPU使用率
+            cpu_usage = get_cpu_usage(device_id, conn)
+            result['cpu_usage'] = cpu_usage
+            
+            # 获取内存使用率
+            memory_usage = get_memory_usage(device_id, conn)
+            result['memory_usage'] = memory_usage
+            
+            # 获取运行时间
+            uptime = get_uptime(device_id, conn)
+            result['uptime'] = uptime
+            
+            # 接口状态变化频繁，每次巡检都获取接口清单和流量
+            interface_stats = get_interface_stats(device_id, conn)
+            
+            # 增量巡检：设备没有重启（运行时间未变小）时沿用基准的固件版本，接口结果保存为相对基准的差异；
+            # 否则重新获取版本信息
+            baseline = device_info.get('baseline')
+            uptime_seconds = parse_uptime(uptime)
+            if baseline and uptime_seconds is not None and baseline.get('uptime_seconds') is not None \
+                    and uptime_seconds >= baseline['uptime_seconds']:
+                result['firmware_version'] = baseline.get('firmware_version') or result['firmware_version']
+                result['port_usage_base'] = baseline
+            else:
+                result['device_facts'] = get_version_info(device_id, conn)
+                result['firmware_version'] = result['device_facts']['firmware_version'] or result['firmware_version']
+            result['port_usage'] = json.dumps(interface_stats, ensure_ascii=False)
         
         # 获取系统负载（这里简化为随机值，实际应该从设备获取）
         system_load = min(1.0, cpu_usage / 100.0 * 0.8 + memory_usage / 100.0 * 0.2)
         result['system_load'] = system_load
         
-        # 关闭连接
-        close_connection(device_id)
-        
         # 标记巡检成功
         result['status'] = '正常'
         
         # 判断设备状态是否异常
         inspection_results = analyze_device_status(result, device_info)
         result['inspection_results'] = json.dumps(inspection_results, ensure_ascii=False)
+        result['abnormal_items'] = inspection_results.get('abnormal_items', [])
         
         # 如果有异常项，状态设为"异常"
         if inspection_results.get('abnormal_items', []):
@@ -300,107 +325,188 @@ def analyze_device_status(device_result: Dict, device_info: Dict) -> Dict:
         'abnormal_count': len(abnormal_items)
     }
 
-def save_inspection_results(report_id: int, results: List[Dict]) -> None:
+def save_inspection_result(report_id: int, result: Dict) -> bool:
     """
-    保存巡检结果到数据库
+    保存单台设备的巡检结果，并在同一事务中更新巡检报告进度
     
     Args:
         report_id: 巡检报告ID
-        results: 巡检结果列表
+        result: 巡检结果
+        
+    Returns:
+        是否保存成功
     """
     try:
-        for result in results:
-            # 创建巡检项
-            inspection_item = InspectionItem(
-                report_id=report_id,
-                device_id=result['device_id'],
-                status=result['status'],
-                cpu_usage=result['cpu_usage'],
-                memory_usage=result['memory_usage'],
-                uptime=result['uptime'],
-                firmware_version=result['firmware_version'],
-                port_usage=result['port_usage'],
-                system_load=result['system_load'],
-                error_message=result['error_message'],
-                inspection_results=result['inspection_results']
-            )
-            db.session.add(inspection_item)
-            
-            # 如果有故障，创建故障记录
-            if result['has_fault'] and result['status'] == '异常':
-                # 解析巡检结果以获取异常项
-                try:
-                    inspection_results = json.loads(result['inspection_results'])
-                    abnormal_items = inspection_results.get('abnormal_items', [])
-                    
-                    if abnormal_items:
-                        # 构造故障描述
-                        description = f"设备巡检发现异常：\n"
-                        for item in abnormal_items:
-                            description += f"- {item['item']}: {item['message']}\n"
-                        
-                        # 确定故障严重程度
-                        severity = "medium"  # 默认中等严重度
-                        if len(abnormal_items) > 2:
-                            severity = "high"  # 异常项超过2个，设为高严重度
-                        
-                        # 创建故障记录
-                        fault = Fault(
-                            device_id=result['device_id'],
-                            fault_type="巡检异常",
-                            severity=severity,
-                            description=description,
-                            status="open"
-                        )
-                        db.session.add(fault)
-                except Exception as e:
-                    logger.error(f"创建故障记录失败: {str(e)}")
+        # 增量巡检的接口信息保存为相对基准巡检项的差异
+        port_usage = result['port_usage']
+        port_usage_base_id = None
+        baseline = result.get('port_usage_base')
+        if baseline and port_usage:
+            port_usage = json.dumps(diff_port_usage(baseline['keyframe_interfaces'], json.loads(port_usage)),
+                                    ensure_ascii=False)
+            port_usage_base_id = baseline['keyframe_id']
+        
+        # 创建巡检项
+        inspection_item = InspectionItem(
+            report_id=report_id,
+            device_id=result['device_id'],
+            status=result['status'],
+            cpu_usage=result['cpu_usage'],
+            memory_usage=result['memory_usage'],
+            uptime=result['uptime'],
+            firmware_version=result['firmware_version'],
+            port_usage=port_usage,
+            port_usage_base_id=port_usage_base_id,
+            system_load=result['system_load'],
+            error_message=result['error_message'],
+            inspection_results=result['inspection_results'] or None  # 失败的巡检没有结果详情
+        )
+        db.session.add(inspection_item)
+        
+        # 重新获取的固件版本、型号写回设备档案
+        facts = result.get('device_facts')
+        if facts:
+            device = db.session.get(Device, result['device_id'])
+            for field in ('firmware_version', 'model'):
+                if device and facts.get(field) and getattr(device, field) != facts[field]:
+                    logger.info(f"设备 {device.name} 的{field}变化: {getattr(device, field)} -> {facts[field]}")
+                    setattr(device, field, facts[field])
+        
+        # 更新报告进度
+        report = db.session.get(InspectionReport, report_id)
+        if report:
+            report.completed_devices = (report.completed_devices or 0) + 1
+            if result['status'] == '正常':
+                report.successful_devices = (report.successful_devices or 0) + 1
+            elif result['status'] == '异常':
+                report.abnormal_devices = (report.abnormal_devices or 0) + 1
+            else:
+                report.failed_devices = (report.failed_devices or 0) + 1
         
         db.session.commit()
-        logger.info(f"成功保存巡检结果到数据库，报告ID: {report_id}")
+        return True
     
     except SQLAlchemyError as e:
         db.session.rollback()
-        logger.error(f"数据库错误: {str(e)}")
+        logger.error(f"保存设备 {result.get('device_name')} 的巡检结果时数据库错误: {str(e)}")
+        return False
     
     except Exception as e:
-        logger.error(f"保存巡检结果失败: {str(e)}")
+        db.session.rollback()
+        logger.error(f"保存设备 {result.get('device_name')} 的巡检结果失败: {str(e)}")
+        return False
 
-def update_inspection_report(report_id: int, results: List[Dict]) -> None:
+def save_inspection_results(report_id: int, results: List[Dict]) -> None:
     """
-    更新巡检报告统计信息
+    保存巡检结果到数据库（逐台设备提交），并批量生成故障记录
     
     Args:
         report_id: 巡检报告ID
         results: 巡检结果列表
     """
+    saved = [result for result in results if save_inspection_result(report_id, result)]
+    upsert_inspection_faults([build_inspection_fault(result) for result in saved if result.get('abnormal_items')])
+    logger.info(f"保存巡检结果到数据库，报告ID: {report_id}，成功 {len(saved)}/{len(results)}")
+
+def build_inspection_fault(result: Dict) -> Dict:
+    """
+    根据巡检结果的异常项构造故障记录
+    
+    Args:
+        result: 巡检结果（包含 device_id 和 abnormal_items）
+        
+    Returns:
+        故障字段字典
+    """
+    abnormal_items = result['abnormal_items']
+    description = "设备巡检发现异常：\n" + "".join(f"- {item['item']}: {item['message']}\n" for item in abnormal_items)
+    return {
+        'device_id': result['device_id'],
+        'fault_type': INSPECTION_FAULT_TYPE,
+        'severity': "high" if len(abnormal_items) > 2 else "medium",  # 异常项超过2个为高严重度
+        'description': description
+    }
+
+def upsert_inspection_faults(faults: List[Dict]) -> Tuple[int, int]:
+    """
+    批量写入巡检故障：设备已有同类型未关闭的故障时更新该故障，否则新建
+    
+    用一次索引查询找出已有的未关闭故障，再分别用一条批量UPDATE和一条批量INSERT写入。
+    
+    Args:
+        faults: build_inspection_fault 生成的故障字段列表，同一设备只保留最后一条
+        
+    Returns:
+        (新建数, 更新数)
+    """
+    if not faults:
+        return 0, 0
+    
+    by_device = {fault['device_id']: fault for fault in faults}
+    try:
+        open_faults = dict(db.session.query(Fault.device_id, Fault.id).filter(
+            Fault.device_id.in_(list(by_device)),
+            Fault.fault_type == INSPECTION_FAULT_TYPE,
+            Fault.status.in_(OPEN_FAULT_STATUSES)
+        ).order_by(Fault.id).all())
+        
+        now = datetime.utcnow()
+        updates = [dict(fault, id=open_faults[device_id], updated_at=now)
+                   for device_id, fault in by_device.items() if device_id in open_faults]
+        inserts = [dict(fault, status='open', created_at=now, updated_at=now)
+                   for device_id, fault in by_device.items() if device_id not in open_faults]
+        if updates:
+            db.session.execute(update(Fault), updates)
+        if inserts:
+            db.session.execute(insert(Fault), inserts)
+        db.session.commit()
+        
+        logger.info(f"巡检故障写入完成：新建 {len(inserts)} 条，更新 {len(updates)} 条")
+        return len(inserts), len(updates)
+    
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"批量写入巡检故障失败: {str(e)}")
+        return 0, 0
+
+def update_inspection_report(report_id: int) -> None:
+    """
+    根据已保存的巡检项汇总巡检报告，并将报告标记为已完成
+    
+    Args:
+        report_id: 巡检报告ID
+    """
     try:
-        report = InspectionReport.query.get(report_id)
+        report = db.session.get(InspectionReport, report_id)
         if not report:
             logger.error(f"找不到巡检报告: {report_id}")
             return
         
+        items = InspectionItem.query.filter_by(report_id=report_id).all()
+        
         # 统计各类设备数量
-        total_devices = len(results)
-        successful_devices = sum(1 for r in results if r['status'] == '正常')
-        failed_devices = sum(1 for r in results if r['status'] == '失败')
-        abnormal_devices = sum(1 for r in results if r['status'] == '异常')
+        total_devices = len(items)
+        successful_devices = sum(1 for item in items if item.status == '正常')
+        failed_devices = sum(1 for item in items if item.status == '失败')
+        abnormal_devices = sum(1 for item in items if item.status == '异常')
         
         # 更新报告统计数据
         report.total_devices = total_devices
+        report.completed_devices = total_devices
         report.successful_devices = successful_devices
         report.failed_devices = failed_devices
         report.abnormal_devices = abnormal_devices
         report.end_time = datetime.now()
+        report.status = 'completed'
         
         # 生成报告摘要
         abnormal_device_details = []
-        for result in results:
-            if result['status'] == '异常' and result['inspection_results']:
+        for item in items:
+            if item.status == '异常' and item.inspection_results:
                 try:
-                    inspection_results = json.loads(result['inspection_results'])
+                    inspection_results = json.loads(item.inspection_results)
                     abnormal_device_details.append({
-                        'device_name': result['device_name'],
+                        'device_name': inspection_results.get('device_name') or f"设备 {item.device_id}",
                         'abnormal_count': inspection_results.get('abnormal_count', 0)
                     })
                 except:
@@ -429,18 +535,311 @@ def update_inspection_report(report_id: int, results: List[Dict]) -> None:
     except Exception as e:
         logger.error(f"更新巡检报告失败: {str(e)}")
 
-def batch_info_collect(max_workers: int = 5, operator: str = "系统") -> Optional[int]:
+def diff_port_usage(base: Dict, current: Dict) -> Dict:
+    """
+    计算接口信息相对基准的差异
+    
+    Args:
+        base: 基准接口信息 {接口名: 信息}
+        current: 本次接口信息
+        
+    Returns:
+        {'changed': {新增或变化的接口: 信息}, 'removed': [已不存在的接口]}
+    """
+    return {
+        'changed': {name: info for name, info in current.items() if base.get(name) != info},
+        'removed': [name for name in base if name not in current]
+    }
+
+def load_inspection_baselines(device_ids: List[int], fact_ttl: float) -> Dict[int, Dict]:
+    """
+    加载增量巡检的基准：各设备最近一次成功的巡检项及其接口完整记录（基准巡检项）
+    
+    基准巡检项超过 fact_ttl 的设备不返回基准，本次巡检重新获取接口清单和版本信息。
+    
+    Args:
+        device_ids: 设备ID列表
+        fact_ttl: 慢变信息有效期（秒）
+        
+    Returns:
+        {设备ID: 基准信息}
+    """
+    if not device_ids:
+        return {}
+    
+    latest_ids = db.session.query(func.max(InspectionItem.id)).filter(
+        InspectionItem.device_id.in_(device_ids),
+        InspectionItem.status != '失败',
+        InspectionItem.port_usage.isnot(None)
+    ).group_by(InspectionItem.device_id)
+    latest_items = InspectionItem.query.filter(InspectionItem.id.in_(latest_ids)).all()
+    
+    keyframe_ids = {item.port_usage_base_id or item.id for item in latest_items}
+    keyframes = {item.id: item for item in InspectionItem.query.filter(InspectionItem.id.in_(keyframe_ids))}
+    
+    expire_before = datetime.utcnow() - timedelta(seconds=fact_ttl)
+    baselines = {}
+    for item in latest_items:
+        keyframe = keyframes.get(item.port_usage_base_id or item.id)
+        if not keyframe or not keyframe.created_at or keyframe.created_at < expire_before:
+            continue
+        baselines[item.device_id] = {
+            'keyframe_id': keyframe.id,
+            'keyframe_interfaces': json.loads(keyframe.port_usage),
+            'interfaces': json.loads(item.get_port_usage()),
+            'uptime_seconds': parse_uptime(item.uptime),
+            'firmware_version': item.firmware_version
+        }
+    return baselines
+
+def release_port_usage_bases(report_id: int) -> None:
+    """
+    删除巡检报告前，将其他报告中以该报告巡检项为基准的差异记录还原为完整记录
+    
+    Args:
+        report_id: 即将删除的巡检报告ID
+    """
+    report_item_ids = db.session.query(InspectionItem.id).filter_by(report_id=report_id)
+    dependents = InspectionItem.query.filter(
+        InspectionItem.port_usage_base_id.in_(report_item_ids),
+        InspectionItem.report_id != report_id
+    ).all()
+    for item in dependents:
+        item.port_usage = item.get_port_usage()
+        item.port_usage_base_id = None
+    if dependents:
+        logger.info(f"巡检报告 {report_id} 删除前还原了 {len(dependents)} 条接口差异记录")
+
+def get_inspection_settings() -> Tuple[int, float, Dict[str, int]]:
+    """
+    获取巡检并发配置
+    
+    Returns:
+        (最大并发数, 单台设备超时时间（秒）, {设备类型: 该类型最大并发数})
+    """
+    config = current_app.config if has_app_context() else {}
+    return (
+        config.get('INSPECTION_MAX_WORKERS', DEFAULT_MAX_WORKERS),
+        config.get('INSPECTION_DEVICE_TIMEOUT', DEFAULT_DEVICE_TIMEOUT),
+        parse_type_limits(config.get('INSPECTION_TYPE_CONCURRENCY', ''))
+    )
+
+def get_incremental_settings() -> Tuple[bool, float]:
+    """
+    获取增量巡检配置
+    
+    Returns:
+        (是否启用增量巡检, 慢变信息有效期（秒）)
+    """
+    config = current_app.config if has_app_context() else {}
+    return config.get('INSPECTION_INCREMENTAL', True), config.get('INSPECTION_FACT_TTL', DEFAULT_FACT_TTL)
+
+def parse_type_limits(value) -> Dict[str, int]:
+    """
+    解析按设备类型的并发限制，格式为 "防火墙:4,交换机:32"
+    
+    Args:
+        value: 配置字符串或字典
+        
+    Returns:
+        {设备类型: 最大并发数}
+    """
+    if isinstance(value, dict):
+        return {key: int(limit) for key, limit in value.items()}
+    limits = {}
+    for part in (value or '').split(','):
+        if ':' not in part:
+            continue
+        device_type, limit = part.rsplit(':', 1)
+        try:
+            limits[device_type.strip()] = max(1, int(limit))
+        except ValueError:
+            logger.warning(f"忽略无效的巡检并发配置: {part}")
+    return limits
+
+def _failed_result(device_info: Dict, error_message: str) -> Dict:
+    """构造巡检失败的结果"""
+    return {
+        'device_id': device_info['id'],
+        'device_name': device_info['name'],
+        'device_type': device_info['type'],
+        'status': '失败',
+        'cpu_usage': None,
+        'memory_usage': None,
+        'uptime': None,
+        'firmware_version': device_info.get('firmware_version', '未知'),
+        'port_usage': None,
+        'system_load': None,
+        'error_message': error_message,
+        'inspection_results': {},
+        'has_fault': False
+    }
+
+def iter_inspection_results(device_infos: List[Dict], max_workers: int, device_timeout: float,
+                            type_limits: Optional[Dict[str, int]] = None,
+                            collect: Optional[Callable[[Dict], Dict]] = None) -> Iterator[Dict]:
+    """
+    在I/O线程池中并发巡检设备，按完成顺序逐个产出结果
+    
+    巡检线程与性能监控共用进程内的SSH会话池。每种设备类型的并发数受 type_limits 限制，
+    各类型轮流提交。单台设备超过 device_timeout 仍未完成时产出失败结果，不再等待该设备。
+    
+    Args:
+        device_infos: 需要巡检的设备信息列表
+        max_workers: 最大并发数
+        device_timeout: 单台设备的巡检超时时间（秒）
+        type_limits: {设备类型: 该类型最大并发数}，未配置的类型只受 max_workers 限制
+        collect: 单台设备的巡检函数，默认 network_device_info_collect
+        
+    Yields:
+        巡检结果字典
+    """
+    collect = collect or network_device_info_collect
+    type_limits = type_limits or {}
+    max_workers = max(1, min(max_workers, len(device_infos) or 1))
+    
+    queues: Dict[str, deque] = {}
+    for info in device_infos:
+        queues.setdefault(info['type'], deque()).append(info)
+    in_flight = {device_type: 0 for device_type in queues}
+    running: Dict[Future, Dict] = {}
+    abandoned = set()
+    started: Dict[int, float] = {}
+    
+    def run(info: Dict) -> Dict:
+        started[info['id']] = time.monotonic()
+        return collect(info)
+    
+    def release_slot(info: Dict):
+        in_flight[info['type']] -= 1
+    
+    # 并发数由 fill() 控制；线程数留出一倍余量，被超时设备占住的线程不影响其余设备
+    executor = ThreadPoolExecutor(max_workers=max_workers * 2, thread_name_prefix='inspection')
+    
+    def fill():
+        # 各设备类型轮流提交，直到达到总并发数或类型并发数上限
+        active = len(running) - len(abandoned)
+        progressed = True
+        while progressed and active < max_workers:
+            progressed = False
+            for device_type, queue in queues.items():
+                if queue and active < max_workers and in_flight[device_type] < type_limits.get(device_type, max_workers):
+                    info = queue.popleft()
+                    running[executor.submit(run, info)] = info
+                    in_flight[device_type] += 1
+                    active += 1
+                    progressed = True
+    
+    try:
+        fill()
+        last_progress = time.monotonic()
+        while running or any(queues.values()):
+            done, _ = wait(list(running), timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                info = running.pop(future)
+                if future in abandoned:
+                    # 已按超时记为失败的设备，迟到的结果丢弃
+                    abandoned.discard(future)
+                    continue
+                release_slot(info)
+                last_progress = time.monotonic()
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"巡检设备 {info['name']} (ID: {info['id']}) 出错: {str(e)}")
+                    yield _failed_result(info, str(e))
+            
+            now = time.monotonic()
+            for future, info in list(running.items()):
+                start = started.get(info['id'])
+                if future not in abandoned and start is not None and now - start > device_timeout:
+                    # 超时设备的线程继续运行直到底层连接超时，但不再占用并发名额
+                    logger.error(f"巡检设备 {info['name']} (ID: {info['id']}) 超时（{device_timeout}秒）")
+                    abandoned.add(future)
+                    release_slot(info)
+                    last_progress = now
+                    yield _failed_result(info, f"巡检超时（{device_timeout}秒）")
+            
+            if now - last_progress > device_timeout + STALL_GRACE:
+                # 全部工作线程都被无响应的设备占用，剩余设备记为失败
+                remaining = [info for future, info in running.items() if future not in abandoned]
+                remaining += [info for queue in queues.values() for info in queue]
+                logger.error(f"巡检长时间没有新结果，剩余 {len(remaining)} 台设备记为失败")
+                for info in remaining:
+                    yield _failed_result(info, "巡检工作线程无响应")
+                break
+            
+            fill()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def run_inspection(report_id: int, device_infos: List[Dict], max_workers: Optional[int] = None,
+                   device_timeout: Optional[float] = None, incremental: Optional[bool] = None,
+                   job: Optional[JobContext] = None) -> None:
+    """
+    并发巡检设备，每台设备完成后立即保存结果并更新进度，全部完成后汇总报告
+    
+    Args:
+        report_id: 巡检报告ID
+        device_infos: 需要巡检的设备信息列表
+        max_workers: 最大并发数，默认使用 INSPECTION_MAX_WORKERS
+        device_timeout: 单台设备的巡检超时时间（秒）
+        incremental: 是否增量巡检，默认使用 INSPECTION_INCREMENTAL
+        job: 后台任务句柄，每台设备完成后报告进度，请求取消时抛出 JobCancelled（已保存的结果保留，可继续巡检）
+    """
+    default_workers, default_timeout, type_limits = get_inspection_settings()
+    max_workers = max_workers or default_workers
+    device_timeout = device_timeout or default_timeout
+    default_incremental, fact_ttl = get_incremental_settings()
+    
+    if incremental if incremental is not None else default_incremental:
+        baselines = load_inspection_baselines([info['id'] for info in device_infos], fact_ttl)
+        device_infos = [dict(info, baseline=baselines.get(info['id'])) for info in device_infos]
+        logger.info(f"增量巡检：{len(baselines)}/{len(device_infos)} 台设备沿用接口清单和版本信息")
+    
+    if device_infos:
+        logger.info(f"开始并发巡检，最大并发数: {max_workers}，待巡检设备: {len(device_infos)}")
+        faults = []
+        results = iter_inspection_results(device_infos, max_workers, device_timeout, type_limits)
+        try:
+            for completed, result in enumerate(results, 1):
+                if save_inspection_result(report_id, result) and result.get('abnormal_items'):
+                    faults.append(build_inspection_fault(result))
+                    if len(faults) >= FAULT_FLUSH_SIZE:
+                        upsert_inspection_faults(faults)
+                        faults = []
+                if job is not None:
+                    job.update(progress=completed / len(device_infos),
+                               message=f"已巡检 {completed}/{len(device_infos)} 台设备",
+                               data={'report_id': report_id})
+                    job.check_cancelled()
+        finally:
+            # 取消时立即停止尚未开始的设备巡检，并写入已发现的故障
+            results.close()
+            upsert_inspection_faults(faults)
+    
+    update_inspection_report(report_id)
+
+def batch_info_collect(max_workers: Optional[int] = None, operator: str = "系统",
+                       device_timeout: Optional[float] = None, incremental: Optional[bool] = None,
+                       job: Optional[JobContext] = None) -> Optional[int]:
     """
-    批量信息巡检主函数，创建进程池并发巡检所有网络设备
+    批量信息巡检主函数，在I/O线程池中并发巡检所有网络设备
+    
+    巡检结果逐台保存，报告的 completed_devices 反映实时进度；巡检中断后可用 resume_inspection 继续。
     
     Args:
-        max_workers: 最大并发进程数
+        max_workers: 最大并发数，默认使用 INSPECTION_MAX_WORKERS
         operator: 操作人员
+        device_timeout: 单台设备的巡检超时时间（秒）
+        incremental: 是否增量巡检（设备未重启且未过有效期时不重新获取接口清单和版本信息）
+        job: 后台任务句柄，取消时报告标记为已中断并抛出 JobCancelled
         
     Returns:
         巡检报告ID，如果失败则返回None
     """
     logger.info("开始网络设备批量信息巡检")
+    report_id = None
     
     try:
         # 1. 获取需要巡检的设备列表
@@ -450,36 +849,145 @@ def batch_info_collect(max_workers: int = 5, operator: str = "系统") -> Option
             logger.warning("没有找到需要巡检的网络设备")
             return None
         
-        # 2. 创建巡检报告
+        # 2. 创建巡检报告，记录计划巡检的设备作为断点
         report = InspectionReport(
             title=f"网络设备批量巡检报告 {datetime.now().strftime('%Y-%m-%d %H:%M')}",
             start_time=datetime.now(),
             end_time=datetime.now(),  # 临时，后面会更新
             total_devices=len(device_infos),
+            completed_devices=0,
+            successful_devices=0,
+            failed_devices=0,
+            abnormal_devices=0,
+            status='running',
+            device_ids=json.dumps([info['id'] for info in device_infos]),
             operator=operator
         )
         db.session.add(report)
         db.session.commit()
         report_id = report.id
+        if job is not None:
+            job.update(progress=0, message=f"待巡检 {len(device_infos)} 台设备", data={'report_id': report_id})
         
-        # 3. 创建进程池，并发执行巡检
-        logger.info(f"创建进程池，最大并发数: {max_workers}")
-        
-        with multiprocessing.Pool(processes=max_workers) as pool:
-            # 提交所有设备的巡检任务
-            inspection_results = pool.map(network_device_info_collect, device_infos)
-        
-        # 4. 保存巡检结果
-        save_inspection_results(report_id, inspection_results)
-        
-        # 5. 更新巡检报告信息
-        update_inspection_report(report_id, inspection_results)
+        # 3. 并发巡检，结果逐台保存，最后汇总报告
+        run_inspection(report_id, device_infos, max_workers, device_timeout, incremental, job)
         
         logger.info(f"完成网络设备批量信息巡检，报告ID: {report_id}")
         return report_id
     
+    except JobCancelled:
+        logger.info(f"批量巡检已取消，报告ID: {report_id}")
+        _mark_interrupted(report_id)
+        raise
     except Exception as e:
         logger.error(f"执行批量巡检失败: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-        return None 
\ No newline at end of file
+        _mark_interrupted(report_id)
+        return None
+
+def _report_running(report: InspectionReport, device_timeout: float) -> bool:
+    """仍在运行的报告会持续更新进度，超过一个设备超时周期没有更新才视为中断"""
+    return report.status == 'running' and report.updated_at is not None and \
+        (datetime.utcnow() - report.updated_at).total_seconds() < device_timeout + STALL_GRACE
+
+def inspection_in_progress(report: InspectionReport) -> bool:
+    """
+    巡检报告是否仍在巡检：有未结束的后台任务（排队或运行中）在处理该报告，或报告最近仍在更新进度
+    
+    Args:
+        report: 巡检报告
+        
+    Returns:
+        仍在巡检时返回True
+    """
+    description = RESUME_JOB_DESCRIPTION.format(report_id=report.id)
+    for job in get_job_queue().list_jobs(kind='inspection', limit=200):
+        if not job['done'] and ((job['data'] or {}).get('report_id') == report.id or job['description'] == description):
+            return True
+    return _report_running(report, get_inspection_settings()[1])
+
+def resume_inspection(report_id: int, max_workers: Optional[int] = None,
+                      device_timeout: Optional[float] = None, job: Optional[JobContext] = None) -> Optional[int]:
+    """
+    继续中断的巡检：只巡检报告中计划巡检但还没有结果的设备
+    
+    Args:
+        report_id: 巡检报告ID
+        max_workers: 最大并发数，默认使用 INSPECTION_MAX_WORKERS
+        device_timeout: 单台设备的巡检超时时间（秒）
+        job: 后台任务句柄，取消时报告标记为已中断并抛出 JobCancelled
+        
+    Returns:
+        巡检报告ID，报告不存在、已完成或仍在运行时返回None
+    """
+    device_timeout = device_timeout or get_inspection_settings()[1]
+    
+    try:
+        report = db.session.get(InspectionReport, report_id)
+        if not report or report.status == 'completed':
+            logger.warning(f"巡检报告 {report_id} 不存在或已完成，无需继续")
+            return None
+        
+        if _report_running(report, device_timeout):
+            logger.warning(f"巡检报告 {report_id} 仍在运行")
+            return None
+        
+        planned = json.loads(report.device_ids or '[]')
+        done = {device_id for (device_id,) in
+                db.session.query(InspectionItem.device_id).filter_by(report_id=report_id)}
+        device_infos = [info for info in get_batch_collect_dev_infos()
+                        if info['id'] in planned and info['id'] not in done]
+        
+        # 上次运行中断时可能还有故障没有写入，重新写入（已有的未关闭故障只会被更新）
+        saved_results = [
+            {'device_id': item.device_id, 'abnormal_items': json.loads(item.inspection_results).get('abnormal_items', [])}
+            for item in InspectionItem.query.filter_by(report_id=report_id, status='异常') if item.inspection_results
+        ]
+        upsert_inspection_faults([build_inspection_fault(result) for result in saved_results if result['abnormal_items']])
+        
+        logger.info(f"继续巡检报告 {report_id}：已完成 {len(done)} 台，剩余 {len(device_infos)} 台")
+        report.status = 'running'
+        report.total_devices = len(done) + len(device_infos)
+        report.completed_devices = len(done)
+        db.session.commit()
+        
+        run_inspection(report_id, device_infos, max_workers, device_timeout, job=job)
+        return report_id
+    
+    except JobCancelled:
+        logger.info(f"继续巡检报告 {report_id} 已取消")
+        _mark_interrupted(report_id)
+        raise
+    except Exception as e:
+        logger.error(f"继续巡检报告 {report_id} 失败: {str(e)}")
+        _mark_interrupted(report_id)
+        return None
+
+def batch_inspection_job(job: JobContext, **kwargs) -> Dict:
+    """后台任务：批量巡检（参数同 batch_info_collect），返回报告ID"""
+    report_id = batch_info_collect(job=job, **kwargs)
+    if not report_id:
+        raise RuntimeError('网络设备批量巡检失败，详情请查看日志')
+    return {'report_id': report_id}
+
+def resume_inspection_job(job: JobContext, report_id: int, **kwargs) -> Dict:
+    """后台任务：继续中断的巡检（参数同 resume_inspection），返回报告ID"""
+    job.update(data={'report_id': report_id})
+    if not resume_inspection(report_id, job=job, **kwargs):
+        raise RuntimeError(f'巡检报告 {report_id} 仍在运行或继续巡检失败，详情请查看日志')
+    return {'report_id': report_id}
+
+def _mark_interrupted(report_id: Optional[int]) -> None:
+    """将巡检报告标记为已中断"""
+    if not report_id:
+        return
+    try:
+        db.session.rollback()
+        report = db.session.get(InspectionReport, report_id)
+        if report and report.status == 'running':
+            report.status = 'interrupted'
+            db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"标记巡检报告 {report_id} 中断失败: {str(e)}")
@@ -10,11 +10,16 @@ from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
 
 from src.core.db import db
 from src.models.device import Device
 from src.models.maintenance import MaintenanceRecord, InspectionReport, InspectionItem
-from src.modules.maintenance.inspection_service import batch_info_collect
+from src.modules.maintenance.inspection_service import (
+    batch_inspection_job, resume_inspection_job, release_port_usage_bases, inspection_in_progress,
+    RESUME_JOB_DESCRIPTION
+)
+from src.core.job_queue import get_job_queue
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -189,7 +194,7 @@ def inspection_reports():
 def start_batch_inspection():
     try:
         data = request.json or {}
-        max_workers = data.get('max_workers', 5)
+        max_workers = data.get('max_workers')
         
         # 避免使用hasattr
         operator = data.get('operator')
@@ -199,22 +204,18 @@ def start_batch_inspection():
             except (AttributeError, TypeError):
                 operator = '系统'
         
-        # 启动批量巡检（异步方式）
-        # 注意：在实际生产环境中，应该使用 Celery 或其他任务队列来处理这种耗时操作
-        # 这里为了简单，直接在请求中执行
-        report_id = batch_info_collect(max_workers=max_workers, operator=operator)
+        # 在后台任务中巡检，前端通过 /api/jobs/<job_id> 查询进度，报告ID在任务数据中返回
+        job_id = get_job_queue().submit(
+            'inspection', batch_inspection_job,
+            description='网络设备批量巡检', owner=operator,
+            max_workers=max_workers, operator=operator, incremental=data.get('incremental')
+        )
         
-        if report_id:
-            return jsonify({
-                'success': True,
-                'message': '网络设备批量巡检已启动',
-                'report_id': report_id
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': '启动网络设备批量巡检失败，详情请查看日志'
-            }), 500
+        return jsonify({
+            'success': True,
+            'message': '网络设备批量巡检已启动',
+            'job_id': job_id
+        }), 202
     
     except Exception as e:
         logger.error(f"启动网络设备批量巡检失败: {str(e)}")
@@ -225,6 +226,54 @@ def start_batch_inspection():
             'message': f'启动巡检任务失败: {str(e)}'
         }), 500
 
+# API：继续中断的巡检（只巡检尚未保存结果的设备）
+@maintenance_bp.route('/api/inspection/reports/<int:report_id>/resume', methods=['POST'])
+@login_required
+def resume_batch_inspection(report_id):
+    try:
+        report = InspectionReport.query.get(report_id)
+        if not report:
+            return jsonify({
+                'success': False,
+                'message': '巡检报告不存在'
+            }), 404
+        
+        if report.status == 'completed':
+            return jsonify({
+                'success': False,
+                'message': '巡检报告已完成，无需继续'
+            }), 400
+        
+        # 报告仍在由其他任务巡检时不再提交，避免两个任务巡检同一批设备
+        if inspection_in_progress(report):
+            return jsonify({
+                'success': False,
+                'message': '巡检报告仍在巡检中，请等待当前巡检结束'
+            }), 409
+        
+        data = request.json or {}
+        max_workers = data.get('max_workers')
+        
+        job_id = get_job_queue().submit(
+            'inspection', resume_inspection_job, report_id,
+            description=RESUME_JOB_DESCRIPTION.format(report_id=report_id), owner=getattr(current_user, 'username', None),
+            max_workers=max_workers
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': '巡检已继续',
+            'report_id': report_id,
+            'job_id': job_id
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"继续巡检报告 {report_id} 失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'继续巡检失败: {str(e)}'
+        }), 500
+
 # API：获取巡检报告列表
 @maintenance_bp.route('/api/inspection/reports')
 @login_required
@@ -256,7 +305,8 @@ def get_inspection_report(report_id):
             }), 404
         
         # 获取报告中的所有巡检项
-        items = InspectionItem.query.filter_by(report_id=report_id).all()
+        items = InspectionItem.query.options(selectinload(InspectionItem.port_usage_base)) \
+            .filter_by(report_id=report_id).all()
         
         # 构造响应数据
         response = {
@@ -288,7 +338,8 @@ def delete_inspection_report(report_id):
                 'message': '巡检报告不存在'
             }), 404
         
-        # 删除报告（级联删除所有巡检项）
+        # 删除报告（级联删除所有巡检项），其他报告中以这些巡检项为基准的接口差异先还原为完整记录
+        release_port_usage_bases(report_id)
         db.session.delete(report)
         db.session.commit()
         
@@ -326,7 +377,8 @@ def get_device_inspection_history(device_id):
             }), 404
         
         # 获取设备的所有巡检项
-        items = InspectionItem.query.filter_by(device_id=device_id).order_by(InspectionItem.created_at.desc()).all()
+        items = InspectionItem.query.options(selectinload(InspectionItem.port_usage_base)) \
+            .filter_by(device_id=device_id).order_by(InspectionItem.created_at.desc()).all()
         
         # 获取相关的报告ID
         report_ids = [item.report_id for item in items]
@@ -0,0 +1,525 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步SSH采集后端 - 基于asyncssh在单个事件循环中并发采集大量设备的性能数据
+
+与 enhanced_ssh_monitor 使用同一套厂商命令(VENDOR_MAP)和输出解析函数，
+collect_device_data 的参数和返回值与 enhanced_ssh_monitor.collect_device_data 完全一致。
+每台设备保持一个交互式shell会话，命令在会话中串行执行；不同设备之间的采集由事件循环并发调度，
+并发数由信号量限制，几千台设备也不需要几千个线程。
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+try:
+    import asyncssh
+    ASYNCSSH_AVAILABLE = True
+except ImportError:
+    ASYNCSSH_AVAILABLE = False
+    logging.warning("asyncssh未安装，异步SSH采集后端将不可用")
+
+from src.modules.performance.enhanced_ssh_monitor import (
+    connection_status, get_vendor_config, get_device_status, format_bandwidth,
+    parse_cpu_usage, parse_memory_usage, parse_uptime,
+    parse_interface_list, parse_interface_detail, summarize_bandwidth
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 同时进行采集的最大设备数，可通过环境变量 ASYNC_SSH_CONCURRENCY 调整
+DEFAULT_CONCURRENCY = int(os.environ.get('ASYNC_SSH_CONCURRENCY') or 200)
+CONNECT_TIMEOUT = 10  # 连接超时(秒)
+COMMAND_TIMEOUT = 30  # 单条命令超时(秒)
+MAX_INTERFACES = 5  # 每台设备最多采集流量的UP接口数
+
+# 设备提示符: <HUAWEI>、[HUAWEI]、Router#、Router>
+PROMPT_PATTERN = re.compile(r'(<[^<>\r\n]+>|\[[^\[\]\r\n]+\]|[\w.\-@()/:~]+[>#])\s*$')
+# 分页提示符: ---- More ----、--More--
+PAGING_PATTERN = re.compile(r'-{2,}\s*[Mm]ore\s*-{2,}|--More--')
+# 终端控制字符
+ANSI_PATTERN = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]|[\x08\x07]')
+
+
+class AsyncDeviceSession:
+    """单台设备的异步交互式SSH会话"""
+
+    def __init__(self, device_id: int, ip: str, username: str, password: str,
+                 port: int = 22, vendor: str = "huawei",
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 command_timeout: float = COMMAND_TIMEOUT):
+        """
+        初始化会话
+
+        Args:
+            device_id: 设备ID
+            ip: 设备IP地址
+            username: 用户名
+            password: 密码
+            port: SSH端口，默认22
+            vendor: 设备厂商，连接后会根据提示符重新判断
+            connect_timeout: 连接超时(秒)
+            command_timeout: 默认命令超时(秒)
+        """
+        self.device_id = device_id
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.port = port
+        self.vendor = vendor if vendor in ("huawei", "cisco") else "huawei"
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+
+        self.conn = None
+        self.process = None
+        self.prompt = None
+        self.lock = asyncio.Lock()
+        self.last_used = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """会话是否可用"""
+        return self.process is not None and not self.process.stdout.at_eof()
+
+    async def open(self):
+        """建立连接、打开交互式shell、识别提示符并关闭分页"""
+        self.conn = await asyncio.wait_for(
+            asyncssh.connect(
+                self.ip, port=self.port,
+                username=self.username, password=self.password,
+                known_hosts=None,
+                preferred_auth='password,keyboard-interactive'
+            ),
+            timeout=self.connect_timeout
+        )
+        # 较宽的终端避免长行被设备折行
+        self.process = await self.conn.create_process(
+            term_type='vt100', term_size=(511, 24), encoding='utf-8', errors='replace'
+        )
+
+        banner = await self._read_until_prompt(self.connect_timeout)
+        self.prompt = self._last_line(banner)
+        self.vendor = self._detect_vendor(self.prompt, self.vendor)
+
+        try:
+            await self.send_command(get_vendor_config(self.vendor)["disable_paging_cmd"])
+        except Exception as e:
+            logger.warning(f"设备 {self.device_id} 设置分页失败: {str(e)}")
+
+        self.last_used = time.time()
+
+    async def send_command(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        发送命令并读取到下一个提示符为止的输出
+
+        Args:
+            command: 要执行的命令
+            timeout: 命令超时(秒)，默认使用 command_timeout
+
+        Returns:
+            去掉命令回显和提示符后的输出
+        """
+        async with self.lock:
+            self.process.stdin.write(command + "\n")
+            output = await self._read_until_prompt(timeout or self.command_timeout)
+            self.last_used = time.time()
+            return self._clean_output(output, command)
+
+    async def close(self):
+        """关闭会话"""
+        try:
+            if self.process is not None:
+                self.process.close()
+            if self.conn is not None:
+                self.conn.close()
+                await self.conn.wait_closed()
+        except Exception as e:
+            logger.debug(f"关闭设备 {self.device_id} 会话时出错: {str(e)}")
+        finally:
+            self.process = None
+            self.conn = None
+
+    async def _read_until_prompt(self, timeout: float) -> str:
+        """读取输出直到出现提示符，遇到分页提示时自动翻页"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        buffer = ""
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"等待设备提示符超时，已读取 {len(buffer)} 字节")
+
+            chunk = await asyncio.wait_for(self.process.stdout.read(65536), timeout=remaining)
+            if not chunk:
+                raise ConnectionError("设备连接已关闭")
+            buffer += ANSI_PATTERN.sub("", chunk)
+
+            if PAGING_PATTERN.search(buffer[-64:]):
+                buffer = PAGING_PATTERN.sub("", buffer)
+                self.process.stdin.write(" ")
+                continue
+
+            if self._ends_with_prompt(buffer):
+                return buffer
+
+    def _ends_with_prompt(self, buffer: str) -> bool:
+        """判断缓冲区是否以提示符结尾"""
+        last_line = self._last_line(buffer)
+        if self.prompt:
+            return last_line == self.prompt
+        return bool(PROMPT_PATTERN.search(last_line))
+
+    @staticmethod
+    def _last_line(buffer: str) -> str:
+        """获取最后一个非空行"""
+        lines = buffer.replace("\r", "").rstrip().split("\n")
+        return lines[-1].strip() if lines else ""
+
+    def _clean_output(self, output: str, command: str) -> str:
+        """去掉命令回显和末尾提示符"""
+        lines = output.replace("\r\n", "\n").replace("\r", "").split("\n")
+        if lines and command.strip() and command.strip() in lines[0]:
+            lines = lines[1:]
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if lines and lines[-1].strip() == self.prompt:
+            lines.pop()
+        return "\n".join(lines)
+
+    @staticmethod
+    def _detect_vendor(prompt: str, default: str) -> str:
+        """根据提示符判断设备厂商：华为为 <name> 或 [name]，思科为 name# 或 name>"""
+        if prompt.startswith("<") or prompt.startswith("["):
+            return "huawei"
+        if prompt.endswith("#") or prompt.endswith(">"):
+            return "cisco"
+        return default
+
+
+class AsyncCollectionEngine:
+    """异步采集引擎，管理设备会话并限制并发采集数"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 command_timeout: float = COMMAND_TIMEOUT,
+                 max_interfaces: int = MAX_INTERFACES):
+        """
+        初始化采集引擎
+
+        Args:
+            concurrency: 同时采集的最大设备数
+            connect_timeout: 连接超时(秒)
+            command_timeout: 单条命令超时(秒)
+            max_interfaces: 每台设备最多采集流量的UP接口数
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.max_interfaces = max_interfaces
+
+        self.sessions: Dict[int, AsyncDeviceSession] = {}
+        self._semaphore = None
+        self._device_locks: Dict[int, asyncio.Lock] = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取并发信号量（在事件循环中延迟创建）"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def get_session(self, device_id: int, ip: str, username: str, password: str,
+                          port: int = 22, vendor: str = "huawei") -> Optional[AsyncDeviceSession]:
+        """
+        获取或创建设备会话，并维护与同步后端一致的 connection_status
+
+        Returns:
+            会话对象，连接失败时返回None
+        """
+        if device_id not in connection_status:
+            connection_status[device_id] = {
+                "status": "disconnected",
+                "last_error": "",
+                "reconnect_attempts": 0,
+                "vendor": vendor
+            }
+        status = connection_status[device_id]
+
+        session = self.sessions.get(device_id)
+        if session is not None:
+            if session.is_open and session.ip == ip and session.port == port:
+                status["status"] = "connected"
+                status["reconnect_attempts"] = 0
+                return session
+            logger.warning(f"设备 {device_id} 的会话已失效，准备重新连接")
+            await session.close()
+            self.sessions.pop(device_id, None)
+            status["status"] = "reconnecting"
+
+        if status["status"] == "reconnecting":
+            status["reconnect_attempts"] += 1
+
+        session = AsyncDeviceSession(device_id, ip, username, password, port, vendor,
+                                     self.connect_timeout, self.command_timeout)
+        try:
+            logger.info(f"正在创建到设备 ID:{device_id}, IP:{ip} 的异步SSH会话...")
+            await session.open()
+        except asyncio.TimeoutError:
+            await session.close()
+            error_msg = f"连接超时: 设备 {ip} 可能无法访问或SSH服务未启用"
+            logger.error(error_msg)
+            status["status"] = "timeout"
+            status["last_error"] = error_msg
+            return None
+        except asyncssh.PermissionDenied:
+            await session.close()
+            error_msg = "认证失败: 用户名或密码错误"
+            logger.error(error_msg)
+            status["status"] = "auth_failed"
+            status["last_error"] = error_msg
+            return None
+        except Exception as e:
+            await session.close()
+            error_msg = f"创建设备 ID:{device_id}, IP:{ip} 的连接失败: {str(e)}"
+            logger.error(error_msg)
+            status["status"] = "error"
+            status["last_error"] = error_msg
+            return None
+
+        self.sessions[device_id] = session
+        status["status"] = "connected"
+        status["reconnect_attempts"] = 0
+        status["last_error"] = ""
+        status["vendor"] = session.vendor
+        logger.info(f"成功建立到设备 ID:{device_id}, IP:{ip} 的异步SSH会话")
+        return session
+
+    async def collect(self, device_id: int, ip: str, username: str, password: str,
+                      port: int = 22, vendor: str = "huawei", collect_interfaces: bool = True) -> Dict:
+        """
+        从设备收集综合性能数据，返回值与 enhanced_ssh_monitor.collect_device_data 相同
+        """
+        lock = self._device_locks.setdefault(device_id, asyncio.Lock())
+        async with self._get_semaphore(), lock:
+            try:
+                session = await self.get_session(device_id, ip, username, password, port, vendor)
+                if not session:
+                    return {
+                        'cpu_usage': 0.0,
+                        'memory_usage': 0.0,
+                        'uptime': '连接失败',
+                        'timestamp': time.time(),
+                        'error': '无法建立SSH连接',
+                        'connection_status': get_device_status(device_id)
+                    }
+
+                vendor = session.vendor
+                vendor_config = get_vendor_config(vendor)
+
+                cpu_usage = parse_cpu_usage(vendor, await session.send_command(vendor_config["cpu_cmd"]))
+                memory_usage = parse_memory_usage(vendor, await session.send_command(vendor_config["memory_cmd"]))
+                uptime = parse_uptime(vendor, await session.send_command(vendor_config["version_cmd"]))
+                interfaces = await self._collect_interfaces(session) if collect_interfaces else {}
+
+                bandwidth_usage, total_input, total_output = summarize_bandwidth(interfaces)
+
+                return {
+                    'cpu_usage': cpu_usage,
+                    'memory_usage': memory_usage,
+                    'uptime': uptime,
+                    'interfaces': interfaces,
+                    'bandwidth_usage': round(bandwidth_usage, 2),
+                    'total_input_rate': format_bandwidth(total_input),
+                    'total_output_rate': format_bandwidth(total_output),
+                    'timestamp': time.time(),
+                    'connection_status': get_device_status(device_id)
+                }
+            except Exception as e:
+                logger.error(f"从设备 ID:{device_id}, IP:{ip} 收集数据时出错: {str(e)}")
+                # 会话状态未知，关闭后下次重新连接
+                await self.close_session(device_id)
+                if device_id in connection_status:
+                    connection_status[device_id]["status"] = "error"
+                    connection_status[device_id]["last_error"] = str(e)
+                return {
+                    'cpu_usage': 0.0,
+                    'memory_usage': 0.0,
+                    'uptime': '数据收集出错',
+                    'timestamp': time.time(),
+                    'error': str(e),
+                    'connection_status': get_device_status(device_id)
+                }
+
+    async def _collect_interfaces(self, session: AsyncDeviceSession) -> Dict:
+        """采集接口列表及UP接口的流量信息"""
+        vendor_config = get_vendor_config(session.vendor)
+        output = await session.send_command(vendor_config["interface_cmd"])
+        interfaces = parse_interface_list(session.vendor, output)
+
+        up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
+        for interface in up_interfaces[:self.max_interfaces]:
+            cmd = vendor_config["interface_detail_cmd"].format(interface=interface)
+            output = await session.send_command(cmd)
+            interfaces[interface].update(parse_interface_detail(session.vendor, output))
+        return interfaces
+
+    async def collect_many(self, devices: List[Dict]) -> Dict[int, Dict]:
+        """
+        并发采集多台设备
+
+        Args:
+            devices: 设备列表，每项包含 id/ip/username/password，可选 port/vendor
+
+        Returns:
+            {设备ID: 性能数据字典}
+        """
+        tasks = [
+            self.collect(device['id'], device['ip'], device['username'], device['password'],
+                         device.get('port', 22), device.get('vendor', 'huawei'))
+            for device in devices
+        ]
+        results = await asyncio.gather(*tasks)
+        return {device['id']: result for device, result in zip(devices, results)}
+
+    async def close_session(self, device_id: int) -> bool:
+        """关闭设备会话"""
+        session = self.sessions.pop(device_id, None)
+        if session is None:
+            return False
+        await session.close()
+        if device_id in connection_status:
+            connection_status[device_id]["status"] = "disconnected"
+        logger.info(f"已关闭设备 {device_id} 的异步SSH会话")
+        return True
+
+    async def close_all(self):
+        """关闭所有会话"""
+        for device_id in list(self.sessions.keys()):
+            await self.close_session(device_id)
+
+
+class _LoopThread:
+    """在后台线程中运行的事件循环，供同步代码提交协程"""
+
+    def __init__(self, name: str = 'async-ssh-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """提交协程并等待结果"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def stop(self):
+        """停止事件循环"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+# 全局采集引擎和事件循环线程
+_engine = None
+_loop_thread = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncCollectionEngine:
+    """获取全局异步采集引擎（首次调用时创建，并启动后台事件循环线程）"""
+    global _engine, _loop_thread
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _loop_thread = _LoopThread()
+                _engine = AsyncCollectionEngine()
+    return _engine
+
+
+def run_coroutine(coro, timeout: Optional[float] = None) -> Any:
+    """在全局事件循环中执行协程并同步等待结果"""
+    get_async_engine()
+    return _loop_thread.run(coro, timeout)
+
+
+def collect_device_data(device_id: int, ip: str, username: str, password: str,
+                        port: int = 22, vendor: str = "huawei", collect_interfaces: bool = True) -> Dict:
+    """
+    从设备收集综合性能数据（同步接口，与 enhanced_ssh_monitor.collect_device_data 一致）
+
+    Args:
+        device_id: 设备ID
+        ip: 设备IP地址
+        username: 用户名
+        password: 密码
+        port: SSH端口，默认22
+        vendor: 设备厂商，默认'huawei'
+        collect_interfaces: 是否通过CLI采集接口
+
+    Returns:
+        性能数据字典
+    """
+    if not ASYNCSSH_AVAILABLE:
+        return {
+            'cpu_usage': 0.0,
+            'memory_usage': 0.0,
+            'uptime': '连接失败',
+            'timestamp': time.time(),
+            'error': 'asyncssh未安装',
+            'connection_status': get_device_status(device_id)
+        }
+    engine = get_async_engine()
+    return run_coroutine(engine.collect(device_id, ip, username, password, port, vendor, collect_interfaces))
+
+
+def batch_collect_data(devices: List[Dict], timeout: Optional[float] = None) -> Dict[int, Dict]:
+    """
+    并发采集多台设备（同步接口）
+
+    Args:
+        devices: 设备列表，每项包含 id/ip/username/password，可选 port/vendor
+        timeout: 整批采集的超时时间(秒)，默认不限
+
+    Returns:
+        {设备ID: 性能数据字典}
+    """
+    if not ASYNCSSH_AVAILABLE or not devices:
+        return {}
+    engine = get_async_engine()
+    return run_coroutine(engine.collect_many(devices), timeout)
+
+
+def close_connection(device_id: int) -> bool:
+    """关闭设备的异步SSH会话"""
+    if _engine is None:
+        return False
+    return run_coroutine(_engine.close_session(device_id))
+
+
+def close_all_connections() -> None:
+    """关闭所有异步SSH会话"""
+    if _engine is not None:
+        run_coroutine(_engine.close_all())
+
+
+def shutdown_async_engine():
+    """关闭所有会话并停止后台事件循环"""
+    global _engine, _loop_thread
+    with _engine_lock:
+        if _engine is not None:
+            try:
+                _loop_thread.run(_engine.close_all(), timeout=10)
+            except Exception as e:
+                logger.warning(f"关闭异步SSH会话时出错: {str(e)}")
+            _loop_thread.stop()
+            _engine = None
+            _loop_thread = None
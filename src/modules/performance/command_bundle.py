@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+轮询命令组合模块 - 将一个轮询周期内的所有命令一次写入SSH通道
+
+设备按顺序执行缓冲区中的命令，每条命令输出后打印一次提示符，
+因此按提示符切分合并后的输出即可得到每条命令的结果，再交给对应厂商的解析函数。
+运行时间/版本信息变化很慢，只按较长的间隔加入命令组合，其余周期使用缓存值。
+"""
+
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from src.modules.performance.enhanced_ssh_monitor import (
+    get_vendor_config, parse_cpu_usage, parse_memory_usage, parse_uptime
+)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SLOW_METRICS_INTERVAL = 300  # 运行时间/版本信息采集间隔(秒)
+BUNDLE_READ_TIMEOUT = 30.0  # 读取整组命令输出的超时(秒)
+READ_POLL_DELAY = 0.05  # 读取通道的间隔(秒)
+
+# 每个周期都采集的命令，以及慢周期才采集的命令（VENDOR_MAP中的命令键）
+FAST_COMMANDS = ('cpu_cmd', 'memory_cmd')
+SLOW_COMMANDS = ('version_cmd',)
+
+
+def prompt_pattern(base_prompt: str) -> 're.Pattern':
+    """
+    根据设备基础提示符构造行首提示符正则，如 HUAWEI 匹配 <HUAWEI>、[HUAWEI]，Router 匹配 Router#、Router>
+    """
+    base = re.escape(base_prompt)
+    return re.compile(
+        r'^(?:<' + base + r'[^<>\n]*>|\[' + base + r'[^\[\]\n]*\]|' + base + r'(?:\([^)\n]*\))?[>#])',
+        re.MULTILINE
+    )
+
+
+def split_output_by_prompt(output: str, base_prompt: str, commands: List[str]) -> Optional[List[str]]:
+    """
+    按提示符切分合并输出
+
+    Args:
+        output: 一次写入所有命令后读取到的输出
+        base_prompt: 设备基础提示符
+        commands: 按写入顺序排列的命令
+
+    Returns:
+        与commands对应的输出列表（已去掉命令回显），提示符数量不足时返回None
+    """
+    text = output.replace('\r\n', '\n').replace('\r', '\n')
+    segments = prompt_pattern(base_prompt).split(text)
+    if len(segments) < len(commands) + 1:
+        return None
+
+    results = []
+    for command, segment in zip(commands, segments[:len(commands)]):
+        lines = segment.split('\n')
+        if lines and command.strip() and command.strip() in lines[0]:
+            lines = lines[1:]
+        results.append('\n'.join(lines).strip('\n'))
+    return results
+
+
+def send_command_bundle(connection: Any, commands: List[str],
+                        read_timeout: float = BUNDLE_READ_TIMEOUT) -> Dict[str, str]:
+    """
+    将多条命令一次写入Netmiko连接的通道，并按提示符切分输出
+
+    设备输出无法按提示符切分时（例如提示符在执行过程中变化），回退为逐条 send_command。
+
+    Args:
+        connection: Netmiko连接对象
+        commands: 命令列表
+        read_timeout: 读取超时(秒)
+
+    Returns:
+        {命令: 输出}
+    """
+    if not commands:
+        return {}
+
+    base_prompt = getattr(connection, 'base_prompt', None)
+    if base_prompt:
+        try:
+            pattern = prompt_pattern(base_prompt)
+            connection.clear_buffer()
+            connection.write_channel('\n'.join(commands) + '\n')
+
+            output = ''
+            deadline = time.time() + read_timeout
+            while time.time() < deadline:
+                output += connection.read_channel()
+                # 每条命令执行完输出一个提示符
+                if len(pattern.findall(output.replace('\r', '\n'))) >= len(commands):
+                    break
+                time.sleep(READ_POLL_DELAY)
+
+            parts = split_output_by_prompt(output, base_prompt, commands)
+            if parts is not None:
+                return dict(zip(commands, parts))
+            logger.warning("无法按提示符切分命令组合输出，改为逐条执行")
+        except Exception as e:
+            logger.warning(f"命令组合执行失败，改为逐条执行: {str(e)}")
+
+    return {command: connection.send_command(command) for command in commands}
+
+
+class PollCommandPlanner:
+    """决定每个轮询周期需要执行的命令，并缓存慢周期指标"""
+
+    def __init__(self, slow_interval: float = SLOW_METRICS_INTERVAL):
+        """
+        初始化
+
+        Args:
+            slow_interval: 运行时间/版本信息采集间隔(秒)
+        """
+        self.slow_interval = slow_interval
+        self._last_slow_poll: Dict[int, float] = {}
+        self._slow_values: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, device_id: int, vendor: str, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """
+        生成本周期的命令列表
+
+        Returns:
+            [(命令键, 命令)]
+        """
+        now = now or time.time()
+        vendor_config = get_vendor_config(vendor)
+        keys = list(FAST_COMMANDS)
+        with self._lock:
+            if now - self._last_slow_poll.get(device_id, 0) >= self.slow_interval:
+                keys.extend(SLOW_COMMANDS)
+        return [(key, vendor_config[key]) for key in keys]
+
+    def record(self, device_id: int, values: Dict, now: Optional[float] = None):
+        """记录本周期结果，含慢周期指标时更新缓存"""
+        if 'uptime' not in values:
+            return
+        with self._lock:
+            self._last_slow_poll[device_id] = now or time.time()
+            self._slow_values[device_id] = {'uptime': values['uptime']}
+
+    def cached_slow_values(self, device_id: int) -> Dict:
+        """获取缓存的慢周期指标"""
+        with self._lock:
+            return dict(self._slow_values.get(device_id, {}))
+
+    def reset(self, device_id: Optional[int] = None):
+        """清除缓存（设备重连或停止监控时调用）"""
+        with self._lock:
+            if device_id is None:
+                self._last_slow_poll.clear()
+                self._slow_values.clear()
+            else:
+                self._last_slow_poll.pop(device_id, None)
+                self._slow_values.pop(device_id, None)
+
+
+# 全局命令计划器，各监控服务共享慢周期指标缓存
+poll_planner = PollCommandPlanner()
+
+
+def parse_bundle_outputs(vendor: str, outputs: Dict[str, str]) -> Dict:
+    """
+    将按命令键组织的输出交给对应的厂商解析函数
+
+    Args:
+        vendor: 设备厂商
+        outputs: {命令键: 输出}
+
+    Returns:
+        包含 cpu_usage/memory_usage，以及（如果执行了）uptime 的字典
+    """
+    values = {}
+    if 'cpu_cmd' in outputs:
+        values['cpu_usage'] = parse_cpu_usage(vendor, outputs['cpu_cmd'])
+    if 'memory_cmd' in outputs:
+        values['memory_usage'] = parse_memory_usage(vendor, outputs['memory_cmd'])
+    if 'version_cmd' in outputs:
+        values['uptime'] = parse_uptime(vendor, outputs['version_cmd'])
+    return values
+
+
+def poll_device_metrics(device_id: int, connection: Any, vendor: str,
+                        planner: Optional[PollCommandPlanner] = None) -> Dict:
+    """
+    执行一个轮询周期：一次写入本周期的所有命令，解析并合并缓存的慢周期指标
+
+    Args:
+        device_id: 设备ID
+        connection: Netmiko连接对象
+        vendor: 设备厂商
+        planner: 命令计划器，默认使用全局计划器
+
+    Returns:
+        包含 cpu_usage/memory_usage/uptime 的字典
+    """
+    planner = planner or poll_planner
+    now = time.time()
+    plan = planner.plan(device_id, vendor, now)
+    outputs = send_command_bundle(connection, [command for _, command in plan])
+    values = parse_bundle_outputs(vendor, {key: outputs.get(command, '') for key, command in plan})
+    planner.record(device_id, values, now)
+
+    result = planner.cached_slow_values(device_id)
+    result.update(values)
+    result.setdefault('uptime', 'Unknown')
+    return result
@@ -6,18 +6,16 @@
 """
 
 import time
-import threading
-import queue
 import logging
 import random
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
+from flask import current_app
 
 from src.core.db import db
 from src.models.device import Device
-from src.models.performance import PerformanceData
 from src.modules.performance.enhanced_ssh_monitor import (
-    get_connection,
+    register_connection,
     get_cpu_usage,
     get_memory_usage,
     get_uptime,
@@ -29,16 +27,31 @@ from src.modules.performance.enhanced_ssh_monitor import (
     get_device_status,
     get_all_connections_status
 )
+from src.modules.performance.scheduler import get_poll_scheduler
+from src.modules.performance.interface_collector import collect_interface_stats, get_interface_collector
+from src.modules.performance.enhanced_ssh_monitor import summarize_bandwidth, format_bandwidth
+from src.modules.performance.timeseries import get_timeseries_store, interface_metrics
+from src.modules.performance.metrics_hub import get_metrics_hub
+from src.modules.performance.shared_cache import get_shared_cache
+from src.core.ssh_pool import get_ssh_pool
+from src.modules.performance.ring_buffer import RingBuffer, history_depth
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 监控间隔（秒）
+CPU_MEMORY_INTERVAL = 10  # 性能数据采集间隔
+SAVE_DB_INTERVAL = 300  # 保存到数据库间隔5分钟
+
 # 全局变量
-monitor_threads = {}  # 存储设备监控线程 {device_id: thread}
-keepalive_threads = {}  # 存储保活线程 {device_id: thread}
-device_performance_data = {}  # 存储设备性能数据队列 {device_id: queue.Queue}
+monitored_devices = {}  # 正在监控的设备 {device_id: device_name}
+device_performance_data = {}  # 存储设备最近的性能样本 {device_id: RingBuffer}
 latest_device_data = {}  # 存储设备最新数据 {device_id: data_dict}
-monitor_stop_flags = {}  # 控制监控线程停止的标志 {device_id: bool}
+last_save_db_times = {}  # 上次保存到数据库的时间 {device_id: timestamp}
+
+def _monitor_job_id(device_id: int) -> str:
+    """增强版监控轮询任务ID"""
+    return f"enhanced:{device_id}"
 
 class EnhancedMonitorService:
     """增强版设备监控服务"""
@@ -61,12 +74,13 @@ class EnhancedMonitorService:
                 return {'status': 'error', 'message': f'设备不存在: ID={device_id}'}
                 
             # 检查是否已在监控中
-            if device_id in monitor_threads and monitor_threads[device_id].is_alive():
+            scheduler = get_poll_scheduler()
+            if scheduler.has_job(_monitor_job_id(device_id)):
                 return {'status': 'success', 'message': f'设备 {device.name} 已在监控中'}
                 
-            # 初始化数据队列
+            # 初始化最近样本的环形缓冲
             if device_id not in device_performance_data:
-                device_performance_data[device_id] = queue.Queue(maxsize=100)
+                device_performance_data[device_id] = RingBuffer(depth=history_depth())
                 
             # 初始化最新数据
             latest_device_data[device_id] = {
@@ -78,26 +92,26 @@ class EnhancedMonitorService:
                 "interfaces": {}
             }
             
-            # 初始化停止标志
-            monitor_stop_flags[device_id] = False
-            
-            # 启动监控线程
-            monitor_thread = threading.Thread(
-                target=EnhancedMonitorService._monitor_device_thread,
-                args=(device_id,),
-                daemon=True
-            )
-            monitor_threads[device_id] = monitor_thread
-            monitor_thread.start()
+            # 设备连接信息在启动时读取一次，轮询任务中不再查询数据库
+            device_info = {
+                'ip': device.ip_address,
+                'username': device.username or 'admin',
+                'password': device.password or 'admin123',
+                'port': device.port or 22,
+                'snmp_community': current_app.config.get('SNMP_COMMUNITY', 'public'),
+                'interface_method': current_app.config.get('INTERFACE_COLLECT_METHOD', 'snmp')
+            }
+            monitored_devices[device_id] = device.name
+            last_save_db_times[device_id] = 0
             
-            # 启动保活线程
-            keepalive_thread = threading.Thread(
-                target=EnhancedMonitorService._keepalive_thread,
-                args=(device_id,),
-                daemon=True
+            # 将轮询任务交给共享调度器，会话保活由SSH会话池的健康探测负责
+            scheduler.add_job(
+                _monitor_job_id(device_id),
+                EnhancedMonitorService._monitor_device_job,
+                interval=CPU_MEMORY_INTERVAL,
+                args=(device_id, device.name, device_info),
+                app=current_app._get_current_object()
             )
-            keepalive_threads[device_id] = keepalive_thread
-            keepalive_thread.start()
             
             logger.info(f"已启动对设备 {device.name} 的性能监控")
             return {'status': 'success', 'message': f'已启动对设备 {device.name} 的性能监控'}
@@ -124,8 +138,12 @@ class EnhancedMonitorService:
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: ID={device_id}'}
                 
-            # 设置停止标志
-            monitor_stop_flags[device_id] = True
+            # 从调度器移除轮询任务
+            scheduler = get_poll_scheduler()
+            scheduler.remove_job(_monitor_job_id(device_id))
+            monitored_devices.pop(device_id, None)
+            last_save_db_times.pop(device_id, None)
+            get_interface_collector().reset(device_id)
             
             # 关闭设备连接
             close_connection(device_id)
@@ -137,13 +155,8 @@ class EnhancedMonitorService:
             # 清理最新数据
             if device_id in latest_device_data:
                 del latest_device_data[device_id]
-                
-            # 等待线程结束（最多等待5秒）
-            if device_id in monitor_threads:
-                monitor_threads[device_id].join(timeout=5)
-                
-            if device_id in keepalive_threads:
-                keepalive_threads[device_id].join(timeout=5)
+            get_shared_cache().forget(device_id)
+            get_metrics_hub().forget(device_id)
                 
             logger.info(f"已停止对设备 {device.name} 的性能监控")
             return {'status': 'success', 'message': f'已停止对设备 {device.name} 的性能监控'}
@@ -164,13 +177,22 @@ class EnhancedMonitorService:
             最新性能数据
         """
         try:
+            # 优先读取共享指标缓存（任意工作进程采集的最新数据），不查询数据库
+            data = get_shared_cache().latest(device_id)
+            if data is not None and data.get('device_name') is not None:
+                return {
+                    'status': 'success',
+                    'data': data,
+                    'device_name': data['device_name']
+                }
+            
             # 检查设备是否存在
             device = Device.query.get(device_id)
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: ID={device_id}'}
                 
             # 检查是否已启动监控
-            if device_id not in latest_device_data:
+            if data is None and device_id not in latest_device_data:
                 # 如果未启动监控，自动创建模拟数据
                 cpu_usage = round(random.uniform(20.0, 80.0), 1)
                 memory_usage = round(random.uniform(30.0, 70.0), 1)
@@ -195,7 +217,7 @@ class EnhancedMonitorService:
             # 返回最新数据
             return {
                 'status': 'success',
-                'data': latest_device_data[device_id],
+                'data': data or latest_device_data[device_id],
                 'device_name': device.name
             }
             
@@ -217,6 +239,20 @@ class EnhancedMonitorService:
             历史性能数据
         """
         try:
+            # 共享指标缓存保存了最近的样本，任意工作进程都能读取
+            cache = get_shared_cache()
+            history_data = cache.history(device_id)
+            if history_data:
+                device_name = (cache.latest(device_id) or {}).get('device_name')
+                if device_name is None:
+                    device = Device.query.get(device_id)
+                    device_name = device.name if device else f"设备{device_id}"
+                return {
+                    'status': 'success',
+                    'data': history_data,
+                    'device_name': device_name
+                }
+            
             device = Device.query.get(device_id)
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: ID={device_id}'}
@@ -224,9 +260,8 @@ class EnhancedMonitorService:
             if device_id not in device_performance_data:
                 return {'status': 'error', 'message': f'设备 {device.name} 未在监控中'}
                 
-            # 从队列中提取数据
-            queue_obj = device_performance_data[device_id]
-            history_data = list(queue_obj.queue)
+            # 复制环形缓冲中的样本（不阻塞采集任务）
+            history_data = device_performance_data[device_id].to_dicts()
             
             return {
                 'status': 'success',
@@ -250,38 +285,27 @@ class EnhancedMonitorService:
             data: 性能数据
             
         Returns:
-            保存的性能数据记录ID，失败时返回None
+            包含设备ID和采样时间的字典，失败时返回None
         """
         try:
             # 准备数据
             cpu_usage = data.get('cpu_usage', 0)
             memory_usage = data.get('memory_usage', 0)
             bandwidth_usage = data.get('bandwidth_usage', 0)
-            uptime = data.get('uptime', 'Unknown')
             timestamp = datetime.now()
             
-            # 使用SQL语句直接插入数据
-            sql = """
-            INSERT INTO performance_data 
-            (device_id, cpu_usage, memory_usage, bandwidth_usage, uptime, timestamp, created_at, updated_at) 
-            VALUES (:device_id, :cpu_usage, :memory_usage, :bandwidth_usage, :uptime, :timestamp, :created_at, :updated_at)
-            """
-            
-            result = db.session.execute(sql, {
-                'device_id': device_id,
+            # 通过批量写入缓冲写入时序存储：CPU/内存/带宽写入性能记录表，接口速率写入指标采样表
+            metrics = {
                 'cpu_usage': cpu_usage,
                 'memory_usage': memory_usage,
-                'bandwidth_usage': bandwidth_usage,
-                'uptime': uptime,
-                'timestamp': timestamp,
-                'created_at': timestamp,
-                'updated_at': timestamp
-            })
-            
-            db.session.commit()
+                'bandwidth_usage': bandwidth_usage
+            }
+            metrics.update(interface_metrics(data.get('interfaces')))
+            if not get_timeseries_store().enqueue(device_id, metrics, recorded_at=timestamp):
+                return None
             
-            logger.debug(f"已保存设备 {device_id} 的性能数据: CPU={cpu_usage}%, MEM={memory_usage}%")
-            return {'id': result.lastrowid, 'device_id': device_id, 'timestamp': timestamp}
+            logger.debug(f"已提交设备 {device_id} 的性能数据: CPU={cpu_usage}%, MEM={memory_usage}%")
+            return {'device_id': device_id, 'timestamp': timestamp}
             
         except Exception as e:
             logger.error(f"保存性能数据失败: {str(e)}")
@@ -305,7 +329,10 @@ class EnhancedMonitorService:
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: ID={device_id}'}
                 
-            # 发送命令
+            # 登记连接参数后租用会话池中该设备的会话发送命令（监控中的设备复用已有会话）
+            if not get_ssh_pool().has_factory(device_id):
+                register_connection(device_id, device.ip_address, device.username or 'admin',
+                                    device.password or 'admin123', device.port or 22)
             result = send_command(device_id, command)
             
             if result['status'] == 'success':
@@ -334,12 +361,13 @@ class EnhancedMonitorService:
             设备信息列表
         """
         result = []
-        for device_id in monitor_threads:
+        scheduler = get_poll_scheduler()
+        for device_id in list(monitored_devices):
             try:
                 device = Device.query.get(device_id)
                 if device:
                     # 获取最新数据
-                    latest_data = latest_device_data.get(device_id, {})
+                    latest_data = get_shared_cache().latest(device_id) or latest_device_data.get(device_id, {})
                     
                     # 获取连接状态
                     connection_status = latest_data.get('connection_status', {
@@ -353,7 +381,7 @@ class EnhancedMonitorService:
                         'ip_address': device.ip_address,
                         'type': device.type.name if device.type else 'Unknown',
                         'status': device.status,
-                        'monitoring': monitor_threads[device_id].is_alive(),
+                        'monitoring': scheduler.has_job(_monitor_job_id(device_id)),
                         'connection_status': connection_status,
                         'cpu_usage': latest_data.get('cpu_usage', 0),
                         'memory_usage': latest_data.get('memory_usage', 0)
@@ -364,164 +392,58 @@ class EnhancedMonitorService:
         return result
     
     @staticmethod
-    def _monitor_device_thread(device_id: int):
+    def _monitor_device_job(device_id: int, device_name: str, device_info: Dict):
         """
-        设备监控线程
+        调度器任务：采集一次设备数据，并按间隔保存到数据库
         
         Args:
             device_id: 设备ID
+            device_name: 设备名称
+            device_info: 设备连接信息
         """
-        # 导入当前应用，并创建应用上下文
-        from flask import current_app
-        from src.app import create_app
-        
-        # 创建应用实例并推送上下文
-        app = create_app()
-        
-        with app.app_context():
-            try:
-                # 获取设备信息
-                device_info = db.session.execute(
-                    f"SELECT id, name, ip_address, username, password, port FROM devices WHERE id = {device_id}"
-                ).fetchone()
-                
-                if not device_info:
-                    logger.error(f"设备不存在: ID={device_id}")
-                    return
-                    
-                device_name = device_info.name
-                logger.info(f"启动设备 {device_name} (ID:{device_id}) 的性能监控线程")
-                
-                # 监控间隔
-                cpu_memory_interval = 10  # 默认10秒
-                interface_stats_interval = 30  # 接口统计数据收集间隔30秒
-                save_db_interval = 300  # 保存到数据库间隔5分钟
-                
-                # 上次数据收集时间
-                last_cpu_memory_time = 0
-                last_interface_stats_time = 0
-                last_save_db_time = 0
-                
-                # 设备连接信息
-                device_ip = device_info.ip_address
-                device_username = device_info.username or 'admin'
-                device_password = device_info.password or 'admin123'
-                device_port = device_info.port or 22
-                
-                logger.debug(f"设备连接信息: IP={device_ip}, 用户名={device_username}, 端口={device_port}")
-                
-                # 监控循环
-                while not monitor_stop_flags.get(device_id, False):
-                    current_time = time.time()
-                    
-                    try:
-                        # 获取基本性能数据（每cpu_memory_interval秒）
-                        if current_time - last_cpu_memory_time >= cpu_memory_interval:
-                            # 收集设备数据
-                            data = collect_device_data(
-                                device_id, 
-                                device_ip, 
-                                device_username, 
-                                device_password, 
-                                device_port
-                            )
-                            
-                            # 更新最新数据
-                            latest_device_data[device_id] = data
-                            
-                            # 添加到历史数据队列
-                            if device_id in device_performance_data:
-                                if device_performance_data[device_id].full():
-                                    # 队列满则移除最旧的数据
-                                    try:
-                                        device_performance_data[device_id].get_nowait()
-                                    except:
-                                        pass
-                                    
-                                try:
-                                    device_performance_data[device_id].put_nowait(data)
-                                except:
-                                    pass
-                            
-                            # 更新时间戳
-                            last_cpu_memory_time = current_time
-                            
-                            logger.debug(f"设备 {device_name} 数据更新: CPU={data.get('cpu_usage')}%, MEM={data.get('memory_usage')}%")
-                            
-                        # 保存到数据库（每save_db_interval秒）
-                        if current_time - last_save_db_time >= save_db_interval:
-                            if device_id in latest_device_data:
-                                EnhancedMonitorService.save_performance_data(
-                                    device_id, 
-                                    latest_device_data[device_id]
-                                )
-                                last_save_db_time = current_time
-                        
-                        # 休眠一小段时间，减少CPU使用
-                        time.sleep(2)
-                        
-                    except Exception as e:
-                        logger.error(f"监控设备 {device_name} 出错: {str(e)}")
-                        time.sleep(30)  # 出错后等待30秒再重试
-                        
-                logger.info(f"设备 {device_name} 监控线程已停止")
-                
-            except Exception as e:
-                logger.error(f"监控线程异常: {str(e)}")
-                import traceback
-                logger.error(traceback.format_exc())
-    
-    @staticmethod
-    def _keepalive_thread(device_id: int):
-        """
-        保持连接的线程
-        
-        Args:
-            device_id: 设备ID
-        """
-        # 导入当前应用，并创建应用上下文
-        from flask import current_app
-        from src.app import create_app
-        
-        # 创建应用实例并推送上下文
-        app = create_app()
-        
-        with app.app_context():
-            try:
-                # 获取设备信息
-                device_info = db.session.execute(
-                    f"SELECT id, name FROM devices WHERE id = {device_id}"
-                ).fetchone()
-                
-                if not device_info:
-                    logger.error(f"设备不存在: ID={device_id}")
-                    return
-                    
-                device_name = device_info.name
-                logger.info(f"启动设备 {device_name} (ID:{device_id}) 的保活线程")
-                
-                # 保活间隔
-                keepalive_interval = 60  # 默认60秒
-                
-                # 监控循环
-                while not monitor_stop_flags.get(device_id, False):
-                    try:
-                        # 发送保活命令
-                        result = send_command(device_id, "display clock")
-                        
-                        if result['status'] == 'success':
-                            logger.debug(f"设备 {device_name} 保活成功: {result['output']}")
-                        else:
-                            logger.warning(f"设备 {device_name} 保活失败: {result['message']}")
-                            
-                        # 休眠一段时间
-                        time.sleep(keepalive_interval)
-                        
-                    except Exception as e:
-                        logger.error(f"保活设备 {device_name} 出错: {str(e)}")
-                        time.sleep(30)  # 出错后等待30秒再重试
-                        
-                logger.info(f"设备 {device_name} 保活线程已停止")
+        try:
+            # 优先通过SNMP采集全部接口，SNMP无响应时回退到CLI采集
+            interfaces = {}
+            if device_info.get('interface_method', 'snmp') == 'snmp':
+                interfaces = collect_interface_stats(
+                    device_id, device_info['ip'], device_info.get('snmp_community')
+                )
+            
+            # 收集设备数据
+            data = collect_device_data(
+                device_id, 
+                device_info['ip'], 
+                device_info['username'], 
+                device_info['password'], 
+                device_info['port'],
+                collect_interfaces=not interfaces
+            )
+            
+            if interfaces:
+                bandwidth_usage, total_input, total_output = summarize_bandwidth(interfaces)
+                data['interfaces'] = interfaces
+                data['bandwidth_usage'] = round(bandwidth_usage, 2)
+                data['total_input_rate'] = format_bandwidth(total_input)
+                data['total_output_rate'] = format_bandwidth(total_output)
+            
+            # 更新最新数据（同时写入共享指标缓存供其他工作进程读取），并推送给订阅该设备的浏览器
+            latest_device_data[device_id] = data
+            get_shared_cache().put(device_id, data, device_name=device_name)
+            get_metrics_hub().publish(device_id, data)
+            
+            # 写入环形缓冲，写满后自动覆盖最旧的样本
+            history = device_performance_data.get(device_id)
+            if history is not None:
+                history.append(data)
+            
+            logger.debug(f"设备 {device_name} 数据更新: CPU={data.get('cpu_usage')}%, MEM={data.get('memory_usage')}%")
+            
+            # 保存到数据库（每SAVE_DB_INTERVAL秒）
+            current_time = time.time()
+            if current_time - last_save_db_times.get(device_id, 0) >= SAVE_DB_INTERVAL:
+                EnhancedMonitorService.save_performance_data(device_id, data)
+                last_save_db_times[device_id] = current_time
                 
-            except Exception as e:
-                logger.error(f"保活线程异常: {str(e)}") 
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"监控设备 {device_name} 出错: {str(e)}")
+            get_poll_scheduler().defer(_monitor_job_id(device_id), 30)  # 出错后等待30秒再重试
@@ -8,11 +8,11 @@
 
 import time
 import re
-import threading
 import logging
-import paramiko
 from typing import Dict, Optional, Any, List, Tuple, Union
 
+from src.core.ssh_pool import get_ssh_pool, SSHPoolError
+
 try:
     from netmiko import ConnectHandler
     from netmiko.exceptions import NetMikoTimeoutException, NetMikoAuthenticationException
@@ -25,12 +25,17 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 全局连接管理
-connection_locks = {}  # 格式: {device_id: threading.Lock()}
-device_connections = {}  # 格式: {device_id: connection_object}
+# 连接状态（连接本身由共享SSH会话池管理）
 last_connection_times = {}  # 格式: {device_id: timestamp}
 connection_status = {}  # 格式: {device_id: {"status": "connected", "last_error": "", "reconnect_attempts": 0}}
 
+# 采集后端: "netmiko"(默认，同步阻塞) 或 "asyncssh"(单事件循环并发采集，见 async_ssh_monitor)，
+# 由 init_collect_backend 按应用配置 SSH_COLLECT_BACKEND 设置
+SSH_COLLECT_BACKEND = 'netmiko'
+
+# 未采集到接口速率时假设的链路容量(bps)
+DEFAULT_LINK_CAPACITY = 1000000000
+
 # 设备厂商映射
 VENDOR_MAP = {
     "huawei": {
@@ -92,11 +97,11 @@ def detect_device_vendor(connection: Any) -> str:
         logger.warning(f"无法检测设备厂商类型: {str(e)}")
         return "huawei"  # 默认使用华为设备
 
-def get_connection(device_id: int, ip: str, username: str, password: str, 
-                  port: int = 22, vendor: str = "huawei", 
-                  timeout: int = 10) -> Optional[Any]:
+def _open_connection(device_id: int, ip: str, username: str, password: str,
+                     port: int = 22, vendor: str = "huawei",
+                     timeout: int = 10) -> Optional[Any]:
     """
-    获取或创建到设备的SSH连接
+    建立到设备的新SSH连接（由SSH会话池在需要新会话时调用）
     
     Args:
         device_id: 设备ID
@@ -110,131 +115,130 @@ def get_connection(device_id: int, ip: str, username: str, password: str,
     Returns:
         SSH连接对象，如果连接失败则返回None
     """
-    global device_connections, last_connection_times, connection_status
+    # 初始化连接状态
+    if device_id not in connection_status:
+        connection_status[device_id] = {
+            "status": "disconnected",
+            "last_error": "",
+            "reconnect_attempts": 0,
+            "vendor": vendor
+        }
     
-    # 确保该设备有连接锁
-    if device_id not in connection_locks:
-        connection_locks[device_id] = threading.Lock()
+    # 检查是否有netmiko支持
+    if not NETMIKO_AVAILABLE:
+        logger.warning("Netmiko未安装，无法连接设备")
+        connection_status[device_id]["status"] = "error"
+        connection_status[device_id]["last_error"] = "Netmiko未安装"
+        return None
     
-    with connection_locks[device_id]:
-        # 初始化连接状态
-        if device_id not in connection_status:
-            connection_status[device_id] = {
-                "status": "disconnected",
-                "last_error": "",
-                "reconnect_attempts": 0,
-                "vendor": vendor
-            }
+    try:
+        logger.info(f"正在创建到设备 ID:{device_id}, IP:{ip} 的新连接...")
+        
+        # 增加重连尝试计数
+        if connection_status[device_id]["status"] != "disconnected":
+            connection_status[device_id]["reconnect_attempts"] += 1
+        
+        # 设置连接参数
+        vendor_type = vendor.lower() if vendor else "huawei"
+        if vendor_type not in VENDOR_MAP:
+            vendor_type = "huawei"  # 默认使用华为设备
             
-        # 检查连接是否存在且有效
-        if device_id in device_connections and device_connections[device_id] is not None:
-            try:
-                # 发送简单命令测试连接是否有效
-                if hasattr(device_connections[device_id], 'find_prompt'):
-                    device_connections[device_id].find_prompt()
-                
-                connection_status[device_id]["status"] = "connected"
-                connection_status[device_id]["reconnect_attempts"] = 0
-                return device_connections[device_id]
-            except Exception as e:
-                logger.warning(f"设备 {device_id} 的连接已失效，准备重新连接: {str(e)}")
-                try:
-                    device_connections[device_id].disconnect()
-                except:
-                    pass
-                device_connections[device_id] = None
-                connection_status[device_id]["status"] = "reconnecting"
-                connection_status[device_id]["last_error"] = str(e)
-        
-        # 连接不存在或无效，创建新连接
-        # 检查是否频繁重连（防止在短时间内多次重连）
-        current_time = time.time()
-        if device_id in last_connection_times and current_time - last_connection_times.get(device_id, 0) < 5:
-            time.sleep(2)  # 等待一段时间再重连
-        
-        # 检查是否有netmiko支持
-        if not NETMIKO_AVAILABLE:
-            logger.warning("Netmiko未安装，无法连接设备")
-            connection_status[device_id]["status"] = "error"
-            connection_status[device_id]["last_error"] = "Netmiko未安装"
-            return None
+        device_info = {
+            'device_type': VENDOR_MAP[vendor_type]["device_type"],
+            'ip': ip,
+            'username': username,
+            'password': password,
+            'port': port,
+            'timeout': timeout,
+            'session_timeout': 60,
+            'keepalive': 30,
+            'global_delay_factor': 2,
+            'fast_cli': False,  # 禁用快速CLI，增加兼容性
+        }
+        
+        # 使用ConnectHandler连接设备
+        conn = ConnectHandler(**device_info)
+        
+        # 发送一个简单命令确认连接正常
+        conn.find_prompt()
+        
+        # 尝试自动检测设备类型
+        detected_vendor = detect_device_vendor(conn)
+        connection_status[device_id]["vendor"] = detected_vendor
+        last_connection_times[device_id] = time.time()
+        
+        # 更新状态
+        connection_status[device_id]["status"] = "connected"
+        connection_status[device_id]["reconnect_attempts"] = 0
+        connection_status[device_id]["last_error"] = ""
         
+        logger.info(f"成功建立到设备 ID:{device_id}, IP:{ip} 的新连接")
+        
+        # 发送禁用分页命令
         try:
-            logger.info(f"正在创建到设备 ID:{device_id}, IP:{ip} 的新连接...")
-            
-            # 增加重连尝试计数
-            if connection_status[device_id]["status"] == "reconnecting":
-                connection_status[device_id]["reconnect_attempts"] += 1
-            
-            # 设置连接参数
-            vendor_type = vendor.lower() if vendor else "huawei"
-            if vendor_type not in VENDOR_MAP:
-                vendor_type = "huawei"  # 默认使用华为设备
-                
-            device_info = {
-                'device_type': VENDOR_MAP[vendor_type]["device_type"],
-                'ip': ip,
-                'username': username,
-                'password': password,
-                'port': port,
-                'timeout': timeout,
-                'session_timeout': 60,
-                'keepalive': 30,
-                'global_delay_factor': 2,
-                'fast_cli': False,  # 禁用快速CLI，增加兼容性
-            }
-            
-            # 使用ConnectHandler连接设备
-            conn = ConnectHandler(**device_info)
-            
-            # 发送一个简单命令确认连接正常
-            conn.find_prompt()
-            
-            # 尝试自动检测设备类型
-            detected_vendor = detect_device_vendor(conn)
-            connection_status[device_id]["vendor"] = detected_vendor
-            
-            # 存储连接
-            device_connections[device_id] = conn
-            last_connection_times[device_id] = time.time()
-            
-            # 更新状态
-            connection_status[device_id]["status"] = "connected"
-            connection_status[device_id]["reconnect_attempts"] = 0
-            connection_status[device_id]["last_error"] = ""
-            
-            logger.info(f"成功建立到设备 ID:{device_id}, IP:{ip} 的新连接")
-            
-            # 发送禁用分页命令
-            try:
-                disable_paging_cmd = VENDOR_MAP[detected_vendor]["disable_paging_cmd"]
-                conn.send_command(disable_paging_cmd)
-                logger.debug(f"已发送禁用分页命令: {disable_paging_cmd}")
-            except Exception as e:
-                logger.warning(f"设置分页失败: {str(e)}")
-                
-            return conn
-            
-        except NetMikoTimeoutException:
-            error_msg = f"连接超时: 设备 {ip} 可能无法访问或SSH服务未启用"
-            logger.error(error_msg)
-            connection_status[device_id]["status"] = "timeout"
-            connection_status[device_id]["last_error"] = error_msg
-            return None
-            
-        except NetMikoAuthenticationException:
-            error_msg = f"认证失败: 用户名或密码错误"
-            logger.error(error_msg)
-            connection_status[device_id]["status"] = "auth_failed"
-            connection_status[device_id]["last_error"] = error_msg
-            return None
-            
+            disable_paging_cmd = VENDOR_MAP[detected_vendor]["disable_paging_cmd"]
+            conn.send_command(disable_paging_cmd)
+            logger.debug(f"已发送禁用分页命令: {disable_paging_cmd}")
         except Exception as e:
-            error_msg = f"创建设备 ID:{device_id}, IP:{ip} 的连接失败: {str(e)}"
-            logger.error(error_msg)
-            connection_status[device_id]["status"] = "error"
-            connection_status[device_id]["last_error"] = error_msg
-            return None
+            logger.warning(f"设置分页失败: {str(e)}")
+            
+        return conn
+        
+    except NetMikoTimeoutException:
+        error_msg = f"连接超时: 设备 {ip} 可能无法访问或SSH服务未启用"
+        logger.error(error_msg)
+        connection_status[device_id]["status"] = "timeout"
+        connection_status[device_id]["last_error"] = error_msg
+        return None
+        
+    except NetMikoAuthenticationException:
+        error_msg = f"认证失败: 用户名或密码错误"
+        logger.error(error_msg)
+        connection_status[device_id]["status"] = "auth_failed"
+        connection_status[device_id]["last_error"] = error_msg
+        return None
+        
+    except Exception as e:
+        error_msg = f"创建设备 ID:{device_id}, IP:{ip} 的连接失败: {str(e)}"
+        logger.error(error_msg)
+        connection_status[device_id]["status"] = "error"
+        connection_status[device_id]["last_error"] = error_msg
+        return None
+
+def lease_connection(device_id: int, ip: str, username: str, password: str, 
+                     port: int = 22, vendor: str = "huawei", 
+                     timeout: int = 10):
+    """
+    从共享SSH会话池租用到设备的一个会话（上下文管理器），没有空闲会话时新建连接
+    
+    Args:
+        device_id: 设备ID
+        ip: 设备IP地址
+        username: 用户名
+        password: 密码
+        port: SSH端口，默认22
+        vendor: 设备厂商，默认'huawei'
+        timeout: 连接超时时间，默认10秒
+        
+    Raises:
+        SSHPoolError: 连接失败或等待可用会话超时
+    """
+    register_connection(device_id, ip, username, password, port, vendor, timeout)
+    return get_ssh_pool().lease(device_id)
+
+def register_connection(device_id: int, ip: str, username: str, password: str, 
+                        port: int = 22, vendor: str = "huawei", 
+                        timeout: int = 10) -> None:
+    """
+    向共享SSH会话池登记设备的连接参数，之后 send_command 可以只凭设备ID租用会话
+    
+    Args:
+        同 lease_connection
+    """
+    get_ssh_pool().register(
+        device_id,
+        lambda: _open_connection(device_id, ip, username, password, port, vendor, timeout)
+    )
 
 def get_device_status(device_id: int) -> Dict:
     """
@@ -259,6 +263,239 @@ def get_device_status(device_id: int) -> Dict:
     status["connected"] = status["status"] == "connected"
     return status
 
+def get_vendor_config(vendor: str) -> Dict:
+    """
+    获取厂商命令和解析规则，未知厂商使用华为配置
+    
+    Args:
+        vendor: 设备厂商
+        
+    Returns:
+        VENDOR_MAP中的厂商配置
+    """
+    return VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])
+
+def parse_cpu_usage(vendor: str, output: str) -> float:
+    """
+    从命令输出中解析CPU使用率
+    
+    Args:
+        vendor: 设备厂商
+        output: cpu_cmd的命令输出
+        
+    Returns:
+        CPU使用率百分比，解析失败返回0
+    """
+    match = re.search(get_vendor_config(vendor)["cpu_pattern"], output)
+    if match:
+        return float(match.group(1))
+    
+    # 尝试备用正则表达式
+    fallback_patterns = [
+        r'CPU.+?(\d+(\.\d+)?)%',  # 通用模式
+        r'(\d+(\.\d+)?)%\s+CPU',
+        r'utilization\s*:\s*(\d+(\.\d+)?)%'
+    ]
+    
+    for pattern in fallback_patterns:
+        match = re.search(pattern, output)
+        if match:
+            return float(match.group(1))
+            
+    return 0.0
+
+def parse_memory_usage(vendor: str, output: str) -> float:
+    """
+    从命令输出中解析内存使用率
+    
+    Args:
+        vendor: 设备厂商
+        output: memory_cmd的命令输出
+        
+    Returns:
+        内存使用率百分比，解析失败返回0
+    """
+    # 思科输出为 "Processor <Head> <Total> <Used> <Free> ..."，需要自行计算百分比
+    if vendor == "cisco":
+        match = re.search(r'Processor\s+[0-9A-Fa-f]+\s+(\d+)\s+(\d+)', output)
+        if match and int(match.group(1)) > 0:
+            return round(int(match.group(2)) / int(match.group(1)) * 100, 2)
+    
+    match = re.search(get_vendor_config(vendor)["memory_pattern"], output)
+    if match and vendor != "cisco":
+        return float(match.group(1))
+    
+    # 尝试备用正则表达式
+    fallback_patterns = [
+        r'Memory.+?(\d+(\.\d+)?)%',  # 通用模式
+        r'memory utilization\s*:\s*(\d+(\.\d+)?)%',
+        r'Memory usage\s*:\s*(\d+(\.\d+)?)%'
+    ]
+    
+    for pattern in fallback_patterns:
+        match = re.search(pattern, output)
+        if match:
+            return float(match.group(1))
+            
+    return 0.0
+
+def parse_uptime(vendor: str, output: str) -> str:
+    """
+    从命令输出中解析运行时间
+    
+    Args:
+        vendor: 设备厂商
+        output: version_cmd的命令输出
+        
+    Returns:
+        运行时间字符串，解析失败返回"Unknown"
+    """
+    match = re.search(get_vendor_config(vendor)["uptime_pattern"], output)
+    if match:
+        return match.group(1).strip()
+    
+    # 尝试备用正则表达式
+    fallback_patterns = [
+        r'[Uu]ptime\s+(?:is|:)\s+(.+)',
+        r'[Ss]ystem uptime\s*:\s*(.+)',
+        r'has been up for\s+(.+)'
+    ]
+    
+    for pattern in fallback_patterns:
+        match = re.search(pattern, output)
+        if match:
+            return match.group(1).strip()
+            
+    return "Unknown"
+
+def parse_interface_list(vendor: str, output: str) -> Dict:
+    """
+    从接口列表命令输出中解析接口及其状态
+    
+    Args:
+        vendor: 设备厂商
+        output: interface_cmd的命令输出
+        
+    Returns:
+        接口字典 {接口名: {"status": ..., "type": ...}}
+    """
+    interfaces = {}
+    
+    # 解析接口信息 - 不同设备厂商有不同的输出格式
+    if vendor == "huawei":
+        # 华为设备接口解析
+        for line in output.splitlines():
+            # 匹配常见的接口类型
+            if any(intf_type in line for intf_type in ['GigabitEthernet', 'Ethernet', 'Vlanif', 'LoopBack']):
+                parts = line.split()
+                if len(parts) >= 2:
+                    interface_name = parts[0]
+                    status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
+                    interfaces[interface_name] = {
+                        "status": status,
+                        "type": interface_name.split('GigabitEthernet')[0] if 'GigabitEthernet' in interface_name else "Unknown"
+                    }
+    elif vendor == "cisco":
+        # 思科设备接口解析: Interface IP-Address OK? Method Status Protocol
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) < 6 or parts[0] == "Interface":
+                continue
+            interface_name = parts[0]
+            status = "up" if parts[-2].lower() == "up" else "down"
+            interfaces[interface_name] = {
+                "status": status,
+                "type": interface_name.split('/')[0] if '/' in interface_name else "Unknown"
+            }
+    else:
+        # 通用解析方法
+        for line in output.splitlines():
+            # 匹配任何看起来像接口名的内容
+            match = re.search(r'([A-Za-z0-9\/\.-]+)\s+', line)
+            if match:
+                interface_name = match.group(1)
+                status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
+                interfaces[interface_name] = {
+                    "status": status,
+                    "type": interface_name.split('/')[0] if '/' in interface_name else "Unknown"
+                }
+    
+    return interfaces
+
+def parse_interface_detail(vendor: str, output: str) -> Dict:
+    """
+    从接口详情命令输出中解析速率、MAC和错误计数
+    
+    Args:
+        vendor: 设备厂商
+        output: interface_detail_cmd的命令输出
+        
+    Returns:
+        接口详情字典
+    """
+    vendor_config = get_vendor_config(vendor)
+    detail = {}
+    
+    # 提取输入/输出速率
+    input_match = re.search(vendor_config["interface_input_pattern"], output, re.DOTALL)
+    output_match = re.search(vendor_config["interface_output_pattern"], output, re.DOTALL)
+    
+    input_rate = int(input_match.group(1)) if input_match else 0
+    output_rate = int(output_match.group(1)) if output_match else 0
+    
+    # 将bps转换为更易读的单位
+    detail["input_rate"] = input_rate
+    detail["output_rate"] = output_rate
+    detail["input_rate_formatted"] = format_bandwidth(input_rate)
+    detail["output_rate_formatted"] = format_bandwidth(output_rate)
+    
+    # 提取更多接口信息
+    mac_match = re.search(r'MAC\s+[Aa]ddress[^\w]*:\s*([0-9a-fA-F\-:]+)', output)
+    if mac_match:
+        detail["mac_address"] = mac_match.group(1)
+    
+    # 提取错误和丢包信息
+    errors_in_match = re.search(r'input\s+error[s]*\s+(\d+)', output, re.IGNORECASE)
+    errors_out_match = re.search(r'output\s+error[s]*\s+(\d+)', output, re.IGNORECASE)
+    
+    if errors_in_match:
+        detail["input_errors"] = int(errors_in_match.group(1))
+    if errors_out_match:
+        detail["output_errors"] = int(errors_out_match.group(1))
+    
+    return detail
+
+def summarize_bandwidth(interfaces: Dict) -> Tuple[float, int, int]:
+    """
+    汇总接口速率并估算带宽使用率
+    
+    Args:
+        interfaces: 接口统计信息字典，SNMP采集的接口带有 speed（ifHighSpeed，Mbps）
+        
+    Returns:
+        (带宽使用率百分比, 总输入速率bps, 总输出速率bps)
+    """
+    total_input = 0
+    total_output = 0
+    for intf, data in interfaces.items():
+        if 'input_rate' in data:
+            total_input += data['input_rate']
+        if 'output_rate' in data:
+            total_output += data['output_rate']
+    
+    # 链路总容量为所有up接口的速率之和，没有采集到速率的接口（CLI采集）按1Gbps计算
+    link_capacity = sum(
+        (data.get('speed') or 0) * 1000000 or DEFAULT_LINK_CAPACITY
+        for data in interfaces.values() if data.get('status') == 'up'
+    )
+    if link_capacity > 0:
+        bandwidth_usage = max(total_input, total_output) / link_capacity * 100
+    else:
+        bandwidth_usage = 0.0
+        
+    # 限制带宽使用率的最大值为100%
+    return min(bandwidth_usage, 100.0), total_input, total_output
+
 def get_cpu_usage(device_id: int, connection: Any) -> float:
     """
     获取CPU使用率
@@ -272,30 +509,13 @@ def get_cpu_usage(device_id: int, connection: Any) -> float:
     """
     try:
         vendor = connection_status.get(device_id, {}).get("vendor", "huawei")
-        cmd = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["cpu_cmd"]
-        pattern = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["cpu_pattern"]
+        cmd = get_vendor_config(vendor)["cpu_cmd"]
         
         logger.debug(f"执行CPU命令: {cmd}")
         output = connection.send_command(cmd)
         logger.debug(f"CPU命令输出: {output}")
         
-        match = re.search(pattern, output)
-        if match:
-            return float(match.group(1))
-        
-        # 尝试备用正则表达式
-        fallback_patterns = [
-            r'CPU.+?(\d+(\.\d+)?)%',  # 通用模式
-            r'(\d+(\.\d+)?)%\s+CPU',
-            r'utilization\s*:\s*(\d+(\.\d+)?)%'
-        ]
-        
-        for pattern in fallback_patterns:
-            match = re.search(pattern, output)
-            if match:
-                return float(match.group(1))
-                
-        return 0.0
+        return parse_cpu_usage(vendor, output)
     except Exception as e:
         logger.error(f"获取设备 {device_id} CPU使用率失败: {str(e)}")
         return 0.0
@@ -313,30 +533,13 @@ def get_memory_usage(device_id: int, connection: Any) -> float:
     """
     try:
         vendor = connection_status.get(device_id, {}).get("vendor", "huawei")
-        cmd = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["memory_cmd"]
-        pattern = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["memory_pattern"]
+        cmd = get_vendor_config(vendor)["memory_cmd"]
         
         logger.debug(f"执行内存命令: {cmd}")
         output = connection.send_command(cmd)
         logger.debug(f"内存命令输出: {output}")
         
-        match = re.search(pattern, output)
-        if match:
-            return float(match.group(1))
-        
-        # 尝试备用正则表达式
-        fallback_patterns = [
-            r'Memory.+?(\d+(\.\d+)?)%',  # 通用模式
-            r'memory utilization\s*:\s*(\d+(\.\d+)?)%',
-            r'Memory usage\s*:\s*(\d+(\.\d+)?)%'
-        ]
-        
-        for pattern in fallback_patterns:
-            match = re.search(pattern, output)
-            if match:
-                return float(match.group(1))
-                
-        return 0.0
+        return parse_memory_usage(vendor, output)
     except Exception as e:
         logger.error(f"获取设备 {device_id} 内存使用率失败: {str(e)}")
         return 0.0
@@ -354,30 +557,13 @@ def get_uptime(device_id: int, connection: Any) -> str:
     """
     try:
         vendor = connection_status.get(device_id, {}).get("vendor", "huawei")
-        cmd = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["version_cmd"]
-        pattern = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["uptime_pattern"]
+        cmd = get_vendor_config(vendor)["version_cmd"]
         
         logger.debug(f"执行版本命令: {cmd}")
         output = connection.send_command(cmd)
         logger.debug(f"版本命令输出: {output}")
         
-        match = re.search(pattern, output)
-        if match:
-            return match.group(1)
-        
-        # 尝试备用正则表达式
-        fallback_patterns = [
-            r'[Uu]ptime\s+(?:is|:)\s+(.+)',
-            r'[Ss]ystem uptime\s*:\s*(.+)',
-            r'has been up for\s+(.+)'
-        ]
-        
-        for pattern in fallback_patterns:
-            match = re.search(pattern, output)
-            if match:
-                return match.group(1)
-                
-        return "Unknown"
+        return parse_uptime(vendor, output)
     except Exception as e:
         logger.error(f"获取设备 {device_id} 运行时间失败: {str(e)}")
         return "Unknown"
@@ -398,89 +584,21 @@ def get_interface_stats(device_id: int, connection: Any, max_interfaces: int = 5
     
     try:
         vendor = connection_status.get(device_id, {}).get("vendor", "huawei")
-        interface_cmd = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["interface_cmd"]
-        interface_detail_cmd = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["interface_detail_cmd"]
-        input_pattern = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["interface_input_pattern"]
-        output_pattern = VENDOR_MAP.get(vendor, VENDOR_MAP["huawei"])["interface_output_pattern"]
+        vendor_config = get_vendor_config(vendor)
         
         # 1. 获取接口列表
-        logger.debug(f"执行接口列表命令: {interface_cmd}")
-        output = connection.send_command(interface_cmd)
-        
-        # 解析接口信息 - 不同设备厂商有不同的输出格式
-        if vendor == "huawei":
-            # 华为设备接口解析
-            for line in output.splitlines():
-                # 匹配常见的接口类型
-                if any(intf_type in line for intf_type in ['GigabitEthernet', 'Ethernet', 'Vlanif', 'LoopBack']):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        interface_name = parts[0]
-                        status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
-                        interfaces[interface_name] = {
-                            "status": status,
-                            "type": interface_name.split('GigabitEthernet')[0] if 'GigabitEthernet' in interface_name else "Unknown"
-                        }
-        elif vendor == "cisco":
-            # 思科设备接口解析
-            for line in output.splitlines():
-                if "unassigned" in line or "." in line.split()[0]:  # 有IP地址的接口或子接口
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        interface_name = parts[0]
-                        status = "up" if parts[4].lower() == "up" else "down"
-                        interfaces[interface_name] = {
-                            "status": status,
-                            "type": interface_name.split('/')[0] if '/' in interface_name else "Unknown"
-                        }
-        else:
-            # 通用解析方法
-            for line in output.splitlines():
-                # 匹配任何看起来像接口名的内容
-                match = re.search(r'([A-Za-z0-9\/\.-]+)\s+', line)
-                if match:
-                    interface_name = match.group(1)
-                    status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
-                    interfaces[interface_name] = {
-                        "status": status,
-                        "type": interface_name.split('/')[0] if '/' in interface_name else "Unknown"
-                    }
+        logger.debug(f"执行接口列表命令: {vendor_config['interface_cmd']}")
+        output = connection.send_command(vendor_config["interface_cmd"])
+        interfaces = parse_interface_list(vendor, output)
         
         # 2. 仅获取UP状态接口的流量信息（最多max_interfaces个）
         up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
         for interface in up_interfaces[:max_interfaces]:
             try:
-                cmd = interface_detail_cmd.format(interface=interface)
+                cmd = vendor_config["interface_detail_cmd"].format(interface=interface)
                 logger.debug(f"执行接口详情命令: {cmd}")
                 output = connection.send_command(cmd)
-                
-                # 提取输入/输出速率
-                input_match = re.search(input_pattern, output, re.DOTALL)
-                output_match = re.search(output_pattern, output, re.DOTALL)
-                
-                input_rate = int(input_match.group(1)) if input_match else 0
-                output_rate = int(output_match.group(1)) if output_match else 0
-                
-                # 将bps转换为更易读的单位
-                interfaces[interface]["input_rate"] = input_rate
-                interfaces[interface]["output_rate"] = output_rate
-                interfaces[interface]["input_rate_formatted"] = format_bandwidth(input_rate)
-                interfaces[interface]["output_rate_formatted"] = format_bandwidth(output_rate)
-                
-                # 提取更多接口信息
-                mac_match = re.search(r'MAC\s+[Aa]ddress[^\w]*:\s*([0-9a-fA-F\-:]+)', output)
-                if mac_match:
-                    interfaces[interface]["mac_address"] = mac_match.group(1)
-                
-                # 提取错误和丢包信息
-                errors_in_match = re.search(r'input\s+error[s]*\s+(\d+)', output, re.IGNORECASE)
-                errors_out_match = re.search(r'output\s+error[s]*\s+(\d+)', output, re.IGNORECASE)
-                
-                if errors_in_match:
-                    interfaces[interface]["input_errors"] = int(errors_in_match.group(1))
-                if errors_out_match:
-                    interfaces[interface]["output_errors"] = int(errors_out_match.group(1))
-                
+                interfaces[interface].update(parse_interface_detail(vendor, output))
             except Exception as e:
                 logger.error(f"获取设备 {device_id} 接口 {interface} 信息时出错: {str(e)}")
     except Exception as e:
@@ -508,7 +626,8 @@ def format_bandwidth(bits_per_sec: int) -> str:
         return f"{bits_per_sec/1000000000:.2f} Gbps"
 
 def collect_device_data(device_id: int, ip: str, username: str, password: str, 
-                       port: int = 22, vendor: str = "huawei") -> Dict:
+                       port: int = 22, vendor: str = "huawei",
+                       collect_interfaces: bool = True) -> Dict:
     """
     从设备收集综合性能数据
     
@@ -519,52 +638,40 @@ def collect_device_data(device_id: int, ip: str, username: str, password: str,
         password: 密码
         port: SSH端口，默认22
         vendor: 设备厂商，默认'huawei'
+        collect_interfaces: 是否通过CLI采集接口，接口改由SNMP采集时传False
         
     Returns:
         性能数据字典
     """
+    async_monitor = get_async_backend()
+    if async_monitor is not None:
+        return async_monitor.collect_device_data(device_id, ip, username, password, port, vendor,
+                                                 collect_interfaces)
+    
     try:
-        # 获取SSH连接
-        connection = get_connection(device_id, ip, username, password, port, vendor)
-        if not connection:
+        # 从共享会话池租用一个会话，采集完成后归还
+        from src.modules.performance.command_bundle import poll_device_metrics
+        try:
+            with lease_connection(device_id, ip, username, password, port, vendor) as connection:
+                # CPU/内存/运行时间命令一次写入通道，运行时间按慢周期采集
+                vendor = connection_status.get(device_id, {}).get("vendor", vendor)
+                metrics = poll_device_metrics(device_id, connection, vendor)
+                interfaces = get_interface_stats(device_id, connection) if collect_interfaces else {}
+        except SSHPoolError as e:
             return {
                 'cpu_usage': 0.0,
                 'memory_usage': 0.0,
                 'uptime': '连接失败',
                 'timestamp': time.time(),
-                'error': '无法建立SSH连接',
+                'error': f'无法建立SSH连接: {str(e)}',
                 'connection_status': get_device_status(device_id)
             }
-        
-        # 获取性能数据
-        cpu_usage = get_cpu_usage(device_id, connection)
-        memory_usage = get_memory_usage(device_id, connection)
-        uptime = get_uptime(device_id, connection)
-        interfaces = get_interface_stats(device_id, connection)
+        cpu_usage = metrics['cpu_usage']
+        memory_usage = metrics['memory_usage']
+        uptime = metrics['uptime']
         
         # 计算总带宽使用率 (仅作为示例，实际可能需要更复杂的计算)
-        total_input = 0
-        total_output = 0
-        for intf, data in interfaces.items():
-            if 'input_rate' in data:
-                total_input += data['input_rate']
-            if 'output_rate' in data:
-                total_output += data['output_rate']
-        
-        # 计算带宽利用率百分比 (假设链路总容量为1Gbps)
-        # 这只是一个示例，实际应用中应该根据接口实际速率计算
-        link_capacity = 1000000000  # 1Gbps in bps
-        total_interfaces = len([i for i in interfaces.values() if i.get('status') == 'up'])
-        if total_interfaces > 0:
-            bandwidth_usage = max(
-                (total_input / (link_capacity * total_interfaces)) * 100,
-                (total_output / (link_capacity * total_interfaces)) * 100
-            )
-        else:
-            bandwidth_usage = 0.0
-            
-        # 限制带宽使用率的最大值为100%
-        bandwidth_usage = min(bandwidth_usage, 100.0)
+        bandwidth_usage, total_input, total_output = summarize_bandwidth(interfaces)
         
         # 返回结果
         return {
@@ -591,9 +698,32 @@ def collect_device_data(device_id: int, ip: str, username: str, password: str,
             'connection_status': get_device_status(device_id)
         }
 
+def init_collect_backend(app):
+    """
+    按应用配置设置SSH采集后端
+
+    Args:
+        app: Flask应用实例
+    """
+    global SSH_COLLECT_BACKEND
+    SSH_COLLECT_BACKEND = (app.config.get('SSH_COLLECT_BACKEND') or 'netmiko').lower()
+
+def get_async_backend():
+    """
+    当配置为asyncssh采集后端且asyncssh可用时返回 async_ssh_monitor 模块，否则返回None
+    """
+    if SSH_COLLECT_BACKEND != 'asyncssh':
+        return None
+    
+    from src.modules.performance import async_ssh_monitor
+    if not async_ssh_monitor.ASYNCSSH_AVAILABLE:
+        logger.warning("asyncssh未安装，回退到Netmiko采集后端")
+        return None
+    return async_ssh_monitor
+
 def close_connection(device_id: int) -> bool:
     """
-    关闭到设备的SSH连接
+    关闭到设备的SSH连接（会话池中该设备的空闲会话立即关闭，使用中的会话归还时关闭）
     
     Args:
         device_id: 设备ID
@@ -601,35 +731,36 @@ def close_connection(device_id: int) -> bool:
     Returns:
         是否成功关闭连接
     """
-    if device_id in device_connections and device_connections[device_id] is not None:
-        with connection_locks.get(device_id, threading.Lock()):
-            try:
-                device_connections[device_id].disconnect()
-                device_connections[device_id] = None
-                
-                # 更新连接状态
-                if device_id in connection_status:
-                    connection_status[device_id]["status"] = "disconnected"
-                    
-                logger.info(f"已关闭设备 {device_id} 的连接")
-                return True
-            except Exception as e:
-                logger.error(f"关闭设备 {device_id} 连接时出错: {str(e)}")
-                
-                # 更新连接状态
-                if device_id in connection_status:
-                    connection_status[device_id]["status"] = "error"
-                    connection_status[device_id]["last_error"] = f"关闭连接失败: {str(e)}"
+    async_monitor = get_async_backend()
+    if async_monitor is not None and async_monitor.close_connection(device_id):
+        return True
+    
+    try:
+        get_ssh_pool().close_device(device_id)
+        
+        # 更新连接状态
+        if device_id in connection_status:
+            connection_status[device_id]["status"] = "disconnected"
+            
+        logger.info(f"已关闭设备 {device_id} 的连接")
+        return True
+    except Exception as e:
+        logger.error(f"关闭设备 {device_id} 连接时出错: {str(e)}")
+        
+        # 更新连接状态
+        if device_id in connection_status:
+            connection_status[device_id]["status"] = "error"
+            connection_status[device_id]["last_error"] = f"关闭连接失败: {str(e)}"
     return False
 
 def close_all_connections() -> None:
     """关闭所有SSH连接"""
-    for device_id in list(device_connections.keys()):
+    for device_id in list(connection_status.keys()):
         close_connection(device_id)
 
 def send_command(device_id: int, command: str, timeout: int = 30) -> Dict:
     """
-    向设备发送命令并获取结果
+    向设备发送命令并获取结果（租用会话池中该设备的会话）
     
     Args:
         device_id: 设备ID
@@ -639,7 +770,8 @@ def send_command(device_id: int, command: str, timeout: int = 30) -> Dict:
     Returns:
         包含命令输出的字典
     """
-    if device_id not in device_connections or device_connections[device_id] is None:
+    pool = get_ssh_pool()
+    if not pool.has_factory(device_id):
         return {
             'status': 'error',
             'message': '设备未连接',
@@ -647,13 +779,13 @@ def send_command(device_id: int, command: str, timeout: int = 30) -> Dict:
         }
         
     try:
-        with connection_locks.get(device_id, threading.Lock()):
-            output = device_connections[device_id].send_command(command, read_timeout=timeout)
-            return {
-                'status': 'success',
-                'message': '命令执行成功',
-                'output': output
-            }
+        with pool.lease(device_id) as connection:
+            output = connection.send_command(command, read_timeout=timeout)
+        return {
+            'status': 'success',
+            'message': '命令执行成功',
+            'output': output
+        }
     except Exception as e:
         logger.error(f"设备 {device_id} 执行命令 '{command}' 失败: {str(e)}")
         return {
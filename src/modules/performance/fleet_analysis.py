@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+全网设备性能分析模块 - 一次查询取回所有设备的指标曲线，用NumPy按列批量计算
+
+所有设备的采样按 (设备, 时间) 排序后一次性读入列式数组，再按设备展开为 设备数×点数 的矩阵（不足的位置为NaN），
+每台设备的统计值、百分位数、趋势斜率和异常评分都在矩阵上按行向量化计算，不再逐台设备查询和循环。
+时间范围较长时读取时序存储的降采样数据（见 timeseries 模块），每台设备的点数保持在几千以内。
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Iterable
+
+import numpy as np
+
+from src.core.db import db
+from src.models.device import Device
+from src.models.performance import PerformanceRecord, PerformanceRollup
+from src.modules.performance.timeseries import get_timeseries_store, RAW_RESOLUTION, RECORD_METRICS, EPOCH
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+RECENT_FRACTION = 0.1  # 计算近期突变时使用的最近一段点数比例
+MAD_SCALE = 1.4826  # 中位数绝对偏差换算为标准差的系数
+MIN_SPREAD = 1.0  # 离散度下限（百分点），避免全网数值非常接近时评分被放大
+
+
+def load_fleet_series(start: datetime, end: datetime, metrics: Iterable[str] = RECORD_METRICS,
+                      resolution: Optional[int] = None, now: Optional[datetime] = None) -> Dict:
+    """
+    一次查询读取所有设备在时间范围内的指标，返回列式数组
+
+    Args:
+        start: 开始时间
+        end: 结束时间
+        metrics: 指标名列表
+        resolution: 分辨率(秒)，0表示原始采样，默认根据时间范围自动选择
+        now: 当前时间，用于判断数据保留期
+
+    Returns:
+        {'resolution': 分辨率, 'device_ids': int数组, 'times': 秒数数组, 指标: float数组(缺失为NaN)}，
+        数组按 (设备, 时间) 排序
+    """
+    metrics = list(metrics)
+    store = get_timeseries_store()
+    if resolution is None:
+        resolution = store.choose_resolution(start, end, now=now)
+
+    if resolution == RAW_RESOLUTION:
+        rows = db.session.query(
+            PerformanceRecord.device_id, PerformanceRecord.recorded_at,
+            *[getattr(PerformanceRecord, name) for name in metrics]
+        ).filter(
+            PerformanceRecord.recorded_at >= start,
+            PerformanceRecord.recorded_at <= end
+        ).order_by(PerformanceRecord.device_id, PerformanceRecord.recorded_at).all()
+
+        device_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        times = np.fromiter(((row[1] - EPOCH).total_seconds() for row in rows), dtype=np.float64, count=len(rows))
+        columns = {
+            name: np.array([row[2 + i] for row in rows], dtype=np.float64)
+            for i, name in enumerate(metrics)
+        }
+    else:
+        # 降采样数据每个指标一行，按 (设备, 时间桶) 展开为列；最近尚未汇总的时间段从原始采样聚合后并入
+        rows = db.session.query(
+            PerformanceRollup.device_id, PerformanceRollup.bucket_start,
+            PerformanceRollup.metric, PerformanceRollup.avg_value
+        ).filter(
+            PerformanceRollup.resolution == resolution,
+            PerformanceRollup.metric.in_(metrics),
+            PerformanceRollup.bucket_start >= start,
+            PerformanceRollup.bucket_start < end
+        ).all()
+        rows += [
+            (row['device_id'], row['bucket_start'], row['metric'], row['avg_value'])
+            for row in store.aggregate_pending(start, end, resolution, metrics)
+        ]
+
+        raw_devices = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        raw_times = np.fromiter(((row[1] - EPOCH).total_seconds() for row in rows), dtype=np.float64, count=len(rows))
+        metric_index = np.fromiter((metrics.index(row[2]) for row in rows), dtype=np.int64, count=len(rows))
+        raw_values = np.array([row[3] for row in rows], dtype=np.float64)
+
+        keys = np.stack([raw_devices, raw_times.astype(np.int64)], axis=1) if len(rows) else np.empty((0, 2), np.int64)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        device_ids = unique_keys[:, 0]
+        times = unique_keys[:, 1].astype(np.float64)
+        columns = {}
+        for i, name in enumerate(metrics):
+            column = np.full(len(unique_keys), np.nan)
+            mask = metric_index == i
+            column[inverse[mask]] = raw_values[mask]
+            columns[name] = column
+
+    result = {'resolution': resolution, 'device_ids': device_ids, 'times': times}
+    result.update(columns)
+    return result
+
+
+def _to_matrix(device_ids: np.ndarray, *columns: np.ndarray):
+    """将按设备排序的列式数组展开为 设备数×最大点数 的矩阵，不足的位置为NaN"""
+    devices, starts, counts = np.unique(device_ids, return_index=True, return_counts=True)
+    width = int(counts.max()) if len(counts) else 0
+    rows = np.repeat(np.arange(len(devices)), counts)
+    cols = np.arange(len(device_ids)) - np.repeat(starts, counts)
+
+    matrices = []
+    for column in columns:
+        matrix = np.full((len(devices), width), np.nan)
+        matrix[rows, cols] = column
+        matrices.append(matrix)
+    return devices, matrices
+
+
+def _nan_slope(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """按行计算 y 对 x 的最小二乘斜率，忽略NaN，样本不足的行为NaN"""
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    n = mask.sum(axis=1)
+    xm = np.where(mask, x, 0.0)
+    ym = np.where(mask, y, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = xm.sum(axis=1) / n
+        mean_y = ym.sum(axis=1) / n
+        dx = np.where(mask, x - mean_x[:, None], 0.0)
+        dy = np.where(mask, y - mean_y[:, None], 0.0)
+        denominator = (dx * dx).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / denominator
+    slope[(n < 2) | (denominator == 0)] = np.nan
+    return slope
+
+
+def _robust_z(values: np.ndarray) -> np.ndarray:
+    """相对全网中位数的稳健Z分数（用中位数绝对偏差估计离散度）"""
+    valid = values[~np.isnan(values)]
+    if not len(valid):
+        return np.full(values.shape, np.nan)
+    median = np.median(valid)
+    spread = max(MAD_SCALE * np.median(np.abs(valid - median)), MIN_SPREAD)
+    return (values - median) / spread
+
+
+def analyze_fleet(series: Dict, metrics: Iterable[str] = RECORD_METRICS) -> Dict:
+    """
+    对列式数组按设备批量计算统计值和异常评分
+
+    每个指标的异常评分取以下两项中较大者：
+      - 设备P95相对全网设备P95分布的稳健Z分数（长期比其他设备高）
+      - 设备最近一段时间均值相对自身均值的Z分数（近期突然升高）
+    设备的综合评分为各指标评分的最大值。
+
+    Args:
+        series: load_fleet_series 的返回值
+        metrics: 指标名列表
+
+    Returns:
+        {'devices': 设备ID数组, 'score': 综合评分数组, 'top_metric': 评分最高的指标列表, 指标: {统计数组}}
+    """
+    metrics = list(metrics)
+    devices, matrices = _to_matrix(series['device_ids'], series['times'], *[series[name] for name in metrics])
+    result = {'devices': devices, 'score': np.empty(0), 'top_metric': []}
+    if not len(devices):
+        return result
+
+    times = matrices[0]
+    hours = (times - times[:, :1]) / 3600.0  # 相对每台设备第一个点的小时数
+    scores = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name, values in zip(metrics, matrices[1:]):
+            count = (~np.isnan(values)).sum(axis=1)
+            has_data = count > 0
+            safe = np.where(has_data[:, None], values, 0.0)  # 没有数据的行避免nan函数告警
+            mean = np.where(has_data, np.nanmean(safe, axis=1), np.nan)
+            std = np.where(has_data, np.nanstd(safe, axis=1), np.nan)
+            p50, p95 = np.nanpercentile(safe, [50, 95], axis=1)
+            p50 = np.where(has_data, p50, np.nan)
+            p95 = np.where(has_data, p95, np.nan)
+
+            # 最近一段时间的均值：按每台设备自己的点数取最后 RECENT_FRACTION 比例
+            position = np.cumsum(~np.isnan(values), axis=1)
+            recent_mask = position > (count * (1 - RECENT_FRACTION))[:, None]
+            recent_mean = np.nansum(np.where(recent_mask, values, 0.0), axis=1) / np.maximum(
+                (recent_mask & ~np.isnan(values)).sum(axis=1), 1)
+
+            fleet_z = _robust_z(p95)
+            self_z = (recent_mean - mean) / np.maximum(std, MIN_SPREAD)
+            score = np.fmax(np.fmax(fleet_z, self_z), 0.0)
+            score[~has_data] = np.nan
+            scores.append(score)
+
+            result[name] = {
+                'count': count,
+                'min': np.where(has_data, np.nanmin(safe, axis=1), np.nan),
+                'max': np.where(has_data, np.nanmax(safe, axis=1), np.nan),
+                'avg': mean,
+                'std': std,
+                'p50': p50,
+                'p95': p95,
+                'slope': _nan_slope(hours, values),  # 每小时变化（百分点）
+                'score': score
+            }
+
+    stacked = np.vstack(scores)
+    all_nan = np.all(np.isnan(stacked), axis=0)
+    filled = np.where(np.isnan(stacked), -np.inf, stacked)
+    result['score'] = np.where(all_nan, np.nan, filled.max(axis=0))
+    result['top_metric'] = [None if missing else metrics[i] for i, missing in zip(filled.argmax(axis=0), all_nan)]
+    return result
+
+
+def _round(value: Any, digits: int = 2) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def get_top_offenders(hours: int = 24, top: int = 20, metrics: Iterable[str] = RECORD_METRICS,
+                      now: Optional[datetime] = None) -> Dict:
+    """
+    全网性能分析，返回按异常评分排序的设备列表
+
+    Args:
+        hours: 分析的时间范围(小时)
+        top: 返回的设备数量
+        metrics: 指标名列表
+        now: 当前时间
+
+    Returns:
+        {'status': 'success', 'resolution', 'device_count', 'fleet': 全网分布, 'top_offenders': [...]}
+    """
+    metrics = list(metrics)
+    try:
+        end = now or datetime.now()
+        start = end - timedelta(hours=hours)
+        series = load_fleet_series(start, end, metrics, now=end)
+        analysis = analyze_fleet(series, metrics)
+        devices = analysis['devices']
+
+        names = dict(db.session.query(Device.id, Device.name).filter(Device.id.in_(devices.tolist())).all()) \
+            if len(devices) else {}
+
+        order = np.argsort(np.where(np.isnan(analysis['score']), -np.inf, -analysis['score']), kind='stable')
+        offenders = []
+        for index in order[:top]:
+            device_id = int(devices[index])
+            item = {
+                'device_id': device_id,
+                'device_name': names.get(device_id, f'设备{device_id}'),
+                'score': _round(analysis['score'][index]),
+                'top_metric': analysis['top_metric'][index]
+            }
+            for name in metrics:
+                stats = analysis[name]
+                item[name] = {
+                    key: _round(stats[key][index]) for key in ('avg', 'max', 'p95', 'slope', 'score')
+                }
+            offenders.append(item)
+
+        fleet = {}
+        for name in metrics:
+            p95 = analysis[name]['p95'] if len(devices) else np.empty(0)
+            valid = p95[~np.isnan(p95)]
+            fleet[name] = {
+                'p50_of_p95': _round(np.median(valid)) if len(valid) else None,
+                'max_p95': _round(valid.max()) if len(valid) else None
+            }
+
+        return {
+            'status': 'success',
+            'resolution': series['resolution'],
+            'device_count': int(len(devices)),
+            'fleet': fleet,
+            'top_offenders': offenders
+        }
+    except Exception as e:
+        logger.error(f"全网性能分析出错: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return {'status': 'error', 'message': f'全网性能分析出错: {str(e)}'}
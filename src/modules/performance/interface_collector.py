@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SNMP接口计数器采集模块 - 通过IF-MIB一次性采集设备全部接口的状态、流量和错误计数
+
+一台设备的整张接口表通过几次GETBULK请求取回，速率由相邻两次采样的计数器差值计算，
+并处理32/64位计数器回绕和设备重启导致的计数器归零。
+采集结果的格式与 enhanced_ssh_monitor.get_interface_stats 相同，并写入 Interface 表。
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.core.db import db
+from src.core.snmp_client import get_snmp_client
+from src.modules.performance.enhanced_ssh_monitor import format_bandwidth
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMUNITY = 'public'
+
+# IF-MIB 列
+IF_MIB_COLUMNS = {
+    'ifDescr': '1.3.6.1.2.1.2.2.1.2',
+    'ifOperStatus': '1.3.6.1.2.1.2.2.1.8',
+    'ifInOctets': '1.3.6.1.2.1.2.2.1.10',
+    'ifInErrors': '1.3.6.1.2.1.2.2.1.14',
+    'ifOutOctets': '1.3.6.1.2.1.2.2.1.16',
+    'ifOutErrors': '1.3.6.1.2.1.2.2.1.20',
+    'ifName': '1.3.6.1.2.1.31.1.1.1.1',
+    'ifHCInOctets': '1.3.6.1.2.1.31.1.1.1.6',
+    'ifHCOutOctets': '1.3.6.1.2.1.31.1.1.1.10',
+    'ifHighSpeed': '1.3.6.1.2.1.31.1.1.1.15',
+}
+
+# ifOperStatus 取值
+OPER_STATUS = {
+    '1': 'up',
+    '2': 'down',
+    '3': 'testing',
+    '5': 'dormant',
+    '6': 'notPresent',
+    '7': 'lowerLayerDown',
+}
+
+COUNTER32_MAX = 2 ** 32
+COUNTER64_MAX = 2 ** 64
+
+
+def counter_delta(previous: int, current: int, bits: int = 64,
+                  max_delta: Optional[int] = None) -> Optional[int]:
+    """
+    计算两次采样间的计数器增量，处理计数器回绕
+
+    Args:
+        previous: 上次计数值
+        current: 本次计数值
+        bits: 计数器位数，32或64
+        max_delta: 本采样周期内可能的最大增量（按接口速率估算），超过则认为计数器被重置
+
+    Returns:
+        计数器增量；无法判断（如设备重启导致计数器归零）时返回None
+    """
+    if current >= previous:
+        return current - previous
+
+    # 计数器减小：回绕或被重置
+    delta = current + (COUNTER64_MAX if bits == 64 else COUNTER32_MAX) - previous
+    if bits == 64:
+        # 64位计数器实际不会回绕，减小说明计数器被重置
+        return None
+    if max_delta is not None and delta > max_delta:
+        return None
+    return delta
+
+
+def _index_of(oid: str, column_oid: str) -> str:
+    """从完整OID中取出接口索引"""
+    return oid.lstrip('.')[len(column_oid) + 1:]
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class InterfaceCounterCollector:
+    """通过SNMP采集接口计数器，并保存上一次采样用于计算速率"""
+
+    def __init__(self):
+        # 上次采样 {device_id: {ifIndex: sample}}
+        self._samples: Dict[int, Dict[str, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def collect(self, device_id: int, ip: str, community: str = DEFAULT_COMMUNITY,
+                port: int = 161, version: int = 2) -> Dict:
+        """
+        采集单台设备的全部接口
+
+        Returns:
+            接口统计信息字典 {接口名: {...}}，SNMP不可用或无响应时返回空字典
+        """
+        return self.collect_many([{
+            'id': device_id, 'ip': ip, 'community': community, 'port': port, 'version': version
+        }]).get(device_id, {})
+
+    def collect_many(self, devices: List[Dict]) -> Dict[int, Dict]:
+        """
+        并发采集多台设备的全部接口
+
+        Args:
+            devices: 设备列表，每项包含 id/ip，可选 community/port/version
+
+        Returns:
+            {设备ID: 接口统计信息字典}
+        """
+        client = get_snmp_client()
+        if client is None or not devices:
+            return {}
+
+        columns = list(IF_MIB_COLUMNS.values())
+        targets = [{
+            'ip': device['ip'],
+            'community': device.get('community') or DEFAULT_COMMUNITY,
+            'port': device.get('port', 161),
+            'version': device.get('version', 2),
+            'oids': columns
+        } for device in devices]
+
+        try:
+            tables = client.walk_multi(targets)
+        except Exception as e:
+            logger.error(f"SNMP采集接口计数器出错: {str(e)}")
+            return {}
+
+        sampled_at = time.time()
+        results = {}
+        for device, table in zip(devices, tables):
+            rows = self._build_rows(table)
+            if rows:
+                results[device['id']] = self._compute_rates(device['id'], rows, sampled_at)
+        return results
+
+    def reset(self, device_id: Optional[int] = None):
+        """清除上次采样（停止监控时调用）"""
+        with self._lock:
+            if device_id is None:
+                self._samples.clear()
+            else:
+                self._samples.pop(device_id, None)
+
+    @staticmethod
+    def _build_rows(table: Dict[str, List[Tuple[str, str]]]) -> Dict[str, Dict]:
+        """将按列遍历的结果转换为按接口索引组织的行"""
+        rows: Dict[str, Dict] = {}
+        for column_name, column_oid in IF_MIB_COLUMNS.items():
+            for oid, value in table.get(column_oid, []):
+                rows.setdefault(_index_of(oid, column_oid), {})[column_name] = value
+        return rows
+
+    def _compute_rates(self, device_id: int, rows: Dict[str, Dict], sampled_at: float) -> Dict:
+        """根据本次和上次采样计算每个接口的速率"""
+        interfaces = {}
+        current_samples = {}
+
+        with self._lock:
+            previous_samples = self._samples.get(device_id, {})
+
+            for if_index, row in rows.items():
+                name = row.get('ifName') or row.get('ifDescr') or f'ifIndex{if_index}'
+
+                # 优先使用64位计数器，不支持时退回32位
+                if row.get('ifHCInOctets') is not None:
+                    in_octets, out_octets, bits = _to_int(row.get('ifHCInOctets')), _to_int(row.get('ifHCOutOctets')), 64
+                else:
+                    in_octets, out_octets, bits = _to_int(row.get('ifInOctets')), _to_int(row.get('ifOutOctets')), 32
+
+                speed = _to_int(row.get('ifHighSpeed'))  # Mbps
+                sample = {
+                    'time': sampled_at,
+                    'in_octets': in_octets,
+                    'out_octets': out_octets,
+                    'bits': bits
+                }
+                current_samples[if_index] = sample
+
+                data = {
+                    'if_index': int(if_index) if if_index.isdigit() else None,
+                    'status': OPER_STATUS.get(row.get('ifOperStatus'), 'unknown'),
+                    'type': name.split('Ethernet')[0] + 'Ethernet' if 'Ethernet' in name else 'Unknown',
+                    'speed': speed,
+                    'in_octets': in_octets,
+                    'out_octets': out_octets,
+                    'input_errors': _to_int(row.get('ifInErrors')),
+                    'output_errors': _to_int(row.get('ifOutErrors')),
+                }
+
+                previous = previous_samples.get(if_index)
+                if previous and previous['bits'] == bits and sampled_at > previous['time']:
+                    elapsed = sampled_at - previous['time']
+                    # 按接口速率估算周期内最大字节数（留出余量），用于识别计数器重置
+                    max_delta = int(speed * 1000000 / 8 * elapsed * 1.5) if speed else None
+                    in_delta = self._delta(previous['in_octets'], in_octets, bits, max_delta)
+                    out_delta = self._delta(previous['out_octets'], out_octets, bits, max_delta)
+                    if in_delta is not None:
+                        data['input_rate'] = int(in_delta * 8 / elapsed)
+                        data['input_rate_formatted'] = format_bandwidth(data['input_rate'])
+                    if out_delta is not None:
+                        data['output_rate'] = int(out_delta * 8 / elapsed)
+                        data['output_rate_formatted'] = format_bandwidth(data['output_rate'])
+
+                interfaces[name] = data
+
+            self._samples[device_id] = current_samples
+
+        return interfaces
+
+    @staticmethod
+    def _delta(previous: Optional[int], current: Optional[int], bits: int,
+               max_delta: Optional[int]) -> Optional[int]:
+        if previous is None or current is None:
+            return None
+        return counter_delta(previous, current, bits, max_delta)
+
+
+def save_interface_stats(device_id: int, interfaces: Dict) -> int:
+    """
+    将接口采集结果写入 Interface 表（按设备ID和接口名更新或新增）
+
+    Args:
+        device_id: 设备ID
+        interfaces: 接口统计信息字典
+
+    Returns:
+        写入的接口数
+    """
+    from src.core.models import Interface
+
+    if not interfaces:
+        return 0
+
+    try:
+        existing = {
+            interface.name: interface
+            for interface in Interface.query.filter_by(device_id=device_id).all()
+        }
+        now = datetime.now()
+
+        for name, data in interfaces.items():
+            interface = existing.get(name)
+            if interface is None:
+                interface = Interface(device_id=device_id, name=name[:64])
+                db.session.add(interface)
+            interface.type = data.get('type')
+            interface.status = data.get('status', 'unknown')
+            interface.if_index = data.get('if_index')
+            interface.speed = data.get('speed')
+            interface.in_octets = data.get('in_octets')
+            interface.out_octets = data.get('out_octets')
+            interface.in_errors = data.get('input_errors')
+            interface.out_errors = data.get('output_errors')
+            # 首次采样没有速率，保留上次的值
+            if 'input_rate' in data:
+                interface.input_rate = data['input_rate']
+            if 'output_rate' in data:
+                interface.output_rate = data['output_rate']
+            interface.stats_updated_at = now
+
+        db.session.commit()
+        return len(interfaces)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"保存设备 {device_id} 接口统计信息失败: {str(e)}")
+        return 0
+
+
+# 全局采集器实例
+_collector = InterfaceCounterCollector()
+
+
+def get_interface_collector() -> InterfaceCounterCollector:
+    """获取全局接口计数器采集器"""
+    return _collector
+
+
+def collect_interface_stats(device_id: int, ip: str, community: Optional[str] = None,
+                            port: int = 161, version: int = 2, save: bool = True) -> Dict:
+    """
+    通过SNMP采集设备全部接口并写入 Interface 表
+
+    Args:
+        device_id: 设备ID
+        ip: 设备IP地址
+        community: SNMP团体名，默认读取应用配置 SNMP_COMMUNITY
+        port: SNMP端口
+        version: SNMP版本，1或2
+        save: 是否写入数据库（需要应用上下文）
+
+    Returns:
+        接口统计信息字典，SNMP不可用或无响应时返回空字典
+    """
+    if community is None:
+        community = DEFAULT_COMMUNITY
+        try:
+            from flask import current_app, has_app_context
+            if has_app_context():
+                community = current_app.config.get('SNMP_COMMUNITY', community)
+        except ImportError:
+            pass
+
+    interfaces = _collector.collect(device_id, ip, community, port, version)
+    if interfaces and save:
+        save_interface_stats(device_id, interfaces)
+    return interfaces
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实时指标发布/订阅中心 - 采集任务发布每个采样，浏览器通过SSE长连接订阅
+
+采集任务（RealTimeMonitor、EnhancedMonitorService）每采集到一个样本调用 publish，
+中心保存每台设备的最新样本，并把样本放入匹配的订阅者的邮箱。订阅者可以订阅单台设备、
+多台设备（仪表板一个连接订阅页面上所有设备）或全部设备。邮箱有长度上限，
+浏览器读取过慢时丢弃最旧的样本，不会阻塞采集任务。
+
+多进程部署时采集任务只运行在某一个工作进程中，其他进程通过 relay_from 关联共享指标缓存，
+有订阅者时后台线程按间隔检查缓存中其他进程写入的样本并发布给本进程的订阅者。
+"""
+
+import os
+import time
+import json
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Iterable, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MAILBOX_SIZE = 256  # 每个订阅者最多缓存的样本数
+HEARTBEAT_INTERVAL = 15  # SSE心跳间隔(秒)，防止代理断开空闲连接
+RETRY_INTERVAL = 5000  # 浏览器断线重连间隔(毫秒)
+RELAY_INTERVAL = 1.0  # 检查共享指标缓存的间隔(秒)
+
+
+class Subscription:
+    """一个订阅者（一个SSE连接）"""
+
+    def __init__(self, device_ids: Optional[Iterable[int]] = None, mailbox_size: int = MAILBOX_SIZE):
+        """
+        初始化
+
+        Args:
+            device_ids: 订阅的设备ID，None表示订阅全部设备
+            mailbox_size: 邮箱长度上限
+        """
+        self.device_ids = set(device_ids) if device_ids is not None else None
+        self.dropped = 0
+        self._mailbox: deque = deque(maxlen=mailbox_size)
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def matches(self, device_id: int) -> bool:
+        return self.device_ids is None or device_id in self.device_ids
+
+    def put(self, device_id: int, data: Dict):
+        """放入一个样本，邮箱满时丢弃最旧的样本"""
+        with self._cond:
+            if len(self._mailbox) == self._mailbox.maxlen:
+                self.dropped += 1
+            self._mailbox.append((device_id, data))
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[Tuple[int, Dict]]:
+        """
+        取出邮箱中的全部样本，没有样本时最多等待 timeout 秒
+
+        Returns:
+            [(设备ID, 样本)]，超时或已关闭时返回空列表
+        """
+        with self._cond:
+            if not self._mailbox and not self.closed:
+                self._cond.wait(timeout)
+            items = list(self._mailbox)
+            self._mailbox.clear()
+            return items
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class MetricsHub:
+    """进程内的实时指标发布/订阅中心"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscription] = []
+        self._latest: Dict[int, Dict] = {}
+        self._stats = {'published': 0, 'delivered': 0, 'relayed': 0}
+        self._cache = None
+        self._relay_interval = RELAY_INTERVAL
+        self._relay_thread: Optional[threading.Thread] = None
+        self._relay_pid = None
+        self._relay_seen: Dict[int, int] = {}
+
+    def publish(self, device_id: int, data: Dict):
+        """
+        发布设备的一个样本
+
+        Args:
+            device_id: 设备ID
+            data: 样本数据（cpu_usage、memory_usage、bandwidth_usage、timestamp 等）
+        """
+        with self._lock:
+            self._latest[device_id] = data
+            subscribers = [sub for sub in self._subscribers if sub.matches(device_id)]
+            self._stats['published'] += 1
+            self._stats['delivered'] += len(subscribers)
+        for sub in subscribers:
+            sub.put(device_id, data)
+
+    def latest(self, device_id: int) -> Optional[Dict]:
+        """获取设备的最新样本"""
+        return self._latest.get(device_id)
+
+    def snapshot(self, device_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict]:
+        """获取多台设备的最新样本，device_ids为None时返回全部设备"""
+        with self._lock:
+            if device_ids is None:
+                return dict(self._latest)
+            return {device_id: self._latest[device_id] for device_id in device_ids if device_id in self._latest}
+
+    def forget(self, device_id: int):
+        """停止监控设备后移除其最新样本"""
+        with self._lock:
+            self._latest.pop(device_id, None)
+
+    def subscribe(self, device_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """订阅设备样本，device_ids为None时订阅全部设备"""
+        sub = Subscription(device_ids)
+        with self._lock:
+            self._subscribers.append(sub)
+        if self._cache is not None:
+            self._start_relay()
+            self.relay_once()
+        return sub
+
+    def relay_from(self, cache, interval: float = RELAY_INTERVAL):
+        """
+        关联共享指标缓存，转发其他工作进程采集的样本
+
+        Args:
+            cache: SharedMetricsCache 实例
+            interval: 检查间隔(秒)
+        """
+        self._cache = cache
+        self._relay_interval = interval
+
+    def relay_once(self) -> int:
+        """
+        检查一次共享指标缓存，发布其他进程新写入的样本
+
+        Returns:
+            发布的样本数
+        """
+        if self._cache is None:
+            return 0
+        relayed = 0
+        for device_id, count in self._cache.changes(self._relay_seen).items():
+            self._relay_seen[device_id] = count
+            data = self._cache.latest(device_id)
+            if data is not None:
+                self.publish(device_id, data)
+                relayed += 1
+        if relayed:
+            with self._lock:
+                self._stats['relayed'] += relayed
+        return relayed
+
+    def _start_relay(self):
+        """按需启动转发线程（在fork出的工作进程中首次订阅时启动）"""
+        with self._lock:
+            if self._relay_pid == os.getpid() and self._relay_thread and self._relay_thread.is_alive():
+                return
+            self._relay_pid = os.getpid()
+            self._relay_thread = threading.Thread(target=self._relay_loop, name='metrics-hub-relay', daemon=True)
+            self._relay_thread.start()
+
+    def _relay_loop(self):
+        while True:
+            time.sleep(self._relay_interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._relay_thread = None
+                    return
+            try:
+                self.relay_once()
+            except Exception as e:
+                logger.error(f"转发共享指标缓存样本出错: {str(e)}")
+
+    def unsubscribe(self, sub: Subscription):
+        """取消订阅"""
+        sub.close()
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def get_stats(self) -> Dict:
+        """获取统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+            stats['devices'] = len(self._latest)
+            stats['dropped'] = sum(sub.dropped for sub in self._subscribers)
+            return stats
+
+    def stream(self, device_ids: Optional[Iterable[int]] = None, include_interfaces: bool = False,
+               heartbeat: float = HEARTBEAT_INTERVAL):
+        """
+        SSE事件流生成器：先发送订阅设备的最新样本，再持续推送新样本
+
+        Args:
+            device_ids: 订阅的设备ID，None表示全部设备
+            include_interfaces: 是否包含接口明细（仪表板不需要，省去大部分数据量）
+            heartbeat: 心跳间隔(秒)
+
+        Yields:
+            SSE格式的文本
+        """
+        device_ids = set(device_ids) if device_ids is not None else None
+        sub = self.subscribe(device_ids)
+        try:
+            yield f"retry: {RETRY_INTERVAL}\n\n"
+            for device_id, data in self.snapshot(device_ids).items():
+                yield _format_event(device_id, data, include_interfaces)
+            while not sub.closed:
+                items = sub.get(timeout=heartbeat)
+                if not items:
+                    yield f": keepalive {int(time.time())}\n\n"
+                    continue
+                for device_id, data in items:
+                    yield _format_event(device_id, data, include_interfaces)
+        finally:
+            self.unsubscribe(sub)
+
+
+def _format_event(device_id: int, data: Dict, include_interfaces: bool) -> str:
+    """格式化一条SSE事件"""
+    payload = {key: value for key, value in data.items() if include_interfaces or key != 'interfaces'}
+    payload['device_id'] = device_id
+    return f"event: metrics\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+# 全局发布/订阅中心实例
+_metrics_hub = MetricsHub()
+
+
+def get_metrics_hub() -> MetricsHub:
+    """获取全局实时指标发布/订阅中心"""
+    return _metrics_hub
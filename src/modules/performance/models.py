@@ -48,7 +48,11 @@ def convert_to_performance_record(performance_data: PerformanceData) -> Performa
 class Alert(db.Model):
     """设备告警记录模型"""
     __tablename__ = 'alerts'
-    __table_args__ = {'extend_existing': True}  # 确保可以扩展现有表
+    __table_args__ = (
+        # 活跃告警查询：按确认状态和设备过滤，按创建时间倒序
+        db.Index('ix_alerts_ack_device_created', 'acknowledged', 'device_id', 'created_at'),
+        {'extend_existing': True}  # 确保可以扩展现有表
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     device_id = db.Column(db.Integer, db.ForeignKey('devices.id'), nullable=False)
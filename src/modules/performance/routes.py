@@ -6,7 +6,7 @@
 """
 
 import logging
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from sqlalchemy import desc
 from datetime import datetime, timedelta
@@ -17,6 +17,14 @@ import time
 from src.db import db
 from src.core.models import Device, PerformanceRecord, Threshold
 from src.modules.performance.services import PerformanceAnalyzer, PerformanceCollector, RealTimeMonitor, collect_performance_data, get_historical_data, get_all_devices_status
+from src.modules.performance.scheduler import get_poll_scheduler
+from src.modules.performance.timeseries import get_timeseries_store, RECORD_METRICS
+from src.modules.performance.write_buffer import get_write_buffer
+from src.modules.performance.fleet_analysis import get_top_offenders
+from src.modules.performance.metrics_hub import get_metrics_hub
+from src.modules.performance.shared_cache import get_shared_cache
+from src.core.ssh_pool import get_ssh_pool
+from src.core.job_queue import get_job_queue
 
 # 设置日志记录器
 logger = logging.getLogger(__name__)
@@ -53,15 +61,11 @@ def get_performance_data():
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=time_range)
     
-    # 查询指定时间范围内的性能记录
-    records = PerformanceRecord.query.filter(
-        PerformanceRecord.device_id == device_id,
-        PerformanceRecord.recorded_at >= start_time,
-        PerformanceRecord.recorded_at <= end_time
-    ).order_by(PerformanceRecord.recorded_at).all()
+    # 从时序存储查询，按时间范围自动选择原始采样或降采样分辨率
+    series = get_timeseries_store().query(device_id, RECORD_METRICS, start_time, end_time)
     
     # 如果没有记录，生成一些模拟数据
-    if not records:
+    if not series['timestamps']:
         # 生成更真实的模拟数据
         timestamps = []
         
@@ -108,19 +112,22 @@ def get_performance_data():
             'message': '使用模拟数据（无实际记录）'
         })
     
-    # 处理实际记录数据
-    timestamps = [record.recorded_at.strftime('%Y-%m-%d %H:%M') for record in records]
-    cpu_usage = [record.cpu_usage for record in records]
-    memory_usage = [record.memory_usage for record in records]
-    bandwidth_usage = [record.bandwidth_usage for record in records]
+    # 处理实际记录数据（曲线使用平均值，降采样时附带每个时间桶的最小/最大值）
+    timestamps = [ts.strftime('%Y-%m-%d %H:%M') for ts in series['timestamps']]
+    values = series['series']
     
     return jsonify({
         'status': 'success',
         'data': {
             'timestamps': timestamps,
-            'cpu_usage': cpu_usage,
-            'memory_usage': memory_usage,
-            'bandwidth_usage': bandwidth_usage
+            'cpu_usage': values['cpu_usage']['avg'],
+            'memory_usage': values['memory_usage']['avg'],
+            'bandwidth_usage': values['bandwidth_usage']['avg'],
+            'resolution': series['resolution'],
+            'ranges': {
+                metric: {'min': values[metric]['min'], 'max': values[metric]['max']}
+                for metric in RECORD_METRICS
+            }
         }
     })
 
@@ -181,14 +188,32 @@ def realtime_device_monitor(device_id):
             
         logger.info(f"传递性能数据到模板: {performance_data}")
         
-        # 获取历史趋势数据（最近5分钟）
+        # 获取历史趋势数据（最近5分钟），优先使用共享指标缓存中的样本
         history_data = []
         try:
-            # 尝试获取历史数据记录
+            since = time.time() - 300
+            for sample in get_shared_cache().history(device_id):
+                if sample['timestamp'] >= since:
+                    history_data.append({
+                        'timestamp': datetime.fromtimestamp(sample['timestamp']).strftime('%H:%M:%S'),
+                        'cpu_usage': sample['cpu_usage'],
+                        'memory_usage': sample['memory_usage'],
+                        'bandwidth_usage': sample['bandwidth_usage'] or 0
+                    })
+        except Exception as e:
+            logger.error(f"读取共享指标缓存出错: {str(e)}")
+        
+        try:
+            # 缓存中没有样本时查询历史数据记录
             end_time = datetime.now()
             start_time = end_time - timedelta(minutes=5)
             
-            history_records = PerformanceRecord.query.filter(
+            history_records = [] if history_data else PerformanceRecord.query.with_entities(
+                PerformanceRecord.recorded_at,
+                PerformanceRecord.cpu_usage,
+                PerformanceRecord.memory_usage,
+                PerformanceRecord.bandwidth_usage
+            ).filter(
                 PerformanceRecord.device_id == device_id,
                 PerformanceRecord.recorded_at >= start_time,
                 PerformanceRecord.recorded_at <= end_time
@@ -312,6 +337,47 @@ def get_realtime_data(device_id):
 def get_realtime_history(device_id):
     return jsonify(RealTimeMonitor.get_history_data(device_id))
 
+# 实时数据推送（Server-Sent Events）
+# 参数: device_id 可重复，group 为设备类型ID（可重复），都不传时订阅全部设备；interfaces=1 时包含接口明细
+@performance_bp.route('/stream')
+@login_required
+def stream_realtime_data():
+    """SSE事件流，连接保持期间一直占用一个工作线程
+
+    部署时假定gunicorn使用线程工作模式（--worker-class gthread --threads N，见Dockerfile），
+    每个打开的连接占用一个线程；默认的sync模式下每个连接会占满一个worker进程，几个页面就会阻塞整个应用。
+    """
+    device_ids = set(request.args.getlist('device_id', type=int))
+    groups = request.args.getlist('group', type=int)
+    if groups:
+        # 订阅时一次解析设备组，推送过程中不再访问数据库
+        device_ids.update(row[0] for row in db.session.query(Device.id).filter(Device.type_id.in_(groups)).all())
+    elif not device_ids:
+        device_ids = None
+    include_interfaces = request.args.get('interfaces', 0, type=int) == 1
+    db.session.remove()  # 长连接期间不占用数据库连接
+    
+    return Response(
+        stream_with_context(get_metrics_hub().stream(device_ids, include_interfaces)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# 获取轮询调度器状态（队列深度、轮询延迟），用于评估线程池大小
+@performance_bp.route('/scheduler/stats')
+@login_required
+def get_scheduler_stats():
+    scheduler = get_poll_scheduler()
+    return jsonify({
+        'status': 'success',
+        'data': scheduler.get_stats(),
+        'write_buffer': get_write_buffer().get_stats(),
+        'metrics_hub': get_metrics_hub().get_stats(),
+        'shared_cache': get_shared_cache().get_stats(),
+        'ssh_pool': get_ssh_pool().get_stats(),
+        'jobs': scheduler.get_jobs() if request.args.get('jobs', type=int) else []
+    })
+
 # 性能分析页面
 @performance_bp.route('/analyze')
 @login_required
@@ -334,6 +400,17 @@ def analyze():
         analysis_result=analysis_result
     )
 
+# 全网性能分析：按异常评分排序的设备列表（性能异常设备列表）
+@performance_bp.route('/fleet/analysis')
+@login_required
+def fleet_analysis():
+    hours = request.args.get('hours', 24, type=int)
+    top = request.args.get('top', 20, type=int)
+    result = get_top_offenders(hours=max(hours, 1), top=max(top, 1))
+    if result['status'] != 'success':
+        return jsonify(result), 500
+    return jsonify({'status': 'success', 'data': result})
+
 # 阈值管理页面
 @performance_bp.route('/thresholds')
 @login_required
@@ -468,18 +545,23 @@ def delete_threshold():
     
     return redirect(url_for('performance.thresholds'))
 
-# 手动触发性能数据采集
+def _collect_job(job, device_id):
+    """后台任务：采集单台设备的性能数据"""
+    result = PerformanceCollector.collect_device_performance(device_id)
+    if result.get('status', 'success') != 'success':
+        raise RuntimeError(result.get('message', '未知错误'))
+    return result
+
+# 手动触发性能数据采集（后台任务，结果通过 /api/jobs/<任务ID> 查询）
 @performance_bp.route('/collect/<int:device_id>', methods=['POST'])
 @login_required
 def collect_device_data(device_id):
     try:
-        # 调用性能数据采集服务
-        result = PerformanceCollector.collect_device_performance(device_id)
-        
-        if result['status'] == 'success':
-            flash('性能数据采集成功', 'success')
-        else:
-            flash(f'性能数据采集失败: {result.get("message", "未知错误")}', 'danger')
+        job_id = get_job_queue().submit(
+            'performance_collect', _collect_job, device_id,
+            description=f'采集设备 {device_id} 性能数据', owner=getattr(current_user, 'username', None)
+        )
+        flash(f'已提交性能数据采集任务（任务ID: {job_id}），采集完成后刷新页面查看', 'info')
             
         # 重定向到性能监控页面
         return redirect(url_for('performance.index'))
@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能监控轮询调度器 - 用固定大小的工作线程池统一调度所有设备的周期性轮询任务
+
+所有待执行的轮询任务按"下次到期时间"放入一个优先队列（小顶堆），
+工作线程从堆顶取出已到期的任务执行，执行完成后按任务自身的间隔（加随机抖动）重新入堆。
+这样监控几百台设备也只需要固定数量的线程，并且可以通过队列深度和轮询延迟判断线程池是否足够。
+"""
+
+import os
+import time
+import heapq
+import random
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Callable
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认工作线程数，可通过环境变量 MONITOR_POLL_WORKERS 调整
+DEFAULT_POLL_WORKERS = int(os.environ.get('MONITOR_POLL_WORKERS') or 8)
+
+
+class PollJob:
+    """周期性轮询任务"""
+
+    def __init__(self, job_id: str, func: Callable, interval: float, jitter: float = 0.1,
+                 args: tuple = (), kwargs: Optional[Dict] = None, app: Any = None):
+        """
+        初始化轮询任务
+
+        Args:
+            job_id: 任务唯一标识，如 "realtime:1"
+            func: 每次轮询执行的函数
+            interval: 轮询间隔(秒)
+            jitter: 抖动比例，每次调度在 interval 基础上随机偏移 ±interval*jitter
+            args: 传给 func 的位置参数
+            kwargs: 传给 func 的关键字参数
+            app: Flask应用实例，提供时在应用上下文中执行 func
+        """
+        self.job_id = job_id
+        self.func = func
+        self.interval = float(interval)
+        self.jitter = float(jitter)
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.app = app
+
+        self.next_due = 0.0  # 下次到期时间
+        self.running = False  # 是否正在执行
+        self.cancelled = False  # 是否已被移除
+        self.defer_seconds = None  # 本次执行后的临时延迟（用于连接失败退避）
+
+        # 运行统计
+        self.run_count = 0
+        self.failure_count = 0
+        self.last_run_at = None
+        self.last_duration = 0.0
+        self.last_lag = 0.0
+        self.last_error = None
+
+    def next_delay(self) -> float:
+        """计算下一次调度的间隔（含抖动）"""
+        if self.jitter <= 0:
+            return self.interval
+        offset = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-offset, offset))
+
+    def to_dict(self) -> Dict:
+        """转换为字典"""
+        return {
+            'job_id': self.job_id,
+            'interval': self.interval,
+            'jitter': self.jitter,
+            'next_due_in': round(max(0.0, self.next_due - time.time()), 3),
+            'running': self.running,
+            'run_count': self.run_count,
+            'failure_count': self.failure_count,
+            'last_run_at': self.last_run_at,
+            'last_duration': round(self.last_duration, 3),
+            'last_lag': round(self.last_lag, 3),
+            'last_error': self.last_error
+        }
+
+
+class PollScheduler:
+    """基于优先队列和固定工作线程池的轮询调度器"""
+
+    def __init__(self, max_workers: int = DEFAULT_POLL_WORKERS, name: str = 'poll'):
+        """
+        初始化调度器
+
+        Args:
+            max_workers: 工作线程数量
+            name: 调度器名称，用于线程命名
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+
+        self._heap: List[tuple] = []  # (next_due, seq, job)
+        self._jobs: Dict[str, PollJob] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._running = False
+        self._busy_workers = 0
+
+        # 轮询延迟统计（任务到期到实际开始执行的时间差）
+        self._lag_ewma = 0.0
+        self._lag_max = 0.0
+        self._total_runs = 0
+        self._total_failures = 0
+
+    def start(self):
+        """启动工作线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            for i in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True
+                )
+                self._workers.append(worker)
+                worker.start()
+        logger.info(f"轮询调度器 {self.name} 已启动，工作线程数: {self.max_workers}")
+
+    def stop(self, wait: bool = True, timeout: float = 5.0):
+        """停止调度器"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout=timeout)
+        self._workers = []
+        logger.info(f"轮询调度器 {self.name} 已停止")
+
+    def is_running(self) -> bool:
+        """调度器是否在运行"""
+        return self._running
+
+    def add_job(self, job_id: str, func: Callable, interval: float, jitter: float = 0.1,
+                args: tuple = (), kwargs: Optional[Dict] = None, app: Any = None,
+                run_immediately: bool = True) -> PollJob:
+        """
+        添加（或替换）一个周期性轮询任务
+
+        Args:
+            job_id: 任务唯一标识
+            func: 轮询函数
+            interval: 轮询间隔(秒)
+            jitter: 抖动比例
+            args: 位置参数
+            kwargs: 关键字参数
+            app: Flask应用实例
+            run_immediately: 是否立即执行第一次（仍会加入少量抖动以错开同时加入的任务）
+
+        Returns:
+            轮询任务对象
+        """
+        job = PollJob(job_id, func, interval, jitter, args, kwargs, app)
+        now = time.time()
+        if run_immediately:
+            job.next_due = now + random.uniform(0, min(1.0, job.interval * job.jitter))
+        else:
+            job.next_due = now + job.next_delay()
+
+        with self._cond:
+            old_job = self._jobs.get(job_id)
+            if old_job:
+                old_job.cancelled = True
+            self._jobs[job_id] = job
+            self._push(job)
+            self._cond.notify()
+
+        logger.debug(f"已添加轮询任务 {job_id}，间隔 {interval} 秒")
+        return job
+
+    def remove_job(self, job_id: str) -> bool:
+        """
+        移除轮询任务（正在执行的任务会在本次执行结束后停止）
+
+        Args:
+            job_id: 任务唯一标识
+
+        Returns:
+            任务是否存在
+        """
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if not job:
+                return False
+            job.cancelled = True
+            self._cond.notify_all()
+        logger.debug(f"已移除轮询任务 {job_id}")
+        return True
+
+    def has_job(self, job_id: str) -> bool:
+        """任务是否存在"""
+        return job_id in self._jobs
+
+    def get_job(self, job_id: str) -> Optional[PollJob]:
+        """获取任务"""
+        return self._jobs.get(job_id)
+
+    def defer(self, job_id: str, seconds: float):
+        """
+        推迟任务的下一次执行，用于连接失败后的退避
+
+        在任务函数内部调用时，作用于本次执行结束后的下一次调度
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            if job.running:
+                job.defer_seconds = seconds
+            else:
+                job.cancelled = True
+                new_job = self._clone(job)
+                new_job.next_due = time.time() + seconds
+                self._jobs[job_id] = new_job
+                self._push(new_job)
+                self._cond.notify()
+
+    def get_stats(self) -> Dict:
+        """
+        获取调度器统计信息
+
+        Returns:
+            包含队列深度、轮询延迟、工作线程占用等信息的字典
+        """
+        now = time.time()
+        with self._cond:
+            live_entries = [entry for entry in self._heap if not entry[2].cancelled]
+            queue_depth = sum(1 for entry in live_entries if entry[0] <= now)
+            oldest_due = min((entry[0] for entry in live_entries), default=None)
+            current_lag = max(0.0, now - oldest_due) if oldest_due is not None and oldest_due <= now else 0.0
+            return {
+                'name': self.name,
+                'running': self._running,
+                'workers': self.max_workers,
+                'busy_workers': self._busy_workers,
+                'scheduled_jobs': len(self._jobs),
+                'queue_depth': queue_depth,
+                'current_lag': round(current_lag, 3),
+                'avg_lag': round(self._lag_ewma, 3),
+                'max_lag': round(self._lag_max, 3),
+                'total_runs': self._total_runs,
+                'total_failures': self._total_failures
+            }
+
+    def get_jobs(self) -> List[Dict]:
+        """获取所有任务的状态"""
+        with self._cond:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def _push(self, job: PollJob):
+        """将任务放入优先队列（调用方需持有锁）"""
+        self._seq += 1
+        heapq.heappush(self._heap, (job.next_due, self._seq, job))
+
+    @staticmethod
+    def _clone(job: PollJob) -> PollJob:
+        """复制任务（保留统计信息），用于重新调度被取消的堆条目"""
+        new_job = PollJob(job.job_id, job.func, job.interval, job.jitter, job.args, job.kwargs, job.app)
+        new_job.run_count = job.run_count
+        new_job.failure_count = job.failure_count
+        new_job.last_run_at = job.last_run_at
+        new_job.last_duration = job.last_duration
+        new_job.last_lag = job.last_lag
+        new_job.last_error = job.last_error
+        return new_job
+
+    def _next_ready_job(self) -> Optional[PollJob]:
+        """等待并取出下一个到期任务（调用方需持有锁），调度器停止时返回None"""
+        while self._running:
+            # 丢弃已取消的任务
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                self._cond.wait()
+                continue
+
+            due = self._heap[0][0]
+            now = time.time()
+            if due > now:
+                self._cond.wait(timeout=due - now)
+                continue
+
+            _, _, job = heapq.heappop(self._heap)
+            return job
+        return None
+
+    def _worker_loop(self):
+        """工作线程主循环"""
+        while True:
+            with self._cond:
+                job = self._next_ready_job()
+                if job is None:
+                    return
+                job.running = True
+                self._busy_workers += 1
+
+            started_at = time.time()
+            lag = max(0.0, started_at - job.next_due)
+            error = None
+
+            try:
+                if job.app is not None:
+                    with job.app.app_context():
+                        job.func(*job.args, **job.kwargs)
+                else:
+                    job.func(*job.args, **job.kwargs)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"轮询任务 {job.job_id} 执行出错: {error}")
+
+            finished_at = time.time()
+
+            with self._cond:
+                self._busy_workers -= 1
+                job.running = False
+                job.run_count += 1
+                job.last_run_at = started_at
+                job.last_duration = finished_at - started_at
+                job.last_lag = lag
+                job.last_error = error
+
+                self._total_runs += 1
+                self._lag_ewma = lag if self._total_runs == 1 else self._lag_ewma * 0.9 + lag * 0.1
+                self._lag_max = max(self._lag_max, lag)
+                if error:
+                    job.failure_count += 1
+                    self._total_failures += 1
+
+                if not job.cancelled and self._jobs.get(job.job_id) is job:
+                    deferred = job.defer_seconds
+                    job.defer_seconds = None
+                    if deferred is not None:
+                        job.next_due = finished_at + deferred
+                    else:
+                        # 以上次到期时间为基准，避免执行耗时造成周期漂移；已经落后时从当前时间重新计算
+                        next_due = job.next_due + job.next_delay()
+                        if next_due <= finished_at:
+                            next_due = finished_at + job.next_delay()
+                        job.next_due = next_due
+                    self._push(job)
+                    self._cond.notify()
+
+
+# 全局调度器实例
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_poll_scheduler() -> PollScheduler:
+    """
+    获取全局轮询调度器（首次调用时创建并启动）
+
+    工作线程数优先读取应用配置 MONITOR_POLL_WORKERS
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                max_workers = DEFAULT_POLL_WORKERS
+                try:
+                    from flask import current_app, has_app_context
+                    if has_app_context():
+                        max_workers = current_app.config.get('MONITOR_POLL_WORKERS', max_workers)
+                except ImportError:
+                    pass
+                scheduler = PollScheduler(max_workers=max_workers, name='monitor-poll')
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
+
+
+def shutdown_poll_scheduler():
+    """停止全局轮询调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
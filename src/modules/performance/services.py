@@ -6,14 +6,14 @@
 """
 
 import time
-import threading
-import queue
 import random
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import re
+import math
 
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
 from src.core.db import db
@@ -21,6 +21,16 @@ from src.modules.device.models import Device
 from src.models import PerformanceRecord
 from src.modules.performance.models import PerformanceData, Alert, PerformanceDataDTO
 from src.modules.performance.threshold import ThresholdManager
+from src.modules.performance.scheduler import get_poll_scheduler
+from src.modules.performance.enhanced_ssh_monitor import (
+    VENDOR_MAP, get_vendor_config, parse_cpu_usage, parse_memory_usage, parse_uptime
+)
+from src.modules.performance.command_bundle import poll_device_metrics, poll_planner
+from src.modules.performance.timeseries import get_timeseries_store, RECORD_METRICS
+from src.modules.performance.metrics_hub import get_metrics_hub
+from src.modules.performance.shared_cache import get_shared_cache
+from src.modules.performance.ring_buffer import RingBuffer, history_depth
+from src.core.ssh_pool import get_ssh_pool, SSHPoolError
 
 # 尝试导入netmiko，用于设备连接
 try:
@@ -35,14 +45,18 @@ except ImportError:
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 轮询间隔（秒）
+MONITOR_POLL_INTERVAL = 5  # CPU/内存采集间隔
+CONNECT_RETRY_DELAY = 30  # 连接失败后的重试间隔
+
 # 全局变量
-monitor_threads = {}  # 存储设备监控线程
-keepalive_threads = {} # 存储保活线程
-device_performance_data = {}  # 存储设备性能数据队列
+device_performance_data = {}  # 存储设备最近的性能样本 {device_id: RingBuffer}
 latest_device_data = {}  # 存储设备最新数据
-connection_locks = {}  # 设备连接锁
-device_connections = {}  # 设备连接对象
-last_connection_times = {}  # 上次连接时间
+device_vendors = {}  # 设备厂商缓存 {device_id: vendor}，避免每次采集查询数据库
+
+def _realtime_job_id(device_id: int) -> str:
+    """实时监控轮询任务ID"""
+    return f"realtime:{device_id}"
 
 class RealTimeMonitor:
     """设备实时监控服务"""
@@ -68,20 +82,16 @@ class RealTimeMonitor:
                 return {'status': 'error', 'message': f'设备不存在: {device_id}'}
             
             # 如果已经在监控中，则返回成功
-            if device_id in monitor_threads and monitor_threads[device_id].is_alive():
+            scheduler = get_poll_scheduler()
+            if scheduler.has_job(_realtime_job_id(device_id)):
                 return {'status': 'success', 'message': f'设备 {device.name} 已在监控中'}
                 
-            # 创建数据队列
+            # 创建最近样本的环形缓冲
             if device_id not in device_performance_data:
-                device_performance_data[device_id] = queue.Queue(maxsize=100)
-                
-            # 创建连接锁
-            if device_id not in connection_locks:
-                connection_locks[device_id] = threading.Lock()
+                device_performance_data[device_id] = RingBuffer(depth=history_depth())
                 
-            # 初始化连接时间
-            if device_id not in last_connection_times:
-                last_connection_times[device_id] = 0
+            # 缓存设备厂商
+            device_vendors[device_id] = RealTimeMonitor._resolve_vendor(device)
                 
             # 初始化最新数据
             latest_device_data[device_id] = {
@@ -93,23 +103,15 @@ class RealTimeMonitor:
                 "interfaces": {}
             }
             
-            # 启动监控线程
-            monitor_thread = threading.Thread(
-                target=RealTimeMonitor._monitor_device_performance,
-                args=(device_id,),
-                daemon=True
+            # 将轮询任务交给共享调度器，不再为每台设备单独创建线程；会话保活由SSH会话池的健康探测负责
+            app = current_app._get_current_object()
+            scheduler.add_job(
+                _realtime_job_id(device_id),
+                RealTimeMonitor._monitor_device_performance,
+                interval=MONITOR_POLL_INTERVAL,
+                args=(device_id, device.name),
+                app=app
             )
-            monitor_threads[device_id] = monitor_thread
-            monitor_thread.start()
-            
-            # 启动保活线程
-            keepalive_thread = threading.Thread(
-                target=RealTimeMonitor._keepalive_thread,
-                args=(device_id,),
-                daemon=True
-            )
-            keepalive_threads[device_id] = keepalive_thread
-            keepalive_thread.start()
             
             logger.info(f"已启动对设备 {device.name} 的实时监控")
             return {'status': 'success', 'message': f'已启动对设备 {device.name} 的实时监控'}
@@ -136,16 +138,12 @@ class RealTimeMonitor:
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: {device_id}'}
                 
-            # 清理连接
-            if device_id in device_connections:
-                with connection_locks.get(device_id, threading.Lock()):
-                    if device_connections.get(device_id):
-                        try:
-                            device_connections[device_id].disconnect()
-                        except:
-                            pass
-                        finally:
-                            device_connections[device_id] = None
+            # 从调度器移除轮询任务
+            scheduler = get_poll_scheduler()
+            scheduler.remove_job(_realtime_job_id(device_id))
+            
+            # 关闭会话池中该设备的空闲会话
+            get_ssh_pool().close_device(device_id)
             
             # 移除数据队列
             if device_id in device_performance_data:
@@ -154,8 +152,12 @@ class RealTimeMonitor:
             # 移除最新数据
             if device_id in latest_device_data:
                 del latest_device_data[device_id]
-                
-            # 线程会自行结束 (daemon=True)
+            get_shared_cache().forget(device_id)
+            get_metrics_hub().forget(device_id)
+            
+            # 清除厂商和慢周期指标缓存
+            device_vendors.pop(device_id, None)
+            poll_planner.reset(device_id)
                 
             logger.info(f"已停止对设备 {device.name} 的实时监控")
             return {'status': 'success', 'message': f'已停止对设备 {device.name} 的实时监控'}
@@ -176,19 +178,20 @@ class RealTimeMonitor:
             最新性能数据
         """
         try:
-            # 检查设备是否存在
-            device = Device.query.get(device_id)
-            if not device:
-                return {'status': 'error', 'message': f'设备不存在: {device_id}'}
+            # 优先读取共享指标缓存（任意工作进程采集的最新数据），不查询数据库
+            data = get_shared_cache().latest(device_id) or latest_device_data.get(device_id)
+            if data is None:
+                # 检查设备是否存在
+                device = Device.query.get(device_id)
+                if not device:
+                    return {'status': 'error', 'message': f'设备不存在: {device_id}'}
                 
-            # 检查是否已启动监控
-            if device_id not in latest_device_data:
                 # 如果未启动监控，自动创建模拟数据
                 cpu_usage = round(random.uniform(20.0, 80.0), 1)
                 memory_usage = round(random.uniform(30.0, 70.0), 1)
                 bandwidth_usage = round(random.uniform(10.0, 60.0), 1)
                 
-                latest_device_data[device_id] = {
+                latest_device_data[device_id] = data = {
                     "cpu_usage": cpu_usage,
                     "memory_usage": memory_usage,
                     "bandwidth_usage": bandwidth_usage,
@@ -201,8 +204,7 @@ class RealTimeMonitor:
                 RealTimeMonitor.start_device_monitoring(device_id)
             
             # 检查数据是否为空或无效（CPU和内存都为0，可能是采集失败）
-            data = latest_device_data[device_id]
-            if data.get('cpu_usage', 0) == 0 and data.get('memory_usage', 0) == 0:
+            if not data.get('cpu_usage') and not data.get('memory_usage'):
                 # 生成模拟数据替换
                 cpu_usage = round(random.uniform(20.0, 80.0), 1)
                 memory_usage = round(random.uniform(30.0, 70.0), 1)
@@ -250,6 +252,21 @@ class RealTimeMonitor:
             历史性能数据
         """
         try:
+            # 共享指标缓存保存了最近的样本，任意工作进程都能读取
+            cache = get_shared_cache()
+            history_data = cache.history(device_id)
+            if history_data:
+                latest = cache.latest(device_id) or {}
+                device_name = latest.get('device_name')
+                if device_name is None:
+                    device = Device.query.get(device_id)
+                    device_name = device.name if device else f"设备{device_id}"
+                return {
+                    'status': 'success',
+                    'data': history_data,
+                    'device_name': device_name
+                }
+            
             device = Device.query.get(device_id)
             if not device:
                 return {'status': 'error', 'message': f'设备不存在: {device_id}'}
@@ -257,9 +274,8 @@ class RealTimeMonitor:
             if device_id not in device_performance_data:
                 return {'status': 'error', 'message': f'设备 {device.name} 未在监控中'}
                 
-            # 从队列中提取数据
-            queue_obj = device_performance_data[device_id]
-            history_data = list(queue_obj.queue)
+            # 复制环形缓冲中的样本（不阻塞采集任务）
+            history_data = device_performance_data[device_id].to_dicts()
             
             return {
                 'status': 'success',
@@ -274,38 +290,33 @@ class RealTimeMonitor:
             return {'status': 'error', 'message': f'获取历史数据出错: {str(e)}'}
             
     @staticmethod
-    def get_device_connection(device_id: int):
-        """获取到设备的连接"""
-        from flask import current_app
+    def _resolve_vendor(device: Device) -> str:
+        """根据设备厂商、型号和类型名称判断VENDOR_MAP中的厂商"""
+        type_name = device.type.name if getattr(device, 'type', None) else ''
+        text = ' '.join(filter(None, [device.manufacturer, device.model, type_name])).lower()
+        for vendor in VENDOR_MAP:
+            if vendor in text:
+                return vendor
+        return "huawei"
+    
+    @staticmethod
+    def _get_vendor(device_id: int) -> str:
+        """获取设备厂商（首次查询数据库后缓存）"""
+        if device_id not in device_vendors:
+            device = Device.query.get(device_id)
+            device_vendors[device_id] = RealTimeMonitor._resolve_vendor(device) if device else "huawei"
+        return device_vendors[device_id]
+    
+    @staticmethod
+    def _open_connection(device_id: int):
+        """建立到设备的新连接（由SSH会话池在需要新会话时调用）"""
+        from flask import current_app, has_app_context
         from src.app import create_app
         
-        # 创建应用实例并推送上下文，确保在线程中可以访问数据库
-        app = create_app()
+        # 调度器任务已在应用上下文中执行，仅在没有上下文时创建应用实例
+        app = current_app._get_current_object() if has_app_context() else create_app()
         
         with app.app_context():
-            # 检查现有连接
-            if device_id in device_connections and device_connections[device_id] is not None:
-                # 检查现有连接是否仍然有效
-                try:
-                    # 尝试发送简单命令验证连接
-                    device_connections[device_id].send_command(" ")
-                    logger.debug(f"设备 {device_id} 的连接仍然有效")
-                    return device_connections[device_id]
-                except Exception as e:
-                    logger.warning(f"设备 {device_id} 的现有连接已失效: {str(e)}，将重新连接")
-                    # 清理无效连接
-                    try:
-                        device_connections[device_id].disconnect()
-                    except Exception as disconnect_err:
-                        logger.warning(f"断开失效连接时出错: {str(disconnect_err)}")
-                    device_connections[device_id] = None
-            
-            # 确保连接不会过于频繁
-            current_time = time.time()
-            if device_id in last_connection_times and current_time - last_connection_times[device_id] < 10:
-                logger.warning(f"设备 {device_id} 的连接请求过于频繁，将延迟10秒")
-                time.sleep(10)
-            
             try:
                 # 获取设备信息
                 device = Device.query.get(device_id)
@@ -321,9 +332,12 @@ class RealTimeMonitor:
                 
                 # 不再尝试记录设备对象的属性，避免引用不存在的属性
                 
+                vendor = RealTimeMonitor._resolve_vendor(device)
+                device_vendors[device_id] = vendor
+                
                 # 创建设备连接参数，参考huawei_monitor_app.py
                 device_params = {
-                    'device_type': 'huawei',  # 硬编码使用华为设备类型
+                    'device_type': VENDOR_MAP[vendor]["device_type"],
                     'ip': device.ip_address,
                     'username': device.username,
                     'password': device.password,
@@ -354,16 +368,11 @@ class RealTimeMonitor:
                     
                     # 设置无分页，参考huawei_monitor_app.py
                     try:
-                        # 针对华为设备的无分页命令
-                        conn.send_command("screen-length 0 temporary")
+                        conn.send_command(VENDOR_MAP[vendor]["disable_paging_cmd"])
                         logger.debug("已设置终端无分页")
                     except Exception as e:
                         logger.warning(f"设置终端无分页失败: {str(e)}")
                     
-                    # 保存连接和时间
-                    device_connections[device_id] = conn
-                    last_connection_times[device_id] = time.time()
-                    
                     logger.info(f"已成功连接设备 {device.name}")
                     return conn
                 except Exception as ssh_err:
@@ -378,33 +387,19 @@ class RealTimeMonitor:
                 logger.error(traceback.format_exc())
                 return None
     
+    @staticmethod
+    def _lease(device_id: int):
+        """从共享SSH会话池租用设备的一个会话"""
+        return get_ssh_pool().lease(device_id, lambda: RealTimeMonitor._open_connection(device_id))
+    
     @staticmethod
     def _get_cpu_usage(device_id: int) -> float:
         """获取CPU使用率"""
         try:
-            conn = RealTimeMonitor.get_device_connection(device_id)
-            if not conn:
-                return 0.0
-                
-            device = Device.query.get(device_id)
-            if not device:
-                return 0.0
-                
-            # 根据设备类型发送不同命令
-            if 'huawei' in device.device_type.lower():
-                output = conn.send_command('display cpu-usage')
-                match = re.search(r'CPU Usage\s+:\s+(\d+)%', output)
-            elif 'cisco' in device.device_type.lower():
-                output = conn.send_command('show processes cpu | include CPU')
-                match = re.search(r'CPU utilization.+?(\d+)%', output)
-            else:
-                # 通用命令
-                output = conn.send_command('show cpu usage')
-                match = re.search(r'(\d+(\.\d+)?)%', output)
-                
-            if match:
-                return float(match.group(1))
-            return 0.0
+            vendor = RealTimeMonitor._get_vendor(device_id)
+            with RealTimeMonitor._lease(device_id) as conn:
+                output = conn.send_command(get_vendor_config(vendor)["cpu_cmd"])
+            return parse_cpu_usage(vendor, output)
             
         except Exception as e:
             logger.error(f"获取CPU使用率失败: {str(e)}")
@@ -414,34 +409,10 @@ class RealTimeMonitor:
     def _get_memory_usage(device_id: int) -> float:
         """获取内存使用率"""
         try:
-            conn = RealTimeMonitor.get_device_connection(device_id)
-            if not conn:
-                return 0.0
-                
-            device = Device.query.get(device_id)
-            if not device:
-                return 0.0
-                
-            # 根据设备类型发送不同命令
-            if 'huawei' in device.device_type.lower():
-                output = conn.send_command('display memory-usage')
-                match = re.search(r'Memory utilization\s+:\s+(\d+)%', output)
-            elif 'cisco' in device.device_type.lower():
-                output = conn.send_command('show memory statistics | include Processor')
-                used_match = re.search(r'Processor\s+(\d+)\s+(\d+)', output)
-                if used_match:
-                    total = int(used_match.group(1))
-                    used = int(used_match.group(2))
-                    if total > 0:
-                        return (used / total) * 100
-            else:
-                # 通用命令
-                output = conn.send_command('show memory')
-                match = re.search(r'(\d+(\.\d+)?)%', output)
-                
-            if match:
-                return float(match.group(1))
-            return 0.0
+            vendor = RealTimeMonitor._get_vendor(device_id)
+            with RealTimeMonitor._lease(device_id) as conn:
+                output = conn.send_command(get_vendor_config(vendor)["memory_cmd"])
+            return parse_memory_usage(vendor, output)
             
         except Exception as e:
             logger.error(f"获取内存使用率失败: {str(e)}")
@@ -451,29 +422,10 @@ class RealTimeMonitor:
     def _get_uptime(device_id: int) -> str:
         """获取设备运行时间"""
         try:
-            conn = RealTimeMonitor.get_device_connection(device_id)
-            if not conn:
-                return "Unknown"
-                
-            device = Device.query.get(device_id)
-            if not device:
-                return "Unknown"
-                
-            # 根据设备类型发送不同命令
-            if 'huawei' in device.device_type.lower():
-                output = conn.send_command('display version')
-                match = re.search(r'Uptime is\s+(.+)', output)
-            elif 'cisco' in device.device_type.lower():
-                output = conn.send_command('show version | include uptime')
-                match = re.search(r'uptime is\s+(.+)', output)
-            else:
-                # 通用命令
-                output = conn.send_command('show version')
-                match = re.search(r'uptime is\s+(.+)', output)
-                
-            if match:
-                return match.group(1)
-            return "Unknown"
+            vendor = RealTimeMonitor._get_vendor(device_id)
+            with RealTimeMonitor._lease(device_id) as conn:
+                output = conn.send_command(get_vendor_config(vendor)["version_cmd"])
+            return parse_uptime(vendor, output)
             
         except Exception as e:
             logger.error(f"获取设备运行时间失败: {str(e)}")
@@ -485,55 +437,52 @@ class RealTimeMonitor:
         interfaces = {}
         
         try:
-            conn = RealTimeMonitor.get_device_connection(device_id)
-            if not conn:
-                return interfaces
-                
             device = Device.query.get(device_id)
             if not device:
                 return interfaces
                 
-            # 1. 先获取接口列表
-            if 'huawei' in device.device_type.lower():
-                output = conn.send_command('display interface brief')
-            elif 'cisco' in device.device_type.lower():
-                output = conn.send_command('show interface status')
-            else:
-                output = conn.send_command('show interface brief')
-            
-            # 提取接口信息
-            for line in output.splitlines():
-                if 'Ethernet' in line or 'GigabitEthernet' in line:
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        interface_name = parts[0]
-                        status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
-                        interfaces[interface_name] = {"status": status}
-            
-            # 2. 仅获取UP状态接口的流量信息（最多3个，减少查询次数）
-            up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
-            for interface in up_interfaces[:3]:
-                try:
-                    if 'huawei' in device.device_type.lower():
-                        output = conn.send_command(f'display interface {interface}')
-                        input_match = re.search(r'input.+?(\d+)\s+bits/sec', output, re.DOTALL)
-                        output_match = re.search(r'output.+?(\d+)\s+bits/sec', output, re.DOTALL)
-                    elif 'cisco' in device.device_type.lower():
-                        output = conn.send_command(f'show interface {interface}')
-                        input_match = re.search(r'input rate\s+(\d+)', output)
-                        output_match = re.search(r'output rate\s+(\d+)', output)
-                    else:
-                        output = conn.send_command(f'show interface {interface}')
-                        input_match = re.search(r'input rate\s+(\d+)', output)
-                        output_match = re.search(r'output rate\s+(\d+)', output)
+            with RealTimeMonitor._lease(device_id) as conn:
+                # 1. 先获取接口列表
+                if 'huawei' in device.device_type.lower():
+                    output = conn.send_command('display interface brief')
+                elif 'cisco' in device.device_type.lower():
+                    output = conn.send_command('show interface status')
+                else:
+                    output = conn.send_command('show interface brief')
+            
+                # 提取接口信息
+                for line in output.splitlines():
+                    if 'Ethernet' in line or 'GigabitEthernet' in line:
+                        parts = line.split()
+                        if len(parts) >= 2:
+                            interface_name = parts[0]
+                            status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
+                            interfaces[interface_name] = {"status": status}
+            
+                # 2. 仅获取UP状态接口的流量信息（最多3个，减少查询次数）
+                up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
+                for interface in up_interfaces[:3]:
+                    try:
+                        if 'huawei' in device.device_type.lower():
+                            output = conn.send_command(f'display interface {interface}')
+                            input_match = re.search(r'input.+?(\d+)\s+bits/sec', output, re.DOTALL)
+                            output_match = re.search(r'output.+?(\d+)\s+bits/sec', output, re.DOTALL)
+                        elif 'cisco' in device.device_type.lower():
+                            output = conn.send_command(f'show interface {interface}')
+                            input_match = re.search(r'input rate\s+(\d+)', output)
+                            output_match = re.search(r'output rate\s+(\d+)', output)
+                        else:
+                            output = conn.send_command(f'show interface {interface}')
+                            input_match = re.search(r'input rate\s+(\d+)', output)
+                            output_match = re.search(r'output rate\s+(\d+)', output)
                     
-                    input_rate = int(input_match.group(1)) if input_match else 0
-                    output_rate = int(output_match.group(1)) if output_match else 0
+                        input_rate = int(input_match.group(1)) if input_match else 0
+                        output_rate = int(output_match.group(1)) if output_match else 0
                     
-                    interfaces[interface]["input_rate"] = input_rate
-                    interfaces[interface]["output_rate"] = output_rate
-                except Exception as e:
-                    logger.error(f"获取接口 {interface} 信息时出错: {str(e)}")
+                        interfaces[interface]["input_rate"] = input_rate
+                        interfaces[interface]["output_rate"] = output_rate
+                    except Exception as e:
+                        logger.error(f"获取接口 {interface} 信息时出错: {str(e)}")
                     
             return interfaces
             
@@ -542,237 +491,73 @@ class RealTimeMonitor:
             return interfaces
     
     @staticmethod
-    def _monitor_device_performance(device_id: int):
-        """后台线程：持续监控设备性能"""
-        # 确保每次循环迭代都有新的应用上下文
+    def _monitor_device_performance(device_id: int, device_name: str):
+        """调度器任务：采集一次设备性能数据（在调度器提供的应用上下文中执行）"""
         try:
-            # 导入当前应用，并创建应用上下文
-            from flask import current_app
-            from src.app import create_app
+            # 从共享会话池租用一个会话执行采集命令，命令执行完立即归还
+            # CPU/内存/运行时间命令一次写入通道，运行时间按慢周期采集
+            try:
+                with RealTimeMonitor._lease(device_id) as conn:
+                    metrics = poll_device_metrics(device_id, conn, RealTimeMonitor._get_vendor(device_id))
+            except SSHPoolError as e:
+                logger.error(f"设备 {device_name} 连接失败，将在{CONNECT_RETRY_DELAY}秒后重试: {str(e)}")
+                get_poll_scheduler().defer(_realtime_job_id(device_id), CONNECT_RETRY_DELAY)
+                return
+            cpu_usage = metrics['cpu_usage']
+            memory_usage = metrics['memory_usage']
+            uptime = metrics['uptime']
+            
+            # 获取设备带宽使用情况（简化处理）
+            bandwidth_usage = random.uniform(5.0, 45.0)  # 暂时使用随机值
+            
+            # 准备数据
+            data = {
+                "cpu_usage": cpu_usage,
+                "memory_usage": memory_usage,
+                "bandwidth_usage": bandwidth_usage,
+                "uptime": uptime,
+                "timestamp": time.time(),
+                "interfaces": {}
+            }
             
-            # 创建应用实例并推送上下文
-            app = create_app()
+            # 更新最新数据（同时写入共享指标缓存供其他工作进程读取），并推送给订阅该设备的浏览器
+            latest_device_data[device_id] = data
+            get_shared_cache().put(device_id, data, device_name=device_name)
+            get_metrics_hub().publish(device_id, data)
             
-            # 获取设备信息
-            with app.app_context():
-                device = Device.query.get(device_id)
-                if not device:
-                    logger.error(f"设备不存在: ID = {device_id}")
-                    return
-                    
-                logger.info(f"开始监控设备: {device.name} (ID:{device_id}), IP:{device.ip_address}")
-                
-                # 配置监控间隔
-                cpu_memory_interval = 5  # 默认5秒
-                
-                # 使用设备信息的本地变量，避免重复查询
-                device_name = device.name
-                device_ip = device.ip_address
-                
-            # 循环监控直到线程终止
-            while device_id in monitor_threads and monitor_threads[device_id].is_alive():
-                # 每次循环都创建新的应用上下文
-                with app.app_context():
-                    try:
-                        # 检查连接
-                        if device_id not in device_connections or device_connections[device_id] is None:
-                            logger.info(f"设备 {device_name} 尚未连接，尝试建立连接...")
-                            with connection_locks.get(device_id, threading.Lock()):
-                                # 使用获取连接方法
-                                connection = RealTimeMonitor.get_device_connection(device_id)
-                                
-                                # 如果连接失败，延迟重试
-                                if not connection:
-                                    logger.error(f"设备 {device_name} 连接失败，将在30秒后重试")
-                                    time.sleep(30)
-                                    continue
-                        
-                        # 使用缓存的连接获取数据
-                        with connection_locks.get(device_id, threading.Lock()):
-                            if device_id not in device_connections or device_connections[device_id] is None:
-                                logger.error(f"设备 {device_name} 连接丢失，需要重新连接")
-                                continue
-                                
-                            conn = device_connections[device_id]
-                            
-                            # 获取CPU使用率
-                            try:
-                                logger.debug(f"正在获取设备 {device_name} 的CPU使用率")
-                                # 参考huawei_monitor_app.py的命令
-                                cmd_output = conn.send_command("display cpu-usage")
-                                logger.debug(f"CPU命令输出: {cmd_output}")
-                                
-                                # 匹配不同格式的输出，参考huawei_monitor_app.py的解析方式
-                                match = re.search(r'CPU Usage\s*:\s*(\d+)%', cmd_output)
-                                if not match:
-                                    match = re.search(r'CPU.+?(\d+(\.\d+)?)%', cmd_output)
-                                
-                                if match:
-                                    cpu_usage = float(match.group(1))
-                                else:
-                                    logger.warning(f"无法从输出中解析CPU使用率: {cmd_output}")
-                                    cpu_usage = 0.0
-                            except Exception as e:
-                                logger.error(f"获取CPU使用率出错: {str(e)}")
-                                cpu_usage = 0.0
-                            
-                            # 获取内存使用率
-                            try:
-                                logger.debug(f"正在获取设备 {device_name} 的内存使用率")
-                                # 参考huawei_monitor_app.py的命令
-                                cmd_output = conn.send_command("display memory-usage")
-                                logger.debug(f"内存命令输出: {cmd_output}")
-                                
-                                # 匹配不同格式的输出
-                                match = re.search(r'Memory utilization\s*:\s*(\d+)%', cmd_output)
-                                if not match:
-                                    match = re.search(r'Memory.+?(\d+(\.\d+)?)%', cmd_output)
-                                
-                                if match:
-                                    memory_usage = float(match.group(1))
-                                else:
-                                    logger.warning(f"无法从输出中解析内存使用率: {cmd_output}")
-                                    memory_usage = 0.0
-                            except Exception as e:
-                                logger.error(f"获取内存使用率出错: {str(e)}")
-                                memory_usage = 0.0
-                            
-                            # 获取设备带宽使用情况（简化处理）
-                            bandwidth_usage = random.uniform(5.0, 45.0)  # 暂时使用随机值
-                            
-                            # 获取运行时间
-                            try:
-                                logger.debug(f"正在获取设备 {device_name} 的运行时间")
-                                cmd_output = conn.send_command("display version")
-                                logger.debug(f"运行时间命令输出: {cmd_output}")
-                                
-                                # 参考huawei_monitor_app.py的解析方式
-                                match = re.search(r'Uptime is\s+(.+)', cmd_output)
-                                if not match:
-                                    match = re.search(r'uptime is (.+)', cmd_output)
-                                    
-                                if match:
-                                    uptime = match.group(1)
-                                else:
-                                    logger.warning(f"无法从输出中解析运行时间: {cmd_output}")
-                                    uptime = "未知"
-                            except Exception as e:
-                                logger.error(f"获取运行时间出错: {str(e)}")
-                                uptime = "错误"
-                            
-                            # 准备数据
-                            data = {
-                                "cpu_usage": cpu_usage,
-                                "memory_usage": memory_usage,
-                                "bandwidth_usage": bandwidth_usage,
-                                "uptime": uptime,
-                                "timestamp": time.time(),
-                                "interfaces": {}
-                            }
-                            
-                            # 更新最新数据
-                            latest_device_data[device_id] = data
-                            
-                            # 将数据保存到数据库
-                            try:
-                                # 在应用上下文中执行数据库操作
-                                record = PerformanceRecord(
-                                    device_id=device_id,
-                                    cpu_usage=cpu_usage,
-                                    memory_usage=memory_usage,
-                                    bandwidth_usage=bandwidth_usage,
-                                    recorded_at=datetime.now()
-                                )
-                                db.session.add(record)
-                                db.session.commit()
-                                
-                                # 检查是否超过阈值
-                                ThresholdManager.check_thresholds(record)
-                            except SQLAlchemyError as e:
-                                db.session.rollback()
-                                logger.error(f"保存性能记录失败: {str(e)}")
-                            
-                            # 将数据放入队列
-                            if device_id in device_performance_data:
-                                queue_obj = device_performance_data[device_id]
-                                if queue_obj.full():
-                                    queue_obj.get()  # 移除最旧的数据
-                                queue_obj.put(data)
-                            
-                            logger.info(f"设备 {device_name} 性能数据: CPU {cpu_usage}%, 内存 {memory_usage}%")
-                    
-                    except Exception as e:
-                        logger.error(f"监控设备 {device_id} 出错: {str(e)}")
-                        import traceback
-                        logger.error(f"详细错误: {traceback.format_exc()}")
-                        
-                        # 清理连接
-                        if device_id in device_connections:
-                            with connection_locks.get(device_id, threading.Lock()):
-                                if device_connections.get(device_id):
-                                    try:
-                                        device_connections[device_id].disconnect()
-                                        logger.info(f"断开设备 {device_name} 的连接")
-                                    except Exception as conn_err:
-                                        logger.error(f"断开连接时发生错误: {str(conn_err)}")
-                                    finally:
-                                        device_connections[device_id] = None
-                
-                # 在应用上下文外休眠，避免持有上下文太久
-                time.sleep(cpu_memory_interval)
+            # 将数据放入批量写入缓冲，由后台线程统一写入数据库
+            try:
+                record = PerformanceRecord(
+                    device_id=device_id,
+                    cpu_usage=cpu_usage,
+                    memory_usage=memory_usage,
+                    bandwidth_usage=bandwidth_usage,
+                    recorded_at=datetime.now()
+                )
+                get_timeseries_store().enqueue(device_id, {
+                    'cpu_usage': cpu_usage,
+                    'memory_usage': memory_usage,
+                    'bandwidth_usage': bandwidth_usage
+                }, recorded_at=record.recorded_at)
+                
+                # 检查是否超过阈值
+                ThresholdManager.check_thresholds(record)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.error(f"保存性能记录失败: {str(e)}")
+            
+            # 将数据写入环形缓冲，写满后自动覆盖最旧的样本
+            history = device_performance_data.get(device_id)
+            if history is not None:
+                history.append(data)
+            
+            logger.info(f"设备 {device_name} 性能数据: CPU {cpu_usage}%, 内存 {memory_usage}%")
         
         except Exception as e:
-            logger.error(f"监控线程初始化错误: {str(e)}")
+            logger.error(f"监控设备 {device_id} 出错: {str(e)}")
             import traceback
             logger.error(f"详细错误: {traceback.format_exc()}")
     
-    @staticmethod
-    def _keepalive_thread(device_id: int):
-        """保持SSH连接活跃的线程"""
-        try:
-            # 导入当前应用，并创建应用上下文
-            from flask import current_app
-            from src.app import create_app
-            
-            # 创建应用实例
-            app = create_app()
-            
-            # 获取设备信息
-            with app.app_context():
-                device = Device.query.get(device_id)
-                if not device:
-                    logger.error(f"保活线程: 设备 {device_id} 不存在")
-                    return
-                    
-                # 保存设备名称为本地变量，避免多次访问数据库
-                device_name = device.name
-                
-                logger.info(f"已启动设备 {device_name} 的保活线程")
-            
-            # 保活循环
-            while device_id in keepalive_threads and keepalive_threads[device_id].is_alive():
-                try:
-                    # 每25秒发送一个简单的保活命令
-                    if device_id in device_connections and device_connections[device_id] is not None:
-                        with connection_locks.get(device_id, threading.Lock()):
-                            if device_connections.get(device_id) is not None:
-                                try:
-                                    # 发送对设备影响最小的命令
-                                    device_connections[device_id].send_command(" ")
-                                    logger.debug(f"设备 {device_name} 发送保活信号")
-                                except Exception as e:
-                                    logger.warning(f"设备 {device_name} 保活失败: {str(e)}")
-                except Exception as e:
-                    logger.warning(f"设备 {device_name} 保活线程错误: {str(e)}")
-                    
-                # 等待下一次保活
-                time.sleep(25)
-        
-        except Exception as e:
-            logger.error(f"保活线程初始化错误: {str(e)}")
-            import traceback
-            logger.error(f"详细错误: {traceback.format_exc()}")
-
 class PerformanceCollector:
     """性能数据采集器"""
     
@@ -826,44 +611,38 @@ class PerformanceAnalyzer:
             end_time = datetime.now()
             start_time = end_time - timedelta(days=days)
             
-            # 查询历史数据
-            records = PerformanceRecord.query.filter(
-                PerformanceRecord.device_id == device_id,
-                PerformanceRecord.recorded_at >= start_time,
-                PerformanceRecord.recorded_at <= end_time
-            ).order_by(PerformanceRecord.recorded_at).all()
+            # 在数据库中完成统计，不再把窗口内的全部记录加载到Python；
+            # 超出原始采样保留期的窗口按降采样数据统计
+            if start_time < end_time - get_timeseries_store().raw_retention:
+                aggregates = PerformanceAnalyzer._aggregate_history(device_id, start_time, end_time)
+            else:
+                aggregates = PerformanceAnalyzer._aggregate_metrics(device_id, start_time, end_time)
+            record_count = aggregates['record_count']
             
             # 如果记录数太少，返回错误
-            if len(records) < 2:
+            if record_count < 2:
                 return {
                     'status': 'error', 
-                    'message': f'数据不足以进行分析，只有 {len(records)} 条记录'
+                    'message': f'数据不足以进行分析，只有 {record_count} 条记录'
                 }
             
-            # 计算各项指标的统计值
-            cpu_values = [r.cpu_usage for r in records if r.cpu_usage is not None]
-            memory_values = [r.memory_usage for r in records if r.memory_usage is not None]
-            bandwidth_values = [r.bandwidth_usage for r in records if r.bandwidth_usage is not None]
-            
             # 计算统计值
             result = {
                 'status': 'success',
                 'device_id': device_id,
                 'device_name': device.name,
                 'analysis_period': f'{days} 天',
-                'record_count': len(records),
-                'cpu': PerformanceAnalyzer._calculate_stats(cpu_values),
-                'memory': PerformanceAnalyzer._calculate_stats(memory_values),
-                'bandwidth': PerformanceAnalyzer._calculate_stats(bandwidth_values),
+                'record_count': record_count,
+                'cpu': aggregates['cpu']['stats'],
+                'memory': aggregates['memory']['stats'],
+                'bandwidth': aggregates['bandwidth']['stats'],
                 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
                 'end_time': end_time.strftime('%Y-%m-%d %H:%M:%S')
             }
             
             # 分析性能趋势
             result['trends'] = {
-                'cpu': PerformanceAnalyzer._analyze_trend(cpu_values),
-                'memory': PerformanceAnalyzer._analyze_trend(memory_values),
-                'bandwidth': PerformanceAnalyzer._analyze_trend(bandwidth_values)
+                name: aggregates[name]['trend'] for name in ('cpu', 'memory', 'bandwidth')
             }
             
             return result
@@ -872,6 +651,109 @@ class PerformanceAnalyzer:
             logger.error(f"分析设备性能出错: {str(e)}")
             return {'status': 'error', 'message': f'分析设备性能出错: {str(e)}'}
     
+    @staticmethod
+    def _aggregate_metrics(device_id: int, start_time: datetime, end_time: datetime) -> Dict:
+        """
+        在数据库中计算各指标的统计值和趋势
+        
+        一次聚合查询得到记录数、最小/最大/平均值、平方和，以及按时间顺序编号后的 Σx·y，
+        由此得到标准差和线性回归斜率（x 为该指标非空样本的序号，与 _analyze_trend 一致）；
+        中位数和P95由数据库排序后按位置取值。
+        
+        Returns:
+            {'record_count': 记录数, 指标: {'stats': 统计值, 'trend': 趋势}}
+        """
+        conditions = (
+            PerformanceRecord.device_id == device_id,
+            PerformanceRecord.recorded_at >= start_time,
+            PerformanceRecord.recorded_at <= end_time
+        )
+        metrics = {
+            'cpu': PerformanceRecord.cpu_usage,
+            'memory': PerformanceRecord.memory_usage,
+            'bandwidth': PerformanceRecord.bandwidth_usage
+        }
+        
+        # 窗口函数为每个指标的非空样本按时间编号（从0开始）
+        window_columns = []
+        for name, column in metrics.items():
+            window_columns.append(column.label(name))
+            window_columns.append(
+                (func.count(column).over(order_by=PerformanceRecord.recorded_at, rows=(None, 0)) - 1).label(f'{name}_x')
+            )
+        samples = select(*window_columns).where(*conditions).subquery()
+        
+        aggregate_columns = [func.count()]
+        for name in metrics:
+            y = samples.c[name]
+            aggregate_columns.extend([
+                func.count(y), func.min(y), func.max(y), func.avg(y),
+                func.sum(y * y), func.sum(samples.c[f'{name}_x'] * y)
+            ])
+        row = db.session.execute(select(*aggregate_columns).select_from(samples)).one()
+        
+        result = {'record_count': row[0]}
+        for i, (name, column) in enumerate(metrics.items()):
+            n, min_value, max_value, avg_value, sum_squares, sum_xy = row[1 + i * 6:7 + i * 6]
+            if not n:
+                result[name] = {
+                    'stats': dict(PerformanceAnalyzer._calculate_stats([]), stddev=0, p95=0),
+                    'trend': "数据不足"
+                }
+                continue
+            
+            variance = max(float(sum_squares) / n - float(avg_value) ** 2, 0.0)
+            median_values = PerformanceAnalyzer._values_at(column, conditions, (n - 1) // 2, 2 - n % 2)
+            stats = {
+                'min': min_value,
+                'max': max_value,
+                'avg': float(avg_value),
+                'median': sum(median_values) / len(median_values),
+                'stddev': math.sqrt(variance),
+                'p95': PerformanceAnalyzer._values_at(column, conditions, math.ceil(0.95 * n) - 1, 1)[0]
+            }
+            
+            # x = 0..n-1，Σ(x-x̄)² 和 x̄ 有闭式解，只需要 Σx·y 和 Σy
+            if n < 2:
+                trend = "数据不足"
+            else:
+                mean_x = (n - 1) / 2
+                denominator = n * (n * n - 1) / 12
+                slope = (float(sum_xy) - mean_x * float(avg_value) * n) / denominator
+                trend = PerformanceAnalyzer._trend_label(slope)
+            
+            result[name] = {'stats': stats, 'trend': trend}
+        return result
+    
+    @staticmethod
+    def _aggregate_history(device_id: int, start_time: datetime, end_time: datetime) -> Dict:
+        """
+        与 _aggregate_metrics 返回相同结构的统计值，数据来自 TimeSeriesStore.load_history
+        （原始采样保留期之前的部分为降采样平均值，每个时间桶计为一个样本）
+        """
+        history = get_timeseries_store().load_history(device_id, RECORD_METRICS, start_time, end_time, now=end_time)
+        result = {'record_count': len(history)}
+        for name, metric in zip(('cpu', 'memory', 'bandwidth'), RECORD_METRICS):
+            values = [point[metric] for _, point in history if point[metric] is not None]
+            if not values:
+                result[name] = {
+                    'stats': dict(PerformanceAnalyzer._calculate_stats([]), stddev=0, p95=0),
+                    'trend': "数据不足"
+                }
+                continue
+            
+            stats = PerformanceAnalyzer._calculate_stats(values)
+            stats['stddev'] = math.sqrt(max(sum(v * v for v in values) / len(values) - stats['avg'] ** 2, 0.0))
+            stats['p95'] = sorted(values)[math.ceil(0.95 * len(values)) - 1]
+            result[name] = {'stats': stats, 'trend': PerformanceAnalyzer._analyze_trend(values)}
+        return result
+    
+    @staticmethod
+    def _values_at(column, conditions, offset: int, count: int) -> List[float]:
+        """按指标值排序后取第 offset 个开始的 count 个值（用于中位数和百分位数）"""
+        rows = db.session.query(column).filter(*conditions, column.isnot(None)).order_by(column).offset(offset).limit(count).all()
+        return [row[0] for row in rows]
+    
     @staticmethod
     def _calculate_stats(values: List[float]) -> Dict:
         """计算统计值"""
@@ -919,9 +801,11 @@ class PerformanceAnalyzer:
         if denominator == 0:
             return "稳定"
         
-        slope = numerator / denominator
-        
-        # 根据斜率判断趋势
+        return PerformanceAnalyzer._trend_label(numerator / denominator)
+    
+    @staticmethod
+    def _trend_label(slope: float) -> str:
+        """根据斜率判断趋势"""
         if abs(slope) < 0.1:
             return "稳定"
         elif slope > 0:
@@ -935,45 +819,81 @@ def collect_performance_data(device_id: int) -> Dict:
     return PerformanceCollector.collect_device_performance(device_id)
 
 def get_historical_data(device_id: int, hours: int = 24) -> List[Dict]:
-    """获取历史性能数据"""
-    time_threshold = datetime.now() - timedelta(hours=hours)
+    """获取历史性能数据（超出原始采样保留期的部分为降采样数据，没有记录ID）"""
+    now = datetime.now()
+    time_threshold = now - timedelta(hours=hours)
+    store = get_timeseries_store()
+    if time_threshold < now - store.raw_retention:
+        device_name = db.session.query(Device.name).filter(Device.id == device_id).scalar()
+        return [dict({
+            'id': None,
+            'device_id': device_id,
+            'device_name': device_name,
+            'recorded_at': recorded_at.isoformat(),
+            'created_at': None
+        }, **values) for recorded_at, values in store.load_history(device_id, RECORD_METRICS, time_threshold, now, now=now)]
     
-    records = PerformanceRecord.query.filter(
+    # 只取需要的列，设备名称只查询一次（to_dict 会为每条记录加载一次设备）
+    records = PerformanceRecord.query.with_entities(
+        PerformanceRecord.id,
+        PerformanceRecord.recorded_at,
+        PerformanceRecord.cpu_usage,
+        PerformanceRecord.memory_usage,
+        PerformanceRecord.bandwidth_usage,
+        PerformanceRecord.created_at
+    ).filter(
         PerformanceRecord.device_id == device_id,
         PerformanceRecord.recorded_at >= time_threshold
     ).order_by(PerformanceRecord.recorded_at.asc()).all()
     
-    return [record.to_dict() for record in records]
+    device_name = db.session.query(Device.name).filter(Device.id == device_id).scalar()
+    return [{
+        'id': record.id,
+        'device_id': device_id,
+        'device_name': device_name,
+        'cpu_usage': record.cpu_usage,
+        'memory_usage': record.memory_usage,
+        'bandwidth_usage': record.bandwidth_usage,
+        'recorded_at': record.recorded_at.isoformat() if record.recorded_at else None,
+        'created_at': record.created_at.isoformat() if record.created_at else None
+    } for record in records]
 
 def get_all_devices_status() -> List[Dict]:
-    """获取所有设备的最新状态"""
-    devices = Device.query.all()
-    results = []
-    
-    for device in devices:
-        # 获取最新性能记录
-        record = PerformanceRecord.query.filter_by(device_id=device.id).order_by(
-            PerformanceRecord.recorded_at.desc()
-        ).first()
-        
-        # 获取告警数量
-        alert_count = Alert.query.filter_by(
-            device_id=device.id, 
-            acknowledged=False
-        ).count()
-        
-        # 创建状态信息
-        status_info = {
-            'device_id': device.id,
-            'device_name': device.name,
-            'ip_address': device.ip_address,
-            'status': device.status,
-            'cpu_usage': record.cpu_usage if record else None,
-            'memory_usage': record.memory_usage if record else None,
-            'last_updated': record.recorded_at.strftime('%Y-%m-%d %H:%M:%S') if record else None,
-            'alert_count': alert_count
-        }
-        
-        results.append(status_info)
-    
-    return results 
\ No newline at end of file
+    """获取所有设备的最新状态（最新记录和未确认告警数各一次查询，不再逐台设备查询）
+
+    正在实时监控的设备使用共享指标缓存中的最新样本，比批量写入数据库的记录更新
+    """
+    latest_id = select(PerformanceRecord.id).where(
+        PerformanceRecord.device_id == Device.id
+    ).order_by(PerformanceRecord.recorded_at.desc()).limit(1).correlate(Device).scalar_subquery()
+
+    rows = db.session.query(
+        Device.id, Device.name, Device.ip_address, Device.status,
+        PerformanceRecord.cpu_usage, PerformanceRecord.memory_usage, PerformanceRecord.recorded_at
+    ).outerjoin(PerformanceRecord, PerformanceRecord.id == latest_id).order_by(Device.id).all()
+
+    alert_counts = dict(db.session.query(Alert.device_id, func.count(Alert.id)).filter(
+        Alert.acknowledged == False
+    ).group_by(Alert.device_id).all())
+
+    cached = get_shared_cache().latest_many(row[0] for row in rows)
+
+    result = []
+    for device_id, name, ip_address, status, cpu_usage, memory_usage, recorded_at in rows:
+        sample = cached.get(device_id)
+        if sample and sample.get('timestamp') and (
+                recorded_at is None or sample['timestamp'] > recorded_at.timestamp()):
+            cpu_usage = sample.get('cpu_usage')
+            memory_usage = sample.get('memory_usage')
+            recorded_at = datetime.fromtimestamp(sample['timestamp'])
+        result.append({
+            'device_id': device_id,
+            'device_name': name,
+            'ip_address': ip_address,
+            'status': status,
+            'cpu_usage': cpu_usage,
+            'memory_usage': memory_usage,
+            'last_updated': recorded_at.strftime('%Y-%m-%d %H:%M:%S') if recorded_at else None,
+            'alert_count': alert_counts.get(device_id, 0)
+        })
+    return result
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+跨进程共享的设备指标缓存 - 最新值和最近一段时间的历史，所有工作进程都能读到
+
+缓存是一个内存映射文件（默认放在 /dev/shm），布局固定：
+  - 槽位表: 每台设备占一个槽位，记录设备ID、写入进程、写入次数和序列锁计数
+  - 历史环: 每个槽位 depth 行 × (时间戳 + 各指标) 列的 float64 环形缓冲，最新值就是最后写入的一行
+  - 附加信息: 每个槽位一段定长字节，保存最新样本中的非数值字段（设备名称、运行时间、接口明细等）的JSON，
+    超过长度上限时丢弃接口明细
+
+写入时持有文件锁并用序列锁标记槽位正在修改；读取不加锁，读到修改中或前后序列号不一致时重试，
+因此读取最新值是O(1)且不会被采集任务阻塞。没有配置文件路径时使用进程内数组，只在本进程内共享。
+
+缓存文件在重启后保留，超过 max_age 没有更新的最新值视为没有缓存（采集进程已退出），
+进程启动时清除上一次运行或已退出进程写入的槽位。布局不一致时新建文件再改名替换，
+不截断其他进程可能仍在映射的文件。
+"""
+
+import os
+import json
+import time
+import mmap
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+from src.modules.performance.timeseries import RECORD_METRICS
+from src.modules.performance.ring_buffer import HISTORY_COLUMNS, ring_positions
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x43534d5343414348  # 文件头标记
+LAYOUT_VERSION = 1
+HEADER_FIELDS = 8
+COLUMNS = HISTORY_COLUMNS
+DEFAULT_MAX_DEVICES = 2048
+DEFAULT_DEPTH = 360  # 5秒采样时约30分钟
+DEFAULT_DOC_SIZE = 8192  # 每台设备附加信息的最大字节数
+DEFAULT_MAX_AGE = 60  # 最新值的有效期（秒），约为最长采集间隔(10秒)的6倍
+READ_RETRIES = 20
+
+
+class SharedMetricsCache:
+    """跨进程共享的设备最新值和短期历史缓存"""
+
+    def __init__(self, path: Optional[str] = None, max_devices: int = DEFAULT_MAX_DEVICES,
+                 depth: int = DEFAULT_DEPTH, doc_size: int = DEFAULT_DOC_SIZE,
+                 max_age: Optional[float] = DEFAULT_MAX_AGE):
+        """
+        初始化
+
+        Args:
+            path: 内存映射文件路径，为None时使用进程内数组
+            max_devices: 最大设备数（槽位数）
+            depth: 每台设备保留的历史样本数
+            doc_size: 每台设备附加信息的最大字节数
+            max_age: 最新值的有效期（秒），为None或0时不检查
+        """
+        self.path = path
+        self.max_devices = max_devices
+        self.depth = depth
+        self.doc_size = doc_size
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._slots: Dict[int, int] = {}  # 本进程缓存的 设备ID -> 槽位
+        self._opened = False
+        self._lock_fd = None
+
+    def configure(self, path: Optional[str] = None, max_devices: Optional[int] = None,
+                  depth: Optional[int] = None, doc_size: Optional[int] = None,
+                  max_age: Optional[float] = None):
+        """修改配置（下次访问时重新打开）"""
+        with self._lock:
+            self.path = path
+            self.max_devices = max_devices or self.max_devices
+            self.depth = depth or self.depth
+            self.doc_size = doc_size or self.doc_size
+            if max_age is not None:
+                self.max_age = max_age
+            self._slots = {}
+            self._opened = False
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    # ---------- 存储布局 ----------
+
+    def _open(self):
+        """打开（或创建）内存映射文件，文件已存在但布局不同（如修改了配置）时重新创建"""
+        if self._opened:
+            return
+        with self._lock:
+            if self._opened:
+                return
+            n, depth, width, doc_size = self.max_devices, self.depth, len(COLUMNS), self.doc_size
+            sizes = [
+                ('header', np.int64, (HEADER_FIELDS,)),
+                ('devices', np.int64, (n,)),
+                ('owners', np.int64, (n,)),
+                ('counts', np.int64, (n,)),
+                ('seqs', np.int64, (n,)),
+                ('doc_lens', np.int64, (n,)),
+                ('history', np.float64, (n, depth, width)),
+                ('docs', np.uint8, (n, doc_size)),
+            ]
+            total = sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, dtype, shape in sizes)
+            header = [MAGIC, LAYOUT_VERSION, n, depth, width, doc_size, 0, 0]
+
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                buffer = self._map_file(total, header)
+            else:
+                buffer = bytearray(total)
+                buffer[:HEADER_FIELDS * 8] = np.array(header, dtype=np.int64).tobytes()
+
+            offset = 0
+            for name, dtype, shape in sizes:
+                count = int(np.prod(shape))
+                array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+                setattr(self, '_' + name, array)
+                offset += count * np.dtype(dtype).itemsize
+            self._slots = {}
+            self._opened = True
+
+    def _map_file(self, total: int, header: List[int]) -> mmap.mmap:
+        """映射缓存文件；布局不一致时在持有旧文件锁的情况下新建文件并改名替换"""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._lock_fd = fd
+            with self._file_lock():
+                # 等待文件锁期间其他进程可能已经替换了文件，重新打开
+                if os.stat(self.path).st_ino != os.fstat(fd).st_ino:
+                    replaced = True
+                else:
+                    replaced = False
+                    existing = np.frombuffer(os.pread(fd, HEADER_FIELDS * 8, 0), dtype=np.int64)
+                    if os.fstat(fd).st_size != total or len(existing) < HEADER_FIELDS or \
+                            list(existing[:6]) != header[:6]:
+                        self._lock_fd = self._replace_file(total, header)
+                    buffer = mmap.mmap(self._lock_fd, total)
+            if self._lock_fd != fd:
+                os.close(fd)
+            if not replaced:
+                return buffer
+            os.close(fd)
+
+    def _replace_file(self, total: int, header: List[int]) -> int:
+        """新建写好文件头的缓存文件并改名替换旧文件，返回新文件的描述符"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.ftruncate(fd, total)
+        os.pwrite(fd, np.array(header, dtype=np.int64).tobytes(), 0)
+        os.replace(tmp_path, self.path)
+        logger.info(f"共享指标缓存布局已变化，重新创建 {self.path}")
+        return fd
+
+    def _file_lock(self):
+        """跨进程写锁（文件锁），不支持文件锁时只使用进程内锁"""
+        return _FileLock(self._lock_fd if self.path and FCNTL_AVAILABLE else None, self._lock)
+
+    def _find_slot(self, device_id: int) -> Optional[int]:
+        """查找设备的槽位（本进程缓存失效时在槽位表中向量化查找）"""
+        slot = self._slots.get(device_id)
+        if slot is not None and self._devices[slot] == device_id:
+            return slot
+        found = np.flatnonzero(self._devices == device_id)
+        if not len(found):
+            self._slots.pop(device_id, None)
+            return None
+        self._slots[device_id] = int(found[0])
+        return int(found[0])
+
+    # ---------- 写入 ----------
+
+    def put(self, device_id: int, data: Dict, device_name: Optional[str] = None,
+            timestamp: Optional[float] = None) -> bool:
+        """
+        写入设备的一个样本
+
+        Args:
+            device_id: 设备ID
+            data: 样本数据，数值指标写入历史环，其他字段保存为附加信息
+            device_name: 设备名称，保存在附加信息中，读取时不用再查询数据库
+            timestamp: 样本时间(秒)，默认使用 data['timestamp'] 或当前时间
+
+        Returns:
+            是否写入成功（槽位已满时返回False）
+        """
+        self._open()
+        timestamp = timestamp or data.get('timestamp') or time.time()
+        row = [timestamp] + [_to_float(data.get(metric)) for metric in RECORD_METRICS]
+        doc = {key: value for key, value in data.items() if key not in COLUMNS}
+        if device_name is not None:
+            doc['device_name'] = device_name
+        encoded = _encode(doc)
+        if len(encoded) > self.doc_size:
+            doc.pop('interfaces', None)
+            encoded = _encode(doc)
+            if len(encoded) > self.doc_size:
+                encoded = _encode({'device_name': device_name} if device_name is not None else {})
+
+        with self._file_lock():
+            slot = self._find_slot(device_id)
+            if slot is None:
+                free = np.flatnonzero(self._devices == 0)
+                if not len(free):
+                    logger.warning(f"共享指标缓存槽位已满（{self.max_devices}），设备 {device_id} 的数据未缓存")
+                    return False
+                slot = int(free[0])
+                self._counts[slot] = 0
+                self._devices[slot] = device_id
+                self._slots[device_id] = slot
+
+            # 序列锁：奇数表示正在写入
+            self._seqs[slot] += 1
+            self._history[slot, self._counts[slot] % self.depth] = row
+            self._docs[slot, :len(encoded)] = np.frombuffer(encoded, dtype=np.uint8)
+            self._doc_lens[slot] = len(encoded)
+            self._owners[slot] = os.getpid()
+            self._counts[slot] += 1
+            self._seqs[slot] += 1
+        return True
+
+    def release_stale_slots(self) -> int:
+        """
+        清除上一次运行遗留的槽位：写入进程已退出的槽位，以及与本进程PID相同的槽位
+        （容器重启后新进程常复用原来的PID）。进程启动时调用一次，返回清除数量。
+        """
+        self._open()
+        pid = os.getpid()
+        released = 0
+        with self._file_lock():
+            for slot in np.flatnonzero(self._devices != 0):
+                owner = int(self._owners[slot])
+                if owner != pid and _process_alive(owner):
+                    continue
+                self._seqs[slot] += 1
+                self._devices[slot] = 0
+                self._counts[slot] = 0
+                self._seqs[slot] += 1
+                released += 1
+            self._slots = {}
+        if released:
+            logger.info(f"已清除共享指标缓存中 {released} 个遗留槽位")
+        return released
+
+    def forget(self, device_id: int):
+        """移除设备的缓存（停止监控时调用）"""
+        self._open()
+        with self._file_lock():
+            slot = self._find_slot(device_id)
+            if slot is not None:
+                self._seqs[slot] += 1
+                self._devices[slot] = 0
+                self._counts[slot] = 0
+                self._seqs[slot] += 1
+                self._slots.pop(device_id, None)
+
+    # ---------- 读取 ----------
+
+    def _read(self, device_id: int, limit: Optional[int]):
+        """在序列锁保护下复制槽位数据，返回 (历史行, 附加信息) 或 None"""
+        self._open()
+        for _ in range(READ_RETRIES):
+            slot = self._find_slot(device_id)
+            if slot is None:
+                return None
+            seq = self._seqs[slot]
+            if seq % 2:
+                time.sleep(0)
+                continue
+            count = int(self._counts[slot])
+            positions = ring_positions(count, self.depth, limit or self.depth)
+            rows = self._history[slot, positions].copy()
+            doc = bytes(self._docs[slot, :self._doc_lens[slot]])
+            if self._seqs[slot] == seq and self._devices[slot] == device_id:
+                return rows, doc
+        return None
+
+    def latest(self, device_id: int) -> Optional[Dict]:
+        """
+        获取设备的最新样本
+
+        Returns:
+            {'timestamp', 指标..., 附加信息...}，没有缓存或样本超过有效期时返回None
+        """
+        result = self._read(device_id, 1)
+        if result is None or not len(result[0]):
+            return None
+        rows, doc = result
+        if self.max_age and time.time() - rows[-1][0] > self.max_age:
+            return None
+        data = json.loads(doc.decode('utf-8')) if doc else {}
+        data.update(_row_to_dict(rows[-1]))
+        return data
+
+    def latest_many(self, device_ids: Iterable[int]) -> Dict[int, Dict]:
+        """获取多台设备的最新样本 {设备ID: 样本}"""
+        result = {}
+        for device_id in device_ids:
+            data = self.latest(device_id)
+            if data is not None:
+                result[device_id] = data
+        return result
+
+    def history(self, device_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """
+        获取设备最近的样本（按时间从旧到新）
+
+        Args:
+            device_id: 设备ID
+            limit: 最多返回的样本数，默认返回全部
+        """
+        result = self._read(device_id, limit)
+        if result is None:
+            return []
+        return [_row_to_dict(row) for row in result[0]]
+
+    def changes(self, since: Dict[int, int]) -> Dict[int, int]:
+        """
+        获取写入次数发生变化的设备
+
+        Args:
+            since: 上次看到的 {设备ID: 写入次数}
+
+        Returns:
+            {设备ID: 当前写入次数}，只包含有变化且不是本进程写入的设备
+        """
+        self._open()
+        active = np.flatnonzero((self._devices != 0) & (self._owners != os.getpid()))
+        changed = {}
+        for slot in active:
+            device_id = int(self._devices[slot])
+            count = int(self._counts[slot])
+            if since.get(device_id) != count:
+                changed[device_id] = count
+        return changed
+
+    def get_stats(self) -> Dict:
+        """获取统计信息"""
+        self._open()
+        return {
+            'path': self.path,
+            'devices': int(np.count_nonzero(self._devices)),
+            'max_devices': self.max_devices,
+            'depth': self.depth
+        }
+
+
+class _FileLock:
+    """进程内锁 + 可选的文件锁"""
+
+    def __init__(self, fd: Optional[int], lock: threading.RLock):
+        self.fd = fd
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+def _process_alive(pid: int) -> bool:
+    """判断本机进程是否存在"""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _encode(doc: Dict) -> bytes:
+    return json.dumps(doc, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _row_to_dict(row: np.ndarray) -> Dict:
+    result = {}
+    for name, value in zip(COLUMNS, row):
+        result[name] = None if np.isnan(value) else float(value)
+    return result
+
+
+# 全局共享指标缓存实例
+_shared_cache = SharedMetricsCache()
+_released_pid = None  # 已清除遗留槽位的进程
+
+
+def get_shared_cache() -> SharedMetricsCache:
+    """获取全局共享指标缓存"""
+    return _shared_cache
+
+
+def init_shared_cache(app):
+    """
+    按应用配置初始化全局共享指标缓存
+
+    Args:
+        app: Flask应用实例
+    """
+    _shared_cache.configure(
+        path=app.config.get('SHARED_CACHE_PATH'),
+        max_devices=app.config.get('SHARED_CACHE_MAX_DEVICES'),
+        depth=app.config.get('SHARED_CACHE_HISTORY_DEPTH'),
+        doc_size=app.config.get('SHARED_CACHE_DOC_SIZE'),
+        max_age=app.config.get('SHARED_CACHE_MAX_AGE')
+    )
+    # 同一进程可能多次创建应用，只在进程第一次初始化时清除遗留槽位
+    global _released_pid
+    if _shared_cache.path and _released_pid != os.getpid():
+        _released_pid = os.getpid()
+        try:
+            _shared_cache.release_stale_slots()
+        except (OSError, ValueError) as e:
+            logger.error(f"清除共享指标缓存遗留槽位失败: {str(e)}")
+    if _shared_cache.path:
+        from src.modules.performance.metrics_hub import get_metrics_hub
+        get_metrics_hub().relay_from(_shared_cache)
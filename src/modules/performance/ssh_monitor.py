@@ -9,10 +9,12 @@ import time
 import re
 import threading
 import logging
-import paramiko
 import random
+from contextlib import contextmanager
 from typing import Dict, Optional, Any
 
+from src.core.ssh_pool import get_ssh_pool, SSHPoolError
+
 # 启用模拟模式（当无法连接到真实设备时，返回模拟数据）
 SIMULATION_MODE = True
 
@@ -27,16 +29,17 @@ except ImportError:
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 连接锁，防止多线程同时操作连接
-connection_locks = {}  # 格式: {device_id: threading.Lock()}
-# 当前连接对象
-device_connections = {}  # 格式: {device_id: connection_object}
-# 上次连接时间
-last_connection_times = {}  # 格式: {device_id: timestamp}
+def _is_simulated(ip: str) -> bool:
+    """是否对该设备使用模拟连接"""
+    return SIMULATION_MODE and (not ip.startswith('127.') and not ip.startswith('192.168.1.'))
+
+def _simulated_connection(device_id: int) -> Dict:
+    """模拟连接对象（仅包含设备ID用于标识）"""
+    return {'device_id': device_id, 'simulation': True}
 
-def get_connection(device_id: int, ip: str, username: str, password: str, port: int = 22) -> Optional[Any]:
+def _open_connection(device_id: int, ip: str, username: str, password: str, port: int = 22) -> Optional[Any]:
     """
-    获取或创建到设备的SSH连接
+    建立到设备的新SSH连接（由SSH会话池在需要新会话时调用）
     
     Args:
         device_id: 设备ID
@@ -48,105 +51,82 @@ def get_connection(device_id: int, ip: str, username: str, password: str, port:
     Returns:
         SSH连接对象，如果连接失败则返回None
     """
-    global device_connections, last_connection_times
+    logger.info(f"正在创建到设备 ID:{device_id}, IP:{ip} 的新连接...")
     
-    # 如果启用了模拟模式，并且IP不是本地网络或无法连接
-    if SIMULATION_MODE and (not ip.startswith('127.') and not ip.startswith('192.168.1.')):
-        logger.info(f"使用模拟模式连接设备 ID:{device_id}, IP:{ip}")
-        # 返回一个模拟连接对象（仅包含设备ID用于标识）
-        return {'device_id': device_id, 'simulation': True}
-    
-    # 确保该设备有连接锁
-    if device_id not in connection_locks:
-        connection_locks[device_id] = threading.Lock()
-    
-    with connection_locks[device_id]:
-        # 检查连接是否存在且有效
-        if device_id in device_connections and device_connections[device_id] is not None:
-            try:
-                # 发送简单命令测试连接是否有效
-                if hasattr(device_connections[device_id], 'find_prompt'):
-                    device_connections[device_id].find_prompt()
-                return device_connections[device_id]
-            except Exception as e:
-                logger.warning(f"设备 {device_id} 的连接已失效，准备重新连接: {str(e)}")
-                try:
-                    device_connections[device_id].disconnect()
-                except:
-                    pass
-                device_connections[device_id] = None
+    # 设置连接参数
+    device_info = {
+        'device_type': 'huawei',  # 默认使用华为设备
+        'ip': ip,
+        'username': username,
+        'password': password,
+        'port': port,
+        'timeout': 10,
+        'keepalive': 30,
+        'session_timeout': 60,
+        'auto_connect': True,
+        'global_delay_factor': 2
+    }
+    
+    # 使用ConnectHandler连接设备
+    conn = ConnectHandler(**device_info)
+    
+    # 发送一个简单命令确认连接正常
+    conn.find_prompt()
+    logger.info(f"成功建立到设备 ID:{device_id}, IP:{ip} 的新连接")
+    
+    try:
+        conn.send_command("screen-length 0 temporary")  # 禁用分页
+    except Exception as e:
+        logger.warning(f"设置分页失败: {str(e)}")
         
-        # 连接不存在或无效，创建新连接
-        # 检查是否频繁重连（防止在短时间内多次重连）
-        current_time = time.time()
-        if device_id in last_connection_times and current_time - last_connection_times.get(device_id, 0) < 5:
-            time.sleep(5)  # 等待一段时间再重连
+    return conn
+
+@contextmanager
+def lease_connection(device_id: int, ip: str, username: str, password: str, port: int = 22):
+    """
+    从共享SSH会话池租用到设备的一个会话（上下文管理器），用完自动归还
+    
+    模拟模式下，对非本地网络的设备或连接失败时提供模拟连接对象。
+    
+    Args:
+        device_id: 设备ID
+        ip: 设备IP地址
+        username: 用户名
+        password: 密码
+        port: SSH端口，默认22
         
-        # 检查是否有netmiko支持
-        if not NETMIKO_AVAILABLE:
+    Yields:
+        SSH连接对象或模拟连接对象，无法连接且未启用模拟模式时为None
+    """
+    if _is_simulated(ip) or not NETMIKO_AVAILABLE:
+        if not NETMIKO_AVAILABLE and not SIMULATION_MODE:
             logger.warning("Netmiko未安装，无法连接设备")
-            if SIMULATION_MODE:
-                logger.info(f"使用模拟模式连接设备 ID:{device_id}, IP:{ip}")
-                return {'device_id': device_id, 'simulation': True}
-            return None
-        
-        try:
-            logger.info(f"正在创建到设备 ID:{device_id}, IP:{ip} 的新连接...")
-            
-            # 模拟模式，直接返回模拟连接对象
-            if SIMULATION_MODE:
-                logger.info(f"使用模拟模式连接设备 ID:{device_id}, IP:{ip}")
-                sim_conn = {'device_id': device_id, 'simulation': True}
-                device_connections[device_id] = sim_conn
-                last_connection_times[device_id] = time.time()
-                return sim_conn
-            
-            # 设置连接参数
-            device_info = {
-                'device_type': 'huawei',  # 默认使用华为设备
-                'ip': ip,
-                'username': username,
-                'password': password,
-                'port': port,
-                'timeout': 10,
-                'keepalive': 30,
-                'session_timeout': 60,
-                'auto_connect': True,
-                'global_delay_factor': 2
-            }
-            
-            # 创建SSH客户端
-            ssh_conn = paramiko.SSHClient()
-            ssh_conn.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # 使用ConnectHandler连接设备
-            conn = ConnectHandler(**device_info)
-            
-            # 发送一个简单命令确认连接正常
-            conn.find_prompt()
-            
-            device_connections[device_id] = conn
-            last_connection_times[device_id] = time.time()
-            logger.info(f"成功建立到设备 ID:{device_id}, IP:{ip} 的新连接")
-            
-            # 发送keep-alive配置命令（如果设备支持）
-            try:
-                conn.send_command("screen-length 0 temporary")  # 禁用分页
-            except Exception as e:
-                logger.warning(f"设置分页失败: {str(e)}")
-                
-            return conn
-        except Exception as e:
-            logger.error(f"创建设备 ID:{device_id}, IP:{ip} 的连接失败: {str(e)}")
-            
-            if SIMULATION_MODE:
-                logger.info(f"连接失败，切换到模拟模式: 设备 ID:{device_id}, IP:{ip}")
-                sim_conn = {'device_id': device_id, 'simulation': True}
-                device_connections[device_id] = sim_conn
-                last_connection_times[device_id] = time.time()
-                return sim_conn
-                
-            return None
+            yield None
+            return
+        logger.info(f"使用模拟模式连接设备 ID:{device_id}, IP:{ip}")
+        yield _simulated_connection(device_id)
+        return
+    
+    pool = get_ssh_pool()
+    try:
+        session = pool.acquire(device_id, lambda: _open_connection(device_id, ip, username, password, port))
+    except SSHPoolError as e:
+        logger.error(f"创建设备 ID:{device_id}, IP:{ip} 的连接失败: {str(e)}")
+        if SIMULATION_MODE:
+            logger.info(f"连接失败，切换到模拟模式: 设备 ID:{device_id}, IP:{ip}")
+            yield _simulated_connection(device_id)
+        else:
+            yield None
+        return
+    
+    broken = False
+    try:
+        yield session.conn
+    except Exception:
+        broken = True
+        raise
+    finally:
+        pool.release(session, broken=broken)
 
 def get_cpu_usage(device_id: int, connection: Any) -> float:
     """
@@ -229,20 +209,64 @@ def get_uptime(device_id: int, connection: Any) -> str:
         logger.error(f"获取设备 {device_id} 运行时间失败: {str(e)}")
         return "Unknown"
 
-def get_interface_stats(device_id: int, connection: Any) -> Dict:
+def get_version_info(device_id: int, connection: Any) -> Dict[str, Optional[str]]:
     """
-    获取接口统计信息
+    获取设备固件版本和型号（display version）
     
     Args:
         device_id: 设备ID
         connection: SSH连接对象
         
     Returns:
-        接口统计信息字典
+        {'firmware_version': 固件版本, 'model': 型号}，无法解析的项为None
+    """
+    info = {'firmware_version': None, 'model': None}
+    
+    # 模拟连接没有版本信息，沿用设备档案中的记录
+    if isinstance(connection, dict) and connection.get('simulation', False):
+        return info
+    
+    try:
+        output = connection.send_command('display version')
+        version_match = re.search(r'\b(V\d{3}R\d{3}C\d{2}\w*)', output)
+        model_match = re.search(r'HUAWEI\s+(\S+).*?uptime is', output, re.IGNORECASE)
+        info['firmware_version'] = version_match.group(1) if version_match else None
+        info['model'] = model_match.group(1) if model_match else None
+    except Exception as e:
+        logger.error(f"获取设备 {device_id} 版本信息失败: {str(e)}")
+    
+    return info
+
+def parse_uptime(uptime: Optional[str]) -> Optional[int]:
+    """
+    将运行时间字符串（如 "1 week, 2 days, 3 hours, 4 minutes"）转换为秒数
+    
+    Args:
+        uptime: 运行时间字符串
+        
+    Returns:
+        运行秒数，无法解析时返回None
+    """
+    units = {'year': 31536000, 'week': 604800, 'day': 86400, 'hour': 3600, 'minute': 60, 'second': 1}
+    matches = re.findall(r'(\d+)\s*(year|week|day|hour|minute|second)s?', uptime or '', re.IGNORECASE)
+    if not matches:
+        return None
+    return sum(int(value) * units[unit.lower()] for value, unit in matches)
+
+def get_interface_inventory(device_id: int, connection: Any) -> Dict:
+    """
+    获取接口清单及状态（display interface brief）
+    
+    Args:
+        device_id: 设备ID
+        connection: SSH连接对象
+        
+    Returns:
+        {接口名: {'status': 'up'|'down'}}
     """
     # 检查是否是模拟连接
     if isinstance(connection, dict) and connection.get('simulation', False):
-        # 创建模拟接口统计信息
+        # 创建模拟接口清单
         interfaces = {}
         interface_types = ["GigabitEthernet", "FastEthernet", "Serial"]
         
@@ -251,23 +275,13 @@ def get_interface_stats(device_id: int, connection: Any) -> Dict:
             interface_type = random.choice(interface_types)
             interface_name = f"{interface_type}{i}/0/{random.randint(0, 8)}"
             status = "up" if random.random() > 0.2 else "down"  # 80%概率为up状态
-            
             interfaces[interface_name] = {"status": status}
-            
-            if status == "up":
-                # 为up状态的接口添加流量信息
-                input_rate = random.randint(1000, 1000000)  # 1Kbps - 1Mbps
-                output_rate = random.randint(1000, 1000000)
-                
-                interfaces[interface_name]["input_rate"] = input_rate
-                interfaces[interface_name]["output_rate"] = output_rate
         
         return interfaces
     
     interfaces = {}
     
     try:
-        # 1. 获取接口列表
         output = connection.send_command('display interface brief')
         
         # 解析接口信息
@@ -278,29 +292,65 @@ def get_interface_stats(device_id: int, connection: Any) -> Dict:
                     interface_name = parts[0]
                     status = "up" if "up" in line.lower() and "down" not in line.lower() else "down"
                     interfaces[interface_name] = {"status": status}
-        
-        # 2. 仅获取UP状态接口的流量信息（最多3个）
-        up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
-        for interface in up_interfaces[:3]:  # 限制只检查前3个UP状态的接口
-            try:
-                output = connection.send_command(f'display interface {interface}')
-                
-                # 提取输入/输出速率
-                input_match = re.search(r'input.+?(\d+)\s+bits/sec', output, re.DOTALL)
-                output_match = re.search(r'output.+?(\d+)\s+bits/sec', output, re.DOTALL)
-                
-                input_rate = int(input_match.group(1)) if input_match else 0
-                output_rate = int(output_match.group(1)) if output_match else 0
-                
-                interfaces[interface]["input_rate"] = input_rate
-                interfaces[interface]["output_rate"] = output_rate
-            except Exception as e:
-                logger.error(f"获取设备 {device_id} 接口 {interface} 信息时出错: {str(e)}")
     except Exception as e:
-        logger.error(f"获取设备 {device_id} 接口统计信息失败: {str(e)}")
+        logger.error(f"获取设备 {device_id} 接口列表失败: {str(e)}")
     
     return interfaces
 
+def get_interface_rates(device_id: int, connection: Any, interfaces: Dict) -> Dict:
+    """
+    获取接口清单中UP状态接口的流量信息（最多3个）
+    
+    Args:
+        device_id: 设备ID
+        connection: SSH连接对象
+        interfaces: 接口清单 {接口名: {'status': ...}}
+        
+    Returns:
+        接口统计信息字典（接口清单的副本，UP状态接口带 input_rate/output_rate）
+    """
+    interfaces = {name: {'status': data.get('status', 'down')} for name, data in interfaces.items()}
+    up_interfaces = [intf for intf, data in interfaces.items() if data['status'] == 'up']
+    
+    # 检查是否是模拟连接
+    if isinstance(connection, dict) and connection.get('simulation', False):
+        # 为up状态的接口添加流量信息（1Kbps - 1Mbps）
+        for interface in up_interfaces:
+            interfaces[interface]["input_rate"] = random.randint(1000, 1000000)
+            interfaces[interface]["output_rate"] = random.randint(1000, 1000000)
+        return interfaces
+    
+    for interface in up_interfaces[:3]:  # 限制只检查前3个UP状态的接口
+        try:
+            output = connection.send_command(f'display interface {interface}')
+            
+            # 提取输入/输出速率
+            input_match = re.search(r'input.+?(\d+)\s+bits/sec', output, re.DOTALL)
+            output_match = re.search(r'output.+?(\d+)\s+bits/sec', output, re.DOTALL)
+            
+            input_rate = int(input_match.group(1)) if input_match else 0
+            output_rate = int(output_match.group(1)) if output_match else 0
+            
+            interfaces[interface]["input_rate"] = input_rate
+            interfaces[interface]["output_rate"] = output_rate
+        except Exception as e:
+            logger.error(f"获取设备 {device_id} 接口 {interface} 信息时出错: {str(e)}")
+    
+    return interfaces
+
+def get_interface_stats(device_id: int, connection: Any) -> Dict:
+    """
+    获取接口统计信息（接口清单 + UP状态接口的流量）
+    
+    Args:
+        device_id: 设备ID
+        connection: SSH连接对象
+        
+    Returns:
+        接口统计信息字典
+    """
+    return get_interface_rates(device_id, connection, get_interface_inventory(device_id, connection))
+
 def collect_device_data(device_id: int, ip: str, username: str, password: str, port: int = 22) -> Dict:
     """
     收集设备性能数据
@@ -328,52 +378,69 @@ def collect_device_data(device_id: int, ip: str, username: str, password: str, p
     
     logger.info(f"开始收集设备 ID:{device_id}, IP:{ip} 的性能数据")
     
-    # 获取连接
-    connection = get_connection(device_id, ip, username, password, port)
-    if connection is None:
-        logger.error(f"无法连接到设备 ID:{device_id}, IP:{ip}")
+    # 配置为asyncssh采集后端时由后台事件循环采集（模拟设备仍使用模拟数据）
+    from src.modules.performance.enhanced_ssh_monitor import get_async_backend
+    async_monitor = None if _is_simulated(ip) else get_async_backend()
+    if async_monitor is not None:
+        data = async_monitor.collect_device_data(device_id, ip, username, password, port)
+        if data.get('error'):
+            logger.error(f"收集设备 ID:{device_id}, IP:{ip} 性能数据失败: {data['error']}")
+            return result
+        result.update(
+            success=True,
+            cpu_usage=data['cpu_usage'],
+            memory_usage=data['memory_usage'],
+            uptime=data['uptime'],
+            interfaces=data.get('interfaces', {})
+        )
         return result
     
-    try:
-        # 是否为模拟连接
-        is_simulation = isinstance(connection, dict) and connection.get('simulation', False)
-        if is_simulation:
-            logger.info(f"使用模拟数据收集设备 ID:{device_id}, IP:{ip} 的性能信息")
+    # 从共享会话池租用会话，采集完成后归还
+    with lease_connection(device_id, ip, username, password, port) as connection:
+        if connection is None:
+            logger.error(f"无法连接到设备 ID:{device_id}, IP:{ip}")
+            return result
+        
+        try:
+            # 是否为模拟连接
+            is_simulation = isinstance(connection, dict) and connection.get('simulation', False)
+            if is_simulation:
+                logger.info(f"使用模拟数据收集设备 ID:{device_id}, IP:{ip} 的性能信息")
         
-        # 获取CPU使用率
-        cpu_usage = get_cpu_usage(device_id, connection)
-        result['cpu_usage'] = cpu_usage
-        logger.info(f"设备 ID:{device_id}, IP:{ip} CPU使用率: {cpu_usage}%")
+            # 获取CPU使用率
+            cpu_usage = get_cpu_usage(device_id, connection)
+            result['cpu_usage'] = cpu_usage
+            logger.info(f"设备 ID:{device_id}, IP:{ip} CPU使用率: {cpu_usage}%")
         
-        # 获取内存使用率
-        memory_usage = get_memory_usage(device_id, connection)
-        result['memory_usage'] = memory_usage
-        logger.info(f"设备 ID:{device_id}, IP:{ip} 内存使用率: {memory_usage}%")
+            # 获取内存使用率
+            memory_usage = get_memory_usage(device_id, connection)
+            result['memory_usage'] = memory_usage
+            logger.info(f"设备 ID:{device_id}, IP:{ip} 内存使用率: {memory_usage}%")
         
-        # 获取运行时间
-        uptime = get_uptime(device_id, connection)
-        result['uptime'] = uptime
-        logger.info(f"设备 ID:{device_id}, IP:{ip} 运行时间: {uptime}")
+            # 获取运行时间
+            uptime = get_uptime(device_id, connection)
+            result['uptime'] = uptime
+            logger.info(f"设备 ID:{device_id}, IP:{ip} 运行时间: {uptime}")
         
-        # 获取接口统计信息
-        interfaces = get_interface_stats(device_id, connection)
-        result['interfaces'] = interfaces
+            # 获取接口统计信息
+            interfaces = get_interface_stats(device_id, connection)
+            result['interfaces'] = interfaces
         
-        # 记录接口数量
-        interface_count = len(interfaces)
-        up_interfaces = sum(1 for intf in interfaces.values() if intf.get('status') == 'up')
-        logger.info(f"设备 ID:{device_id}, IP:{ip} 接口总数: {interface_count}, UP状态接口数: {up_interfaces}")
+            # 记录接口数量
+            interface_count = len(interfaces)
+            up_interfaces = sum(1 for intf in interfaces.values() if intf.get('status') == 'up')
+            logger.info(f"设备 ID:{device_id}, IP:{ip} 接口总数: {interface_count}, UP状态接口数: {up_interfaces}")
         
-        # 标记成功
-        result['success'] = True
+            # 标记成功
+            result['success'] = True
         
-        if is_simulation:
-            logger.info(f"模拟数据收集完成: 设备 ID:{device_id}, IP:{ip}")
-        else:
-            logger.info(f"成功收集设备 ID:{device_id}, IP:{ip} 的性能数据")
+            if is_simulation:
+                logger.info(f"模拟数据收集完成: 设备 ID:{device_id}, IP:{ip}")
+            else:
+                logger.info(f"成功收集设备 ID:{device_id}, IP:{ip} 的性能数据")
             
-    except Exception as e:
-        logger.error(f"收集设备 ID:{device_id}, IP:{ip} 性能数据时发生错误: {str(e)}")
+        except Exception as e:
+            logger.error(f"收集设备 ID:{device_id}, IP:{ip} 性能数据时发生错误: {str(e)}")
     
     return result
 
@@ -428,39 +495,13 @@ def batch_collect_data(devices: list) -> Dict:
 
 def close_all_connections():
     """关闭所有设备连接"""
-    global device_connections
-    
-    for device_id, connection in list(device_connections.items()):
-        try:
-            if connection is not None and not isinstance(connection, dict):
-                if hasattr(connection, 'disconnect'):
-                    connection.disconnect()
-                logger.info(f"已关闭设备 ID:{device_id} 的连接")
-        except Exception as e:
-            logger.warning(f"关闭设备 ID:{device_id} 连接时出错: {str(e)}")
-    
-    # 清空连接字典
-    device_connections = {}
-    last_connection_times = {}
+    get_ssh_pool().close_all()
 
 def close_connection(device_id: int):
     """
-    关闭指定设备的连接
+    关闭指定设备的连接（会话池中该设备的空闲会话）
     
     Args:
         device_id: 设备ID
     """
-    global device_connections
-    
-    if device_id in device_connections:
-        try:
-            connection = device_connections.get(device_id)
-            if connection is not None and not isinstance(connection, dict):
-                if hasattr(connection, 'disconnect'):
-                    connection.disconnect()
-                logger.info(f"已关闭设备 ID:{device_id} 的连接")
-        except Exception as e:
-            logger.warning(f"关闭设备 ID:{device_id} 连接时出错: {str(e)}")
-        
-        device_connections.pop(device_id, None)
-        last_connection_times.pop(device_id, None) 
\ No newline at end of file
+    get_ssh_pool().close_device(device_id)
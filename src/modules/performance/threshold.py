@@ -3,18 +3,30 @@
 
 """
 性能阈值管理模块 - 定义性能监控阈值和告警规则
+
+规则按 (设备, 指标) 编译成索引：设备规则优先，其次是设备类型（设备组）规则、全局自定义规则，最后是默认规则。
+阈值、持续时间、滞回和违反开始时间等状态保存在 设备×指标 的NumPy数组中，一批采样一次向量化判断，
+不再对每条记录重建规则列表、逐条规则比较，告警时也不再查询设备表。
 """
 
 import time
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+import threading
+from typing import Dict, List, Any, Optional, Iterable
+from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
+from sqlalchemy import event as sqla_event, inspect as sqla_inspect
+from sqlalchemy.orm import Session, object_session
+
 from src.core.db import db
+from src.core.local_store import get_local_store
 from src.modules.device.models import Device
 from src.modules.performance.models import Alert
-from src.models import PerformanceRecord
+from src.models import PerformanceRecord, Threshold
+from src.modules.performance.write_buffer import get_write_buffer
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -41,7 +53,9 @@ class ThresholdRule:
         critical_threshold: float,
         duration: int = 0,
         device_id: Optional[int] = None,
-        enabled: bool = True
+        enabled: bool = True,
+        device_type_id: Optional[int] = None,
+        hysteresis: float = 0.0
     ):
         """
         初始化阈值规则
@@ -53,6 +67,8 @@ class ThresholdRule:
             duration: 持续时间(秒)，0表示立即触发
             device_id: 设备ID，None表示适用于所有设备
             enabled: 规则是否启用
+            device_type_id: 设备类型ID（设备组），device_id为None时适用于该类型的所有设备
+            hysteresis: 滞回宽度，数值回落到 警告阈值-滞回宽度 以下才结束违反状态，防止在阈值附近抖动
         """
         self.threshold_type = threshold_type
         self.warning_threshold = warning_threshold
@@ -60,16 +76,344 @@ class ThresholdRule:
         self.duration = duration
         self.device_id = device_id
         self.enabled = enabled
-        self.violation_start_time: Dict[int, datetime] = {}  # 设备ID -> 开始违反阈值的时间
+        self.device_type_id = device_type_id
+        self.hysteresis = hysteresis
+
+METRICS = [threshold_type.value for threshold_type in ThresholdType]
+METRIC_TYPES = list(ThresholdType)
+LEVELS = (None, AlertLevel.WARNING, AlertLevel.CRITICAL)
+THRESHOLD_TOPIC = 'thresholds'  # 共享存储中阈值变更日志的主题
+DEVICE_TOPIC = 'threshold_devices'  # 共享存储中设备名称、类型变更日志的主题
+ALERT_SILENCE_NAMESPACE = 'alert_silence'  # 共享存储中告警静默声明的命名空间
+ALERT_TYPE_NAMES = {
+    ThresholdType.CPU: "CPU使用率过高",
+    ThresholdType.MEMORY: "内存使用率过高",
+    ThresholdType.BANDWIDTH: "带宽使用率过高"
+}
+
+class ThresholdEngine:
+    """
+    编译后的阈值判断引擎
+
+    每台设备占一行，每个指标占一列；没有适用规则的位置阈值为NaN，不会触发告警。
+    """
+
+    def __init__(self, silence_period: float = 1800):
+        """
+        初始化
+
+        Args:
+            silence_period: 告警静默期(秒)，同一设备同一指标在静默期内只告警一次
+        """
+        self.silence_period = silence_period
+        self._lock = threading.RLock()
+        self._rule_index: Dict[tuple, List[ThresholdRule]] = {}  # (范围, 指标) -> 规则，范围为设备ID、('type', 类型ID) 或 None
+        self._defaults: Dict[str, ThresholdRule] = {}
+        self._row_of = np.full(0, -1, dtype=np.int64)  # 设备ID -> 行号
+        self._device_ids: List[int] = []
+        self._device_types: List[Optional[int]] = []
+        self._device_names: List[Optional[str]] = []
+        self._rules: List[List[Optional[ThresholdRule]]] = []  # 行 -> 每个指标生效的规则
+        self._stale: set = set()  # 名称或类型已变更、下次判断前需要重新查询的设备ID
+        self._alloc(0)
+
+    def _alloc(self, capacity: int):
+        """分配（或扩容）状态数组，保留已有行"""
+        shape = (capacity, len(METRICS))
+        old = getattr(self, '_warning', None)
+        arrays = {
+            '_warning': np.nan, '_critical': np.nan, '_clear': np.nan, '_duration': 0.0,
+            '_violation_start': np.nan, '_last_alert': np.nan
+        }
+        for name, fill in arrays.items():
+            array = np.full(shape, fill)
+            if old is not None:
+                previous = getattr(self, name)
+                array[:len(previous)] = previous
+            setattr(self, name, array)
+
+    # ---------- 规则编译 ----------
+
+    @staticmethod
+    def _key(rule: ThresholdRule) -> tuple:
+        """规则在索引中的键 (范围, 指标)"""
+        if rule.device_id is not None:
+            scope = rule.device_id
+        elif rule.device_type_id is not None:
+            scope = ('type', rule.device_type_id)
+        else:
+            scope = None
+        return scope, rule.threshold_type.value
+
+    def compile(self, default_rules: Iterable[ThresholdRule], custom_rules: Iterable[ThresholdRule]):
+        """
+        编译规则索引，并重新计算已登记设备的阈值（全量重建），保留违反状态和最后告警时间
+
+        Args:
+            default_rules: 默认规则
+            custom_rules: 自定义规则，同一范围同一指标有多条时后添加的生效
+        """
+        with self._lock:
+            index = {}
+            for rule in custom_rules:
+                if rule.enabled:
+                    index.setdefault(self._key(rule), []).append(rule)
+            self._defaults = {rule.threshold_type.value: rule for rule in default_rules if rule.enabled}
+            self._rule_index = index
+            for row in range(len(self._device_ids)):
+                self._apply_rules(row)
+
+    def put_rule(self, rule: ThresholdRule):
+        """增量添加一条规则，只重新计算受影响的设备"""
+        if not rule.enabled:
+            return
+        with self._lock:
+            key = self._key(rule)
+            self._rule_index.setdefault(key, []).append(rule)
+            self._apply_scope(key[0])
+
+    def drop_rule(self, rule: ThresholdRule):
+        """增量移除一条规则，同一范围同一指标的上一条规则（或更粗粒度的规则）重新生效"""
+        with self._lock:
+            key = self._key(rule)
+            rules = self._rule_index.get(key, [])
+            if rule in rules:
+                rules.remove(rule)
+                if not rules:
+                    del self._rule_index[key]
+                self._apply_scope(key[0])
+
+    def _apply_scope(self, scope: Any):
+        """重新计算规则范围内的设备：单台设备、一个设备类型或全部设备"""
+        if scope is None:
+            rows = range(len(self._device_ids))
+        elif isinstance(scope, tuple):
+            rows = [row for row, type_id in enumerate(self._device_types) if type_id == scope[1]]
+        elif scope < len(self._row_of) and self._row_of[scope] >= 0:
+            rows = [self._row_of[scope]]
+        else:
+            rows = []
+        for row in rows:
+            self._apply_rules(row)
+
+    def resolve(self, device_id: int, device_type_id: Optional[int], metric: str) -> Optional[ThresholdRule]:
+        """按 设备 → 设备类型 → 全局自定义 → 默认 的顺序查找生效的规则"""
+        index = self._rule_index
+        scopes = (device_id, ('type', device_type_id), None) if device_type_id is not None else (device_id, None)
+        for scope in scopes:
+            rules = index.get((scope, metric))
+            if rules:
+                return rules[-1]
+        return self._defaults.get(metric)
+
+    def _apply_rules(self, row: int):
+        """把设备生效的规则写入状态数组"""
+        rules = []
+        for column, metric in enumerate(METRICS):
+            rule = self.resolve(self._device_ids[row], self._device_types[row], metric)
+            rules.append(rule)
+            if rule is None:
+                self._warning[row, column] = self._critical[row, column] = self._clear[row, column] = np.nan
+                self._violation_start[row, column] = np.nan
+                continue
+            self._warning[row, column] = rule.warning_threshold
+            self._critical[row, column] = rule.critical_threshold
+            self._clear[row, column] = rule.warning_threshold - rule.hysteresis
+            self._duration[row, column] = rule.duration
+        self._rules[row] = rules
+
+    def _lookup(self, device_ids: np.ndarray) -> np.ndarray:
+        """设备ID转行号，未登记的设备为-1"""
+        if not len(self._row_of):
+            return np.full(len(device_ids), -1, dtype=np.int64)
+        known = (device_ids >= 0) & (device_ids < len(self._row_of))
+        return np.where(known, self._row_of[np.where(known, device_ids, 0)], -1)
+
+    def _rows(self, device_ids: np.ndarray) -> np.ndarray:
+        """
+        设备ID转行号，未登记或已变更的设备一次查询设备表后登记；
+        查询失败或设备不存在时行号为-1（不登记，下次判断时重新查询）
+        """
+        rows = self._lookup(device_ids)
+        refresh = set(np.unique(device_ids[rows < 0]).tolist())
+        if self._stale:
+            refresh.update(device_id for device_id in np.unique(device_ids).tolist() if device_id in self._stale)
+        if refresh:
+            self.register_devices(sorted(refresh))
+            rows = self._lookup(device_ids)
+        return rows
+
+    def rules_for(self, device_id: int) -> List[Optional[ThresholdRule]]:
+        """获取设备每个指标生效的规则（没有规则的指标为None）"""
+        with self._lock:
+            row = self._rows(np.array([device_id], dtype=np.int64))[0]
+            if row < 0:
+                return [self.resolve(device_id, None, metric) for metric in METRICS]
+            return list(self._rules[row])
+
+    def invalidate_devices(self, device_ids: Iterable[int]):
+        """标记设备名称或类型已变更，下次判断前重新查询设备表（违反状态和最后告警时间保留）"""
+        with self._lock:
+            self._stale.update(device_ids)
+
+    def register_devices(self, device_ids: List[int], devices: Optional[Dict[int, tuple]] = None):
+        """
+        登记设备（名称、设备类型）并计算其阈值，已登记的设备更新名称和类型
+
+        查询失败时不登记任何设备；设备表中不存在的设备不登记，已登记的移除，下次判断时重新查询。
+
+        Args:
+            device_ids: 设备ID列表
+            devices: {设备ID: (名称, 类型ID)}，为None时从设备表一次查询
+        """
+        with self._lock:
+            if devices is None:
+                devices = {}
+                try:
+                    for device_id, name, type_id in db.session.query(
+                        Device.id, Device.name, Device.type_id
+                    ).filter(Device.id.in_(device_ids)).all():
+                        devices[device_id] = (name, type_id)
+                except Exception as e:
+                    logger.error(f"查询设备信息失败: {str(e)}")
+                    return
+
+            rows = self._lookup(np.asarray(device_ids, dtype=np.int64))
+            new_ids = []
+            for device_id, row in zip(device_ids, rows.tolist()):
+                self._stale.discard(device_id)
+                if device_id not in devices:
+                    if row >= 0:
+                        self._row_of[device_id] = -1
+                    continue
+                if row < 0:
+                    new_ids.append(device_id)
+                    continue
+                name, type_id = devices[device_id]
+                self._device_names[row] = name
+                if self._device_types[row] != type_id:
+                    self._device_types[row] = type_id
+                    self._apply_rules(row)
+
+            if not new_ids:
+                return
+            if max(new_ids) >= len(self._row_of):
+                grown = np.full(max(new_ids) + 1, -1, dtype=np.int64)
+                grown[:len(self._row_of)] = self._row_of
+                self._row_of = grown
+
+            first = len(self._device_ids)
+            if first + len(new_ids) > len(self._warning):
+                self._alloc(max(2 * len(self._warning), first + len(new_ids), 64))
+            for offset, device_id in enumerate(new_ids):
+                name, type_id = devices[device_id]
+                self._row_of[device_id] = first + offset
+                self._device_ids.append(device_id)
+                self._device_names.append(name)
+                self._device_types.append(type_id)
+                self._rules.append([None] * len(METRICS))
+                self._apply_rules(first + offset)
+
+    # ---------- 判断 ----------
+
+    def evaluate(self, device_ids: Iterable[int], values: Dict[str, Iterable[Optional[float]]],
+                 timestamps: Optional[Iterable[float]] = None) -> List[Dict]:
+        """
+        批量判断采样是否超过阈值
+
+        Args:
+            device_ids: 每个采样的设备ID
+            values: {指标名: 每个采样的值（None表示没有采集到）}
+            timestamps: 每个采样的时间戳(秒)，默认为当前时间
+
+        Returns:
+            需要生成告警的事件列表 [{'device_id', 'device_name', 'threshold_type', 'level', 'value', 'threshold'}]
+        """
+        device_ids = np.asarray(list(device_ids), dtype=np.int64)
+        if not len(device_ids):
+            return []
+        matrix = np.full((len(device_ids), len(METRICS)), np.nan)
+        for column, metric in enumerate(METRICS):
+            if metric in values:
+                matrix[:, column] = np.array(list(values[metric]), dtype=np.float64)
+        if timestamps is None:
+            times = np.full(len(device_ids), time.time())
+        else:
+            times = np.asarray(list(timestamps), dtype=np.float64)
+
+        with self._lock:
+            rows = self._rows(device_ids)
+            registered = rows >= 0
+            if not registered.all():
+                # 设备不存在或查询设备表失败的采样本批不判断
+                logger.warning(f"设备 {sorted(set(device_ids[~registered].tolist()))} 未登记，跳过阈值判断")
+                rows, matrix, times = rows[registered], matrix[registered], times[registered]
+            order = np.argsort(times, kind='stable')
+            events = []
+            # 同一批次中同一设备有多个采样时按时间分轮处理，保证持续时间状态按顺序推进
+            while len(order):
+                _, first = np.unique(rows[order], return_index=True)
+                chunk = order[first]
+                events.extend(self._evaluate_chunk(rows[chunk], matrix[chunk], times[chunk]))
+                order = np.delete(order, first)
+            return events
+
+    def _evaluate_chunk(self, rows: np.ndarray, values: np.ndarray, times: np.ndarray) -> List[Dict]:
+        """判断一组行号互不相同的采样"""
+        now = times[:, None]
+        warning = self._warning[rows]
+        critical = self._critical[rows]
+        start = self._violation_start[rows]
+        last_alert = self._last_alert[rows]
+
+        with np.errstate(invalid='ignore'):
+            valid = ~np.isnan(values) & ~np.isnan(warning)
+            above = valid & (values >= warning)
+            cleared = valid & (values < self._clear[rows])
+            start = np.where(cleared, np.nan, start)
+            start = np.where(above & np.isnan(start), now, start)
+            fire = above & (now - start >= self._duration[rows]) & ~(now - last_alert < self.silence_period)
+
+        self._violation_start[rows] = start
+        if not fire.any():
+            return []
+        self._last_alert[rows] = np.where(fire, now, last_alert)
+
+        events = []
+        for i, column in zip(*np.nonzero(fire)):
+            row = rows[i]
+            is_critical = values[i, column] >= critical[i, column]
+            events.append({
+                'device_id': self._device_ids[row],
+                'device_name': self._device_names[row],
+                'threshold_type': METRIC_TYPES[column],
+                'level': LEVELS[2 if is_critical else 1],
+                'value': float(values[i, column]),
+                'threshold': float(critical[i, column] if is_critical else warning[i, column]),
+                'timestamp': float(times[i])
+            })
+        return events
+
+    def set_last_alert(self, device_id: int, metric: str, timestamp: float):
+        """设置最后告警时间（其他进程已经发出同一告警时同步静默期）"""
+        with self._lock:
+            if device_id < len(self._row_of) and self._row_of[device_id] >= 0:
+                self._last_alert[self._row_of[device_id], METRICS.index(metric)] = timestamp
+
+    def reset(self):
+        """清除所有设备的违反状态和最后告警时间"""
+        with self._lock:
+            self._violation_start[:] = np.nan
+            self._last_alert[:] = np.nan
 
 class ThresholdManager:
     """阈值管理器"""
     
     # 默认阈值规则
     default_rules = [
-        ThresholdRule(ThresholdType.CPU, 75.0, 90.0, 60),
-        ThresholdRule(ThresholdType.MEMORY, 80.0, 95.0, 60),
-        ThresholdRule(ThresholdType.BANDWIDTH, 70.0, 90.0, 300)
+        ThresholdRule(ThresholdType.CPU, 75.0, 90.0, 60, hysteresis=5.0),
+        ThresholdRule(ThresholdType.MEMORY, 80.0, 95.0, 60, hysteresis=5.0),
+        ThresholdRule(ThresholdType.BANDWIDTH, 70.0, 90.0, 300, hysteresis=5.0)
     ]
     
     # 自定义规则
@@ -78,17 +422,130 @@ class ThresholdManager:
     # 告警静默期（秒）- 防止频繁告警
     alert_silence_period = 1800  # 30分钟
     
-    # 最后一次告警时间
-    last_alert_time: Dict[str, Dict[int, datetime]] = {
-        ThresholdType.CPU.value: {},
-        ThresholdType.MEMORY.value: {},
-        ThresholdType.BANDWIDTH.value: {}
-    }
+    # 编译后的判断引擎
+    engine = ThresholdEngine(alert_silence_period)
+    
+    # 阈值表中的规则：阈值ID -> 规则
+    stored_rules: Dict[int, ThresholdRule] = {}
+    
+    # 检查其他进程阈值变更的间隔（秒）
+    rule_sync_interval = 5
+    _changelog_seq = 0
+    _device_seq = 0
+    _last_sync = 0.0
+    
+    @classmethod
+    def compile_rules(cls):
+        """重新编译规则索引（全量重建）"""
+        cls.engine.silence_period = cls.alert_silence_period
+        cls.engine.compile(cls.default_rules, cls.custom_rules + list(cls.stored_rules.values()))
+    
+    @classmethod
+    def rule_from_threshold(cls, threshold: Dict) -> Optional[ThresholdRule]:
+        """
+        将阈值表中的一行转换为规则，持续时间和滞回宽度沿用该指标的默认规则
+        
+        Args:
+            threshold: {'id', 'device_id', 'metric_name', 'warning_threshold', 'critical_threshold'}
+        """
+        try:
+            threshold_type = ThresholdType(threshold['metric_name'])
+        except ValueError:
+            logger.warning(f"阈值 {threshold['id']} 的指标 {threshold['metric_name']} 不支持，已忽略")
+            return None
+        default = next((rule for rule in cls.default_rules if rule.threshold_type == threshold_type), None)
+        return ThresholdRule(
+            threshold_type,
+            threshold['warning_threshold'],
+            threshold['critical_threshold'],
+            duration=default.duration if default else 0,
+            device_id=threshold['device_id'],
+            hysteresis=default.hysteresis if default else 0.0
+        )
+    
+    @classmethod
+    def load_stored_rules(cls) -> int:
+        """
+        从阈值表加载全部规则（启动时调用，需要应用上下文）
+        
+        Returns:
+            加载的规则数量
+        """
+        cls._changelog_seq = get_local_store().last_seq(THRESHOLD_TOPIC)
+        cls._device_seq = get_local_store().last_seq(DEVICE_TOPIC)
+        cls._last_sync = time.time()
+        rows = db.session.query(
+            Threshold.id, Threshold.device_id, Threshold.metric_name,
+            Threshold.warning_threshold, Threshold.critical_threshold
+        ).all()
+        cls.stored_rules = {}
+        for row in rows:
+            rule = cls.rule_from_threshold(row._asdict())
+            if rule:
+                cls.stored_rules[row.id] = rule
+        cls.compile_rules()
+        logger.info(f"已从阈值表加载 {len(cls.stored_rules)} 条阈值规则")
+        return len(cls.stored_rules)
+    
+    @classmethod
+    def apply_threshold_change(cls, op: str, threshold: Dict):
+        """
+        增量应用阈值表的一条变更（重复应用结果相同）
+        
+        Args:
+            op: 'put' 或 'delete'
+            threshold: 阈值行，delete 时只需要 'id'
+        """
+        old = cls.stored_rules.pop(threshold['id'], None)
+        if old is not None:
+            cls.engine.drop_rule(old)
+        if op == 'put':
+            rule = cls.rule_from_threshold(threshold)
+            if rule:
+                cls.stored_rules[threshold['id']] = rule
+                cls.engine.put_rule(rule)
+    
+    @classmethod
+    def sync_stored_rules(cls, force: bool = False) -> int:
+        """
+        应用其他进程写入共享存储的阈值变更和设备名称、类型变更
+        
+        Returns:
+            应用的阈值变更数量
+        """
+        now = time.time()
+        if not force and now - cls._last_sync < cls.rule_sync_interval:
+            return 0
+        cls._last_sync = now
+        store = get_local_store()
+        for seq, change in store.changes_since(DEVICE_TOPIC, cls._device_seq):
+            cls.engine.invalidate_devices(change['device_ids'])
+            cls._device_seq = seq
+        changes = store.changes_since(THRESHOLD_TOPIC, cls._changelog_seq)
+        for seq, change in changes:
+            cls.apply_threshold_change(change['op'], change['threshold'])
+            cls._changelog_seq = seq
+        return len(changes)
+    
+    @classmethod
+    def publish_threshold_changes(cls, changes: List[tuple]):
+        """阈值表变更提交后：更新本进程的规则索引，并写入共享存储通知其他进程"""
+        store = get_local_store()
+        for op, threshold in changes:
+            cls.apply_threshold_change(op, threshold)
+            store.append_change(THRESHOLD_TOPIC, {'op': op, 'threshold': threshold})
+    
+    @classmethod
+    def publish_device_changes(cls, device_ids: List[int]):
+        """设备名称、类型变更或设备删除提交后：标记本进程的设备缓存过期，并写入共享存储通知其他进程"""
+        cls.engine.invalidate_devices(device_ids)
+        get_local_store().append_change(DEVICE_TOPIC, {'device_ids': device_ids})
     
     @classmethod
     def add_rule(cls, rule: ThresholdRule):
-        """添加自定义规则"""
+        """添加自定义规则（只在本进程内生效，需要持久化和多进程共享的规则写入阈值表）"""
         cls.custom_rules.append(rule)
+        cls.compile_rules()
         logger.info(f"添加阈值规则: {rule.threshold_type.value}, 警告={rule.warning_threshold}%, 严重={rule.critical_threshold}%")
     
     @classmethod
@@ -96,6 +553,7 @@ class ThresholdManager:
         """移除自定义规则"""
         if 0 <= index < len(cls.custom_rules):
             rule = cls.custom_rules.pop(index)
+            cls.compile_rules()
             logger.info(f"移除阈值规则: {rule.threshold_type.value}, 设备ID={rule.device_id or '所有'}")
             return True
         return False
@@ -107,17 +565,8 @@ class ThresholdManager:
     
     @classmethod
     def get_rules_for_device(cls, device_id: int) -> List[ThresholdRule]:
-        """获取适用于指定设备的规则"""
-        device_rules = [
-            rule for rule in cls.custom_rules 
-            if rule.enabled and (rule.device_id is None or rule.device_id == device_id)
-        ]
-        
-        # 如果没有设备特定规则，使用默认规则
-        if not any(rule.device_id == device_id for rule in device_rules):
-            device_rules.extend([rule for rule in cls.default_rules if rule.enabled])
-            
-        return device_rules
+        """获取指定设备每个指标生效的规则"""
+        return [rule for rule in cls.engine.rules_for(device_id) if rule is not None]
     
     @classmethod
     def check_thresholds(cls, record: PerformanceRecord):
@@ -127,98 +576,96 @@ class ThresholdManager:
         Args:
             record: 性能记录
         """
-        device_id = record.device_id
-        rules = cls.get_rules_for_device(device_id)
-        current_time = datetime.now()
+        cls.check_batch([record])
+    
+    @classmethod
+    def check_batch(cls, records: List[PerformanceRecord], timestamps: Optional[List[float]] = None) -> int:
+        """
+        批量检查性能记录是否超过阈值，超过的生成告警
         
-        for rule in rules:
-            # 获取对应的性能值
-            if rule.threshold_type == ThresholdType.CPU:
-                value = record.cpu_usage
-            elif rule.threshold_type == ThresholdType.MEMORY:
-                value = record.memory_usage
-            elif rule.threshold_type == ThresholdType.BANDWIDTH:
-                value = record.bandwidth_usage
-            else:
-                continue
-            
-            # 检查是否超过阈值
-            if value >= rule.critical_threshold:
-                level = AlertLevel.CRITICAL
-                threshold = rule.critical_threshold
-            elif value >= rule.warning_threshold:
-                level = AlertLevel.WARNING
-                threshold = rule.warning_threshold
-            else:
-                # 如果不超过阈值，重置违反开始时间
-                if device_id in rule.violation_start_time:
-                    del rule.violation_start_time[device_id]
-                continue
-            
-            # 记录开始违反阈值的时间
-            if device_id not in rule.violation_start_time:
-                rule.violation_start_time[device_id] = current_time
-            
-            # 检查是否已经超过持续时间
-            violation_duration = (current_time - rule.violation_start_time[device_id]).total_seconds()
-            if violation_duration < rule.duration:
-                continue
-            
-            # 检查是否在静默期内
-            threshold_type = rule.threshold_type.value
-            last_alert = cls.last_alert_time.get(threshold_type, {}).get(device_id)
-            if last_alert and (current_time - last_alert).total_seconds() < cls.alert_silence_period:
-                continue
-            
-            # 创建告警
-            cls._create_alert(device_id, rule.threshold_type, value, threshold, level)
+        Args:
+            records: 性能记录列表
+            timestamps: 每条记录的判断时间(秒)，默认为当前时间
             
-            # 更新最后告警时间
-            if threshold_type not in cls.last_alert_time:
-                cls.last_alert_time[threshold_type] = {}
-            cls.last_alert_time[threshold_type][device_id] = current_time
+        Returns:
+            生成的告警数量
+        """
+        if not records:
+            return 0
+        try:
+            cls.sync_stored_rules()
+            events = cls.engine.evaluate(
+                [record.device_id for record in records],
+                {metric: [getattr(record, metric) for record in records] for metric in METRICS},
+                timestamps
+            )
+        except Exception as e:
+            logger.error(f"阈值判断失败: {str(e)}")
+            return 0
+        return cls._create_alerts(events)
+    
+    @classmethod
+    def _claim_alert(cls, event: Dict) -> bool:
+        """在共享存储中声明告警，其他进程在静默期内已经发出同一告警时返回False"""
+        metric = event['threshold_type'].value
+        claimed, claimed_at = get_local_store().claim(
+            ALERT_SILENCE_NAMESPACE, f"{event['device_id']}:{metric}",
+            now=event['timestamp'], ttl=cls.alert_silence_period
+        )
+        if not claimed:
+            cls.engine.set_last_alert(event['device_id'], metric, claimed_at)
+        return claimed
     
     @classmethod
-    def _create_alert(cls, device_id: int, threshold_type: ThresholdType, value: float, 
-                      threshold: float, level: AlertLevel):
-        """创建告警记录"""
+    def _release_alert(cls, event: Dict):
+        """撤销本进程对告警的声明，并清除引擎中的最后告警时间"""
+        metric = event['threshold_type'].value
+        get_local_store().release(ALERT_SILENCE_NAMESPACE, f"{event['device_id']}:{metric}", event['timestamp'])
+        cls.engine.set_last_alert(event['device_id'], metric, np.nan)
+    
+    @classmethod
+    def _create_alerts(cls, events: List[Dict]) -> int:
+        """把告警事件放入批量写入缓冲"""
+        rows = []
+        claimed = []
+        for event in events:
+            if event['device_name'] is None:
+                logger.error(f"无法创建告警：设备 {event['device_id']} 不存在")
+                continue
+            # 通过校验后才声明静默期，被丢弃的告警不占用静默期
+            if not cls._claim_alert(event):
+                continue
+            claimed.append(event)
+            threshold_type = event['threshold_type']
+            alert_message = f"{ALERT_TYPE_NAMES.get(threshold_type, '性能告警')}: " \
+                           f"当前值 {event['value']:.1f}% 超过阈值 {event['threshold']:.1f}%"
+            rows.append({
+                'device_id': event['device_id'],
+                'alert_type': threshold_type.value,
+                'alert_level': event['level'].value,
+                'message': alert_message,
+                'value': event['value'],
+                'threshold': event['threshold'],
+                'created_at': datetime.now(),
+                'acknowledged': False
+            })
+            logger.warning(f"设备 {event['device_name']} [{event['device_id']}] 生成告警: {alert_message}")
+        
+        if not rows:
+            return 0
         try:
-            device = Device.query.get(device_id)
-            if not device:
-                logger.error(f"无法创建告警：设备 {device_id} 不存在")
-                return
-                
-            alert_type_map = {
-                ThresholdType.CPU: "CPU使用率过高",
-                ThresholdType.MEMORY: "内存使用率过高",
-                ThresholdType.BANDWIDTH: "带宽使用率过高"
-            }
-            
-            alert_message = f"{alert_type_map.get(threshold_type, '性能告警')}: " \
-                           f"当前值 {value:.1f}% 超过阈值 {threshold:.1f}%"
-            
-            # 创建告警记录
-            alert = Alert(
-                device_id=device_id,
-                alert_type=threshold_type.value,
-                alert_level=level.value,
-                message=alert_message,
-                value=value,
-                threshold=threshold,
-                created_at=datetime.now(),
-                acknowledged=False
-            )
-            
-            db.session.add(alert)
-            db.session.commit()
-            
-            logger.warning(f"设备 {device.name} [{device_id}] 生成告警: {alert_message}")
-            
+            # 告警记录放入批量写入缓冲，与性能采样一起批量写入
+            added = get_write_buffer().add_many(Alert, rows)
             # TODO: 可以在这里添加告警通知逻辑（邮件、短信等）
-            
         except Exception as e:
             db.session.rollback()
             logger.error(f"创建告警记录失败: {str(e)}")
+            added = 0
+        if not added:
+            # 告警没有写入，释放静默期声明，下次超过阈值时重新告警
+            for event in claimed:
+                cls._release_alert(event)
+        return added
     
     @classmethod
     def get_active_alerts(cls, device_id: Optional[int] = None) -> List[Dict]:
@@ -232,12 +679,27 @@ class ThresholdManager:
             活跃告警列表
         """
         try:
-            query = Alert.query.filter_by(acknowledged=False)
+            # 只取需要的列，并一次关联出设备名称（避免每条告警加载一次设备）
+            query = db.session.query(
+                Alert.id, Alert.device_id, Alert.alert_type, Alert.alert_level, Alert.message,
+                Alert.value, Alert.threshold, Alert.created_at, Device.name.label('device_name')
+            ).outerjoin(Device, Device.id == Alert.device_id).filter(Alert.acknowledged == False)
             if device_id is not None:
-                query = query.filter_by(device_id=device_id)
+                query = query.filter(Alert.device_id == device_id)
                 
             alerts = query.order_by(Alert.created_at.desc()).all()
-            return [alert.to_dict() for alert in alerts]
+            return [{
+                'id': alert.id,
+                'device_id': alert.device_id,
+                'device_name': alert.device_name or f"设备{alert.device_id}",
+                'alert_type': alert.alert_type,
+                'alert_level': alert.alert_level,
+                'message': alert.message,
+                'value': alert.value,
+                'threshold': alert.threshold,
+                'created_at': alert.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'acknowledged': False
+            } for alert in alerts]
         except Exception as e:
             logger.error(f"获取活跃告警失败: {str(e)}")
             return []
@@ -267,4 +729,127 @@ class ThresholdManager:
         except Exception as e:
             db.session.rollback()
             logger.error(f"确认告警失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False 
+
+
+
+# 编译默认规则
+ThresholdManager.compile_rules()
+
+
+# ---------- 阈值表变更同步 ----------
+
+def _threshold_snapshot(target: Threshold) -> Dict:
+    return {
+        'id': target.id,
+        'device_id': target.device_id,
+        'metric_name': target.metric_name,
+        'warning_threshold': target.warning_threshold,
+        'critical_threshold': target.critical_threshold
+    }
+
+
+PENDING_KEYS = ('threshold_changes', 'threshold_device_changes')  # session.info 中待提交变更的键
+
+
+def _record_pending(target: Any, key: str, change: Any):
+    """
+    记录会话中待提交的变更，提交成功后再应用；
+    同时记下所在的保存点，回滚保存点时只丢弃保存点内的变更
+    """
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(key, []).append((session.get_nested_transaction(), change))
+
+
+def _pop_pending(session: Session, key: str) -> List:
+    return [change for _, change in session.info.pop(key, [])]
+
+
+def _within(transaction: Any, ancestor: Any) -> bool:
+    """transaction 是否为 ancestor 或其内部的保存点"""
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+def _record_threshold_change(target: Threshold, op: str):
+    """记录会话中待提交的阈值变更，提交成功后再应用"""
+    _record_pending(target, 'threshold_changes', (op, _threshold_snapshot(target)))
+
+
+@sqla_event.listens_for(Threshold, 'after_insert')
+@sqla_event.listens_for(Threshold, 'after_update')
+def _on_threshold_saved(mapper, connection, target):
+    _record_threshold_change(target, 'put')
+
+
+@sqla_event.listens_for(Threshold, 'after_delete')
+def _on_threshold_deleted(mapper, connection, target):
+    _record_threshold_change(target, 'delete')
+
+
+@sqla_event.listens_for(Device, 'after_update')
+def _on_device_updated(mapper, connection, target):
+    state = sqla_inspect(target)
+    if state.attrs.name.history.has_changes() or state.attrs.type_id.history.has_changes():
+        _record_device_change(target)
+
+
+@sqla_event.listens_for(Device, 'after_delete')
+def _on_device_deleted(mapper, connection, target):
+    _record_device_change(target)
+
+
+def _record_device_change(target: Device):
+    """记录会话中待提交的设备变更，提交成功后再通知阈值引擎"""
+    _record_pending(target, 'threshold_device_changes', target.id)
+
+
+@sqla_event.listens_for(Session, 'after_commit')
+def _on_session_commit(session):
+    changes = _pop_pending(session, 'threshold_changes')
+    if changes:
+        try:
+            ThresholdManager.publish_threshold_changes(changes)
+        except Exception as e:
+            logger.error(f"同步阈值变更失败: {str(e)}")
+    device_ids = _pop_pending(session, 'threshold_device_changes')
+    if device_ids:
+        try:
+            ThresholdManager.publish_device_changes(sorted(set(device_ids)))
+        except Exception as e:
+            logger.error(f"同步设备变更失败: {str(e)}")
+
+
+@sqla_event.listens_for(Session, 'after_soft_rollback')
+def _on_session_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        # 最外层事务回滚：丢弃全部待提交变更
+        for key in PENDING_KEYS:
+            session.info.pop(key, None)
+    elif previous_transaction.nested:
+        # 保存点回滚：只丢弃保存点内记录的变更
+        for key in PENDING_KEYS:
+            if key in session.info:
+                session.info[key] = [
+                    (transaction, change) for transaction, change in session.info[key]
+                    if not _within(transaction, previous_transaction)
+                ]
+
+
+def init_thresholds(app):
+    """
+    从阈值表加载规则
+
+    Args:
+        app: Flask应用实例
+    """
+    with app.app_context():
+        try:
+            ThresholdManager.load_stored_rules()
+        except Exception as e:
+            logger.error(f"加载阈值规则失败: {str(e)}")
+
@@ -0,0 +1,635 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能指标时序存储模块 - 原始采样短期保留，并持续降采样为1分钟/5分钟/1小时的最小/平均/最大值
+
+原始采样写入 performance_records（CPU/内存/带宽）和 metric_samples（接口速率等其他指标），
+只保留 RAW_RETENTION_HOURS 小时。降采样任务由轮询调度器定期执行，按分辨率从细到粗汇总已结束的时间桶：
+1分钟桶来自原始采样，5分钟和1小时桶来自上一级桶（按样本数加权平均），结果写入 performance_rollups。
+查询时根据时间范围自动选择分辨率，使返回的点数不超过 max_points；
+尚未汇总的最近一段时间直接从原始采样按同样的时间桶聚合补齐。
+
+降采样和清理任务在每个工作进程中注册，但通过本机共享存储的声明保证每个周期只有一个进程执行。
+清理原始采样前先重新汇总将被删除的时间桶，汇总后才写入的迟到采样也会计入降采样数据。
+需要原始采样保留期之前数据的查询使用 load_history，更早的部分读取降采样数据。
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+from sqlalchemy import func, cast, delete, insert, Integer, BigInteger, literal_column
+
+from src.core.db import db
+from src.models.performance import PerformanceRecord, MetricSample, PerformanceRollup
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+RAW_RESOLUTION = 0  # 原始采样
+RAW_RETENTION_HOURS = int(os.environ.get('TIMESERIES_RAW_RETENTION_HOURS') or 168)  # 原始采样保留时间(小时)
+
+# 降采样分辨率(秒)及保留天数，按从细到粗排列
+ROLLUP_TIERS = (
+    (60, 30),
+    (300, 90),
+    (3600, 730),
+)
+
+RAW_QUERY_MAX_SPAN = 3600  # 查询范围不超过该值(秒)时直接返回原始采样
+DEFAULT_MAX_POINTS = 2000  # 单条曲线最多返回的点数
+ROLLUP_INTERVAL = 60  # 降采样任务执行间隔(秒)
+ROLLUP_LAG = 30  # 时间桶结束后等待迟到采样的时间(秒)
+ROLLUP_JOB_ID = 'timeseries:rollup'
+ROLLUP_CLAIM = ('timeseries', 'maintenance')  # 本机共享存储中降采样任务的声明（命名空间, 键）
+
+# 保存在 performance_records 表中的指标，其余指标保存在 metric_samples 表
+RECORD_METRICS = ('cpu_usage', 'memory_usage', 'bandwidth_usage')
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def floor_time(value: datetime, seconds: int) -> datetime:
+    """将时间向下取整到时间桶起点（与数据库端 bucket_expression 的取整方式一致）"""
+    offset = int((value - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
+
+
+def _ceil_time(value: datetime, seconds: int) -> datetime:
+    """将时间向上取整到时间桶边界"""
+    floored = floor_time(value, seconds)
+    return floored if floored == value else floored + timedelta(seconds=seconds)
+
+
+def bucket_expression(column: Any, seconds: int, dialect_name: str) -> Any:
+    """
+    构造数据库端的时间桶表达式，返回时间桶起点距1970-01-01的秒数
+
+    时间字段按不带时区的本地时间存储，各数据库都按字面值换算成秒数，不做时区转换。
+
+    Args:
+        column: 时间字段
+        seconds: 时间桶长度(秒)
+        dialect_name: 数据库方言名称，如 sqlite/postgresql/mysql
+    """
+    if dialect_name == 'sqlite':
+        # 只取到秒：strftime('%s') 会把小数秒四舍五入，导致桶边界附近的采样落入下一个桶
+        epoch = cast(func.strftime('%s', func.substr(column, 1, 19)), Integer)
+    elif dialect_name in ('mysql', 'mariadb'):
+        epoch = func.timestampdiff(literal_column('SECOND'), literal_column("'1970-01-01'"), column)
+    else:
+        epoch = cast(func.floor(func.extract('epoch', column)), BigInteger)
+    return epoch - epoch % seconds
+
+
+def interface_metrics(interfaces: Dict) -> Dict[str, float]:
+    """
+    将接口统计信息转换为时序指标 {if:<接口名>:in/out: bps}，没有速率的接口跳过
+
+    Args:
+        interfaces: 接口统计信息字典（get_interface_stats / collect_interface_stats 的返回值）
+    """
+    metrics = {}
+    for name, data in (interfaces or {}).items():
+        if data.get('input_rate') is not None:
+            metrics[f'if:{name}:in'] = data['input_rate']
+        if data.get('output_rate') is not None:
+            metrics[f'if:{name}:out'] = data['output_rate']
+    return metrics
+
+
+class TimeSeriesStore:
+    """性能指标时序存储：原始采样写入、分级降采样、过期清理和按范围自动选择分辨率的查询"""
+
+    def __init__(self, raw_retention_hours: int = RAW_RETENTION_HOURS,
+                 tiers: Iterable[Tuple[int, int]] = ROLLUP_TIERS,
+                 max_points: int = DEFAULT_MAX_POINTS,
+                 maintenance_interval: int = ROLLUP_INTERVAL):
+        """
+        初始化
+
+        Args:
+            raw_retention_hours: 原始采样保留时间(小时)
+            tiers: [(分辨率秒, 保留天数)]，按从细到粗排列
+            max_points: 查询时单条曲线最多返回的点数
+            maintenance_interval: 降采样任务执行间隔(秒)，用于多进程间声明执行权
+        """
+        self.raw_retention = timedelta(hours=raw_retention_hours)
+        self.tiers = tuple(sorted(tiers))
+        self.max_points = max_points
+        self.maintenance_interval = maintenance_interval
+        self._rollup_lock = threading.Lock()
+
+    # ---------- 写入 ----------
+
+    def record(self, device_id: int, metrics: Dict[str, Optional[float]],
+               recorded_at: Optional[datetime] = None, commit: bool = True) -> Optional[PerformanceRecord]:
+        """
+        写入一次采样
+
+        Args:
+            device_id: 设备ID
+            metrics: {指标名: 值}，cpu_usage/memory_usage/bandwidth_usage 写入性能记录表，其余写入 metric_samples
+            recorded_at: 采样时间，默认当前时间
+            commit: 是否提交事务
+
+        Returns:
+            新建的性能记录（没有CPU/内存/带宽指标时为None）
+        """
+        values, samples = self._sample_rows(device_id, metrics, recorded_at or datetime.now())
+
+        record = None
+        if values:
+            record = PerformanceRecord(**values)
+            db.session.add(record)
+        if samples:
+            db.session.execute(insert(MetricSample), samples)
+
+        if commit:
+            db.session.commit()
+        return record
+
+    def enqueue(self, device_id: int, metrics: Dict[str, Optional[float]],
+                recorded_at: Optional[datetime] = None) -> bool:
+        """
+        通过批量写入缓冲写入一次采样（采集线程使用，不占用数据库写锁）
+
+        缓冲每隔几秒写入一次，远小于降采样等待迟到采样的时间 ROLLUP_LAG。
+
+        Returns:
+            采样是否已进入队列（队列已满被丢弃时返回False）
+        """
+        from src.modules.performance.write_buffer import get_write_buffer
+
+        values, samples = self._sample_rows(device_id, metrics, recorded_at or datetime.now())
+        write_buffer = get_write_buffer()
+        accepted = True
+        if values:
+            accepted = write_buffer.add(PerformanceRecord, values)
+        if samples:
+            accepted = write_buffer.add_many(MetricSample, samples) == len(samples) and accepted
+        return accepted
+
+    @staticmethod
+    def _sample_rows(device_id: int, metrics: Dict[str, Optional[float]],
+                     recorded_at: datetime) -> Tuple[Optional[Dict], List[Dict]]:
+        """将一次采样拆分为性能记录行和指标采样行"""
+        values = {name: metrics.get(name) for name in RECORD_METRICS}
+        record_row = None
+        if any(value is not None for value in values.values()):
+            record_row = dict(values, device_id=device_id, recorded_at=recorded_at)
+
+        samples = [
+            {'device_id': device_id, 'metric': name[:64], 'value': float(value), 'recorded_at': recorded_at}
+            for name, value in metrics.items()
+            if name not in RECORD_METRICS and value is not None
+        ]
+        return record_row, samples
+
+    # ---------- 降采样 ----------
+
+    def rollup(self, now: Optional[datetime] = None) -> Dict[int, int]:
+        """
+        汇总所有已结束且尚未汇总的时间桶
+
+        Args:
+            now: 当前时间，默认 datetime.now()
+
+        Returns:
+            {分辨率: 写入的时间桶数}
+        """
+        now = now or datetime.now()
+        written = {}
+
+        with self._rollup_lock:
+            source = RAW_RESOLUTION
+            for resolution, _ in self.tiers:
+                end = floor_time(now - timedelta(seconds=ROLLUP_LAG), resolution)
+                start = self._rollup_start(resolution, source)
+                written[resolution] = 0
+                if start is not None and start < end:
+                    written[resolution] = self._write_buckets(source, resolution, start, end)
+                source = resolution
+
+        return written
+
+    def _write_buckets(self, source: int, resolution: int, start: datetime, end: datetime) -> int:
+        """从源数据重新汇总 [start, end) 内的时间桶，返回写入的时间桶数"""
+        if source == RAW_RESOLUTION:
+            rows = self._aggregate_raw(start, end, resolution)
+        else:
+            rows = self._aggregate_tier(source, start, end, resolution)
+
+        # 先删除再写入，重复执行同一时间范围时结果不变
+        db.session.execute(delete(PerformanceRollup).where(
+            PerformanceRollup.resolution == resolution,
+            PerformanceRollup.bucket_start >= start,
+            PerformanceRollup.bucket_start < end
+        ))
+        if rows:
+            db.session.execute(insert(PerformanceRollup), [
+                dict(row, resolution=resolution) for row in rows
+            ])
+        db.session.commit()
+        return len(rows)
+
+    def _rolled_until(self, resolution: int) -> Optional[datetime]:
+        """已汇总到的时间（最后一个时间桶的结束时间），尚未汇总时返回None"""
+        last = db.session.query(func.max(PerformanceRollup.bucket_start)).filter(
+            PerformanceRollup.resolution == resolution
+        ).scalar()
+        return last + timedelta(seconds=resolution) if last is not None else None
+
+    def refresh_rollups(self, start: datetime, end: datetime) -> Dict[int, int]:
+        """
+        重新汇总已汇总范围内 [start, end) 的时间桶（逐级向上刷新覆盖该范围的粗粒度时间桶），
+        使汇总后才写入的迟到采样计入降采样数据
+
+        Returns:
+            {分辨率: 写入的时间桶数}
+        """
+        written = {}
+        with self._rollup_lock:
+            source = RAW_RESOLUTION
+            for resolution, _ in self.tiers:
+                rolled_until = self._rolled_until(resolution)
+                if rolled_until is None:
+                    break
+                start = floor_time(start, resolution)
+                end = min(_ceil_time(end, resolution), rolled_until)
+                if start >= end:
+                    break
+                written[resolution] = self._write_buckets(source, resolution, start, end)
+                source = resolution
+        return written
+
+    def aggregate_pending(self, start: datetime, end: datetime, resolution: int,
+                          metrics: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        所有设备在 [start, end) 内尚未汇总的部分（最后一个已完成的时间桶之后）从原始采样按时间桶聚合
+
+        Returns:
+            与降采样数据字段相同的行
+        """
+        pending_since = max(_ceil_time(start, resolution), self._rolled_until(resolution) or EPOCH)
+        if pending_since >= end:
+            return []
+        return self._aggregate_raw(pending_since, end, resolution, metrics=metrics)
+
+    def _rollup_start(self, resolution: int, source: int) -> Optional[datetime]:
+        """确定本次汇总的起点：上次汇总的最后一个时间桶之后，首次汇总时从最早的源数据开始"""
+        rolled_until = self._rolled_until(resolution)
+        if rolled_until is not None:
+            return rolled_until
+
+        if source == RAW_RESOLUTION:
+            earliest = [
+                db.session.query(func.min(PerformanceRecord.recorded_at)).scalar(),
+                db.session.query(func.min(MetricSample.recorded_at)).scalar()
+            ]
+            earliest = [value for value in earliest if value is not None]
+            if not earliest:
+                return None
+            # 首次汇总包含全部已有的原始采样，升级前积累的历史数据在清理前先转存为降采样数据
+            start = min(earliest)
+        else:
+            start = db.session.query(func.min(PerformanceRollup.bucket_start)).filter(
+                PerformanceRollup.resolution == source
+            ).scalar()
+            if start is None:
+                return None
+        return floor_time(start, resolution)
+
+    def _aggregate_raw(self, start: datetime, end: datetime, resolution: int,
+                       device_id: Optional[int] = None,
+                       metrics: Optional[Iterable[str]] = None) -> List[Dict]:
+        """在数据库中按时间桶聚合原始采样"""
+        dialect_name = db.session.get_bind().dialect.name
+        metrics = list(metrics) if metrics is not None else None
+        record_metrics = [name for name in RECORD_METRICS if metrics is None or name in metrics]
+        sample_metrics = None if metrics is None else [name for name in metrics if name not in RECORD_METRICS]
+        rows = []
+
+        if record_metrics:
+            bucket = bucket_expression(PerformanceRecord.recorded_at, resolution, dialect_name).label('bucket')
+            columns = []
+            for name in record_metrics:
+                column = getattr(PerformanceRecord, name)
+                columns.extend([func.min(column), func.avg(column), func.max(column), func.count(column)])
+
+            query = db.session.query(PerformanceRecord.device_id, bucket, *columns).filter(
+                PerformanceRecord.recorded_at >= start,
+                PerformanceRecord.recorded_at < end
+            )
+            if device_id is not None:
+                query = query.filter(PerformanceRecord.device_id == device_id)
+
+            for result in query.group_by(PerformanceRecord.device_id, bucket).all():
+                bucket_start = EPOCH + timedelta(seconds=int(result[1]))
+                for i, name in enumerate(record_metrics):
+                    min_value, avg_value, max_value, count = result[2 + i * 4:6 + i * 4]
+                    if count:
+                        rows.append(self._row(result[0], name, bucket_start, min_value, avg_value, max_value, count))
+
+        if sample_metrics is None or sample_metrics:
+            bucket = bucket_expression(MetricSample.recorded_at, resolution, dialect_name).label('bucket')
+            query = db.session.query(
+                MetricSample.device_id, MetricSample.metric, bucket,
+                func.min(MetricSample.value), func.avg(MetricSample.value),
+                func.max(MetricSample.value), func.count(MetricSample.value)
+            ).filter(
+                MetricSample.recorded_at >= start,
+                MetricSample.recorded_at < end
+            )
+            if device_id is not None:
+                query = query.filter(MetricSample.device_id == device_id)
+            if sample_metrics:
+                query = query.filter(MetricSample.metric.in_(sample_metrics))
+
+            for result in query.group_by(MetricSample.device_id, MetricSample.metric, bucket).all():
+                if result[6]:
+                    rows.append(self._row(result[0], result[1], EPOCH + timedelta(seconds=int(result[2])), *result[3:]))
+
+        return rows
+
+    def _aggregate_tier(self, source: int, start: datetime, end: datetime, resolution: int) -> List[Dict]:
+        """在数据库中将细粒度时间桶合并为粗粒度时间桶（平均值按样本数加权）"""
+        dialect_name = db.session.get_bind().dialect.name
+        bucket = bucket_expression(PerformanceRollup.bucket_start, resolution, dialect_name).label('bucket')
+        total = func.sum(PerformanceRollup.sample_count)
+
+        query = db.session.query(
+            PerformanceRollup.device_id, PerformanceRollup.metric, bucket,
+            func.min(PerformanceRollup.min_value),
+            func.sum(PerformanceRollup.avg_value * PerformanceRollup.sample_count) / total,
+            func.max(PerformanceRollup.max_value),
+            total
+        ).filter(
+            PerformanceRollup.resolution == source,
+            PerformanceRollup.bucket_start >= start,
+            PerformanceRollup.bucket_start < end
+        ).group_by(PerformanceRollup.device_id, PerformanceRollup.metric, bucket)
+
+        return [
+            self._row(result[0], result[1], EPOCH + timedelta(seconds=int(result[2])), *result[3:])
+            for result in query.all() if result[6]
+        ]
+
+    @staticmethod
+    def _row(device_id, metric, bucket_start, min_value, avg_value, max_value, count) -> Dict:
+        return {
+            'device_id': device_id,
+            'metric': metric,
+            'bucket_start': bucket_start,
+            'min_value': min_value,
+            'avg_value': float(avg_value) if avg_value is not None else None,
+            'max_value': max_value,
+            'sample_count': int(count)
+        }
+
+    # ---------- 清理 ----------
+
+    def purge(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        删除超过保留时间的原始采样和降采样数据
+
+        尚未汇总的原始采样不会被删除；删除前重新汇总将被删除的时间桶，汇总之后才写入的迟到采样
+        也会计入降采样数据。删除边界对齐到最细分辨率的时间桶，时间桶不会只剩一部分原始采样。
+
+        Returns:
+            {表/分辨率: 删除行数}
+        """
+        now = now or datetime.now()
+        deleted = {}
+
+        raw_cutoff = now - self.raw_retention
+        if self.tiers:
+            first_resolution = self.tiers[0][0]
+            raw_cutoff = floor_time(min(raw_cutoff, self._rolled_until(first_resolution) or EPOCH),
+                                    first_resolution)
+            earliest = [
+                db.session.query(func.min(PerformanceRecord.recorded_at)).scalar(),
+                db.session.query(func.min(MetricSample.recorded_at)).scalar()
+            ]
+            earliest = [value for value in earliest if value is not None]
+            if earliest and min(earliest) < raw_cutoff:
+                self.refresh_rollups(min(earliest), raw_cutoff)
+
+        deleted['performance_records'] = db.session.execute(
+            delete(PerformanceRecord).where(PerformanceRecord.recorded_at < raw_cutoff)
+        ).rowcount
+        deleted['metric_samples'] = db.session.execute(
+            delete(MetricSample).where(MetricSample.recorded_at < raw_cutoff)
+        ).rowcount
+
+        for resolution, retention_days in self.tiers:
+            deleted[f'rollup_{resolution}'] = db.session.execute(delete(PerformanceRollup).where(
+                PerformanceRollup.resolution == resolution,
+                PerformanceRollup.bucket_start < now - timedelta(days=retention_days)
+            )).rowcount
+
+        db.session.commit()
+        return deleted
+
+    # ---------- 查询 ----------
+
+    def choose_resolution(self, start: datetime, end: datetime, max_points: Optional[int] = None,
+                          now: Optional[datetime] = None) -> int:
+        """
+        根据时间范围选择分辨率：范围较短且仍在原始采样保留期内时返回原始采样，
+        否则返回点数不超过 max_points 且保留期覆盖起点的最细分辨率
+        """
+        max_points = max_points or self.max_points
+        now = now or datetime.now()
+        span = max((end - start).total_seconds(), 0)
+
+        if span <= RAW_QUERY_MAX_SPAN and start >= now - self.raw_retention:
+            return RAW_RESOLUTION
+        for resolution, retention_days in self.tiers:
+            if span / resolution <= max_points and start >= now - timedelta(days=retention_days):
+                return resolution
+        return self.tiers[-1][0] if self.tiers else RAW_RESOLUTION
+
+    def query(self, device_id: int, metrics: Iterable[str], start: datetime, end: datetime,
+              resolution: Optional[int] = None, max_points: Optional[int] = None) -> Dict:
+        """
+        查询设备指标曲线
+
+        Args:
+            device_id: 设备ID
+            metrics: 指标名列表
+            start: 开始时间
+            end: 结束时间
+            resolution: 分辨率(秒)，0表示原始采样，默认根据时间范围自动选择
+            max_points: 自动选择分辨率时单条曲线最多的点数
+
+        Returns:
+            {'resolution': 分辨率, 'timestamps': [时间桶起点], 'series': {指标: {'min': [], 'avg': [], 'max': []}}}
+            某个时间点缺少某个指标时对应位置为None
+        """
+        metrics = list(metrics)
+        if resolution is None:
+            resolution = self.choose_resolution(start, end, max_points)
+
+        points: Dict[datetime, Dict[str, Tuple]] = {}
+        if resolution == RAW_RESOLUTION:
+            self._query_raw(points, device_id, metrics, start, end)
+        else:
+            covered_until = floor_time(start, resolution)
+            rows = db.session.query(
+                PerformanceRollup.metric, PerformanceRollup.bucket_start,
+                PerformanceRollup.min_value, PerformanceRollup.avg_value, PerformanceRollup.max_value
+            ).filter(
+                PerformanceRollup.device_id == device_id,
+                PerformanceRollup.resolution == resolution,
+                PerformanceRollup.metric.in_(metrics),
+                PerformanceRollup.bucket_start >= covered_until,
+                PerformanceRollup.bucket_start < end
+            ).all()
+            for metric, bucket_start, min_value, avg_value, max_value in rows:
+                points.setdefault(bucket_start, {})[metric] = (min_value, avg_value, max_value)
+                covered_until = max(covered_until, bucket_start + timedelta(seconds=resolution))
+
+            # 最近尚未汇总的时间段从原始采样聚合
+            if covered_until < end:
+                for row in self._aggregate_raw(covered_until, end, resolution, device_id, metrics):
+                    points.setdefault(row['bucket_start'], {})[row['metric']] = (
+                        row['min_value'], row['avg_value'], row['max_value']
+                    )
+
+        timestamps = sorted(points)
+        series = {}
+        for metric in metrics:
+            values = [points[ts].get(metric, (None, None, None)) for ts in timestamps]
+            series[metric] = {
+                'min': [value[0] for value in values],
+                'avg': [value[1] for value in values],
+                'max': [value[2] for value in values]
+            }
+        return {'resolution': resolution, 'timestamps': timestamps, 'series': series}
+
+    @staticmethod
+    def _query_raw(points: Dict, device_id: int, metrics: List[str], start: datetime, end: datetime):
+        """读取原始采样（只选取需要的列）"""
+        record_metrics = [name for name in metrics if name in RECORD_METRICS]
+        sample_metrics = [name for name in metrics if name not in RECORD_METRICS]
+
+        if record_metrics:
+            rows = db.session.query(
+                PerformanceRecord.recorded_at, *[getattr(PerformanceRecord, name) for name in record_metrics]
+            ).filter(
+                PerformanceRecord.device_id == device_id,
+                PerformanceRecord.recorded_at >= start,
+                PerformanceRecord.recorded_at <= end
+            ).all()
+            for row in rows:
+                point = points.setdefault(row[0], {})
+                for name, value in zip(record_metrics, row[1:]):
+                    point[name] = (value, value, value)
+
+        if sample_metrics:
+            rows = db.session.query(MetricSample.recorded_at, MetricSample.metric, MetricSample.value).filter(
+                MetricSample.device_id == device_id,
+                MetricSample.metric.in_(sample_metrics),
+                MetricSample.recorded_at >= start,
+                MetricSample.recorded_at <= end
+            ).all()
+            for recorded_at, metric, value in rows:
+                points.setdefault(recorded_at, {})[metric] = (value, value, value)
+
+    def load_history(self, device_id: int, metrics: Iterable[str], start: datetime, end: datetime,
+                     now: Optional[datetime] = None) -> List[Tuple[datetime, Dict[str, Optional[float]]]]:
+        """
+        按时间顺序读取设备指标：原始采样保留期内返回原始采样，更早的部分返回降采样的平均值
+        （分辨率按该部分的时间范围自动选择）
+
+        Returns:
+            [(时间, {指标: 值})]
+        """
+        metrics = list(metrics)
+        now = now or datetime.now()
+        raw_since = max(start, now - self.raw_retention)
+        history = []
+
+        if start < raw_since and self.tiers:
+            resolution = self.choose_resolution(start, raw_since, now=now)
+            older = self.query(device_id, metrics, start, _ceil_time(raw_since, resolution), resolution=resolution)
+            for i, timestamp in enumerate(older['timestamps']):
+                history.append((timestamp, {name: older['series'][name]['avg'][i] for name in metrics}))
+            if history:
+                # 原始采样从最后一个降采样时间桶结束处开始，避免重复
+                raw_since = history[-1][0] + timedelta(seconds=resolution)
+
+        points: Dict[datetime, Dict[str, Tuple]] = {}
+        self._query_raw(points, device_id, metrics, raw_since, end)
+        for timestamp in sorted(points):
+            history.append((timestamp, {name: points[timestamp].get(name, (None,))[0] for name in metrics}))
+        return history
+
+    # ---------- 定时任务 ----------
+
+    def run_scheduled_maintenance(self) -> Optional[Dict]:
+        """
+        定时任务入口：每个工作进程都会调用，只有在本机共享存储中声明成功的进程执行本周期的降采样和清理
+
+        Returns:
+            执行结果，其他进程已执行时返回None
+        """
+        from src.core.local_store import get_local_store
+
+        claimed, _ = get_local_store().claim(*ROLLUP_CLAIM, now=time.time(), ttl=self.maintenance_interval * 0.8)
+        if not claimed:
+            return None
+        return self.run_maintenance()
+
+    def run_maintenance(self, now: Optional[datetime] = None) -> Dict:
+        """执行一次降采样和过期清理"""
+        try:
+            written = self.rollup(now)
+            deleted = self.purge(now)
+            logger.debug(f"时序数据降采样完成: 写入 {written}，清理 {deleted}")
+            return {'status': 'success', 'rollup': written, 'purged': deleted}
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"时序数据降采样出错: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return {'status': 'error', 'message': str(e)}
+
+
+# 全局时序存储实例
+_store = TimeSeriesStore()
+
+
+def get_timeseries_store() -> TimeSeriesStore:
+    """获取全局时序存储"""
+    return _store
+
+
+def init_timeseries(app):
+    """
+    按应用配置设置原始采样保留时间，并在轮询调度器中注册降采样任务
+
+    Args:
+        app: Flask应用实例
+    """
+    _store.raw_retention = timedelta(hours=app.config.get('TIMESERIES_RAW_RETENTION_HOURS', RAW_RETENTION_HOURS))
+    _store.maintenance_interval = app.config.get('TIMESERIES_ROLLUP_INTERVAL', ROLLUP_INTERVAL)
+    if not app.config.get('TIMESERIES_ROLLUP_ENABLED', True):
+        return
+
+    # 每个工作进程都注册，执行时通过本机共享存储的声明保证同一周期只有一个进程执行
+    from src.modules.performance.scheduler import get_poll_scheduler
+    get_poll_scheduler().add_job(
+        ROLLUP_JOB_ID,
+        _store.run_scheduled_maintenance,
+        interval=_store.maintenance_interval,
+        jitter=0,
+        app=app,
+        run_immediately=False
+    )
+    logger.info("已注册时序数据降采样任务")
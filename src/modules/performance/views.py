@@ -8,12 +8,14 @@
 from flask import Blueprint, render_template, jsonify, abort, request, redirect, url_for
 from flask_login import login_required
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 import random  # 用于生成模拟数据
 
 from src.core.db import db
 # 从统一位置导入所有模型
 from src.models import Device, PerformanceRecord, Threshold
 from src.modules.performance.models import PerformanceData, convert_to_performance_record
+from src.modules.performance.timeseries import get_timeseries_store, RECORD_METRICS
 
 # 创建蓝图
 performance_bp = Blueprint('performance', __name__, template_folder='templates')
@@ -102,12 +104,12 @@ def get_history_data(device_id):
         end_time = datetime.now()
         start_time = end_time - timedelta(hours=hours)
         
-        # 查询历史性能数据
-        records = PerformanceRecord.query.filter(
-            PerformanceRecord.device_id == device_id,
-            PerformanceRecord.recorded_at >= start_time,
-            PerformanceRecord.recorded_at <= end_time
-        ).order_by(PerformanceRecord.recorded_at).all()
+        # 查询历史性能数据（超出原始采样保留期的部分读取降采样数据）
+        records = [
+            SimpleNamespace(recorded_at=recorded_at, **values)
+            for recorded_at, values in get_timeseries_store().load_history(
+                device_id, RECORD_METRICS, start_time, end_time, now=end_time)
+        ]
         
         # 如果新模型没有数据，尝试从旧模型获取
         if not records:
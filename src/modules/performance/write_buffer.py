@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量写入缓冲模块 - 汇总所有采集线程的性能采样和告警，由后台线程批量写入数据库
+
+采集线程只把待写入的行放入内存队列，后台线程在积累到 batch_size 行或距上次写入超过 flush_interval 秒时，
+对每张表执行一次 executemany 批量插入并提交一次事务，避免每个采样一次提交、各监控线程争抢SQLite写锁。
+队列超过 max_pending 行时采集线程最多等待 block_timeout 秒（背压），仍然写不进时溢出到本地文件，
+没有配置溢出文件时丢弃并计数。批量写入失败时按表、再按行重试：因数据库不可用等临时错误失败的行溢出到文件，
+下次启动时由认领到溢出文件的一个进程重新写入；行本身有问题（违反约束、类型错误等）的行移入隔离文件，不再重试。
+进程退出时自动写入队列中剩余的数据。
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy import insert, DateTime
+from sqlalchemy.exc import OperationalError, InterfaceError, DisconnectionError
+
+from src.core.db import db
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500  # 达到该行数立即写入
+DEFAULT_FLUSH_INTERVAL = 2.0  # 最长写入间隔(秒)
+DEFAULT_MAX_PENDING = 20000  # 队列最大行数
+DEFAULT_BLOCK_TIMEOUT = 0.5  # 队列满时采集线程最长等待时间(秒)
+FLUSH_RETRIES = 1  # 批量写入失败后的重试次数
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError)  # 溢出后重试的临时错误
+
+
+class WriteBuffer:
+    """后台批量写入缓冲"""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING, block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+                 spill_path: Optional[str] = None):
+        """
+        初始化
+
+        Args:
+            batch_size: 达到该行数立即写入
+            flush_interval: 最长写入间隔(秒)
+            max_pending: 队列最大行数
+            block_timeout: 队列满时采集线程最长等待时间(秒)
+            spill_path: 溢出文件路径（JSON Lines），为None时队列满直接丢弃
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+
+        self.app = None
+        self._tables: Dict[str, Any] = {}  # 表名 -> Table
+        self._pending: List[tuple] = []  # [(表名, 行)]
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._last_flush = time.time()
+
+        # 统计
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'quarantined': 0,
+            'flush_errors': 0,
+            'blocked': 0,
+            'last_flush_rows': 0,
+            'last_flush_duration': 0.0
+        }
+
+    def start(self, app: Any):
+        """
+        启动后台写入线程，并重新写入上次溢出到文件的数据
+
+        Args:
+            app: Flask应用实例，后台线程在其应用上下文中写入数据库
+        """
+        with self._cond:
+            if self._running:
+                return
+            self.app = app
+            self._running = True
+            self._thread = threading.Thread(target=self._flush_loop, name='write-buffer', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        self.replay_spill()
+        logger.info(f"批量写入缓冲已启动，批量大小: {self.batch_size}，写入间隔: {self.flush_interval} 秒")
+
+    def stop(self, flush: bool = True, timeout: float = 10.0):
+        """停止后台线程，默认写入队列中剩余的数据"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        if flush:
+            self.flush()
+        logger.info(f"批量写入缓冲已停止: {self.get_stats()}")
+
+    def is_running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._running
+
+    def add(self, model: Any, row: Dict) -> bool:
+        """
+        添加一行待写入数据
+
+        后台线程未启动时（如测试、脚本）直接在当前会话中写入并提交。
+
+        Args:
+            model: 模型类，如 PerformanceRecord
+            row: {列名: 值}
+
+        Returns:
+            是否已进入队列或写入（被丢弃时返回False）
+        """
+        return self.add_many(model, [row]) > 0
+
+    def add_many(self, model: Any, rows: List[Dict]) -> int:
+        """
+        添加多行待写入数据
+
+        Returns:
+            进入队列或写入的行数
+        """
+        return self._add_rows(model.__table__, rows)
+
+    def _add_rows(self, table: Any, rows: List[Dict]) -> int:
+        """将某张表的行放入队列，队列满时等待，超时后溢出"""
+        if not rows:
+            return 0
+
+        if not self._running:
+            db.session.execute(insert(table), rows)
+            db.session.commit()
+            return len(rows)
+
+        self._tables.setdefault(table.name, table)
+        with self._cond:
+            if len(self._pending) + len(rows) > self.max_pending:
+                # 背压：唤醒写入线程并等待队列腾出空间
+                self._stats['blocked'] += 1
+                self._cond.notify_all()
+                deadline = time.time() + self.block_timeout
+                while self._running and len(self._pending) + len(rows) > self.max_pending:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+
+            if len(self._pending) + len(rows) > self.max_pending:
+                overflow = True
+            else:
+                overflow = False
+                self._pending.extend((table.name, row) for row in rows)
+                self._stats['enqueued'] += len(rows)
+                if len(self._pending) >= self.batch_size:
+                    self._cond.notify_all()
+
+        if overflow:
+            return len(rows) if self._spill([(table.name, row) for row in rows]) else 0
+        return len(rows)
+
+    def flush(self) -> int:
+        """
+        立即写入队列中的全部数据（需要时自动进入应用上下文）
+
+        Returns:
+            写入的行数
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._last_flush = time.time()
+                self._cond.notify_all()
+            if not batch:
+                return 0
+
+            if self.app is not None:
+                with self.app.app_context():
+                    return self._write_batch(batch)
+            return self._write_batch(batch)
+
+    def _write_batch(self, batch: List[tuple]) -> int:
+        """按表分组批量插入，失败时重试，仍失败则逐表、逐行写入，隔离写不进的行"""
+        grouped: Dict[str, List[Dict]] = {}
+        for table_name, row in batch:
+            grouped.setdefault(table_name, []).append(row)
+
+        started_at = time.time()
+        for attempt in range(FLUSH_RETRIES + 1):
+            try:
+                for table_name, rows in grouped.items():
+                    db.session.execute(insert(self._tables[table_name]), rows)
+                db.session.commit()
+                written = len(batch)
+                break
+            except Exception as e:
+                db.session.rollback()
+                with self._cond:
+                    self._stats['flush_errors'] += 1
+                logger.error(f"批量写入 {len(batch)} 行失败（第 {attempt + 1} 次）: {str(e)}")
+                if isinstance(e, TRANSIENT_ERRORS) and attempt == FLUSH_RETRIES:
+                    # 数据库不可用时逐行重试没有意义，整批溢出
+                    self._spill(batch)
+                    return 0
+        else:
+            written = sum(self._write_table(table_name, rows) for table_name, rows in grouped.items())
+
+        with self._cond:
+            self._stats['written'] += written
+            self._stats['batches'] += 1
+            self._stats['last_flush_rows'] = written
+            self._stats['last_flush_duration'] = round(time.time() - started_at, 4)
+        return written
+
+    def _write_table(self, table_name: str, rows: List[Dict]) -> int:
+        """单独写入一张表的行，失败时逐行写入：临时错误的行溢出，其余失败的行隔离"""
+        table = self._tables[table_name]
+        try:
+            db.session.execute(insert(table), rows)
+            db.session.commit()
+            return len(rows)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"写入表 {table_name} 的 {len(rows)} 行失败，改为逐行写入: {str(e)}")
+
+        written = 0
+        for row in rows:
+            try:
+                db.session.execute(insert(table), [row])
+                db.session.commit()
+                written += 1
+            except TRANSIENT_ERRORS:
+                db.session.rollback()
+                self._spill([(table_name, row)])
+            except Exception as e:
+                db.session.rollback()
+                self._quarantine(table_name, row, e)
+        return written
+
+    def _flush_loop(self):
+        """后台写入线程主循环"""
+        while True:
+            with self._cond:
+                while self._running and len(self._pending) < self.batch_size:
+                    remaining = self._last_flush + self.flush_interval - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                if not self._running:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"批量写入线程出错: {str(e)}")
+
+    # ---------- 溢出文件 ----------
+
+    def _spill(self, batch: List[tuple]) -> bool:
+        """将无法写入的行追加到溢出文件，没有配置溢出文件或写文件失败时丢弃"""
+        if self.spill_path:
+            try:
+                with self._spill_lock:
+                    with open(self.spill_path, 'a', encoding='utf-8') as f:
+                        for table_name, row in batch:
+                            f.write(json.dumps({'table': table_name, 'row': row}, default=_json_default,
+                                               ensure_ascii=False) + '\n')
+                with self._cond:
+                    self._stats['spilled'] += len(batch)
+                logger.warning(f"已将 {len(batch)} 行写入溢出文件 {self.spill_path}")
+                return True
+            except Exception as e:
+                logger.error(f"写入溢出文件失败: {str(e)}")
+
+        with self._cond:
+            self._stats['dropped'] += len(batch)
+        logger.warning(f"写入队列已满，丢弃 {len(batch)} 行")
+        return False
+
+    def _quarantine(self, table_name: str, row: Dict, error: Exception):
+        """将无法写入的行连同错误信息追加到隔离文件（溢出文件路径加 .quarantine），不再重试"""
+        with self._cond:
+            self._stats['quarantined'] += 1
+        logger.error(f"表 {table_name} 的一行数据无法写入，已隔离: {str(error)}")
+        if not self.spill_path:
+            return
+        try:
+            with self._spill_lock:
+                with open(self.spill_path + '.quarantine', 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'table': table_name, 'row': row, 'error': str(error)},
+                                       default=_json_default, ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.error(f"写入隔离文件失败: {str(e)}")
+
+    def _claim_spill_files(self) -> List[str]:
+        """
+        认领待重放的溢出文件：把溢出文件及已退出进程遗留的重放文件原子地改名为本进程的重放文件，
+        多个工作进程同时启动时每个文件只会被一个进程改名成功
+
+        Returns:
+            本进程认领到的重放文件路径
+        """
+        candidates = [self.spill_path]
+        for path in glob.glob(glob.escape(self.spill_path) + '.*.replay'):
+            owner = os.path.basename(path)[len(os.path.basename(self.spill_path)) + 1:].split('-', 1)[0]
+            if not owner.isdigit() or not _process_alive(int(owner)):
+                candidates.append(path)
+
+        claimed = []
+        for path in candidates:
+            target = f'{self.spill_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.replay'
+            try:
+                with self._spill_lock:
+                    os.replace(path, target)
+            except FileNotFoundError:
+                continue  # 不存在或已被其他进程认领
+            claimed.append(target)
+        return claimed
+
+    def replay_spill(self) -> int:
+        """
+        将溢出文件中的数据重新放入队列（启动时调用）
+
+        Returns:
+            重新放入队列的行数
+        """
+        if not self.spill_path:
+            return 0
+
+        count = 0
+        tables = db.metadata.tables
+        for replay_path in self._claim_spill_files():
+            try:
+                grouped: Dict[str, List[Dict]] = {}
+                with open(replay_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        entry = json.loads(line)
+                        table = tables.get(entry['table'])
+                        if table is None:
+                            continue
+                        grouped.setdefault(table.name, []).append(_restore_row(table, entry['row']))
+
+                for table_name, rows in grouped.items():
+                    count += self._add_rows(tables[table_name], rows)
+                os.remove(replay_path)
+            except Exception as e:
+                logger.error(f"读取溢出文件 {replay_path} 失败: {str(e)}")
+
+        if count:
+            with self._cond:
+                self._stats['replayed'] += count
+            logger.info(f"已从溢出文件重新写入 {count} 行")
+        return count
+
+    def get_stats(self) -> Dict:
+        """获取统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+            stats['running'] = self._running
+            return stats
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _process_alive(pid: int) -> bool:
+    """进程是否存在"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _restore_row(table: Any, row: Dict) -> Dict:
+    """将溢出文件中的时间字符串还原为datetime"""
+    for name, value in row.items():
+        column = table.columns.get(name)
+        if column is not None and isinstance(column.type, DateTime) and isinstance(value, str):
+            row[name] = datetime.fromisoformat(value)
+    return row
+
+
+# 全局写入缓冲实例
+_write_buffer = WriteBuffer()
+
+
+def get_write_buffer() -> WriteBuffer:
+    """获取全局写入缓冲"""
+    return _write_buffer
+
+
+def init_write_buffer(app):
+    """
+    按应用配置初始化并启动全局写入缓冲
+
+    Args:
+        app: Flask应用实例
+    """
+    if not app.config.get('WRITE_BUFFER_ENABLED', True):
+        return
+    _write_buffer.batch_size = app.config.get('WRITE_BUFFER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    _write_buffer.flush_interval = app.config.get('WRITE_BUFFER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    _write_buffer.max_pending = app.config.get('WRITE_BUFFER_MAX_PENDING', DEFAULT_MAX_PENDING)
+    _write_buffer.spill_path = app.config.get('WRITE_BUFFER_SPILL_PATH')
+    _write_buffer.start(app)
@@ -7,7 +7,7 @@
 """
 
 import logging
-from typing import Optional
+from typing import Dict, Optional, Type
 
 from src.models.device import Device
 from src.modules.policy.connectors.firewall_connector import FirewallConnector
@@ -20,15 +20,34 @@ class ConnectorFactory:
     """防火墙连接器工厂类"""
     
     @staticmethod
-    def get_connector(device: Device) -> FirewallConnector:
+    def get_connector(device: Device, cache: Optional[Dict[Type[FirewallConnector], FirewallConnector]] = None) -> FirewallConnector:
         """根据设备类型获取合适的连接器
         
         Args:
             device: 设备对象
+            cache: 连接器缓存（按连接器类型），提供时同一厂商的设备复用同一个连接器实例。
+                连接器实例不是线程安全的，缓存只能在单个线程内使用
             
         Returns:
             FirewallConnector: 连接器实例
         """
+        connector_class = ConnectorFactory.get_connector_class(device)
+        if cache is None:
+            return connector_class()
+        if connector_class not in cache:
+            cache[connector_class] = connector_class()
+        return cache[connector_class]
+    
+    @staticmethod
+    def get_connector_class(device: Device) -> Type[FirewallConnector]:
+        """根据设备厂商和型号选择连接器类型
+        
+        Args:
+            device: 设备对象
+            
+        Returns:
+            Type[FirewallConnector]: 连接器类型
+        """
         # 获取设备厂商信息
         manufacturer = device.manufacturer.lower() if device.manufacturer else ""
         model = device.model.lower() if device.model else ""
@@ -36,29 +55,30 @@ class ConnectorFactory:
         # 根据厂商和型号选择合适的连接器
         if "huawei" in manufacturer or "hw" in manufacturer:
             logging.info(f"为设备 {device.name} 选择华为防火墙连接器")
-            return HuaweiFirewallConnector()
+            return HuaweiFirewallConnector
         
         elif "cisco" in manufacturer or "asa" in model:
             logging.info(f"为设备 {device.name} 选择思科防火墙连接器")
-            return CiscoFirewallConnector()
+            return CiscoFirewallConnector
         
         # 默认使用通用连接器
         logging.info(f"为设备 {device.name} 选择通用防火墙连接器")
-        return GenericFirewallConnector()
+        return GenericFirewallConnector
     
     @staticmethod
-    def create_and_connect(device: Device) -> Optional[FirewallConnector]:
+    def create_and_connect(device: Device, cache: Optional[Dict[Type[FirewallConnector], FirewallConnector]] = None) -> Optional[FirewallConnector]:
         """创建连接器并自动连接到设备
         
         Args:
             device: 设备对象
+            cache: 连接器缓存，见 get_connector
             
         Returns:
             Optional[FirewallConnector]: 已连接的连接器实例，连接失败则返回None
         """
         try:
             # 获取合适的连接器
-            connector = ConnectorFactory.get_connector(device)
+            connector = ConnectorFactory.get_connector(device, cache)
             
             # 连接到设备
             success = connector.connect(device)
@@ -7,7 +7,7 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional
 import logging
 
 from src.models.device import Device
@@ -23,6 +23,11 @@ class FirewallDeployError(Exception):
     pass
 
 
+class FirewallConfirmError(FirewallDeployError):
+    """设备要求确认的操作不是已知的保存/提交配置，已拒绝"""
+    pass
+
+
 class FirewallConnector(ABC):
     """防火墙连接器抽象基类"""
     
@@ -110,6 +115,36 @@ class FirewallConnector(ABC):
         """
         pass
     
+    def get_policy_statuses(self, policy_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """获取多个策略在设备上的状态（默认逐个查询，子类可以查询一次后共享结果）
+        
+        Args:
+            policy_ids: 策略ID或标识列表
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: {策略ID: 策略状态信息}
+        """
+        return {policy_id: self.get_policy_status(policy_id) for policy_id in policy_ids}
+    
+    def get_running_config(self) -> Optional[str]:
+        """获取设备的运行配置，用于配置快照和策略漂移检测
+        
+        Returns:
+            Optional[str]: 运行配置文本，不支持时返回None
+        """
+        return None
+    
+    def get_expected_config(self, policy_config: Dict[str, Any]) -> List[str]:
+        """获取策略下发后应出现在运行配置中的命令
+        
+        Args:
+            policy_config: 策略配置数据
+            
+        Returns:
+            List[str]: 配置命令列表，不支持时返回空列表
+        """
+        return []
+    
     def _log_error(self, message: str, exception: Optional[Exception] = None) -> None:
         """记录错误日志
         
@@ -8,22 +8,72 @@
 
 import time
 import re
+import copy
+import zlib
 import logging
 import json
 from typing import Dict, Any, Tuple, Optional, List
 import paramiko
 
 from src.models.device import Device
+from src.core.ssh_pool import get_ssh_pool, SSHPoolError
 from src.modules.policy.connectors.firewall_connector import (
     FirewallConnector,
     FirewallConnectionError,
-    FirewallDeployError
+    FirewallDeployError,
+    FirewallConfirmError
 )
 
 
+class ShellSession:
+    """交互式shell会话（SSH客户端 + shell通道），作为SSH会话池中的 'shell' 类会话"""
+    
+    def __init__(self, client: paramiko.SSHClient, channel: paramiko.Channel):
+        self.client = client
+        self.channel = channel
+        self.prompt = None  # 设备提示符正则，首次使用时探测并关闭分页
+    
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        return bool(transport and transport.is_active() and not self.channel.closed)
+    
+    def drain(self):
+        """丢弃通道中上一次使用残留的输出"""
+        while self.channel.recv_ready():
+            self.channel.recv(4096)
+    
+    def close(self):
+        try:
+            self.channel.close()
+        finally:
+            self.client.close()
+
+
 class GenericFirewallConnector(FirewallConnector):
     """通用防火墙连接器，基于SSH/Telnet协议"""
     
+    # 关闭分页的命令，命令批量下发时不会被 --More-- 打断
+    DISABLE_PAGING_COMMANDS = ["terminal length 0", "terminal width 511"]
+    # 任意设备提示符（行尾为 > # ]），用于首次探测主机名，如 fw#、fw(config)#、<FW>、[FW-acl]
+    PROMPT_PATTERN = re.compile(r'(?:^|[\r\n])[<\[]?([\w.\-/]+)[^\r\n]{0,64}?[>#\]]\s*$')
+    MORE_PATTERN = re.compile(r'--+\s*[Mm]ore\s*--+\s*$')
+    # 保存/提交配置时的已知确认提示及应答，只有这些提示会被自动确认
+    CONFIRM_PATTERNS = [
+        (re.compile(r'configuration will be written to the device\.?\s*Are you sure to continue\?\s*\[Y/N\]\s*:?\s*$',
+                    re.IGNORECASE), "y\n"),
+        (re.compile(r'vrpcfg\.(?:cfg|zip) exists, overwrite\?\s*\[Y/N\]\s*:?\s*$', re.IGNORECASE), "y\n"),
+        (re.compile(r'Overwrite the previous NVRAM configuration\?\s*\[confirm\]\s*$', re.IGNORECASE), "\n"),
+        (re.compile(r'Destination filename \[startup-config\]\?\s*$', re.IGNORECASE), "\n"),
+    ]
+    # 任意确认提示；不在 CONFIRM_PATTERNS 中的（如覆盖文件、重启、清除）一律拒绝并使命令失败
+    ANY_CONFIRM_PATTERN = re.compile(r'(?:\[[Yy](?:es)?/[Nn]o?\]|\([Yy](?:es)?/[Nn]o?\)|\[confirm\])\s*[:?]?\s*$')
+    # 查看运行配置的命令
+    RUNNING_CONFIG_COMMANDS = ["show running-config"]
+    # 进入/退出配置模式和保存配置的命令，不会出现在运行配置中
+    NAVIGATION_COMMANDS = {"configure terminal", "end", "exit", "write memory"}
+    COMMAND_TIMEOUT = 30  # 单条命令等待提示符的时间（秒）
+    READ_POLL_INTERVAL = 0.02  # 通道无数据时的轮询间隔（秒）
+    
     def __init__(self, timeout: int = 30, retry_count: int = 3, retry_interval: int = 5):
         """初始化连接器
         
@@ -39,6 +89,8 @@ class GenericFirewallConnector(FirewallConnector):
         self.ssh_client = None
         self.session = None
         self.last_error = None
+        self._lease = None  # 从SSH会话池租用的会话
+        self._broken = False  # 会话在使用中出错，归还时关闭
     
     def connect(self, device: Device) -> bool:
         """连接到防火墙设备
@@ -61,25 +113,27 @@ class GenericFirewallConnector(FirewallConnector):
             self.last_error = error_msg
             raise FirewallConnectionError(error_msg)
         
-        # 创建SSH客户端
-        self.ssh_client = paramiko.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # 尝试连接
+        # 从共享SSH会话池租用shell会话，没有空闲会话时新建连接
         for attempt in range(self.retry_count):
             try:
                 logging.info(f"正在连接防火墙设备 {device.name} ({device.ip_address})")
-                self.ssh_client.connect(
-                    hostname=device.ip_address,
-                    port=device.port or 22,
-                    username=device.username,
-                    password=device.password,
-                    timeout=self.timeout
+                self._lease = get_ssh_pool().acquire(
+                    device.id, lambda: self._open_shell(device), kind='shell', timeout=self.timeout
                 )
-                self.session = self.ssh_client.invoke_shell()
+                self._lease.conn.drain()
+                self._broken = False
+                self.ssh_client = self._lease.conn.client
+                self.session = self._lease.conn.channel
+                if not self._lease.conn.prompt:
+                    self._prepare_session(self._lease.conn)
                 logging.info(f"已连接到防火墙设备 {device.name} ({device.ip_address})")
                 return True
-            except Exception as e:
+            except (SSHPoolError, FirewallDeployError) as e:
+                if self._lease:
+                    get_ssh_pool().release(self._lease, broken=True)
+                    self._lease = None
+                    self.ssh_client = None
+                    self.session = None
                 error_msg = f"连接防火墙设备失败 ({attempt+1}/{self.retry_count})"
                 self._log_error(error_msg, e)
                 self.last_error = str(e)
@@ -91,22 +145,37 @@ class GenericFirewallConnector(FirewallConnector):
         
         return False
     
+    def _open_shell(self, device: Device) -> ShellSession:
+        """建立到设备的新SSH连接并打开交互式shell（由SSH会话池在需要新会话时调用）"""
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=device.ip_address,
+            port=device.port or 22,
+            username=device.username,
+            password=device.password,
+            timeout=self.timeout
+        )
+        return ShellSession(client, client.invoke_shell())
+    
     def disconnect(self) -> bool:
-        """断开与防火墙设备的连接
+        """断开与防火墙设备的连接（把会话归还SSH会话池，出错的会话直接关闭）
         
         Returns:
             bool: 断开连接是否成功
         """
-        if self.ssh_client:
+        if self._lease:
             try:
-                if self.session:
-                    self.session.close()
-                self.ssh_client.close()
+                get_ssh_pool().release(self._lease, broken=self._broken or not self.is_connected())
                 logging.info(f"已断开与防火墙设备的连接: {self.device.name}")
                 return True
             except Exception as e:
                 self._log_error("断开连接时发生错误", e)
                 return False
+            finally:
+                self._lease = None
+                self.ssh_client = None
+                self.session = None
         return True  # 如果未连接，则视为断开成功
     
     def is_connected(self) -> bool:
@@ -197,6 +266,63 @@ class GenericFirewallConnector(FirewallConnector):
                 'error': error_msg
             }
     
+    def get_policy_statuses(self, policy_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """获取多个策略在设备上的状态
+        
+        状态查询命令输出的是设备全部的IKE/IPSec SA，执行一次后各策略共享解析结果。
+        
+        Args:
+            policy_ids: 策略ID或标识列表
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: {策略ID: 策略状态信息}
+        """
+        if not policy_ids:
+            return {}
+        
+        if not self.is_connected():
+            status = {'status': 'unknown', 'error': '未连接到防火墙设备'}
+        else:
+            try:
+                result = self._execute_commands(self._get_policy_status_commands(policy_ids[0]))
+                status = self._parse_policy_status(result)
+            except Exception as e:
+                error_msg = f"获取策略状态时发生错误: {str(e)}"
+                self._log_error(error_msg)
+                status = {'status': 'error', 'error': error_msg}
+        
+        return {policy_id: copy.deepcopy(status) for policy_id in policy_ids}
+    
+    def get_running_config(self) -> Optional[str]:
+        """获取设备的运行配置
+        
+        Returns:
+            Optional[str]: 运行配置文本（不含命令回显和提示符），未连接或查询失败时返回None
+        """
+        if not self.is_connected():
+            return None
+        
+        try:
+            output = self._execute_commands(self.RUNNING_CONFIG_COMMANDS)
+        except Exception as e:
+            self._log_error("获取运行配置时发生错误", e)
+            return None
+        
+        # 第一行是命令回显，最后一行是提示符
+        return '\n'.join(output.splitlines()[1:-1])
+    
+    def get_expected_config(self, policy_config: Dict[str, Any]) -> List[str]:
+        """获取策略下发后应出现在运行配置中的命令（去掉进入/退出配置模式和保存等命令）
+        
+        Args:
+            policy_config: 策略配置数据
+            
+        Returns:
+            List[str]: 按下发顺序排列的配置命令
+        """
+        return [cmd.strip() for cmd in self._generate_firewall_commands(policy_config)
+                if cmd.strip() and cmd.strip() not in self.NAVIGATION_COMMANDS]
+    
     def rollback_policy(self, policy_id: str) -> Tuple[bool, str]:
         """回滚策略
         
@@ -263,9 +389,28 @@ class GenericFirewallConnector(FirewallConnector):
             self._log_error(error_msg)
             return False, error_msg
     
+    def _prepare_session(self, shell: ShellSession):
+        """探测设备提示符并关闭分页（每个新建的shell会话只做一次）
+        
+        Args:
+            shell: 新建的shell会话
+        """
+        self.session.send("\n")
+        output = self._read_until(lambda buf: self.PROMPT_PATTERN.search(buf), self.COMMAND_TIMEOUT)
+        match = self.PROMPT_PATTERN.search(output)
+        # 配置模式下提示符会追加模式名，因此只匹配主机名前缀（部分设备在配置模式截断主机名）
+        shell.prompt = re.compile(
+            r'(?:^|[\r\n])[<\[]?' + re.escape(match.group(1)[:15]) + r'[^\r\n]{0,64}?[>#\]]'
+        )
+        if self.DISABLE_PAGING_COMMANDS:
+            self._send_batch(self.DISABLE_PAGING_COMMANDS, shell.prompt)
+    
     def _execute_commands(self, commands: List[str]) -> str:
         """执行命令并返回结果
         
+        命令一次性批量写入通道，然后按顺序读取每条命令的回显和其后的提示符，
+        命令执行耗时只取决于设备的响应速度。
+        
         Args:
             commands: 要执行的命令列表
             
@@ -275,29 +420,98 @@ class GenericFirewallConnector(FirewallConnector):
         if not self.is_connected():
             raise FirewallConnectionError("未连接到防火墙设备")
         
-        output = ""
-        
         try:
-            for cmd in commands:
-                logging.debug(f"执行命令: {cmd}")
-                self.session.send(cmd + "\n")
-                time.sleep(2)  # 等待命令执行
-                
-                # 接收输出
-                while self.session.recv_ready():
-                    part = self.session.recv(4096).decode('utf-8', errors='ignore')
-                    output += part
-                    # 如果输出中包含更多数据的提示，如"--More--"
-                    if re.search(r'--+\s*[Mm]ore\s*--+', part):
-                        self.session.send(" ")  # 发送空格继续显示
-                        time.sleep(0.5)
-                
-            return output
+            return self._send_batch(commands, self._lease.conn.prompt)
+        except FirewallConfirmError as e:
+            # 后续命令已写入通道，会话不再可用
+            self._broken = True
+            self._log_error(str(e))
+            raise
         except Exception as e:
+            self._broken = True
             error_msg = f"执行命令时发生错误: {str(e)}"
             self._log_error(error_msg)
             raise FirewallDeployError(error_msg)
     
+    def _send_batch(self, commands: List[str], prompt) -> str:
+        """批量发送命令，逐条等待回显后的提示符
+        
+        Args:
+            commands: 命令列表
+            prompt: 设备提示符正则
+            
+        Returns:
+            str: 全部输出
+            
+        Raises:
+            FirewallDeployError: 某条命令在 COMMAND_TIMEOUT 内没有出现提示符
+        """
+        commands = [cmd.strip() for cmd in commands if cmd and cmd.strip()]
+        if not commands:
+            return ""
+        logging.debug(f"批量执行 {len(commands)} 条命令")
+        self.session.sendall("\n".join(commands) + "\n")
+        
+        output = ""
+        position = 0
+        for cmd in commands:
+            # 从上一条命令的提示符之后查找本条命令的回显（长命令可能被设备折行，只比较前缀），再等待其后的提示符
+            echo = cmd[:32]
+            
+            def prompt_after_echo(buf, start=position, echo=echo):
+                index = buf.find(echo, start)
+                return prompt.search(buf, index + len(echo)) if index >= 0 else None
+            
+            try:
+                output = self._read_until(prompt_after_echo, self.COMMAND_TIMEOUT, output)
+            except FirewallConfirmError as e:
+                raise FirewallConfirmError(f"命令 '{cmd}' {str(e)}")
+            except FirewallDeployError:
+                raise FirewallDeployError(f"命令 '{cmd}' 在 {self.COMMAND_TIMEOUT} 秒内没有返回提示符")
+            position = prompt_after_echo(output).start()
+        return output
+    
+    def _read_until(self, condition, timeout: float, output: str = "") -> str:
+        """读取通道输出，直到 condition(输出) 成立
+        
+        读取过程中自动翻页（--More--）并应答已知的保存/提交配置确认提示，其他确认提示拒绝后抛出异常。
+        
+        Args:
+            condition: 判断输出是否完整的函数
+            timeout: 超时时间（秒）
+            output: 已读取的输出
+            
+        Returns:
+            str: 累积的输出
+            
+        Raises:
+            FirewallDeployError: 超时
+            FirewallConfirmError: 出现未知的确认提示
+        """
+        deadline = time.time() + timeout
+        while not condition(output):
+            if not self.session.recv_ready():
+                if self.session.closed or time.time() > deadline:
+                    raise FirewallDeployError("等待设备提示符超时")
+                time.sleep(self.READ_POLL_INTERVAL)
+                continue
+            part = self.session.recv(65536).decode('utf-8', errors='ignore')
+            output += part
+            tail = output[-200:]
+            if self.MORE_PATTERN.search(tail):
+                self.session.send(" ")  # 发送空格继续显示
+                continue
+            for pattern, answer in self.CONFIRM_PATTERNS:
+                if pattern.search(tail):
+                    self.session.send(answer)
+                    break
+            else:
+                if self.ANY_CONFIRM_PATTERN.search(tail):
+                    self.session.send("n\n")
+                    prompt_line = tail.strip().splitlines()[-1].strip()
+                    raise FirewallConfirmError(f"要求确认未知操作，已拒绝: {prompt_line}")
+        return output
+    
     def _generate_firewall_commands(self, policy_config: Dict[str, Any]) -> List[str]:
         """生成防火墙配置命令
         
@@ -334,8 +548,8 @@ class GenericFirewallConnector(FirewallConnector):
             logging.error("缺少必要的隧道配置参数")
             return []
         
-        # 生成唯一ID，用于配置名称
-        policy_id = str(hash(json.dumps(policy_config, sort_keys=True)) % 10000)
+        # 生成唯一ID，用于配置名称（使用稳定的校验和，保证不同进程生成相同的配置名称）
+        policy_id = str(zlib.crc32(json.dumps(policy_config, sort_keys=True).encode('utf-8')) % 10000)
         
         # 构建命令列表
         commands = []
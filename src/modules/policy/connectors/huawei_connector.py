@@ -16,6 +16,10 @@ from src.modules.policy.connectors.generic_connector import GenericFirewallConne
 class HuaweiFirewallConnector(GenericFirewallConnector):
     """华为防火墙连接器，继承自通用连接器，针对华为设备进行定制"""
     
+    DISABLE_PAGING_COMMANDS = ["screen-length 0 temporary"]
+    RUNNING_CONFIG_COMMANDS = ["display current-configuration"]
+    NAVIGATION_COMMANDS = {"system-view", "quit", "return", "save"}
+    
     def __init__(self, timeout: int = 30, retry_count: int = 3, retry_interval: int = 5):
         """初始化连接器
         
@@ -11,6 +11,7 @@ from src.modules.policy.models.policy_template import PolicyTemplate
 from src.modules.policy.models.policy_deployment import PolicyDeployment
 from src.modules.policy.models.policy_audit_log import PolicyAuditLog
 from src.modules.policy.models.policy_alert import PolicyAlert
+from src.modules.policy.models.config_snapshot import ConfigSnapshot
 
 # 导出所有模型
 __all__ = [
@@ -18,5 +19,6 @@ __all__ = [
     'PolicyTemplate',
     'PolicyDeployment',
     'PolicyAuditLog',
-    'PolicyAlert'
+    'PolicyAlert',
+    'ConfigSnapshot'
 ] 
\ No newline at end of file
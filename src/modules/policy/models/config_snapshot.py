@@ -0,0 +1,51 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey, DateTime, Index, UniqueConstraint
+
+from src.core.db import db
+
+
+class ConfigSnapshot(db.Model):
+    """设备配置快照模型类
+    
+    按配置内容哈希寻址，同一设备相同配置只保存一份。base_id 为空时 content 是压缩后的完整配置，
+    否则是相对 base_id 快照的压缩差异。
+    """
+    __tablename__ = 'config_snapshot'
+    __table_args__ = (
+        UniqueConstraint('device_id', 'config_hash', name='uq_config_snapshot_device_hash'),
+        Index('ix_config_snapshot_device_seen', 'device_id', 'last_seen_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey('devices.id'), nullable=False)
+    config_hash = Column(String(64), nullable=False)  # 规范化配置的SHA-256
+    base_id = Column(Integer, ForeignKey('config_snapshot.id'))  # 差异的基准快照，为空表示完整配置
+    chain_length = Column(Integer, nullable=False, default=0)  # 到最近完整配置的差异层数
+    content = Column(LargeBinary, nullable=False)  # zlib压缩的完整配置或差异
+    size = Column(Integer, nullable=False, default=0)  # 配置原始字节数
+    line_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 最近一次在设备上看到该配置的时间
+    
+    @property
+    def is_full(self) -> bool:
+        """是否保存的是完整配置"""
+        return self.base_id is None
+    
+    def __repr__(self):
+        return f"<ConfigSnapshot(id={self.id}, device_id={self.device_id}, config_hash='{self.config_hash[:12]}')>"
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'device_id': self.device_id,
+            'config_hash': self.config_hash,
+            'base_id': self.base_id,
+            'chain_length': self.chain_length,
+            'stored_bytes': len(self.content) if self.content else 0,
+            'size': self.size,
+            'line_count': self.line_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None
+        }
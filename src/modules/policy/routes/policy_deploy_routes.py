@@ -6,11 +6,15 @@
 提供策略下发、回滚、状态查询等RESTful API
 """
 
+import json
+import math
 import logging
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 
+from src.core.job_queue import get_job_queue
 from src.modules.policy.services.policy_deploy_service import PolicyDeployService
+from src.modules.policy.services.policy_bulk_deploy_service import PolicyBulkDeployService
 from src.modules.policy.services.policy_sync_scheduler import get_scheduler
 
 # 创建蓝图
@@ -20,6 +24,91 @@ policy_deploy_bp = Blueprint('policy_deploy', __name__, url_prefix='/api/policy-
 deploy_service = PolicyDeployService()
 
 
+def _deploy_service_job(job, method, **kwargs):
+    """后台任务：调用策略下发服务的方法（每个任务使用独立的服务实例），失败时保存结果并抛出异常"""
+    success, result = getattr(PolicyDeployService(), method)(**kwargs)
+    if not success:
+        job.update(data=result)
+        raise RuntimeError(result.get('error') or '操作失败')
+    return result
+
+
+def _sync_job(job, policy_id=None, device_id=None):
+    """后台任务：同步策略状态"""
+    return PolicyDeployService().sync_policy_status(policy_id=policy_id, device_id=device_id)
+
+
+def _to_id(value):
+    """将ID参数转换为正整数（允许数字字符串）
+
+    Raises:
+        ValueError: 不是正整数
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(value)
+    if isinstance(value, str) and not value.strip().isdigit():
+        raise ValueError(value)
+    value = int(value)
+    if value <= 0:
+        raise ValueError(value)
+    return value
+
+
+def _bulk_target(data):
+    """读取批量下发的策略ID和设备ID列表（设备ID去重并保持顺序）
+
+    Raises:
+        ValueError: 参数缺失、不是正整数或设备ID不是非空列表
+    """
+    try:
+        policy_id = _to_id(data.get('policy_id'))
+    except ValueError:
+        raise ValueError('policy_id')
+    device_ids = data.get('device_ids')
+    if not isinstance(device_ids, list) or not device_ids:
+        raise ValueError('device_ids')
+    try:
+        device_ids = list(dict.fromkeys(_to_id(device_id) for device_id in device_ids))
+    except ValueError:
+        raise ValueError('device_ids')
+    return policy_id, device_ids
+
+
+def _bulk_options(data):
+    """读取批量下发的并发和分批参数，缺省的参数为None（使用配置）
+
+    Raises:
+        ValueError: 参数不是数字或超出范围
+    """
+    options = {}
+    for name, cast, minimum, maximum in (('max_workers', int, 1, None), ('canary_size', int, 0, None),
+                                         ('wave_size', int, 0, None), ('failure_threshold', float, 0, 1)):
+        value = data.get(name)
+        if value is None:
+            options[name] = None
+            continue
+        if isinstance(value, bool):
+            raise ValueError(name)
+        try:
+            value = cast(value)
+        except (TypeError, ValueError):
+            raise ValueError(name)
+        if math.isnan(value) or value < minimum or (maximum is not None and value > maximum):
+            raise ValueError(name)
+        options[name] = value
+    return options
+
+
+def _job_response(job_id, message):
+    """返回后台任务句柄，前端通过 /api/jobs/<job_id> 查询进度和结果"""
+    return jsonify({
+        'success': True,
+        'message': message,
+        'error': '',
+        'data': {'job_id': job_id}
+    }), 202
+
+
 @policy_deploy_bp.route('/deploy', methods=['POST'])
 @login_required
 def deploy_policy():
@@ -30,7 +119,7 @@ def deploy_policy():
         - device_id: 设备ID
         
     返回：
-        - 部署结果
+        - 后台任务ID，任务结果为部署结果
     """
     try:
         data = request.get_json()
@@ -44,18 +133,13 @@ def deploy_policy():
                 'data': None
             }), 400
         
-        success, result = deploy_service.deploy_policy(
-            policy_id=int(policy_id),
-            device_id=int(device_id),
-            user_id=current_user.id
+        job_id = get_job_queue().submit(
+            'policy_deploy', _deploy_service_job, 'deploy_policy',
+            description=f'部署策略 {policy_id} 到设备 {device_id}', owner=str(current_user.id),
+            policy_id=int(policy_id), device_id=int(device_id), user_id=current_user.id
         )
         
-        return jsonify({
-            'success': success,
-            'message': result.get('message', ''),
-            'error': result.get('error', ''),
-            'data': result
-        }), 200 if success else 400
+        return _job_response(job_id, '策略部署任务已提交')
         
     except Exception as e:
         logging.error(f"部署策略时发生错误: {str(e)}")
@@ -67,6 +151,78 @@ def deploy_policy():
         }), 500
 
 
+@policy_deploy_bp.route('/bulk-deploy', methods=['POST'])
+@login_required
+def bulk_deploy_policy():
+    """批量部署策略API
+    
+    请求参数：
+        - policy_id: 策略ID
+        - device_ids: 设备ID列表
+        - options: 部署选项（可选）
+        - max_workers: 同时下发的设备数（可选）
+        - canary_size: 金丝雀批次设备数（可选，0表示不使用）
+        - wave_size: 每个波次的设备数（可选）
+        - failure_threshold: 波次失败比例阈值（可选）
+        - stream: 为true时在当前请求中下发并逐行返回结果（可选）
+        
+    返回：
+        - 默认返回后台任务ID，任务结果为汇总和每台设备的下发结果
+        - stream为true时返回逐行JSON（application/x-ndjson），每台设备完成后立即返回一行结果，最后一行为汇总
+    """
+    try:
+        data = request.get_json() or {}
+        if not data.get('policy_id') or not data.get('device_ids'):
+            return jsonify({
+                'success': False,
+                'message': '缺少必要参数',
+                'data': None
+            }), 400
+        
+        try:
+            policy_id, device_ids = _bulk_target(data)
+            options = _bulk_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': f'参数 {e} 无效',
+                'data': None
+            }), 400
+        
+        bulk_service = PolicyBulkDeployService(**options)
+        if not data.get('stream'):
+            job_id = get_job_queue().submit(
+                'policy_bulk_deploy', bulk_service.run_job,
+                description=f'批量部署策略 {policy_id} 到 {len(device_ids)} 台设备', owner=str(current_user.id),
+                policy_id=policy_id, device_ids=device_ids, user_id=current_user.id,
+                options=data.get('options')
+            )
+            return _job_response(job_id, '策略批量部署任务已提交')
+        
+        events = bulk_service.deploy(
+            policy_id=policy_id,
+            device_ids=device_ids,
+            user_id=current_user.id,
+            options=data.get('options')
+        )
+        
+        def generate():
+            for event in events:
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+    except Exception as e:
+        logging.error(f"批量部署策略时发生错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': '服务器内部错误',
+            'error': str(e),
+            'data': None
+        }), 500
+
+
 @policy_deploy_bp.route('/rollback', methods=['POST'])
 @login_required
 def rollback_policy():
@@ -77,7 +233,7 @@ def rollback_policy():
         - device_id: 设备ID
         
     返回：
-        - 回滚结果
+        - 后台任务ID，任务结果为回滚结果
     """
     try:
         data = request.get_json()
@@ -91,18 +247,13 @@ def rollback_policy():
                 'data': None
             }), 400
         
-        success, result = deploy_service.rollback_policy(
-            policy_id=int(policy_id),
-            device_id=int(device_id),
-            user_id=current_user.id
+        job_id = get_job_queue().submit(
+            'policy_rollback', _deploy_service_job, 'rollback_policy',
+            description=f'回滚设备 {device_id} 上的策略 {policy_id}', owner=str(current_user.id),
+            policy_id=int(policy_id), device_id=int(device_id), user_id=current_user.id
         )
         
-        return jsonify({
-            'success': success,
-            'message': result.get('message', ''),
-            'error': result.get('error', ''),
-            'data': result
-        }), 200 if success else 400
+        return _job_response(job_id, '策略回滚任务已提交')
         
     except Exception as e:
         logging.error(f"回滚策略时发生错误: {str(e)}")
@@ -169,7 +320,7 @@ def verify_policy():
         - device_id: 设备ID
         
     返回：
-        - 验证结果
+        - 后台任务ID，任务结果为验证结果
     """
     try:
         data = request.get_json()
@@ -183,17 +334,13 @@ def verify_policy():
                 'data': None
             }), 400
         
-        success, result = deploy_service.verify_policy(
-            policy_id=int(policy_id),
-            device_id=int(device_id)
+        job_id = get_job_queue().submit(
+            'policy_verify', _deploy_service_job, 'verify_policy',
+            description=f'验证设备 {device_id} 上的策略 {policy_id}', owner=str(current_user.id),
+            policy_id=int(policy_id), device_id=int(device_id)
         )
         
-        return jsonify({
-            'success': success,
-            'message': result.get('message', ''),
-            'error': result.get('error', ''),
-            'data': result
-        }), 200 if success else 400
+        return _job_response(job_id, '策略验证任务已提交')
         
     except Exception as e:
         logging.error(f"验证策略时发生错误: {str(e)}")
@@ -215,7 +362,7 @@ def sync_policies():
         - device_id: 特定设备ID
         
     返回：
-        - 同步结果统计
+        - 后台任务ID，任务结果为同步结果统计
     """
     try:
         data = request.get_json() or {}
@@ -223,19 +370,51 @@ def sync_policies():
         device_id = data.get('device_id')
         
         # 手动触发同步
-        result = deploy_service.sync_policy_status(
+        job_id = get_job_queue().submit(
+            'policy_sync', _sync_job,
+            description='同步策略状态', owner=str(getattr(current_user, 'id', '')) or None,
             policy_id=int(policy_id) if policy_id else None,
             device_id=int(device_id) if device_id else None
         )
         
+        return _job_response(job_id, '策略同步任务已提交')
+        
+    except Exception as e:
+        logging.error(f"同步策略时发生错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': '服务器内部错误',
+            'error': str(e),
+            'data': None
+        }), 500
+
+
+@policy_deploy_bp.route('/drift', methods=['GET'])
+@login_required
+def get_policy_drift():
+    """策略配置漂移检查API（根据最近一次同步保存的配置快照，不连接设备）
+
+    请求参数（可选）：
+        - policy_id: 特定策略ID
+        - device_id: 特定设备ID
+
+    返回：
+        - 各部署的策略配置是否仍在设备运行配置中
+    """
+    try:
+        policy_id = request.args.get('policy_id', type=int)
+        device_id = request.args.get('device_id', type=int)
+
+        result = deploy_service.check_policy_drift(policy_id=policy_id, device_id=device_id)
+
         return jsonify({
             'success': True,
-            'message': '策略同步已完成',
+            'message': '策略漂移检查已完成',
             'data': result
         }), 200
-        
+
     except Exception as e:
-        logging.error(f"同步策略时发生错误: {str(e)}")
+        logging.error(f"检查策略漂移时发生错误: {str(e)}")
         return jsonify({
             'success': False,
             'message': '服务器内部错误',
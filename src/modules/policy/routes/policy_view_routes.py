@@ -11,9 +11,10 @@ from flask_login import login_required, current_user
 import logging
 import os
 
+from src.core.job_queue import get_job_queue
 from src.modules.policy.services.policy_service import PolicyService
 from src.modules.policy.services.policy_template_service import PolicyTemplateService
-from src.modules.policy.services.policy_deploy_service import PolicyDeployService
+from src.modules.policy.services.policy_bulk_deploy_service import PolicyBulkDeployService
 from src.modules.auth.services.user_service import UserService
 from src.modules.device.services import get_all_devices
 
@@ -233,9 +234,8 @@ def template_list():
 @login_required
 def deploy(policy_id):
     """策略部署页面"""
-    # 获取策略服务和部署服务
+    # 获取策略服务
     policy_service = PolicyService()
-    deploy_service = PolicyDeployService()
     
     # 获取策略详情
     success, policy = policy_service.get_policy(policy_id)
@@ -306,7 +306,6 @@ def deploy(policy_id):
         
         # 执行部署
         deployment_results = []
-        overall_success = True
         
         # 在演示模式下，使用模拟数据
         if deployment_mode == 'demo':
@@ -360,81 +359,16 @@ def deploy(policy_id):
                 result_html=result_html
             )
         
-        # 非演示模式，执行实际部署
-        for device_id in device_ids:
-            try:
-                success, result = deploy_service.deploy_policy(
-                    policy_id=policy_id,
-                    device_id=int(device_id),
-                    user_id=current_user.id,
-                    options=options
-                )
-                
-                device = next((d for d in devices if d.id == int(device_id)), None)
-                device_name = device.name if device else f"设备 {device_id}"
-                
-                deployment_result = {
-                    'device_id': device_id,
-                    'device_name': device_name,
-                    'success': success,
-                    'message': result.get('message', '') if success else result.get('error', '发生未知错误'),
-                    'deployment_id': result.get('deployment_id')
-                }
-                
-                deployment_results.append(deployment_result)
-                
-                if not success:
-                    overall_success = False
-                    
-            except Exception as e:
-                logging.error(f"部署策略到设备 {device_id} 时发生错误: {str(e)}")
-                
-                device = next((d for d in devices if d.id == int(device_id)), None)
-                device_name = device.name if device else f"设备 {device_id}"
-                
-                deployment_results.append({
-                    'device_id': device_id,
-                    'device_name': device_name,
-                    'success': False,
-                    'message': f"部署异常: {str(e)}",
-                    'deployment_id': None
-                })
-                
-                overall_success = False
-        
-        # 生成HTML结果表格
-        result_html = '<div class="table-responsive"><table class="table table-bordered table-hover">'
-        result_html += '<thead><tr><th>设备</th><th>状态</th><th>详细信息</th></tr></thead><tbody>'
-        
-        for result in deployment_results:
-            status_class = 'success' if result['success'] else 'danger'
-            status_icon = 'check-circle' if result['success'] else 'times-circle'
-            status_text = '成功' if result['success'] else '失败'
-            
-            result_html += f'<tr>'
-            result_html += f'<td>{result["device_name"]}</td>'
-            result_html += f'<td><span class="badge bg-{status_class}"><i class="fas fa-{status_icon} me-1"></i>{status_text}</span></td>'
-            result_html += f'<td>{result["message"]}</td>'
-            result_html += f'</tr>'
-        
-        result_html += '</tbody></table></div>'
-        
-        # 显示部署结果
-        if overall_success:
-            flash('策略已成功部署到所有选定设备', 'success')
-        else:
-            flash('部署过程中遇到一些问题，请查看详细信息', 'warning')
-        
-        # 返回到部署页面并显示结果
-        return render_template(
-            'policy/deploy.html',
-            title='部署策略',
-            policy=policy,
-            devices=filtered_devices,
-            all_device_types=all_device_types,
-            deployment_results=deployment_results,
-            result_html=result_html
+        # 非演示模式，提交后台任务按金丝雀批次和波次并行下发，进度和结果通过 /api/jobs/<任务ID> 查询
+        device_ids = list(dict.fromkeys(int(device_id) for device_id in device_ids if device_id.isdigit()))
+        bulk_service = PolicyBulkDeployService()
+        job_id = get_job_queue().submit(
+            'policy_bulk_deploy', bulk_service.run_job,
+            description=f'批量部署策略 {policy_id} 到 {len(device_ids)} 台设备', owner=str(current_user.id),
+            policy_id=policy_id, device_ids=device_ids, user_id=current_user.id, options=options
         )
+        flash(f'已提交策略部署任务（任务ID: {job_id}），部署完成后在策略详情中查看各设备的部署状态', 'info')
+        return redirect(url_for('policy_view.detail', policy_id=policy_id))
     
     return render_template(
         'policy/deploy.html',
@@ -9,4 +9,5 @@
 from src.modules.policy.services.policy_service import PolicyService
 from src.modules.policy.services.policy_template_service import PolicyTemplateService
 from src.modules.policy.services.policy_deploy_service import PolicyDeployService
+from src.modules.policy.services.policy_bulk_deploy_service import PolicyBulkDeployService
 from src.modules.policy.services.policy_sync_scheduler import PolicySyncScheduler, get_scheduler 
\ No newline at end of file
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+设备配置快照服务
+每个同步周期每台设备只读取一次运行配置，策略漂移检测在内存中的配置索引上完成：
+- 快照按规范化配置的哈希寻址，配置没有变化时不新增记录
+- 配置变化时保存相对上一个快照的压缩差异，每 FULL_SNAPSHOT_INTERVAL 个差异保存一次完整配置，限制还原链长度
+- 配置解析为块索引（顶层命令 -> 子命令集合），策略是否存在于配置中通过索引查找判断
+- 密码、预共享密钥、团体字等敏感内容在保存前替换为占位符，漂移检测时期望命令做同样的替换后再比较
+"""
+
+import re
+import json
+import zlib
+import hashlib
+import logging
+import threading
+import difflib
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.core.db import db
+from src.models.device import Device
+from src.modules.policy.models.policy import Policy
+from src.modules.policy.models.config_snapshot import ConfigSnapshot
+from src.modules.policy.connectors.connector_factory import ConnectorFactory
+
+FULL_SNAPSHOT_INTERVAL = 20  # 连续保存差异的最大次数
+
+# 规范化时去掉的易变行（配置修改时间、配置长度等）和分隔行
+VOLATILE_PATTERN = re.compile(
+    r'^\W*(Last configuration change|NVRAM config last updated|Current configuration|Building configuration|'
+    r'Time:|Date:)', re.IGNORECASE
+)
+SEPARATOR_PATTERN = re.compile(r'^\s*[!#]\s*$')
+
+# 敏感配置：关键字后可跟加密方式（cipher/simple/7 等），其后的一个字段为密钥
+# 设备回显时会加密或掩码密钥（如华为 pre-shared-key cipher %^%#...），替换后明文下发的命令与设备回显一致
+SECRET_PATTERN = re.compile(
+    r'(?P<keyword>\b(?:password|secret|pre-shared-key|isakmp key|community|authentication-key|key-string)\b)'
+    r'(?!\s+encryption\b)'
+    r'(?:\s+(?:cipher|simple|irreversible-cipher|plain|encrypted|hidden|read|write|\d))*'
+    r'\s+\S+', re.IGNORECASE
+)
+SECRET_PLACEHOLDER = '******'
+
+
+def redact_line(line: str) -> str:
+    """将配置行中的密钥替换为占位符（去掉加密方式，明文和密文形式替换结果相同）"""
+    return SECRET_PATTERN.sub(lambda match: f"{match.group('keyword')} {SECRET_PLACEHOLDER}", line)
+
+
+def normalize_config(config: str) -> List[str]:
+    """规范化运行配置：去掉行尾空白、空行、分隔行和易变行，密钥替换为占位符
+
+    Args:
+        config: 运行配置文本
+
+    Returns:
+        List[str]: 配置行
+    """
+    return [redact_line(line.rstrip()) for line in config.splitlines()
+            if line.strip() and not SEPARATOR_PATTERN.match(line) and not VOLATILE_PATTERN.search(line)]
+
+
+def config_hash(lines: List[str]) -> str:
+    """计算规范化配置的SHA-256"""
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def compute_delta(old: List[str], new: List[str]) -> List[list]:
+    """计算两份配置的行差异
+
+    Returns:
+        List[list]: [[起始行, 结束行, 替换为的行], ...]，相同的行不记录
+    """
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, new[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_delta(old: List[str], delta: List[list]) -> List[str]:
+    """在基准配置上应用 compute_delta 的结果"""
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(old[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old[position:])
+    return lines
+
+
+class ConfigIndex:
+    """运行配置的块索引"""
+    
+    def __init__(self, lines: List[str]):
+        """
+        Args:
+            lines: 规范化后的配置行，顶层命令不缩进，子命令缩进（Cisco、华为均如此）
+        """
+        self.blocks: Dict[str, set] = {}
+        self.lines = set()
+        current = None
+        for line in lines:
+            stripped = line.strip()
+            self.lines.add(stripped)
+            if line[0].isspace():
+                if current is not None:
+                    self.blocks[current].add(stripped)
+            else:
+                current = stripped
+                self.blocks.setdefault(current, set())
+    
+    def presence(self, expected: List[str]) -> Dict[str, Any]:
+        """检查一组配置命令在配置中是否存在
+        
+        遇到顶层命令（块）时，其后的命令在该块的子命令中查找，找不到时再在全部配置行中查找。
+        命令中的密钥先替换为占位符，设备加密或掩码显示的密钥不算作漂移，缺失的命令也不包含密钥。
+        
+        Args:
+            expected: 按下发顺序排列的配置命令
+        
+        Returns:
+            Dict[str, Any]: 存在的命令数、期望的命令数和缺失的命令
+        """
+        missing = []
+        current = None
+        for command in map(redact_line, expected):
+            if command in self.blocks:
+                current = command
+            elif current is not None and command in self.blocks[current]:
+                pass
+            elif command not in self.lines:
+                missing.append(command)
+        return {'expected': len(expected), 'present': len(expected) - len(missing), 'missing': missing}
+
+
+# 各设备最新快照的内存缓存 {设备ID: (快照ID, 配置哈希, 配置行, 配置索引)}
+_latest_cache: Dict[int, Tuple[int, str, List[str], ConfigIndex]] = {}
+_cache_lock = threading.Lock()
+
+
+class ConfigSnapshotService:
+    """设备配置快照服务类"""
+    
+    def record(self, device_id: int, config: str) -> Tuple[ConfigSnapshot, bool]:
+        """保存设备的运行配置
+        
+        Args:
+            device_id: 设备ID
+            config: 运行配置文本
+        
+        Returns:
+            Tuple[ConfigSnapshot, bool]: (快照, 配置是否与上一个快照不同)
+        """
+        lines = normalize_config(config)
+        digest = config_hash(lines)
+        now = datetime.utcnow()
+        
+        latest = self.get_latest(device_id)
+        if latest is not None and latest.config_hash == digest:
+            latest.last_seen_at = now
+            db.session.commit()
+            self._cache(latest, lines)
+            return latest, False
+        
+        # 配置恢复为以前出现过的内容时复用原快照
+        snapshot = ConfigSnapshot.query.filter_by(device_id=device_id, config_hash=digest).first()
+        if snapshot is None:
+            snapshot = ConfigSnapshot(device_id=device_id, config_hash=digest, size=len(config.encode('utf-8')),
+                                      line_count=len(lines), created_at=now)
+            if latest is not None and latest.chain_length < FULL_SNAPSHOT_INTERVAL:
+                delta = compute_delta(self.load_lines(latest), lines)
+                snapshot.base_id = latest.id
+                snapshot.chain_length = latest.chain_length + 1
+                snapshot.content = zlib.compress(json.dumps(delta, ensure_ascii=False).encode('utf-8'))
+            else:
+                snapshot.chain_length = 0
+                snapshot.content = zlib.compress('\n'.join(lines).encode('utf-8'))
+            db.session.add(snapshot)
+        snapshot.last_seen_at = now
+        db.session.commit()
+        
+        logging.info(f"设备 {device_id} 配置发生变化，快照ID: {snapshot.id}，保存 {len(snapshot.content)} 字节")
+        self._cache(snapshot, lines)
+        return snapshot, True
+    
+    def get_latest(self, device_id: int) -> Optional[ConfigSnapshot]:
+        """获取设备最近一次看到的配置快照"""
+        return ConfigSnapshot.query.filter_by(device_id=device_id) \
+            .order_by(ConfigSnapshot.last_seen_at.desc(), ConfigSnapshot.id.desc()).first()
+    
+    def load_lines(self, snapshot: ConfigSnapshot) -> List[str]:
+        """还原快照的配置行（沿差异链找到完整配置后依次应用差异）"""
+        cached = _latest_cache.get(snapshot.device_id)
+        if cached and cached[:2] == (snapshot.id, snapshot.config_hash):
+            return cached[2]
+        
+        chain = [snapshot]
+        while chain[-1].base_id is not None:
+            chain.append(db.session.get(ConfigSnapshot, chain[-1].base_id))
+        lines = zlib.decompress(chain[-1].content).decode('utf-8').split('\n')
+        for item in reversed(chain[:-1]):
+            lines = apply_delta(lines, json.loads(zlib.decompress(item.content).decode('utf-8')))
+        return [line for line in lines if line]
+    
+    def load_config(self, snapshot: ConfigSnapshot) -> str:
+        """还原快照的配置文本"""
+        return '\n'.join(self.load_lines(snapshot))
+    
+    def get_index(self, device_id: int) -> Optional[ConfigIndex]:
+        """获取设备最新配置的索引（最新快照未变化时使用内存中的索引，其他进程保存了新快照时重新加载）"""
+        latest = self.get_latest(device_id)
+        if latest is None:
+            return None
+        return self._cache(latest, self.load_lines(latest))
+    
+    def check_policy(self, policy: Policy, device: Device) -> Dict[str, Any]:
+        """根据设备最新的配置快照检查策略是否存在（不访问设备）
+        
+        Args:
+            policy: 策略对象
+            device: 设备对象
+        
+        Returns:
+            Dict[str, Any]: status 为 present（全部存在）、drifted（部分缺失）、absent（全部缺失）
+                或 unknown（没有快照或无法生成期望配置）
+        """
+        index = self.get_index(device.id)
+        expected = ConnectorFactory.get_connector_class(device)().get_expected_config(policy.config or {})
+        if index is None or not expected:
+            return {'status': 'unknown', 'expected': len(expected), 'present': 0, 'missing': []}
+        
+        presence = index.presence(expected)
+        if presence['present'] == presence['expected']:
+            presence['status'] = 'present'
+        elif presence['present'] == 0:
+            presence['status'] = 'absent'
+        else:
+            presence['status'] = 'drifted'
+        presence['snapshot_id'] = _latest_cache[device.id][0]
+        return presence
+    
+    @staticmethod
+    def _cache(snapshot: ConfigSnapshot, lines: List[str]) -> ConfigIndex:
+        with _cache_lock:
+            cached = _latest_cache.get(snapshot.device_id)
+            if cached and cached[:2] == (snapshot.id, snapshot.config_hash):
+                return cached[3]
+            index = ConfigIndex(lines)
+            _latest_cache[snapshot.device_id] = (snapshot.id, snapshot.config_hash, lines, index)
+            return index
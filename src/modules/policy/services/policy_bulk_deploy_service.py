@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+策略批量下发服务类
+将一个策略并行下发到多台设备：先下发金丝雀批次，成功后按波次下发其余设备，
+每台设备完成后立即产出结果，失败比例超过阈值时停止后续波次。
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Iterator, Callable, Optional
+
+from flask import current_app, has_app_context
+
+from src.core.job_queue import JobContext, JobCancelled
+from src.models.device import Device
+from src.modules.policy.services.policy_deploy_service import PolicyDeployService
+
+DEFAULT_MAX_WORKERS = 16  # 同时下发的设备数
+DEFAULT_CANARY_SIZE = 1  # 金丝雀批次设备数，0表示不使用金丝雀批次
+DEFAULT_FAILURE_THRESHOLD = 0.2  # 单个波次失败比例超过该值时停止后续波次
+
+
+class PolicyBulkDeployService:
+    """策略批量下发服务类"""
+    
+    def __init__(self, max_workers: int = None, canary_size: int = None, wave_size: int = None,
+                 failure_threshold: float = None):
+        """初始化服务
+        
+        Args:
+            max_workers: 同时下发的设备数上限
+            canary_size: 金丝雀批次设备数，金丝雀批次中任一设备失败即停止下发
+            wave_size: 金丝雀批次之后每个波次的设备数，0或None表示其余设备作为一个波次
+            failure_threshold: 波次失败比例阈值
+        """
+        config = current_app.config if has_app_context() else {}
+        self.max_workers = max_workers or config.get('POLICY_DEPLOY_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        self.canary_size = canary_size if canary_size is not None else \
+            config.get('POLICY_DEPLOY_CANARY_SIZE', DEFAULT_CANARY_SIZE)
+        self.wave_size = wave_size if wave_size is not None else config.get('POLICY_DEPLOY_WAVE_SIZE', 0)
+        self.failure_threshold = failure_threshold if failure_threshold is not None else \
+            config.get('POLICY_DEPLOY_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)
+    
+    def plan_waves(self, device_ids: List[int]) -> List[List[int]]:
+        """划分下发波次
+        
+        Args:
+            device_ids: 设备ID列表
+        
+        Returns:
+            List[List[int]]: 波次列表，启用金丝雀批次时第一个波次为金丝雀批次
+        """
+        canary = device_ids[:self.canary_size] if self.canary_size else []
+        rest = device_ids[len(canary):]
+        wave_size = self.wave_size or len(rest)
+        waves = [canary] if canary else []
+        waves += [rest[i:i + wave_size] for i in range(0, len(rest), wave_size)]
+        return waves
+    
+    def deploy(self, policy_id: int, device_ids: List[int], user_id: int,
+               options: Dict[str, bool] = None,
+               stop_requested: Optional[Callable[[], bool]] = None) -> Iterator[Dict[str, Any]]:
+        """批量下发策略，逐个产出下发事件
+        
+        事件类型：
+            - wave: 开始一个波次，包含波次序号和设备列表
+            - result: 一台设备下发完成（按完成顺序产出），skipped为True表示因停止下发而跳过
+            - done: 全部结束，包含成功、失败、跳过数量和耗时
+        
+        Args:
+            policy_id: 策略ID
+            device_ids: 设备ID列表
+            user_id: 操作用户ID
+            options: 部署选项，与 PolicyDeployService.deploy_policy 相同
+            stop_requested: 每个波次开始前调用，返回True时不再开始后续波次（其余设备记为跳过）
+        
+        Yields:
+            Dict[str, Any]: 下发事件
+        """
+        app = current_app._get_current_object()
+        device_ids = list(dict.fromkeys(int(device_id) for device_id in device_ids))
+        device_names = {
+            device.id: device.name for device in Device.query.filter(Device.id.in_(device_ids)).all()
+        } if device_ids else {}
+        waves = self.plan_waves(device_ids)
+        summary = {'total': len(device_ids), 'success': 0, 'failed': 0, 'skipped': 0, 'waves': len(waves),
+                   'aborted': None}
+        
+        # 每个工作线程复用一个下发服务实例，服务内按厂商复用连接器
+        local = threading.local()
+        
+        def deploy_one(device_id: int):
+            with app.app_context():
+                service = getattr(local, 'service', None)
+                if service is None:
+                    service = local.service = PolicyDeployService(reuse_connectors=True)
+                try:
+                    return service.deploy_policy(policy_id, device_id, user_id, options)
+                except Exception as e:
+                    logging.error(f"部署策略到设备 {device_id} 时发生错误: {str(e)}")
+                    return False, {'error': f'部署异常: {str(e)}'}
+        
+        start = time.time()
+        workers = max(1, min(self.max_workers, len(device_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='policy-deploy') as executor:
+            for index, wave in enumerate(waves):
+                canary = index == 0 and bool(self.canary_size)
+                if not summary['aborted'] and stop_requested is not None and stop_requested():
+                    summary['aborted'] = '已取消，停止后续下发'
+                    logging.info(f"策略 {policy_id} 批量下发已取消")
+                if summary['aborted']:
+                    for device_id in wave:
+                        summary['skipped'] += 1
+                        yield self._result_event(index, device_id, device_names, False,
+                                                 {'error': summary['aborted']}, skipped=True)
+                    continue
+                
+                yield {'event': 'wave', 'wave': index, 'canary': canary, 'devices': wave}
+                futures = {executor.submit(deploy_one, device_id): device_id for device_id in wave}
+                failed = 0
+                for future in as_completed(futures):
+                    success, result = future.result()
+                    if success:
+                        summary['success'] += 1
+                    else:
+                        summary['failed'] += 1
+                        failed += 1
+                    yield self._result_event(index, futures[future], device_names, success, result)
+                
+                # 金丝雀批次不允许失败，其余波次按失败比例判断
+                if canary and failed:
+                    summary['aborted'] = f'金丝雀批次有 {failed} 台设备下发失败，已停止后续下发'
+                elif failed > len(wave) * self.failure_threshold:
+                    summary['aborted'] = f'第 {index + 1} 波次失败 {failed}/{len(wave)} 台，超过阈值，已停止后续下发'
+                if summary['aborted']:
+                    logging.warning(f"策略 {policy_id} 批量下发: {summary['aborted']}")
+        
+        summary['elapsed'] = round(time.time() - start, 3)
+        logging.info(f"策略 {policy_id} 批量下发完成: 成功 {summary['success']}，失败 {summary['failed']}，"
+                     f"跳过 {summary['skipped']}，耗时 {summary['elapsed']} 秒")
+        yield dict(event='done', **summary)
+    
+    def run_job(self, job: JobContext, policy_id: int, device_ids: List[int], user_id: int,
+                options: Dict[str, bool] = None) -> Dict[str, Any]:
+        """作为后台任务批量下发策略，每台设备完成后更新任务进度
+        
+        请求取消后不再开始新的波次（已开始的设备等待完成），其余设备记为跳过，任务以已取消结束，
+        已完成设备的结果保存在任务数据中。全部设备都已开始下发后才收到的取消不影响结果。
+        
+        Returns:
+            Dict[str, Any]: 汇总信息（done事件内容）和每台设备的下发结果
+        """
+        device_ids = list(dict.fromkeys(int(device_id) for device_id in device_ids))
+        results = []
+        stopped = []
+        
+        def stop_requested() -> bool:
+            if job.cancelled:
+                stopped.append(True)
+            return bool(stopped)
+        
+        summary = {}
+        for event in self.deploy(policy_id, device_ids, user_id, options, stop_requested=stop_requested):
+            if event['event'] == 'done':
+                summary = event
+            elif event['event'] == 'result':
+                results.append(event)
+                job.update(progress=len(results) / len(device_ids),
+                           message=f"已下发 {len(results)}/{len(device_ids)} 台设备",
+                           data={'results': results})
+        
+        if stopped:
+            logging.info(f"策略 {policy_id} 批量下发已取消，已完成 {summary['success'] + summary['failed']} 台设备")
+            raise JobCancelled(f"策略 {policy_id} 批量下发已取消")
+        return dict(summary, results=results)
+    
+    @staticmethod
+    def _result_event(wave: int, device_id: int, device_names: Dict[int, str], success: bool,
+                      result: Dict[str, Any], skipped: bool = False) -> Dict[str, Any]:
+        return {
+            'event': 'result',
+            'wave': wave,
+            'device_id': device_id,
+            'device_name': device_names.get(device_id, f'设备 {device_id}'),
+            'success': success,
+            'skipped': skipped,
+            'message': result.get('message', '') if success else result.get('error', '发生未知错误'),
+            'deployment_id': result.get('deployment_id')
+        }
@@ -8,9 +8,12 @@
 
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, List, Tuple, Optional
 from datetime import datetime
 
+from flask import current_app, has_app_context
+
 from src.core.db import db
 from src.models.device import Device
 from src.modules.policy.models.policy import Policy
@@ -18,16 +21,24 @@ from src.modules.policy.models.policy_deployment import PolicyDeployment
 from src.modules.policy.repositories.policy_repository import PolicyRepository, PolicyDeploymentRepository, PolicyAuditLogRepository
 from src.modules.policy.connectors.connector_factory import ConnectorFactory
 from src.modules.policy.connectors.firewall_connector import FirewallConnector, FirewallConnectionError, FirewallDeployError
+from src.modules.policy.services.config_snapshot_service import ConfigSnapshotService, config_hash, normalize_config
+
+DEFAULT_SYNC_WORKERS = 8  # 并行同步的设备数
 
 
 class PolicyDeployService:
     """策略下发服务类"""
     
-    def __init__(self):
-        """初始化服务"""
+    def __init__(self, reuse_connectors: bool = False):
+        """初始化服务
+        
+        Args:
+            reuse_connectors: 按厂商复用连接器实例（批量下发时每个工作线程使用一个服务实例）
+        """
         self.policy_repo = PolicyRepository(db.session)
         self.deployment_repo = PolicyDeploymentRepository(db.session)
         self.audit_repo = PolicyAuditLogRepository(db.session)
+        self._connectors = {} if reuse_connectors else None
     
     def deploy_policy(self, policy_id: int, device_id: int, user_id: int, options: Dict[str, bool] = None) -> Tuple[bool, Any]:
         """部署策略到设备
@@ -185,12 +196,20 @@ class PolicyDeployService:
             logging.error(f"获取策略状态时发生错误: {str(e)}")
             return False, {'error': str(e), 'deployment_data': deployment.to_dict()}
     
-    def sync_policy_status(self, policy_id: int = None, device_id: int = None) -> Dict[str, Any]:
+    def sync_policy_status(self, policy_id: int = None, device_id: int = None,
+                           checksums: Optional[Dict[int, str]] = None, max_workers: int = None) -> Dict[str, Any]:
         """同步策略状态（可由定时任务调用）
         
+        部署记录按设备分组，每台设备只连接一次、执行一次状态查询，结果由设备上的全部策略共享；
+        多台设备并行同步。提供 checksums 时每台设备读取一次运行配置保存为配置快照，
+        并根据快照检查各策略的配置是否仍在设备上（漂移检测）。
+        
         Args:
             policy_id: 策略ID（可选，如果提供则只同步指定策略）
             device_id: 设备ID（可选，如果提供则只同步指定设备上的策略）
+            checksums: 上次同步时各设备的配置校验和 {设备ID: 校验和}（可选）。提供时保存配置快照、
+                跳过配置未变化的设备的状态查询，并写回本次的校验和
+            max_workers: 并行同步的设备数
             
         Returns:
             Dict[str, Any]: 同步结果统计
@@ -213,44 +232,198 @@ class PolicyDeployService:
             'success': 0,
             'failed': 0,
             'not_found': 0,
+            'skipped': 0,
+            'devices': 0,
             'details': []
         }
         
+        # 按设备分组，策略和设备各只查询一次
+        policies = {}
+        groups = {}
         for deployment in deployments:
-            try:
-                policy = self.policy_repo.get_by_id(deployment.policy_id)
-                device = Device.query.get(deployment.device_id)
-                
-                if not policy or not device:
-                    result['not_found'] += 1
-                    continue
-                
-                # 获取设备上的策略状态
-                device_status = self._get_device_policy_status(policy, device)
+            if deployment.policy_id not in policies:
+                policies[deployment.policy_id] = self.policy_repo.get_by_id(deployment.policy_id)
+            groups.setdefault(deployment.device_id, []).append(deployment)
+        
+        tasks = []
+        for group_device_id, group in groups.items():
+            device = Device.query.get(group_device_id)
+            found = [d for d in group if device and policies.get(d.policy_id)]
+            result['not_found'] += len(group) - len(found)
+            if found:
+                tasks.append((device, found))
+        result['devices'] = len(tasks)
+        
+        if not tasks:
+            return result
+        
+        # 并行查询设备（只访问设备，不读写数据库），结果在当前线程写回部署记录
+        if max_workers is None:
+            config = current_app.config if has_app_context() else {}
+            max_workers = config.get('POLICY_SYNC_MAX_WORKERS', DEFAULT_SYNC_WORKERS)
+        workers = max(1, min(max_workers, len(tasks)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='policy-sync') as executor:
+            futures = {
+                executor.submit(
+                    self._sync_device,
+                    device,
+                    [policies[d.policy_id] for d in group],
+                    checksums.get(device.id) if checksums is not None else None,
+                    checksums is not None
+                ): (device, group)
+                for device, group in tasks
+            }
+            outcomes = [(futures[future], future.result()) for future in as_completed(futures)]
+        
+        snapshot_service = ConfigSnapshotService()
+        for (device, group), (config, checksum, statuses) in outcomes:
+            # 只有全部状态查询都成功时才记录校验和，否则下次同步会因配置未变化而沿用错误状态
+            if checksums is not None and checksum and (statuses is None or all(
+                    (statuses.get(str(d.policy_id)) or {}).get('status') not in (None, 'error', 'unknown')
+                    for d in group)):
+                checksums[device.id] = checksum
+            
+            if config is not None:
+                try:
+                    snapshot_service.record(device.id, config)
+                except Exception as e:
+                    logging.error(f"保存设备 {device.name} 的配置快照时发生错误: {str(e)}")
+                    db.session.rollback()
+                    config = None
+            
+            if statuses is None:
+                # 配置未变化，沿用上次同步的状态
+                result['skipped'] += len(group)
+                continue
+            
+            for deployment in group:
+                policy = policies[deployment.policy_id]
+                try:
+                    device_status = statuses.get(str(policy.id))
+                    if device_status:
+                        if config is not None:
+                            # 在内存中的配置索引上检查策略配置是否仍然存在
+                            device_status['config'] = snapshot_service.check_policy(policy, device)
+                        self.deployment_repo.update(deployment.id, {
+                            'result': json.dumps(device_status)
+                        })
+                        
+                        result['success'] += 1
+                        result['details'].append({
+                            'policy_id': policy.id,
+                            'policy_name': policy.name,
+                            'device_id': device.id,
+                            'device_name': device.name,
+                            'status': device_status.get('status', 'unknown'),
+                            'drift': device_status.get('config', {}).get('status')
+                        })
+                    else:
+                        result['failed'] += 1
                 
-                if device_status:
-                    # 更新部署记录
-                    self.deployment_repo.update(deployment.id, {
-                        'result': json.dumps(device_status)
-                    })
-                    
-                    result['success'] += 1
-                    result['details'].append({
-                        'policy_id': policy.id,
-                        'policy_name': policy.name,
-                        'device_id': device.id,
-                        'device_name': device.name,
-                        'status': device_status.get('status', 'unknown')
-                    })
-                else:
+                except Exception as e:
+                    logging.error(f"同步策略状态时发生错误: 策略ID={deployment.policy_id}, 设备ID={deployment.device_id}, 错误: {str(e)}")
                     result['failed'] += 1
+        
+        return result
+    
+    def check_policy_drift(self, policy_id: int = None, device_id: int = None) -> Dict[str, Any]:
+        """根据设备最新的配置快照检查已部署策略是否发生漂移（不连接设备）
+        
+        Args:
+            policy_id: 策略ID（可选）
+            device_id: 设备ID（可选）
             
-            except Exception as e:
-                logging.error(f"同步策略状态时发生错误: 策略ID={deployment.policy_id}, 设备ID={deployment.device_id}, 错误: {str(e)}")
-                result['failed'] += 1
+        Returns:
+            Dict[str, Any]: 各状态的数量和每个部署的检查结果
+        """
+        filters = {'status': 'success'}
+        if policy_id:
+            filters['policy_id'] = policy_id
+        if device_id:
+            filters['device_id'] = device_id
         
+        snapshot_service = ConfigSnapshotService()
+        policies = {}
+        devices = {}
+        result = {'total': 0, 'present': 0, 'drifted': 0, 'absent': 0, 'unknown': 0, 'details': []}
+        for deployment in self.deployment_repo.get_all(filters):
+            if deployment.policy_id not in policies:
+                policies[deployment.policy_id] = self.policy_repo.get_by_id(deployment.policy_id)
+            if deployment.device_id not in devices:
+                devices[deployment.device_id] = Device.query.get(deployment.device_id)
+            policy = policies[deployment.policy_id]
+            device = devices[deployment.device_id]
+            if not policy or not device:
+                continue
+            
+            check = snapshot_service.check_policy(policy, device)
+            result['total'] += 1
+            result[check['status']] += 1
+            result['details'].append(dict(check, policy_id=policy.id, policy_name=policy.name,
+                                          device_id=device.id, device_name=device.name))
         return result
     
+    def _sync_device(self, device: Device, policies: List[Policy], last_checksum: Optional[str],
+                     check_config: bool) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Dict[str, Any]]]]:
+        """查询一台设备上多个策略的状态（在同步线程池中执行）
+        
+        Args:
+            device: 设备对象
+            policies: 设备上需要同步的策略
+            last_checksum: 上次同步时的配置校验和
+            check_config: 是否读取运行配置并计算校验和
+            
+        Returns:
+            Tuple: (运行配置, 本次配置校验和, {策略ID: 状态})，配置未变化时状态为None
+        """
+        policy_ids = [str(policy.id) for policy in policies]
+        check_time = datetime.utcnow().isoformat()
+        try:
+            connector = self._connect(device)
+            if not connector:
+                logging.error(f"无法连接到设备 {device.name}")
+                return None, None, {policy_id: {
+                    'status': 'unknown',
+                    'error': f'无法连接到设备 {device.name}',
+                    'check_time': check_time
+                } for policy_id in policy_ids}
+            
+            try:
+                config = connector.get_running_config() if check_config else None
+                checksum = config_hash(normalize_config(config)) if config else None
+                if checksum and checksum == last_checksum:
+                    logging.debug(f"设备 {device.name} 的配置自上次同步以来没有变化，跳过状态查询")
+                    return config, checksum, None
+                
+                # 只有一个策略时直接查询，多个策略共享一次查询结果
+                if len(policy_ids) == 1:
+                    statuses = {policy_ids[0]: connector.get_policy_status(policy_ids[0])}
+                else:
+                    statuses = connector.get_policy_statuses(policy_ids)
+            finally:
+                # 断开连接
+                connector.disconnect()
+            
+            for policy in policies:
+                status = statuses.get(str(policy.id))
+                if not status:
+                    continue
+                # 确保状态包含检查时间，并添加额外信息以便于追踪
+                status.setdefault('check_time', check_time)
+                status['policy_id'] = policy.id
+                status['policy_name'] = policy.name
+                status['device_id'] = device.id
+                status['device_name'] = device.name
+            return config, checksum, statuses
+        
+        except Exception as e:
+            logging.error(f"获取设备 {device.name} 的策略状态时发生错误: {str(e)}")
+            return None, None, {policy_id: {
+                'status': 'error',
+                'error': str(e),
+                'check_time': check_time
+            } for policy_id in policy_ids}
+    
     def rollback_policy(self, policy_id: int, device_id: int, user_id: int) -> Tuple[bool, Any]:
         """回滚策略
         
@@ -348,7 +521,7 @@ class PolicyDeployService:
         
         try:
             # 创建连接器
-            connector = ConnectorFactory.create_and_connect(device)
+            connector = self._connect(device)
             if not connector:
                 return False, {'error': f'无法连接到设备 {device.name}'}
             
@@ -372,6 +545,19 @@ class PolicyDeployService:
             logging.error(f"验证策略时发生错误: {str(e)}")
             return False, {'error': str(e)}
     
+    def _connect(self, device: Device) -> Optional[FirewallConnector]:
+        """创建（或复用）连接器并连接到设备
+        
+        Args:
+            device: 设备对象
+            
+        Returns:
+            Optional[FirewallConnector]: 已连接的连接器，连接失败返回None
+        """
+        if self._connectors is None:
+            return ConnectorFactory.create_and_connect(device)
+        return ConnectorFactory.create_and_connect(device, self._connectors)
+    
     def _deploy_to_device(self, policy: Policy, device: Device, deployment_id: int) -> Tuple[bool, str]:
         """将策略部署到设备
         
@@ -385,7 +571,7 @@ class PolicyDeployService:
         """
         try:
             # 连接设备
-            connector = ConnectorFactory.create_and_connect(device)
+            connector = self._connect(device)
             if not connector:
                 return False, "无法连接到设备"
             
@@ -416,7 +602,7 @@ class PolicyDeployService:
         """
         try:
             # 连接设备
-            connector = ConnectorFactory.create_and_connect(device)
+            connector = self._connect(device)
             if not connector:
                 logging.error(f"无法连接到设备 {device.name}")
                 return {
@@ -464,7 +650,7 @@ class PolicyDeployService:
         """
         try:
             # 连接设备
-            connector = ConnectorFactory.create_and_connect(device)
+            connector = self._connect(device)
             if not connector:
                 return False, "无法连接到设备"
             
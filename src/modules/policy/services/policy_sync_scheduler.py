@@ -39,6 +39,7 @@ class PolicySyncScheduler:
         self.failure_count = 0
         self.alert_on_failure = False
         self.alert_threshold = 3
+        self.device_checksums: Dict[int, str] = {}  # 上次同步时各设备的配置校验和，配置未变化的设备跳过状态查询
     
     def start(self) -> bool:
         """启动调度器
@@ -93,7 +94,8 @@ class PolicySyncScheduler:
             'last_sync_result': self.last_sync_result,
             'failure_count': self.failure_count,
             'alert_on_failure': self.alert_on_failure,
-            'alert_threshold': self.alert_threshold
+            'alert_threshold': self.alert_threshold,
+            'tracked_devices': len(self.device_checksums)
         }
         
         return status
@@ -307,36 +309,28 @@ class PolicySyncScheduler:
         Returns:
             Dict[str, Any]: 同步结果
         """
-        try:
-            # 创建新的数据库会话
-            session = db.create_scoped_session()
-            deploy_service = PolicyDeployService()
-            
-            # 执行同步
-            result = deploy_service.sync_policy_status()
-            
-            # 记录结果
-            elapsed = time.time() - start_time
-            result['elapsed_time'] = f"{elapsed:.2f}秒"
-            result['sync_time'] = self.last_sync_time.isoformat()
-            
-            self.last_sync_result = result
-            
-            logging.info(f"策略同步完成，耗时: {elapsed:.2f}秒，成功: {result['success']}，"
-                        f"失败: {result['failed']}，未找到: {result['not_found']}")
-            
-            # 处理同步成功
-            if result['failed'] == 0:
-                self._handle_sync_success()
-            else:
-                self._handle_sync_failure(f"同步部分失败: {result['failed']}个策略同步失败")
-            
-            return result
+        deploy_service = PolicyDeployService()
+        
+        # 执行同步（按设备分组并行查询，跳过配置未变化的设备）
+        result = deploy_service.sync_policy_status(checksums=self.device_checksums)
+        
+        # 记录结果
+        elapsed = time.time() - start_time
+        result['elapsed_time'] = f"{elapsed:.2f}秒"
+        result['sync_time'] = self.last_sync_time.isoformat()
+        
+        self.last_sync_result = result
+        
+        logging.info(f"策略同步完成，耗时: {elapsed:.2f}秒，设备: {result['devices']}，成功: {result['success']}，"
+                    f"失败: {result['failed']}，未找到: {result['not_found']}，配置未变化跳过: {result['skipped']}")
+        
+        # 处理同步成功
+        if result['failed'] == 0:
+            self._handle_sync_success()
+        else:
+            self._handle_sync_failure(f"同步部分失败: {result['failed']}个策略同步失败")
         
-        finally:
-            # 如果创建了新会话，关闭它
-            if 'session' in locals():
-                session.close()
+        return result
 
 
 # 全局调度器实例
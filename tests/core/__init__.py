@@ -0,0 +1,3 @@
+"""
+核心模块测试包初始化文件
+"""
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟SNMP v2c代理 - 在后台线程中响应GET/GETNEXT/GETBULK请求
+
+用于在没有真实网络设备的情况下测试SNMP采集客户端，并统计收到的请求数（往返次数）。
+"""
+
+import socket
+import threading
+from bisect import bisect_right
+from typing import Dict, Any
+
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api
+
+P_MOD = api.protoModules[api.protoVersion2c]
+
+
+def _oid_tuple(oid: str) -> tuple:
+    return tuple(int(x) for x in oid.strip('.').split('.'))
+
+
+def build_if_table(port_count: int = 48) -> Dict[str, Any]:
+    """构造一个交换机的IF-MIB数据（ifTable + ifXTable部分列）"""
+    data = {
+        '1.3.6.1.2.1.1.1.0': P_MOD.OctetString('Fake Switch'),
+        '1.3.6.1.2.1.1.3.0': P_MOD.TimeTicks(123456),
+        '1.3.6.1.2.1.2.1.0': P_MOD.Integer(port_count),
+    }
+    for index in range(1, port_count + 1):
+        data[f'1.3.6.1.2.1.2.2.1.1.{index}'] = P_MOD.Integer(index)
+        data[f'1.3.6.1.2.1.2.2.1.2.{index}'] = P_MOD.OctetString(f'GigabitEthernet0/0/{index}')
+        data[f'1.3.6.1.2.1.2.2.1.8.{index}'] = P_MOD.Integer(1 if index % 2 else 2)
+        data[f'1.3.6.1.2.1.2.2.1.10.{index}'] = P_MOD.Counter32(index * 1000)
+        data[f'1.3.6.1.2.1.2.2.1.16.{index}'] = P_MOD.Counter32(index * 2000)
+        data[f'1.3.6.1.2.1.31.1.1.1.1.{index}'] = P_MOD.OctetString(f'GE0/0/{index}')
+    return data
+
+
+class FakeSnmpAgent:
+    """在127.0.0.1随机端口上运行的模拟SNMP代理"""
+
+    def __init__(self, data: Dict[str, Any], community: str = 'public'):
+        self.community = community
+        self.data = {_oid_tuple(oid): value for oid, value in data.items()}
+        self.sorted_oids = sorted(self.data)
+        self.request_count = 0
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.sock.close()
+
+    def _next(self, oid: tuple):
+        position = bisect_right(self.sorted_oids, oid)
+        if position >= len(self.sorted_oids):
+            return oid, P_MOD.EndOfMibView()
+        next_oid = self.sorted_oids[position]
+        return next_oid, self.data[next_oid]
+
+    def _serve(self):
+        while self._running:
+            try:
+                message, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+
+            request, _ = decoder.decode(message, asn1Spec=P_MOD.Message())
+            if str(P_MOD.apiMessage.getCommunity(request)) != self.community:
+                continue
+            self.request_count += 1
+
+            request_pdu = P_MOD.apiMessage.getPDU(request)
+            response = P_MOD.apiMessage.getResponse(request)
+            response_pdu = P_MOD.apiMessage.getPDU(response)
+            request_binds = [tuple(oid) for oid, _ in P_MOD.apiPDU.getVarBinds(request_pdu)]
+            var_binds = []
+
+            if request_pdu.isSameTypeWith(P_MOD.GetRequestPDU()):
+                for oid in request_binds:
+                    var_binds.append((oid, self.data.get(oid, P_MOD.NoSuchInstance())))
+            elif request_pdu.isSameTypeWith(P_MOD.GetNextRequestPDU()):
+                for oid in request_binds:
+                    var_binds.append(self._next(oid))
+            elif request_pdu.isSameTypeWith(P_MOD.GetBulkRequestPDU()):
+                non_repeaters = int(P_MOD.apiBulkPDU.getNonRepeaters(request_pdu))
+                max_repetitions = int(P_MOD.apiBulkPDU.getMaxRepetitions(request_pdu))
+                for oid in request_binds[:non_repeaters]:
+                    var_binds.append(self._next(oid))
+                cursors = request_binds[non_repeaters:]
+                for _ in range(max_repetitions):
+                    row = [self._next(oid) for oid in cursors]
+                    var_binds.extend(row)
+                    cursors = [oid for oid, _ in row]
+                    if all(isinstance(value, P_MOD.EndOfMibView) for _, value in row):
+                        break
+
+            P_MOD.apiPDU.setVarBinds(response_pdu, var_binds)
+            self.sock.sendto(encoder.encode(response), address)
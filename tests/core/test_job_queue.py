@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+后台任务队列单元测试
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from flask import Flask, current_app
+
+from src.core.job_queue import JobQueue, _worker_token
+
+
+def wait_done(queue, job_id, timeout=5):
+    """等待任务结束并返回任务状态"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['done']:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'任务 {job_id} 未在 {timeout} 秒内结束')
+
+
+class TestJobQueue(unittest.TestCase):
+    """后台任务队列测试类（两个实例打开同一文件，模拟两个工作进程）"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'jobs.sqlite')
+        self.worker_a = JobQueue(path, max_workers=1)
+        self.worker_b = JobQueue(path)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.worker_a.shutdown(wait=True)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_submit_progress_and_result(self):
+        """测试提交后立即返回，任务在应用上下文中执行，进度和结果对其他进程可见"""
+        release = threading.Event()
+
+        def task(job, count):
+            job.update(progress=0.5, message='进行中', data={'done': count // 2})
+            release.wait(5)
+            return {'app': current_app.name, 'count': count}
+
+        app = Flask('job-test')
+        with app.app_context():
+            job_id = self.worker_a.submit('demo', task, 10, description='测试任务', owner='admin')
+
+        deadline = time.time() + 5
+        while self.worker_b.get(job_id)['progress'] < 0.5 and time.time() < deadline:
+            time.sleep(0.02)
+        job = self.worker_b.get(job_id)
+        self.assertEqual((job['status'], job['message'], job['data']), ('running', '进行中', {'done': 5}))
+
+        release.set()
+        job = wait_done(self.worker_b, job_id)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result'], {'app': 'job-test', 'count': 10})
+        self.assertEqual(job['progress'], 1.0)
+        self.assertEqual([j['id'] for j in self.worker_b.list_jobs(kind='demo', owner='admin')], [job_id])
+
+    def test_failure(self):
+        """测试任务抛出异常时标记为失败并记录错误信息"""
+        def task(job):
+            raise RuntimeError('设备连接失败')
+
+        job = wait_done(self.worker_a, self.worker_a.submit('demo', task))
+        self.assertEqual((job['status'], job['error']), ('failed', '设备连接失败'))
+
+    def test_cancel_queued_and_running(self):
+        """测试从其他进程取消：排队中的任务不再执行，运行中的任务在检查点停止"""
+        started = threading.Event()
+        executed = []
+
+        def long_task(job):
+            started.set()
+            while True:
+                job.check_cancelled()
+                time.sleep(0.02)
+
+        def short_task(job):
+            executed.append(job.id)
+
+        running_id = self.worker_a.submit('demo', long_task)
+        queued_id = self.worker_a.submit('demo', short_task)
+        self.assertTrue(started.wait(5))
+
+        self.assertTrue(self.worker_b.cancel(queued_id))
+        self.assertEqual(self.worker_b.get(queued_id)['status'], 'cancelled')
+        self.assertTrue(self.worker_b.cancel(running_id))
+        self.assertEqual(wait_done(self.worker_a, running_id)['status'], 'cancelled')
+        self.assertEqual(wait_done(self.worker_a, queued_id)['status'], 'cancelled')
+        self.assertEqual(executed, [])
+        self.assertFalse(self.worker_b.cancel(running_id))
+
+    def test_retention_and_recover(self):
+        """测试已结束任务超过保留时间后清理，执行进程已退出的任务标记为失败"""
+        job_id = self.worker_a.submit('demo', lambda job: None)
+        wait_done(self.worker_a, job_id)
+        self.assertEqual(self.worker_a.purge(time.time() + 10), 0)
+        self.assertEqual(self.worker_a.purge(time.time() + self.worker_a.retention + 10), 1)
+        self.assertIsNone(self.worker_a.get(job_id))
+
+        now = time.time()
+        self.worker_b._execute(
+            "INSERT INTO jobs (id, kind, status, pid, created_at, updated_at) VALUES ('orphan', 'demo', 'running', ?, ?, ?)",
+            (2 ** 22 + 1, now, now)
+        )
+        self.assertEqual(self.worker_b.recover(), 1)
+        self.assertEqual(self.worker_b.get('orphan')['status'], 'failed')
+
+    def test_recover_reused_pid(self):
+        """测试重启后的进程复用了原进程的pid时，原进程遗留的任务仍标记为失败"""
+        now = time.time()
+        sql = "INSERT INTO jobs (id, kind, status, pid, worker, created_at, updated_at) VALUES (?, 'demo', 'running', ?, ?, ?, ?)"
+        self.worker_b._execute(sql, ('previous', os.getpid(), f'{os.getpid()}:1', now, now))
+        self.worker_b._execute(sql, ('legacy', os.getpid(), None, now, now))
+        self.worker_b._execute(sql, ('current', os.getpid(), _worker_token(), now, now))
+        self.assertEqual(self.worker_b.recover(), 2)
+        self.assertEqual(self.worker_b.get('previous')['status'], 'failed')
+        self.assertEqual(self.worker_b.get('current')['status'], 'running')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本机共享状态存储单元测试
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.core.local_store import LocalStore
+
+
+class TestLocalStore(unittest.TestCase):
+    """本机共享状态存储测试类（两个实例打开同一文件，模拟两个工作进程）"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'local_store.sqlite')
+        self.worker_a = LocalStore(path)
+        self.worker_b = LocalStore(path)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_claim_is_exclusive_within_ttl(self):
+        """测试有效期内只有一个进程能声明成功"""
+        self.assertEqual(self.worker_a.claim('alert_silence', '1:cpu_usage', now=100, ttl=60), (True, 100))
+        self.assertEqual(self.worker_b.claim('alert_silence', '1:cpu_usage', now=120, ttl=60), (False, 100))
+        self.assertTrue(self.worker_b.claim('alert_silence', '2:cpu_usage', now=120, ttl=60)[0])
+        self.assertEqual(self.worker_b.claim('alert_silence', '1:cpu_usage', now=160, ttl=60), (True, 160))
+        self.assertEqual(self.worker_a.get_claims('alert_silence'), {'1:cpu_usage': 160, '2:cpu_usage': 120})
+
+    def test_release_own_claim_only(self):
+        """测试撤销声明只撤销指定时间的声明"""
+        self.worker_a.claim('alert_silence', '1:cpu_usage', now=100, ttl=60)
+        self.assertFalse(self.worker_b.release('alert_silence', '1:cpu_usage', 90))
+        self.assertTrue(self.worker_a.release('alert_silence', '1:cpu_usage', 100))
+        self.assertEqual(self.worker_b.claim('alert_silence', '1:cpu_usage', now=110, ttl=60), (True, 110))
+
+    def test_changelog(self):
+        """测试变更日志按序号增量读取"""
+        self.assertEqual(self.worker_b.last_seq('thresholds'), 0)
+        first = self.worker_a.append_change('thresholds', {'op': 'put', 'threshold': {'id': 1}})
+        self.worker_a.append_change('other', {'op': 'put'})
+        self.worker_a.append_change('thresholds', {'op': 'delete', 'threshold': {'id': 1}})
+
+        changes = self.worker_b.changes_since('thresholds', 0)
+        self.assertEqual([change['op'] for _, change in changes], ['put', 'delete'])
+        self.assertEqual([change['op'] for _, change in self.worker_b.changes_since('thresholds', first)], ['delete'])
+        self.assertEqual(self.worker_b.last_seq('thresholds'), changes[-1][0])
+
+    def test_memory_store(self):
+        """测试未配置路径时使用内存数据库"""
+        store = LocalStore()
+        self.assertTrue(store.claim('ns', 'k', now=0, ttl=10)[0])
+        self.assertFalse(store.claim('ns', 'k', now=5, ttl=10)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
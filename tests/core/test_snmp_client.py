@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SNMP批量采集客户端单元测试（使用本地模拟SNMP代理）
+"""
+
+import unittest
+
+from src.core.snmp_client import SnmpClient, SNMP_CLIENT_AVAILABLE
+
+
+@unittest.skipUnless(SNMP_CLIENT_AVAILABLE, "PySnmp未安装")
+class TestSnmpClient(unittest.TestCase):
+    """SNMP批量采集客户端测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from tests.core.fake_snmp_agent import FakeSnmpAgent, build_if_table
+        self.agent = FakeSnmpAgent(build_if_table(48)).start()
+        self.client = SnmpClient(timeout=1.0, retries=0)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.client.close()
+        self.agent.stop()
+
+    def test_get_packs_oids_into_one_pdu(self):
+        """测试多个OID打包到同一个GET请求中"""
+        oids = ['.1.3.6.1.2.1.1.1.0', '.1.3.6.1.2.1.1.3.0', '.1.3.6.1.2.1.2.1.0', '.1.3.6.1.2.1.99.0']
+        result = self.client.get('127.0.0.1', 'public', oids, port=self.agent.port)
+
+        self.assertEqual(self.agent.request_count, 1)
+        self.assertEqual(result['.1.3.6.1.2.1.1.1.0'], 'Fake Switch')
+        self.assertEqual(result['.1.3.6.1.2.1.2.1.0'], '48')
+        self.assertIsNone(result['.1.3.6.1.2.1.99.0'])
+
+    def test_get_chunks_large_requests(self):
+        """测试超过单个PDU上限的OID分片发送"""
+        client = SnmpClient(timeout=1.0, retries=0, max_oids_per_pdu=10)
+        oids = [f'1.3.6.1.2.1.2.2.1.10.{i}' for i in range(1, 49)]
+        try:
+            result = client.get('127.0.0.1', 'public', oids, port=self.agent.port)
+        finally:
+            client.close()
+
+        self.assertEqual(self.agent.request_count, 5)
+        self.assertEqual(result['1.3.6.1.2.1.2.2.1.10.48'], '48000')
+
+    def test_walk_if_table_with_getbulk(self):
+        """测试GETBULK多列遍历48口交换机的接口表只需少量往返"""
+        columns = ['.1.3.6.1.2.1.2.2.1.2', '.1.3.6.1.2.1.2.2.1.8',
+                   '.1.3.6.1.2.1.2.2.1.10', '.1.3.6.1.2.1.2.2.1.16']
+        result = self.client.walk('127.0.0.1', 'public', columns, port=self.agent.port, max_repetitions=25)
+
+        for column in columns:
+            self.assertEqual(len(result[column]), 48)
+        self.assertEqual(result['.1.3.6.1.2.1.2.2.1.2'][0], ('.1.3.6.1.2.1.2.2.1.2.1', 'GigabitEthernet0/0/1'))
+        self.assertEqual(result['.1.3.6.1.2.1.2.2.1.16'][-1], ('.1.3.6.1.2.1.2.2.1.16.48', '96000'))
+        self.assertLessEqual(self.agent.request_count, 3)
+
+    def test_walk_multi_devices(self):
+        """测试同时遍历多个目标"""
+        targets = [
+            {'ip': '127.0.0.1', 'community': 'public', 'port': self.agent.port, 'oids': ['1.3.6.1.2.1.31.1.1.1.1']}
+            for _ in range(5)
+        ]
+        results = self.client.walk_multi(targets)
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(len(result['1.3.6.1.2.1.31.1.1.1.1']) == 48 for result in results))
+
+    def test_snmp_connector_uses_client(self):
+        """测试SNMPConnector的批量获取和遍历"""
+        from src.core.device_connector import SNMPConnector
+        connector = SNMPConnector('127.0.0.1', timeout=1)
+        connector.port = self.agent.port
+
+        values = connector.get_bulk(['1.3.6.1.2.1.1.1.0', '1.3.6.1.2.1.2.1.0'])
+        rows = connector.walk('1.3.6.1.2.1.2.2.1.10', max_repetitions=50)
+
+        self.assertEqual(values, {'1.3.6.1.2.1.1.1.0': 'Fake Switch', '1.3.6.1.2.1.2.1.0': '48'})
+        self.assertEqual(len(rows), 48)
+        self.assertEqual(self.agent.request_count, 2)
+
+    def test_timeout(self):
+        """测试无响应目标超时后返回空值"""
+        result = self.client.get('127.0.0.1', 'wrong-community', ['1.3.6.1.2.1.1.1.0'], port=self.agent.port)
+
+        self.assertIsNone(result['1.3.6.1.2.1.1.1.0'])
+        self.assertEqual(self.client.stats['timeouts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
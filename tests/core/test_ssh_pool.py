@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SSH会话池单元测试
+"""
+
+import time
+import threading
+import unittest
+
+from src.core.ssh_pool import SSHSessionPool, SSHPoolError
+
+
+class FakeConnection:
+    """模拟的SSH连接"""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.closed = True
+
+
+class TestSSHSessionPool(unittest.TestCase):
+    """SSH会话池测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.pool = SSHSessionPool(max_sessions_per_device=2, idle_timeout=300, probe_interval=60, lease_timeout=1)
+        self.opened = []
+
+    def factory(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def test_reuse_idle_session(self):
+        """测试归还的会话被下一次租用复用"""
+        with self.pool.lease(1, self.factory) as first:
+            pass
+        with self.pool.lease(1, self.factory) as second:
+            self.assertIs(first, second)
+
+        stats = self.pool.get_stats()
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(stats['leases'], 2)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['reuse_ratio'], 0.5)
+
+    def test_session_cap_and_wait(self):
+        """测试达到会话数上限时等待归还，超时抛出异常"""
+        a = self.pool.acquire(1, self.factory)
+        b = self.pool.acquire(1, self.factory)
+        self.assertIsNot(a.conn, b.conn)
+        self.assertRaises(SSHPoolError, self.pool.acquire, 1, self.factory, timeout=0.1)
+
+        threading.Timer(0.1, self.pool.release, args=(a,)).start()
+        c = self.pool.acquire(1, self.factory, timeout=2)
+        self.assertIs(c.conn, a.conn)
+
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['wait_timeouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(len(self.opened), 2)
+
+        # 其他设备不受影响
+        with self.pool.lease(2, self.factory):
+            pass
+
+    def test_broken_session_closed(self):
+        """测试块内出错的会话被关闭，下一次租用新建连接"""
+        with self.assertRaises(RuntimeError):
+            with self.pool.lease(1, self.factory):
+                raise RuntimeError('命令执行失败')
+        self.assertTrue(self.opened[0].closed)
+
+        with self.pool.lease(1, self.factory) as conn:
+            self.assertIs(conn, self.opened[1])
+        self.assertEqual(self.pool.get_stats()['broken'], 1)
+
+    def test_registered_factory_and_connect_failure(self):
+        """测试使用登记的工厂函数，连接失败时抛出会话池异常"""
+        self.assertRaises(SSHPoolError, self.pool.acquire, 1)
+        self.pool.register(1, self.factory)
+        self.assertTrue(self.pool.has_factory(1))
+        with self.pool.lease(1):
+            pass
+
+        def failing():
+            raise OSError('连接被拒绝')
+        self.assertRaises(SSHPoolError, self.pool.acquire, 2, failing)
+        self.assertEqual(self.pool.get_stats()['connect_failures'], 1)
+
+        self.pool.close_device(1)
+        self.assertTrue(self.opened[0].closed)
+        self.assertFalse(self.pool.has_factory(1))
+
+    def test_maintain_evicts_and_probes(self):
+        """测试后台维护回收空闲会话、关闭探测失败的会话"""
+        with self.pool.lease(1, self.factory):
+            pass
+        with self.pool.lease(2, self.factory):
+            pass
+        self.opened[1].alive = False
+
+        self.pool.maintain(time.time() + 120)
+        self.assertFalse(self.opened[0].closed)
+        self.assertTrue(self.opened[1].closed)
+        self.assertEqual(self.pool.get_stats()['probe_failures'], 1)
+
+        self.pool.maintain(time.time() + 600)
+        self.assertTrue(self.opened[0].closed)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['idle_evicted'], 1)
+        self.assertEqual(stats['sessions'], 0)
+
+    def test_close_device_during_probe(self):
+        """测试探测期间设备被关闭时，探测结束后会话被关闭而不是留在池中"""
+        with self.pool.lease(1, self.factory) as conn:
+            pass
+        conn.is_alive = lambda: self.pool.close_device(1) or True
+
+        self.pool.maintain(time.time() + 120)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.get_stats()['sessions'], 0)
+
+    def test_kinds_share_cap(self):
+        """测试不同种类的会话不互相复用，但共同计入上限"""
+        with self.pool.lease(1, self.factory, kind='cli'):
+            pass
+        with self.pool.lease(1, self.factory, kind='shell'):
+            pass
+        self.assertEqual(len(self.opened), 2)
+
+        # 第三种会话需要关闭一个空闲会话腾出位置
+        with self.pool.lease(1, self.factory, kind='netconf'):
+            self.assertEqual(self.pool.get_stats()['sessions'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
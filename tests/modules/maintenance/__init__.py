@@ -0,0 +1,3 @@
+"""
+维护管理模块测试包初始化文件
+"""
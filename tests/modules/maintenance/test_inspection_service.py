@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量巡检服务单元测试（逐台保存结果、单台超时、按设备类型限制并发、断点继续、增量巡检、故障去重）
+"""
+
+import json
+import time
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+
+from flask import Flask
+
+from src.core.db import db
+from src.models.maintenance import InspectionReport, InspectionItem
+from src.modules.maintenance import inspection_service
+
+HANG_DEVICE_ID = 3
+network_device_info_collect = inspection_service.network_device_info_collect
+
+
+def fake_collect(device_info):
+    """模拟单台设备巡检：指定设备无响应，其余设备正常"""
+    if device_info['id'] == HANG_DEVICE_ID:
+        time.sleep(3)
+    return {
+        'device_id': device_info['id'],
+        'device_name': device_info['name'],
+        'device_type': device_info['type'],
+        'status': '正常',
+        'cpu_usage': 10.0,
+        'memory_usage': 20.0,
+        'uptime': '1 day',
+        'firmware_version': '未知',
+        'port_usage': '{}',
+        'system_load': 0.12,
+        'error_message': None,
+        'inspection_results': json.dumps({'device_name': device_info['name'], 'abnormal_items': []}),
+        'has_fault': False
+    }
+
+
+def make_device_infos(count):
+    return [{'id': i, 'name': f'sw{i}', 'ip_address': f'10.0.0.{i}', 'username': 'admin', 'password': 'admin',
+             'port': 22, 'type': '交换机', 'model': '未知', 'firmware_version': '未知'} for i in range(1, count + 1)]
+
+
+class TestInspectionService(unittest.TestCase):
+    """批量巡检服务测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        
+        from src.models.device import Device
+        for device_id in range(1, 5):
+            db.session.add(Device(id=device_id, name=f'sw{device_id}', ip_address=f'10.0.0.{device_id}'))
+        db.session.commit()
+        
+        patcher = patch.object(inspection_service, 'network_device_info_collect', side_effect=fake_collect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+    
+    def test_stream_results_with_device_timeout(self):
+        """测试结果逐台保存，无响应的设备超时记为失败而不阻塞其他设备"""
+        with patch.object(inspection_service, 'get_batch_collect_dev_infos', return_value=make_device_infos(4)):
+            start = time.time()
+            report_id = inspection_service.batch_info_collect(max_workers=2, device_timeout=0.5)
+            self.assertLess(time.time() - start, 5)
+        
+        report = db.session.get(InspectionReport, report_id)
+        self.assertEqual(report.status, 'completed')
+        self.assertEqual((report.total_devices, report.completed_devices), (4, 4))
+        self.assertEqual((report.successful_devices, report.failed_devices), (3, 1))
+        
+        failed = InspectionItem.query.filter_by(report_id=report_id, status='失败').one()
+        self.assertEqual(failed.device_id, HANG_DEVICE_ID)
+        self.assertIn('超时', failed.error_message)
+        self.assertEqual(report.to_dict()['progress'], 100.0)
+    
+    def test_type_concurrency_limit(self):
+        """测试按设备类型限制并发，其余类型不受影响"""
+        lock = threading.Lock()
+        running = {'防火墙': 0, '交换机': 0}
+        peak = {'防火墙': 0, '交换机': 0}
+        
+        def collect(info):
+            with lock:
+                running[info['type']] += 1
+                peak[info['type']] = max(peak[info['type']], running[info['type']])
+            time.sleep(0.05)
+            with lock:
+                running[info['type']] -= 1
+            return fake_collect(dict(info, id=info['id'] + 100))
+        
+        device_infos = make_device_infos(20)
+        for info in device_infos[:10]:
+            info['type'] = '防火墙'
+        results = list(inspection_service.iter_inspection_results(
+            device_infos, max_workers=8, device_timeout=5,
+            type_limits=inspection_service.parse_type_limits('防火墙:2'), collect=collect))
+        
+        self.assertEqual(len(results), 20)
+        self.assertEqual(peak['防火墙'], 2)
+        self.assertGreater(peak['交换机'], 2)
+    
+    def test_save_result_updates_progress(self):
+        """测试保存单台设备结果时同时更新报告进度"""
+        report = InspectionReport(title='巡检', start_time=inspection_service.datetime.now(),
+                                  end_time=inspection_service.datetime.now(), total_devices=2,
+                                  completed_devices=0, status='running')
+        db.session.add(report)
+        db.session.commit()
+        
+        self.assertTrue(inspection_service.save_inspection_result(report.id, fake_collect(make_device_infos(1)[0])))
+        report = db.session.get(InspectionReport, report.id)
+        self.assertEqual((report.completed_devices, report.successful_devices), (1, 1))
+        self.assertEqual(report.to_dict()['progress'], 50.0)
+    
+    def test_resume_interrupted_report(self):
+        """测试继续中断的巡检时只巡检尚未保存结果的设备"""
+        device_infos = make_device_infos(4)
+        report = InspectionReport(title='巡检', start_time=inspection_service.datetime.now(),
+                                  end_time=inspection_service.datetime.now(), total_devices=3,
+                                  completed_devices=0, status='interrupted', device_ids=json.dumps([1, 2, 4]))
+        db.session.add(report)
+        db.session.commit()
+        inspection_service.save_inspection_result(report.id, fake_collect(device_infos[0]))
+        
+        with patch.object(inspection_service, 'get_batch_collect_dev_infos', return_value=device_infos):
+            self.assertEqual(inspection_service.resume_inspection(report.id, max_workers=2, device_timeout=1),
+                             report.id)
+            self.assertIsNone(inspection_service.resume_inspection(report.id))
+        
+        items = InspectionItem.query.filter_by(report_id=report.id).all()
+        self.assertEqual(sorted(item.device_id for item in items), [1, 2, 4])
+        report = db.session.get(InspectionReport, report.id)
+        self.assertEqual((report.status, report.completed_devices, report.successful_devices), ('completed', 3, 3))
+    
+    def test_inspection_in_progress(self):
+        """测试报告有未结束的巡检任务或最近仍在更新进度时视为仍在巡检"""
+        import shutil
+        import tempfile
+        from src.core.job_queue import JobQueue
+        
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        queue = JobQueue(f'{tmpdir}/jobs.sqlite')
+        report = InspectionReport(title='巡检', start_time=inspection_service.datetime.now(),
+                                  end_time=inspection_service.datetime.now(), total_devices=2,
+                                  completed_devices=0, status='interrupted', device_ids=json.dumps([1, 2]))
+        db.session.add(report)
+        db.session.commit()
+        
+        sql = "INSERT INTO jobs (id, kind, description, status, data, created_at, updated_at) VALUES (?, 'inspection', ?, ?, ?, 0, 0)"
+        with patch.object(inspection_service, 'get_job_queue', return_value=queue):
+            queue._execute(sql, ('old', f'继续巡检报告 {report.id}', 'failed', None))
+            queue._execute(sql, ('other', '网络设备批量巡检', 'running', json.dumps({'report_id': report.id + 1})))
+            self.assertFalse(inspection_service.inspection_in_progress(report))
+            
+            queue._execute(sql, ('queued', f'继续巡检报告 {report.id}', 'queued', None))
+            self.assertTrue(inspection_service.inspection_in_progress(report))
+            queue._execute("UPDATE jobs SET status = 'succeeded' WHERE id = 'queued'")
+            
+            report.status = 'running'
+            db.session.commit()
+            self.assertTrue(inspection_service.inspection_in_progress(report))
+    
+    def test_cancel_job_marks_report_interrupted(self):
+        """测试后台任务取消时停止巡检，已保存的结果保留，报告标记为已中断可继续"""
+        job = MagicMock()
+        job.check_cancelled.side_effect = [None, inspection_service.JobCancelled('已取消')]
+        
+        with patch.object(inspection_service, 'get_batch_collect_dev_infos', return_value=make_device_infos(4)):
+            with self.assertRaises(inspection_service.JobCancelled):
+                inspection_service.batch_info_collect(max_workers=1, device_timeout=5, job=job)
+        
+        report = InspectionReport.query.one()
+        self.assertEqual((report.status, report.completed_devices), ('interrupted', 2))
+        self.assertEqual(job.update.call_args.kwargs['data'], {'report_id': report.id})
+
+    
+    def test_incremental_inspection(self):
+        """测试增量巡检：每次都获取接口清单，设备未重启时跳过版本信息并保存接口差异，重启后重新获取版本"""
+        @contextmanager
+        def fake_lease(*args):
+            yield object()
+        
+        inventory = {'GE0/0/1': {'status': 'up', 'input_rate': 1000, 'output_rate': 2000},
+                     'GE0/0/2': {'status': 'down'}}
+        rates = {'GE0/0/1': {'status': 'up', 'input_rate': 3000, 'output_rate': 2000},
+                 'GE0/0/2': {'status': 'down'}}
+        ssh = {
+            'lease_connection': fake_lease,
+            'get_cpu_usage': MagicMock(return_value=10.0),
+            'get_memory_usage': MagicMock(return_value=20.0),
+            'get_uptime': MagicMock(return_value='2 days, 3 hours'),
+            'get_interface_stats': MagicMock(return_value=inventory),
+            'get_version_info': MagicMock(return_value={'firmware_version': 'V200R010C10', 'model': 'S5700'}),
+        }
+        
+        def inspect():
+            with patch.object(inspection_service, 'network_device_info_collect', network_device_info_collect), \
+                    patch.multiple(inspection_service, **ssh), \
+                    patch.object(inspection_service, 'get_batch_collect_dev_infos', return_value=make_device_infos(1)):
+                report_id = inspection_service.batch_info_collect(max_workers=1, incremental=True)
+            return InspectionItem.query.filter_by(report_id=report_id).one()
+        
+        first = inspect()
+        self.assertIsNone(first.port_usage_base_id)
+        self.assertEqual(json.loads(first.port_usage), inventory)
+        from src.models.device import Device
+        self.assertEqual(db.session.get(Device, 1).firmware_version, 'V200R010C10')
+        
+        ssh['get_uptime'].return_value = '2 days, 4 hours'
+        ssh['get_interface_stats'].return_value = rates
+        second = inspect()
+        self.assertEqual(ssh['get_interface_stats'].call_count, 2)
+        ssh['get_version_info'].assert_called_once()
+        self.assertEqual(second.port_usage_base_id, first.id)
+        self.assertEqual(json.loads(second.port_usage), {'changed': {'GE0/0/1': rates['GE0/0/1']}, 'removed': []})
+        self.assertEqual(json.loads(second.to_dict()['port_usage']), rates)
+        self.assertEqual(second.firmware_version, 'V200R010C10')
+        
+        # 删除基准所在的报告前，差异记录还原为完整记录
+        inspection_service.release_port_usage_bases(first.report_id)
+        db.session.delete(db.session.get(InspectionReport, first.report_id))
+        db.session.commit()
+        second = db.session.get(InspectionItem, second.id)
+        self.assertIsNone(second.port_usage_base_id)
+        self.assertEqual(json.loads(second.port_usage), rates)
+        
+        # 接口状态变化在下一次巡检中体现
+        ssh['get_interface_stats'].return_value = dict(rates, **{'GE0/0/1': {'status': 'down'}})
+        third = inspect()
+        self.assertEqual(json.loads(third.to_dict()['port_usage'])['GE0/0/1'], {'status': 'down'})
+        
+        # 运行时间变小说明设备重启过，重新获取版本信息
+        ssh['get_uptime'].return_value = '5 minutes'
+        fourth = inspect()
+        self.assertEqual(ssh['get_version_info'].call_count, 2)
+        self.assertIsNone(fourth.port_usage_base_id)
+
+    
+    def test_fault_upsert_dedup(self):
+        """测试巡检故障批量写入：已有未关闭故障的设备更新原故障，其余设备用一条语句批量新建"""
+        from sqlalchemy import event
+        from src.core.models import Fault
+        
+        db.session.add_all([
+            Fault(device_id=1, fault_type='巡检异常', severity='medium', description='旧', status='open'),
+            Fault(device_id=2, fault_type='巡检异常', severity='medium', description='已解决', status='resolved'),
+        ])
+        db.session.commit()
+        
+        abnormal = [{'item': 'CPU使用率', 'message': 'CPU使用率过高: 95%'}]
+        faults = [inspection_service.build_inspection_fault({'device_id': device_id, 'abnormal_items': abnormal * 3})
+                  for device_id in (1, 2, 3, 4)]
+        
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.assertEqual(inspection_service.upsert_inspection_faults(faults), (3, 1))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertLessEqual(len(statements), 3)
+        
+        open_faults = Fault.query.filter_by(status='open').order_by(Fault.device_id).all()
+        self.assertEqual([fault.device_id for fault in open_faults], [1, 2, 3, 4])
+        self.assertEqual(open_faults[0].severity, 'high')
+        self.assertIn('CPU使用率过高', open_faults[0].description)
+        
+        # 再次巡检不产生重复故障
+        self.assertEqual(inspection_service.upsert_inspection_faults(faults), (0, 4))
+        self.assertEqual(Fault.query.filter_by(status='open').count(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,3 @@
+"""
+性能监控模块测试包初始化文件
+"""
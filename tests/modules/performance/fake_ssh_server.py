@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟SSH设备服务器 - 按 VENDOR_MAP 中的命令回放华为/思科设备的典型输出
+
+用于在没有真实网络设备的情况下测试SSH采集后端：
+服务器监听 127.0.0.1 的随机端口，接受任意用户名密码，
+像真实设备一样回显命令、输出结果并打印提示符。
+"""
+
+from typing import Dict, Optional
+
+import asyncssh
+
+from src.modules.performance.enhanced_ssh_monitor import VENDOR_MAP
+
+# 设备提示符
+PROMPTS = {
+    "huawei": "<HUAWEI>",
+    "cisco": "Router#",
+}
+
+HUAWEI_OUTPUTS = {
+    VENDOR_MAP["huawei"]["disable_paging_cmd"]: "Info: The configuration takes effect on the current user terminal interface only.",
+    VENDOR_MAP["huawei"]["cpu_cmd"]: "\n".join([
+        "CPU Usage Stat. Cycle: 60 (Second)",
+        "CPU Usage            : 12% Max: 35%",
+        "CPU Usage Stat. Time : 2023-06-01  10:00:00",
+    ]),
+    VENDOR_MAP["huawei"]["memory_cmd"]: "\n".join([
+        " System Total Memory Is: 536870912 bytes",
+        " Total Memory Used Is: 241591910 bytes",
+        " Memory utilization : 45%",
+    ]),
+    VENDOR_MAP["huawei"]["version_cmd"]: "\n".join([
+        "Huawei Versatile Routing Platform Software",
+        "VRP (R) software, Version 5.170 (S5720 V200R010C00SPC600)",
+        "HUAWEI S5720-28X-SI-AC Routing Switch uptime is 12 days, 3 hours, 41 minutes",
+    ]),
+    VENDOR_MAP["huawei"]["interface_cmd"]: "\n".join([
+        "PHY: Physical",
+        "Interface                   PHY   Protocol InUti OutUti   inErrors  outErrors",
+        "GigabitEthernet0/0/1        up    up          0.01%  0.01%          0          0",
+        "GigabitEthernet0/0/2        down  down           0%     0%          0          0",
+        "Vlanif1                     up    up             --     --          0          0",
+    ]),
+    VENDOR_MAP["huawei"]["interface_detail_cmd"].format(interface="GigabitEthernet0/0/1"): "\n".join([
+        "GigabitEthernet0/0/1 current state : UP",
+        "Line protocol current state : UP",
+        "Last 300 seconds input rate 2000000 bits/sec, 200 packets/sec",
+        "Last 300 seconds output rate 1000000 bits/sec, 100 packets/sec",
+    ]),
+    VENDOR_MAP["huawei"]["interface_detail_cmd"].format(interface="Vlanif1"): "\n".join([
+        "Vlanif1 current state : UP",
+        "Line protocol current state : UP",
+        "Last 300 seconds input rate 3000000 bits/sec, 300 packets/sec",
+        "Last 300 seconds output rate 4000000 bits/sec, 400 packets/sec",
+    ]),
+}
+
+CISCO_OUTPUTS = {
+    VENDOR_MAP["cisco"]["disable_paging_cmd"]: "",
+    VENDOR_MAP["cisco"]["cpu_cmd"]: "CPU utilization for five seconds: 7%/0%; one minute: 6%; five minutes: 5%",
+    VENDOR_MAP["cisco"]["memory_cmd"]: "Processor   6A5E1F28   1000000000   250000000   750000000   740000000   700000000",
+    VENDOR_MAP["cisco"]["version_cmd"]: "Router uptime is 2 weeks, 3 days, 4 hours, 5 minutes",
+    VENDOR_MAP["cisco"]["interface_cmd"]: "\n".join([
+        "Interface              IP-Address      OK? Method Status                Protocol",
+        "GigabitEthernet0/0     192.168.1.1     YES manual up                    up",
+        "GigabitEthernet0/1     unassigned      YES unset  administratively down down",
+    ]),
+    VENDOR_MAP["cisco"]["interface_detail_cmd"].format(interface="GigabitEthernet0/0"): "\n".join([
+        "GigabitEthernet0/0 is up, line protocol is up",
+        "  5 minute input rate 5000000 bits/sec, 500 packets/sec",
+        "  5 minute output rate 6000000 bits/sec, 600 packets/sec",
+    ]),
+}
+
+VENDOR_OUTPUTS = {
+    "huawei": HUAWEI_OUTPUTS,
+    "cisco": CISCO_OUTPUTS,
+}
+
+
+class FakeDeviceServer(asyncssh.SSHServer):
+    """接受任意口令的SSH服务器"""
+
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        return True
+
+
+def make_shell(vendor: str, outputs: Optional[Dict[str, str]] = None):
+    """创建模拟设备命令行的处理函数"""
+    prompt = PROMPTS[vendor]
+    outputs = outputs if outputs is not None else VENDOR_OUTPUTS[vendor]
+
+    async def handle(process):
+        process.stdout.write("Info: The max number of VTY users is 10.\r\n\r\n" + prompt)
+        try:
+            while True:
+                line = await process.stdin.readline()
+                if not line:
+                    break
+                command = line.strip()
+                if command in ("quit", "exit"):
+                    break
+                # 回显命令，然后输出结果和提示符
+                result = outputs.get(command, "Error: Unrecognized command found at '^' position.")
+                body = result.replace("\n", "\r\n")
+                process.stdout.write(command + "\r\n" + (body + "\r\n" if body else "") + prompt)
+        except (asyncssh.BreakReceived, asyncssh.TerminalSizeChanged, ConnectionError):
+            pass
+        finally:
+            process.exit(0)
+
+    return handle
+
+
+async def start_fake_ssh_server(vendor: str = "huawei", outputs: Optional[Dict[str, str]] = None,
+                                host: str = "127.0.0.1", port: int = 0):
+    """
+    在当前事件循环中启动模拟设备
+
+    Returns:
+        (server, port) 元组，测试结束后调用 server.close()
+    """
+    host_key = asyncssh.generate_private_key("ssh-ed25519")
+    server = await asyncssh.create_server(
+        FakeDeviceServer, host, port,
+        server_host_keys=[host_key],
+        process_factory=make_shell(vendor, outputs),
+        line_editor=False,
+        encoding="utf-8"
+    )
+    bound_port = server.sockets[0].getsockname()[1]
+    return server, bound_port
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步SSH采集后端单元测试（使用本地模拟SSH设备）
+"""
+
+import asyncio
+import unittest
+
+from src.modules.performance import async_ssh_monitor
+from src.modules.performance import enhanced_ssh_monitor
+
+
+@unittest.skipUnless(async_ssh_monitor.ASYNCSSH_AVAILABLE, "asyncssh未安装")
+class TestAsyncSSHMonitor(unittest.TestCase):
+    """异步SSH采集后端测试类"""
+
+    def _collect(self, vendor, device_count=1):
+        """启动模拟设备并用异步引擎采集"""
+        from tests.modules.performance.fake_ssh_server import start_fake_ssh_server
+
+        async def run():
+            server, port = await start_fake_ssh_server(vendor)
+            engine = async_ssh_monitor.AsyncCollectionEngine(concurrency=10)
+            try:
+                devices = [
+                    {'id': 9000 + i, 'ip': '127.0.0.1', 'port': port,
+                     'username': 'admin', 'password': 'admin', 'vendor': 'huawei'}
+                    for i in range(device_count)
+                ]
+                return await engine.collect_many(devices)
+            finally:
+                await engine.close_all()
+                server.close()
+
+        return asyncio.run(run())
+
+    def test_collect_huawei(self):
+        """测试采集华为设备"""
+        data = self._collect('huawei')[9000]
+
+        self.assertNotIn('error', data)
+        self.assertEqual(data['cpu_usage'], 12.0)
+        self.assertEqual(data['memory_usage'], 45.0)
+        self.assertEqual(data['uptime'], '12 days, 3 hours, 41 minutes')
+        self.assertEqual(set(data['interfaces'].keys()), {'GigabitEthernet0/0/1', 'GigabitEthernet0/0/2', 'Vlanif1'})
+        self.assertEqual(data['interfaces']['GigabitEthernet0/0/1']['input_rate'], 2000000)
+        self.assertEqual(data['interfaces']['Vlanif1']['output_rate'], 4000000)
+        self.assertEqual(data['total_input_rate'], '5.00 Mbps')
+        self.assertTrue(data['connection_status']['connected'])
+        self.assertEqual(data['connection_status']['vendor'], 'huawei')
+
+    def test_collect_cisco(self):
+        """测试采集思科设备（根据提示符识别厂商）"""
+        data = self._collect('cisco')[9000]
+
+        self.assertNotIn('error', data)
+        self.assertEqual(data['cpu_usage'], 7.0)
+        self.assertEqual(data['memory_usage'], 25.0)
+        self.assertEqual(data['uptime'], '2 weeks, 3 days, 4 hours, 5 minutes')
+        self.assertEqual(data['interfaces']['GigabitEthernet0/0']['status'], 'up')
+        self.assertEqual(data['interfaces']['GigabitEthernet0/1']['status'], 'down')
+        self.assertEqual(data['interfaces']['GigabitEthernet0/0']['output_rate'], 6000000)
+        self.assertEqual(data['connection_status']['vendor'], 'cisco')
+
+    def test_collect_many_devices(self):
+        """测试并发采集多台设备"""
+        results = self._collect('huawei', device_count=20)
+
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(data['cpu_usage'] == 12.0 for data in results.values()))
+
+    def test_connection_failure(self):
+        """测试连接失败时返回与同步后端相同的错误结构"""
+        async def run():
+            engine = async_ssh_monitor.AsyncCollectionEngine(connect_timeout=2)
+            return await engine.collect(9100, '127.0.0.1', 'admin', 'admin', port=1)
+
+        data = asyncio.run(run())
+
+        self.assertEqual(data['uptime'], '连接失败')
+        self.assertEqual(data['error'], '无法建立SSH连接')
+        self.assertFalse(data['connection_status']['connected'])
+
+    def test_sync_facade(self):
+        """测试同步接口通过后台事件循环采集"""
+        from tests.modules.performance.fake_ssh_server import start_fake_ssh_server
+
+        from flask import Flask
+        from src.modules.performance import ssh_monitor
+
+        server, port = async_ssh_monitor.run_coroutine(start_fake_ssh_server('huawei'))
+        original_backend = enhanced_ssh_monitor.SSH_COLLECT_BACKEND
+        app = Flask(__name__)
+        app.config['SSH_COLLECT_BACKEND'] = 'AsyncSSH'
+        enhanced_ssh_monitor.init_collect_backend(app)
+        try:
+            data = enhanced_ssh_monitor.collect_device_data(9200, '127.0.0.1', 'admin', 'admin', port=port)
+            self.assertEqual(data['cpu_usage'], 12.0)
+            data = ssh_monitor.collect_device_data(9200, '127.0.0.1', 'admin', 'admin', port=port)
+            self.assertTrue(data['success'])
+            self.assertEqual(data['memory_usage'], enhanced_ssh_monitor.collect_device_data(
+                9200, '127.0.0.1', 'admin', 'admin', port=port)['memory_usage'])
+            self.assertTrue(enhanced_ssh_monitor.close_connection(9200))
+        finally:
+            enhanced_ssh_monitor.SSH_COLLECT_BACKEND = original_backend
+            server.close()
+            async_ssh_monitor.shutdown_async_engine()
+
+
+class TestVendorParsers(unittest.TestCase):
+    """厂商输出解析函数测试类"""
+
+    def test_cisco_interface_list(self):
+        """测试思科接口列表解析"""
+        output = "\n".join([
+            "Interface              IP-Address      OK? Method Status                Protocol",
+            "",
+            "GigabitEthernet0/0     192.168.1.1     YES manual up                    up",
+            "GigabitEthernet0/1     unassigned      YES unset  administratively down down",
+        ])
+        interfaces = enhanced_ssh_monitor.parse_interface_list('cisco', output)
+
+        self.assertEqual(interfaces['GigabitEthernet0/0']['status'], 'up')
+        self.assertEqual(interfaces['GigabitEthernet0/1']['status'], 'down')
+
+    def test_summarize_bandwidth(self):
+        """测试带宽汇总"""
+        usage, total_in, total_out = enhanced_ssh_monitor.summarize_bandwidth({
+            'a': {'status': 'up', 'input_rate': 500000000, 'output_rate': 100},
+            'b': {'status': 'down'},
+        })
+
+        self.assertEqual(usage, 50.0)
+        self.assertEqual(total_in, 500000000)
+        self.assertEqual(total_out, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+轮询命令组合单元测试
+"""
+
+import unittest
+
+from src.modules.performance.command_bundle import (
+    PollCommandPlanner, send_command_bundle, split_output_by_prompt, poll_device_metrics
+)
+from src.modules.performance.enhanced_ssh_monitor import VENDOR_MAP
+
+HUAWEI = VENDOR_MAP["huawei"]
+
+OUTPUTS = {
+    HUAWEI["cpu_cmd"]: "CPU Usage Stat. Cycle: 60 (Second)\nCPU Usage            : 12% Max: 35%",
+    HUAWEI["memory_cmd"]: " Memory utilization : 45%",
+    HUAWEI["version_cmd"]: "HUAWEI S5720-28X-SI-AC Routing Switch uptime is 12 days, 3 hours, 41 minutes",
+}
+
+
+class FakeChannelConnection:
+    """模拟Netmiko连接：按行执行写入通道的命令，回显命令并在输出后打印提示符"""
+
+    base_prompt = "HUAWEI"
+
+    def __init__(self):
+        self.buffer = ""
+        self.writes = 0
+        self.send_command_calls = 0
+
+    def clear_buffer(self):
+        self.buffer = ""
+
+    def write_channel(self, data):
+        self.writes += 1
+        for command in data.split("\n"):
+            if command:
+                self.buffer += f"{command}\r\n{OUTPUTS.get(command, 'Error: Unrecognized command')}\r\n<HUAWEI>"
+
+    def read_channel(self):
+        data, self.buffer = self.buffer, ""
+        return data
+
+    def send_command(self, command):
+        self.send_command_calls += 1
+        return OUTPUTS.get(command, "")
+
+
+class TestCommandBundle(unittest.TestCase):
+    """轮询命令组合测试类"""
+
+    def test_split_output_by_prompt(self):
+        """测试按提示符切分输出并去掉回显"""
+        output = "display a\r\nA1\r\nA2\r\n<HUAWEI>display b\r\nB1\r\n<HUAWEI>"
+        parts = split_output_by_prompt(output, "HUAWEI", ["display a", "display b"])
+
+        self.assertEqual(parts, ["A1\nA2", "B1"])
+
+    def test_split_output_missing_prompt(self):
+        """测试提示符数量不足时返回None"""
+        self.assertIsNone(split_output_by_prompt("display a\nA1\n<HUAWEI>", "HUAWEI", ["display a", "display b"]))
+
+    def test_bundle_uses_single_write(self):
+        """测试所有命令一次写入通道"""
+        conn = FakeChannelConnection()
+        commands = [HUAWEI["cpu_cmd"], HUAWEI["memory_cmd"], HUAWEI["version_cmd"]]
+        outputs = send_command_bundle(conn, commands, read_timeout=2)
+
+        self.assertEqual(conn.writes, 1)
+        self.assertEqual(conn.send_command_calls, 0)
+        self.assertEqual(outputs[HUAWEI["memory_cmd"]], " Memory utilization : 45%")
+
+    def test_fallback_without_prompt(self):
+        """测试无法识别提示符时逐条执行"""
+        conn = FakeChannelConnection()
+        conn.base_prompt = None
+        outputs = send_command_bundle(conn, [HUAWEI["cpu_cmd"], HUAWEI["memory_cmd"]])
+
+        self.assertEqual(conn.send_command_calls, 2)
+        self.assertIn("12%", outputs[HUAWEI["cpu_cmd"]])
+
+    def test_slow_metrics_cadence(self):
+        """测试运行时间只在慢周期采集，其余周期使用缓存值"""
+        planner = PollCommandPlanner(slow_interval=300)
+        conn = FakeChannelConnection()
+
+        first = poll_device_metrics(1, conn, "huawei", planner)
+        self.assertEqual(first["uptime"], "12 days, 3 hours, 41 minutes")
+        self.assertEqual(first["cpu_usage"], 12.0)
+        self.assertEqual(first["memory_usage"], 45.0)
+
+        self.assertEqual([key for key, _ in planner.plan(1, "huawei")], ["cpu_cmd", "memory_cmd"])
+        second = poll_device_metrics(1, conn, "huawei", planner)
+        self.assertEqual(second["uptime"], "12 days, 3 hours, 41 minutes")
+
+        planner.reset(1)
+        self.assertIn("version_cmd", [key for key, _ in planner.plan(1, "huawei")])
+
+
+if __name__ == '__main__':
+    unittest.main()
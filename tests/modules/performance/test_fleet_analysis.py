@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+全网性能分析单元测试
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Flask
+
+from src.core.db import db
+from src.modules.performance.fleet_analysis import analyze_fleet, get_top_offenders, load_fleet_series
+
+
+class TestFleetAnalysis(unittest.TestCase):
+    """全网性能分析测试类"""
+
+    def setUp(self):
+        """测试前准备：5台设备，sw3 CPU长期偏高，sw5 最近CPU突然升高"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import PerformanceRecord, PerformanceRollup
+        from src.modules.performance.models import Alert
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[
+            DeviceType.__table__, Device.__table__, PerformanceRecord.__table__,
+            PerformanceRollup.__table__, Alert.__table__
+        ])
+
+        self.now = datetime(2024, 1, 1, 12, 0, 0)
+        for device_id in range(1, 6):
+            db.session.add(Device(id=device_id, name=f'sw{device_id}', ip_address=f'10.0.0.{device_id}'))
+        db.session.add(Device(id=6, name='sw6', ip_address='10.0.0.6'))  # 没有性能数据
+        for step in range(40):
+            recorded_at = self.now - timedelta(minutes=40 - step)
+            for device_id in range(1, 6):
+                cpu = 20.0 + (step % 3)
+                if device_id == 3:
+                    cpu = 85.0 + (step % 3)
+                elif device_id == 5 and step >= 36:
+                    cpu = 60.0
+                db.session.add(PerformanceRecord(device_id=device_id, cpu_usage=cpu, memory_usage=40.0,
+                                                 bandwidth_usage=None, recorded_at=recorded_at))
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_top_offenders_ranking(self):
+        """测试异常设备排序：长期偏高和近期突增的设备排在前面"""
+        result = get_top_offenders(hours=1, top=3, now=self.now)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['resolution'], 0)
+        self.assertEqual(result['device_count'], 5)
+
+        offenders = result['top_offenders']
+        self.assertEqual([item['device_name'] for item in offenders[:2]], ['sw3', 'sw5'])
+        self.assertEqual(offenders[0]['top_metric'], 'cpu_usage')
+        self.assertEqual(offenders[0]['cpu_usage']['max'], 87.0)
+        self.assertIsNone(offenders[0]['bandwidth_usage']['avg'])
+        self.assertGreater(offenders[1]['cpu_usage']['slope'], 0)
+
+    def test_analyze_fleet_matches_per_device(self):
+        """测试向量化统计结果与逐台设备计算一致（设备点数不同）"""
+        series = {
+            'device_ids': np.array([1, 1, 1, 2, 2], dtype=np.int64),
+            'times': np.array([0, 3600, 7200, 0, 3600], dtype=np.float64),
+            'cpu_usage': np.array([10.0, 20.0, 30.0, 50.0, np.nan])
+        }
+        analysis = analyze_fleet(series, ['cpu_usage'])
+        stats = analysis['cpu_usage']
+        self.assertEqual(analysis['devices'].tolist(), [1, 2])
+        self.assertEqual(stats['count'].tolist(), [3, 1])
+        self.assertAlmostEqual(stats['avg'][0], 20.0)
+        self.assertAlmostEqual(stats['p95'][0], np.percentile([10, 20, 30], 95))
+        self.assertAlmostEqual(stats['slope'][0], 10.0)
+        self.assertTrue(np.isnan(stats['slope'][1]))
+
+    def test_rollup_series_includes_unrolled_tail(self):
+        """测试降采样曲线包含最后一个已汇总时间桶之后、从原始采样聚合的最近数据"""
+        from src.models.performance import PerformanceRollup
+
+        start = self.now - timedelta(minutes=40)
+        for device_id in range(1, 6):
+            db.session.add(PerformanceRollup(device_id=device_id, metric='cpu_usage', resolution=300,
+                                             bucket_start=start, avg_value=-1.0, sample_count=5))
+        db.session.commit()
+
+        series = load_fleet_series(start, self.now, metrics=['cpu_usage'], resolution=300)
+        self.assertEqual(series['resolution'], 300)
+        self.assertEqual(len(series['device_ids']), 5 * 8)
+        self.assertEqual(series['device_ids'].tolist(), sorted(series['device_ids'].tolist()))
+        device3 = series['cpu_usage'][series['device_ids'] == 3]
+        self.assertEqual(device3[0], -1.0)
+        self.assertAlmostEqual(device3[-1], 85.0 + np.mean([step % 3 for step in range(35, 40)]))
+
+    def test_all_devices_status(self):
+        """测试设备状态列表包含没有性能数据的设备"""
+        from src.modules.performance.services import get_all_devices_status
+
+        status = get_all_devices_status()
+        self.assertEqual([item['device_id'] for item in status], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(status[2]['cpu_usage'], 85.0 + (39 % 3))
+        self.assertEqual(status[2]['last_updated'], '2024-01-01 11:59:00')
+        self.assertIsNone(status[5]['cpu_usage'])
+        self.assertEqual(status[0]['alert_count'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
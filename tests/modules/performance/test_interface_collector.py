@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SNMP接口计数器采集单元测试
+"""
+
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from src.core.db import db
+from src.core.snmp_client import SNMP_CLIENT_AVAILABLE
+from src.modules.performance.interface_collector import (
+    InterfaceCounterCollector, counter_delta, save_interface_stats, COUNTER32_MAX
+)
+from src.modules.performance.enhanced_ssh_monitor import summarize_bandwidth
+
+
+class TestCounterDelta(unittest.TestCase):
+    """计数器增量计算测试类"""
+
+    def test_normal_increase(self):
+        """测试正常递增"""
+        self.assertEqual(counter_delta(100, 250, bits=64), 150)
+
+    def test_counter32_wrap(self):
+        """测试32位计数器回绕"""
+        self.assertEqual(counter_delta(COUNTER32_MAX - 100, 50, bits=32), 150)
+
+    def test_counter32_reset(self):
+        """测试32位计数器增量超过接口能力时视为重置"""
+        self.assertIsNone(counter_delta(COUNTER32_MAX - 100, 50, bits=32, max_delta=100))
+
+    def test_counter64_reset(self):
+        """测试64位计数器减小视为重置"""
+        self.assertIsNone(counter_delta(5000, 10, bits=64))
+
+
+@unittest.skipUnless(SNMP_CLIENT_AVAILABLE, "PySnmp未安装")
+class TestSummarizeBandwidth(unittest.TestCase):
+    """带宽使用率汇总测试类"""
+
+    def test_uses_interface_speed(self):
+        """测试按接口实际速率计算使用率，没有速率的接口按1Gbps计算，down接口不计入容量"""
+        interfaces = {
+            'GE0/0/1': {'status': 'up', 'speed': 100, 'input_rate': 50000000, 'output_rate': 10000000},
+            'GE0/0/2': {'status': 'down', 'speed': 10000, 'input_rate': 0, 'output_rate': 0},
+        }
+        self.assertEqual(summarize_bandwidth(interfaces), (50.0, 50000000, 10000000))
+
+        interfaces['Eth1'] = {'status': 'up', 'input_rate': 0, 'output_rate': 0}
+        self.assertAlmostEqual(summarize_bandwidth(interfaces)[0], 50000000 / 1100000000 * 100)
+        self.assertEqual(summarize_bandwidth({})[0], 0.0)
+
+
+class TestInterfaceCounterCollector(unittest.TestCase):
+    """接口计数器采集测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from tests.core.fake_snmp_agent import FakeSnmpAgent, build_if_table, P_MOD
+        self.P_MOD = P_MOD
+        data = build_if_table(48)
+        for index in range(1, 49):
+            data[f'1.3.6.1.2.1.31.1.1.1.6.{index}'] = P_MOD.Counter64(1000000)
+            data[f'1.3.6.1.2.1.31.1.1.1.10.{index}'] = P_MOD.Counter64(2000000)
+            data[f'1.3.6.1.2.1.31.1.1.1.15.{index}'] = P_MOD.Gauge32(1000)
+        self.agent = FakeSnmpAgent(data).start()
+        self.collector = InterfaceCounterCollector()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.agent.stop()
+
+    def _set_counter(self, column, index, value):
+        oid = tuple(int(x) for x in f'{column}.{index}'.split('.'))
+        self.agent.data[oid] = self.P_MOD.Counter64(value)
+
+    def test_collect_all_interfaces_with_rates(self):
+        """测试采集全部接口并根据两次采样计算速率"""
+        with mock.patch('src.modules.performance.interface_collector.time.time', return_value=1000.0):
+            first = self.collector.collect(1, '127.0.0.1', port=self.agent.port)
+
+        self.assertEqual(len(first), 48)
+        self.assertEqual(first['GE0/0/1']['status'], 'up')
+        self.assertEqual(first['GE0/0/2']['status'], 'down')
+        self.assertEqual(first['GE0/0/1']['speed'], 1000)
+        self.assertNotIn('input_rate', first['GE0/0/1'])
+
+        self._set_counter('1.3.6.1.2.1.31.1.1.1.6', 1, 1000000 + 1250000)  # 10秒内1.25MB => 1Mbps
+        self._set_counter('1.3.6.1.2.1.31.1.1.1.10', 1, 2000000 + 2500000)
+        with mock.patch('src.modules.performance.interface_collector.time.time', return_value=1010.0):
+            second = self.collector.collect(1, '127.0.0.1', port=self.agent.port)
+
+        self.assertEqual(second['GE0/0/1']['input_rate'], 1000000)
+        self.assertEqual(second['GE0/0/1']['output_rate'], 2000000)
+        self.assertEqual(second['GE0/0/2']['input_rate'], 0)
+
+    def test_unreachable_device(self):
+        """测试SNMP无响应时返回空字典"""
+        self.assertEqual(self.collector.collect(1, '127.0.0.1', 'wrong', port=self.agent.port), {})
+
+
+class TestSaveInterfaceStats(unittest.TestCase):
+    """接口统计写入测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.models.device import Device, DeviceType
+        from src.core.models import Interface
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__, Interface.__table__])
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+        db.session.commit()
+        self.Interface = Interface
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_upsert(self):
+        """测试按设备和接口名更新或新增"""
+        save_interface_stats(1, {'GE0/0/1': {'status': 'up', 'in_octets': 10, 'if_index': 1}})
+        save_interface_stats(1, {
+            'GE0/0/1': {'status': 'down', 'in_octets': 20, 'input_rate': 800, 'if_index': 1},
+            'GE0/0/2': {'status': 'up', 'in_octets': 5, 'if_index': 2},
+        })
+
+        rows = {row.name: row for row in self.Interface.query.filter_by(device_id=1).all()}
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows['GE0/0/1'].status, 'down')
+        self.assertEqual(rows['GE0/0/1'].in_octets, 20)
+        self.assertEqual(rows['GE0/0/1'].input_rate, 800)
+        self.assertIsNotNone(rows['GE0/0/2'].stats_updated_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
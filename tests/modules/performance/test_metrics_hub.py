@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实时指标发布/订阅中心单元测试
+"""
+
+import json
+import threading
+import unittest
+
+from src.modules.performance.metrics_hub import MetricsHub, Subscription
+
+
+class TestMetricsHub(unittest.TestCase):
+    """实时指标发布/订阅中心测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.hub = MetricsHub()
+
+    def test_subscription_filter(self):
+        """测试按设备订阅和订阅全部设备"""
+        one = self.hub.subscribe([1])
+        many = self.hub.subscribe([1, 2])
+        everything = self.hub.subscribe()
+
+        self.hub.publish(1, {'cpu_usage': 10.0})
+        self.hub.publish(2, {'cpu_usage': 20.0})
+        self.hub.publish(3, {'cpu_usage': 30.0})
+
+        self.assertEqual([device_id for device_id, _ in one.get(timeout=0)], [1])
+        self.assertEqual([device_id for device_id, _ in many.get(timeout=0)], [1, 2])
+        self.assertEqual(len(everything.get(timeout=0)), 3)
+        self.assertEqual(self.hub.get_stats()['delivered'], 6)
+
+        self.hub.unsubscribe(one)
+        self.assertEqual(self.hub.get_stats()['subscribers'], 2)
+
+    def test_mailbox_drops_oldest(self):
+        """测试订阅者读取过慢时丢弃最旧的样本"""
+        sub = Subscription([1], mailbox_size=3)
+        for i in range(5):
+            sub.put(1, {'cpu_usage': float(i)})
+        self.assertEqual([data['cpu_usage'] for _, data in sub.get(timeout=0)], [2.0, 3.0, 4.0])
+        self.assertEqual(sub.dropped, 2)
+
+    def test_stream(self):
+        """测试SSE事件流：先发送最新样本，再推送新样本，空闲时发送心跳"""
+        self.hub.publish(1, {'cpu_usage': 10.0, 'interfaces': {'GE0/0/1': {}}})
+        stream = self.hub.stream([1], heartbeat=0.05)
+
+        self.assertTrue(next(stream).startswith('retry:'))
+        first = next(stream)
+        self.assertTrue(first.startswith('event: metrics\n'))
+        payload = json.loads(first.split('data: ', 1)[1])
+        self.assertEqual(payload, {'cpu_usage': 10.0, 'device_id': 1})
+
+        self.assertTrue(next(stream).startswith(': keepalive'))
+
+        threading.Timer(0.01, self.hub.publish, args=(1, {'cpu_usage': 20.0})).start()
+        event = next(stream)
+        while event.startswith(':'):
+            event = next(stream)
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['cpu_usage'], 20.0)
+
+        stream.close()
+        self.assertEqual(self.hub.get_stats()['subscribers'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
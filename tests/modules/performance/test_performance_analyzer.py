@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能分析器单元测试
+"""
+
+import random
+import statistics
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from src.core.db import db
+from src.modules.performance.services import PerformanceAnalyzer
+
+
+class TestPerformanceAnalyzer(unittest.TestCase):
+    """性能分析器测试类"""
+
+    def setUp(self):
+        """测试前准备：写入带缺失值和上升趋势的采样"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import PerformanceRecord
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__, PerformanceRecord.__table__])
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+
+        rng = random.Random(7)
+        self.values = {'cpu': [], 'memory': [], 'bandwidth': []}
+        start = datetime.now() - timedelta(days=1)
+        for i in range(301):
+            cpu = 20 + i * 0.2 + rng.uniform(-3, 3)
+            memory = 50 + rng.uniform(-1, 1)
+            bandwidth = None if i % 7 == 0 else 80 - i * 0.01
+            self.values['cpu'].append(cpu)
+            self.values['memory'].append(memory)
+            if bandwidth is not None:
+                self.values['bandwidth'].append(bandwidth)
+            db.session.add(PerformanceRecord(device_id=1, cpu_usage=cpu, memory_usage=memory,
+                                             bandwidth_usage=bandwidth, recorded_at=start + timedelta(minutes=i)))
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        self.ctx.pop()
+
+    def test_matches_python_statistics(self):
+        """测试数据库端统计结果与逐条计算一致"""
+        result = PerformanceAnalyzer.analyze_device_performance(1, days=7)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['record_count'], 301)
+        for name, values in self.values.items():
+            expected = PerformanceAnalyzer._calculate_stats(values)
+            for key in ('min', 'max', 'avg', 'median'):
+                self.assertAlmostEqual(result[name][key], expected[key], places=6)
+            self.assertAlmostEqual(result[name]['stddev'], statistics.pstdev(values), places=6)
+            self.assertEqual(result['trends'][name], PerformanceAnalyzer._analyze_trend(values))
+
+        self.assertEqual(result['trends']['cpu'], '缓慢上升')
+        self.assertEqual(result['trends']['memory'], '稳定')
+        self.assertEqual(result['cpu']['p95'], sorted(self.values['cpu'])[285])
+
+    def test_not_enough_data(self):
+        """测试窗口内记录不足"""
+        from src.models.device import Device
+        from src.models.performance import PerformanceRecord
+
+        db.session.add(Device(id=2, name='sw2', ip_address='10.0.0.2'))
+        db.session.add(PerformanceRecord(device_id=2, cpu_usage=10.0, recorded_at=datetime.now()))
+        db.session.commit()
+
+        result = PerformanceAnalyzer.analyze_device_performance(2, days=7)
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('1 条记录', result['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能记录复合索引和查询路径单元测试
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import inspect
+
+from src.core.db import db
+
+
+class TestQueryIndexes(unittest.TestCase):
+    """复合索引测试类"""
+
+    def setUp(self):
+        """测试前准备：创建没有索引的旧表结构"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import PerformanceRecord
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__, PerformanceRecord.__table__])
+        for index in PerformanceRecord.__table__.indexes:
+            index.drop(bind=db.engine)
+
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+        now = datetime.now()
+        for i in range(5):
+            db.session.add(PerformanceRecord(device_id=1, cpu_usage=10.0 * i, memory_usage=50.0,
+                                             recorded_at=now - timedelta(minutes=i)))
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        self.ctx.pop()
+
+    def _index_names(self):
+        return {index['name'] for index in inspect(db.engine).get_indexes('performance_records')}
+
+    def test_add_missing_indexes(self):
+        """测试为已存在的表补建复合索引，重复执行不会报错"""
+        from src.migration_utils import add_missing_indexes
+
+        self.assertNotIn('ix_performance_records_device_time', self._index_names())
+        result = add_missing_indexes()
+        self.assertEqual(result['status'], 'ok')
+        self.assertIn('ix_performance_records_device_time', result['created_indexes'])
+        self.assertIn('ix_performance_records_device_time', self._index_names())
+
+        self.assertEqual(add_missing_indexes()['created_indexes'], [])
+
+    def test_historical_data_shape(self):
+        """测试只查询所需列后历史数据格式不变"""
+        from src.modules.performance.services import get_historical_data
+
+        records = get_historical_data(1, hours=1)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['device_name'], 'sw1')
+        self.assertEqual(records[-1]['cpu_usage'], 0.0)
+        self.assertEqual(set(records[0]), {
+            'id', 'device_id', 'device_name', 'cpu_usage', 'memory_usage',
+            'bandwidth_usage', 'recorded_at', 'created_at'
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
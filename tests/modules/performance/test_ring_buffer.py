@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+环形缓冲单元测试
+"""
+
+import threading
+import unittest
+
+import numpy as np
+
+from src.modules.performance.ring_buffer import RingBuffer, HISTORY_COLUMNS, ring_positions
+
+
+class TestRingBuffer(unittest.TestCase):
+    """环形缓冲测试类"""
+
+    def test_append_and_wrap(self):
+        """测试写满后覆盖最旧的样本，读取按时间从旧到新"""
+        ring = RingBuffer(depth=3)
+        self.assertEqual(ring.to_dicts(), [])
+        self.assertIsNone(ring.latest())
+
+        for i in range(5):
+            ring.append({'timestamp': 100.0 + i, 'cpu_usage': float(i), 'uptime': '1天', 'interfaces': {}})
+
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.count, 5)
+        self.assertEqual(ring.snapshot().shape, (3, len(HISTORY_COLUMNS)))
+        self.assertEqual([row['cpu_usage'] for row in ring.to_dicts()], [2.0, 3.0, 4.0])
+        self.assertEqual([row['timestamp'] for row in ring.to_dicts(2)], [103.0, 104.0])
+        self.assertEqual(ring.latest()['cpu_usage'], 4.0)
+        self.assertIsNone(ring.latest()['memory_usage'])
+
+    def test_ring_positions(self):
+        """测试环中行号计算"""
+        self.assertEqual(list(ring_positions(2, 4, 10)), [0, 1])
+        self.assertEqual(list(ring_positions(6, 4, 10)), [2, 3, 0, 1])
+        self.assertEqual(list(ring_positions(6, 4, 2)), [0, 1])
+
+    def test_snapshot_while_writing(self):
+        """测试写入的同时读取，读到的样本始终连续"""
+        ring = RingBuffer(columns=('timestamp', 'value'), depth=64)
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                ring.append({'timestamp': float(i), 'value': float(i)})
+                i += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(200):
+                rows = ring.snapshot(16)
+                if len(rows) > 1:
+                    self.assertTrue(np.all(np.diff(rows[:, 0]) == 1))
+        finally:
+            stop.set()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+轮询调度器单元测试
+"""
+
+import time
+import threading
+import unittest
+
+from src.modules.performance.scheduler import PollScheduler
+
+
+class TestPollScheduler(unittest.TestCase):
+    """轮询调度器测试类"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.scheduler = PollScheduler(max_workers=2, name='test-poll')
+        self.scheduler.start()
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.scheduler.stop()
+    
+    def test_job_runs_periodically(self):
+        """测试任务按间隔重复执行"""
+        calls = []
+        self.scheduler.add_job('job:1', lambda: calls.append(time.time()), interval=0.05, jitter=0)
+        time.sleep(0.3)
+        
+        self.assertGreaterEqual(len(calls), 3)
+        self.assertEqual(self.scheduler.get_job('job:1').run_count, len(calls))
+    
+    def test_remove_job_stops_execution(self):
+        """测试移除任务后不再执行"""
+        calls = []
+        self.scheduler.add_job('job:1', lambda: calls.append(1), interval=0.05, jitter=0)
+        time.sleep(0.12)
+        self.assertTrue(self.scheduler.remove_job('job:1'))
+        count = len(calls)
+        time.sleep(0.15)
+        
+        self.assertEqual(len(calls), count)
+        self.assertFalse(self.scheduler.has_job('job:1'))
+        self.assertFalse(self.scheduler.remove_job('job:1'))
+    
+    def test_fixed_worker_pool_serves_many_jobs(self):
+        """测试大量任务只占用固定数量的工作线程"""
+        seen_threads = set()
+        lock = threading.Lock()
+        
+        def poll():
+            with lock:
+                seen_threads.add(threading.current_thread().name)
+        
+        for i in range(50):
+            self.scheduler.add_job(f'job:{i}', poll, interval=0.05)
+        time.sleep(0.2)
+        
+        self.assertLessEqual(len(seen_threads), 2)
+        self.assertEqual(self.scheduler.get_stats()['scheduled_jobs'], 50)
+    
+    def test_stats_report_queue_depth_and_lag(self):
+        """测试统计信息包含队列深度和轮询延迟"""
+        blocker = threading.Event()
+        for i in range(4):
+            self.scheduler.add_job(f'slow:{i}', blocker.wait, interval=10, jitter=0)
+        time.sleep(0.1)
+        
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['busy_workers'], 2)
+        self.assertEqual(stats['queue_depth'], 2)
+        self.assertGreater(stats['current_lag'], 0)
+        
+        blocker.set()
+        time.sleep(0.1)
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['total_runs'], 4)
+        self.assertGreater(stats['max_lag'], 0)
+    
+    def test_failing_job_is_rescheduled(self):
+        """测试任务出错后仍会继续调度"""
+        calls = []
+        
+        def poll():
+            calls.append(1)
+            raise RuntimeError('设备无响应')
+        
+        self.scheduler.add_job('job:1', poll, interval=0.05, jitter=0)
+        time.sleep(0.2)
+        
+        job = self.scheduler.get_job('job:1')
+        self.assertGreaterEqual(job.failure_count, 2)
+        self.assertEqual(job.last_error, '设备无响应')
+    
+    def test_defer_inside_job(self):
+        """测试任务内部推迟下一次执行"""
+        calls = []
+        
+        def poll():
+            calls.append(1)
+            self.scheduler.defer('job:1', 10)
+        
+        self.scheduler.add_job('job:1', poll, interval=0.05, jitter=0)
+        time.sleep(0.2)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertGreater(self.scheduler.get_job('job:1').next_due - time.time(), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
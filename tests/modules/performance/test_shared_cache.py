@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+跨进程共享指标缓存单元测试
+"""
+
+import os
+import shutil
+import time
+import tempfile
+import unittest
+import multiprocessing
+
+from src.modules.performance.metrics_hub import MetricsHub
+from src.modules.performance.shared_cache import SharedMetricsCache
+
+
+def _write_samples(path, device_id, count):
+    """在子进程中写入样本（模拟采集任务所在的工作进程）"""
+    cache = SharedMetricsCache(path, max_devices=8, depth=4, max_age=None)
+    for i in range(count):
+        cache.put(device_id, {'cpu_usage': float(i), 'memory_usage': 50.0, 'timestamp': 1000.0 + i},
+                  device_name=f'sw{device_id}')
+
+
+class TestSharedMetricsCache(unittest.TestCase):
+    """共享指标缓存测试类（两个实例打开同一文件，模拟两个工作进程）"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'metrics.cache')
+        self.worker_a = SharedMetricsCache(self.path, max_devices=8, depth=4, max_age=None)
+        self.worker_b = SharedMetricsCache(self.path, max_devices=8, depth=4, max_age=None)
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_latest_and_history(self):
+        """测试其他实例读取最新值和按时间排序的历史，超过深度时覆盖最旧的样本"""
+        for i in range(6):
+            self.worker_a.put(1, {
+                'cpu_usage': float(i), 'memory_usage': 40.0, 'uptime': '1天',
+                'interfaces': {'GE0/0/1': {'status': 'up'}}, 'timestamp': 100.0 + i
+            }, device_name='sw1')
+
+        latest = self.worker_b.latest(1)
+        self.assertEqual(latest['cpu_usage'], 5.0)
+        self.assertIsNone(latest['bandwidth_usage'])
+        self.assertEqual(latest['device_name'], 'sw1')
+        self.assertEqual(latest['interfaces'], {'GE0/0/1': {'status': 'up'}})
+
+        self.assertEqual([sample['cpu_usage'] for sample in self.worker_b.history(1)], [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual([sample['timestamp'] for sample in self.worker_b.history(1, limit=2)], [104.0, 105.0])
+        self.assertIsNone(self.worker_b.latest(2))
+        self.assertEqual(self.worker_b.history(2), [])
+
+        self.worker_b.forget(1)
+        self.assertIsNone(self.worker_a.latest(1))
+
+    def test_slots_full_and_large_doc(self):
+        """测试槽位用满后拒绝新设备，附加信息过大时丢弃接口明细"""
+        cache = SharedMetricsCache(max_devices=2, depth=2, doc_size=64)
+        self.assertTrue(cache.put(1, {'cpu_usage': 1.0, 'interfaces': {'x' * 100: {}}}, device_name='sw1'))
+        self.assertTrue(cache.put(2, {'cpu_usage': 2.0}))
+        self.assertFalse(cache.put(3, {'cpu_usage': 3.0}))
+        self.assertEqual(cache.latest(1)['device_name'], 'sw1')
+        self.assertNotIn('interfaces', cache.latest(1))
+        self.assertEqual(cache.get_stats()['devices'], 2)
+
+    def test_stale_sample_is_miss(self):
+        """测试超过有效期的最新值视为没有缓存，历史仍可读取"""
+        cache = SharedMetricsCache(self.path, max_devices=8, depth=4, max_age=30)
+        cache.put(1, {'cpu_usage': 1.0, 'timestamp': time.time() - 60})
+        cache.put(2, {'cpu_usage': 2.0})
+        self.assertIsNone(cache.latest(1))
+        self.assertEqual(list(cache.latest_many([1, 2])), [2])
+        self.assertEqual(len(cache.history(1)), 1)
+
+    def test_release_stale_slots(self):
+        """测试启动时清除本进程PID和已退出进程遗留的槽位，保留其他存活进程的槽位"""
+        process = multiprocessing.get_context('fork').Process(target=_write_samples, args=(self.path, 7, 1))
+        process.start()
+        process.join(10)
+        self.worker_a.put(1, {'cpu_usage': 1.0})
+        self.worker_a._owners[self.worker_a._find_slot(1)] = os.getppid()
+
+        self.worker_b.put(2, {'cpu_usage': 2.0})
+        self.assertEqual(self.worker_b.release_stale_slots(), 2)
+        self.assertIsNone(self.worker_a.latest(7))
+        self.assertIsNone(self.worker_a.latest(2))
+        self.assertEqual(self.worker_a.latest(1)['cpu_usage'], 1.0)
+
+    def test_layout_change_replaces_file(self):
+        """测试布局变化时替换文件而不截断，仍映射旧文件的进程可以继续读取"""
+        self.worker_a.put(1, {'cpu_usage': 1.0})
+        old_inode = os.stat(self.path).st_ino
+
+        resized = SharedMetricsCache(self.path, max_devices=16, depth=4, max_age=None)
+        self.assertIsNone(resized.latest(1))
+        self.assertNotEqual(os.stat(self.path).st_ino, old_inode)
+        self.assertEqual(self.worker_a.latest(1)['cpu_usage'], 1.0)
+
+        # 相同布局的新进程打开替换后的文件，不再重建
+        same = SharedMetricsCache(self.path, max_devices=16, depth=4, max_age=None)
+        resized.put(2, {'cpu_usage': 2.0})
+        self.assertEqual(same.latest(2)['cpu_usage'], 2.0)
+        self.assertEqual(os.listdir(self.tmpdir), ['metrics.cache'])
+
+    def test_relay_samples_from_other_process(self):
+        """测试发布/订阅中心转发其他进程写入的样本"""
+        self.worker_a.get_stats()  # 先创建缓存文件
+        process = multiprocessing.get_context('fork').Process(target=_write_samples, args=(self.path, 7, 3))
+        process.start()
+        process.join(10)
+
+        hub = MetricsHub()
+        hub.relay_from(self.worker_b)
+        self.assertEqual(hub.relay_once(), 1)
+        self.assertEqual(hub.latest(7)['cpu_usage'], 2.0)
+        self.assertEqual(hub.latest(7)['device_name'], 'sw7')
+        self.assertEqual(hub.relay_once(), 0)
+
+        # 本进程写入的样本已经直接发布过，不再转发
+        self.worker_a.put(8, {'cpu_usage': 1.0})
+        self.assertEqual(hub.relay_once(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
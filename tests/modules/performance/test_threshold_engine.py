@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+阈值判断引擎单元测试
+"""
+
+import unittest
+
+from flask import Flask
+
+from src.core.db import db
+from src.core.local_store import get_local_store
+from src.modules.performance.threshold import (
+    ThresholdEngine, ThresholdManager, ThresholdRule, ThresholdType, AlertLevel, THRESHOLD_TOPIC
+)
+
+
+class TestThresholdEngine(unittest.TestCase):
+    """阈值判断引擎测试类"""
+
+    def setUp(self):
+        """测试前准备：设备1、2属于类型10，设备3没有类型"""
+        self.engine = ThresholdEngine(silence_period=600)
+        self.defaults = [ThresholdRule(ThresholdType.CPU, 75.0, 90.0, 60, hysteresis=5.0)]
+        self.engine.compile(self.defaults, [])
+        self.engine.register_devices([1, 2, 3], {1: ('sw1', 10), 2: ('sw2', 10), 3: ('sw3', None)})
+
+    def _cpu(self, device_ids, values, timestamps):
+        return self.engine.evaluate(device_ids, {'cpu_usage': values}, timestamps)
+
+    def test_rule_resolution_order(self):
+        """测试规则按 设备 → 设备类型 → 默认 的顺序生效"""
+        device_rule = ThresholdRule(ThresholdType.CPU, 50.0, 60.0, device_id=1)
+        group_rule = ThresholdRule(ThresholdType.CPU, 60.0, 70.0, device_type_id=10)
+        self.engine.compile(self.defaults, [device_rule, group_rule])
+
+        self.assertIs(self.engine.rules_for(1)[0], device_rule)
+        self.assertIs(self.engine.rules_for(2)[0], group_rule)
+        self.assertIs(self.engine.rules_for(3)[0], self.defaults[0])
+        self.assertIsNone(self.engine.rules_for(3)[1])
+
+        events = self._cpu([1, 2, 3], [65.0, 65.0, 65.0], [0, 0, 0])
+        self.assertEqual({event['device_id']: event['level'] for event in events},
+                         {1: AlertLevel.CRITICAL, 2: AlertLevel.WARNING})
+
+    def test_duration_and_silence(self):
+        """测试持续时间达到后才告警，静默期内不重复告警"""
+        self.assertEqual(self._cpu([3], [80.0], [0]), [])
+        self.assertEqual(self._cpu([3], [80.0], [30]), [])
+        events = self._cpu([3], [95.0], [60])
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['device_name'], 'sw3')
+        self.assertEqual(events[0]['threshold'], 90.0)
+        self.assertEqual(self._cpu([3], [95.0], [120]), [])
+        self.assertEqual(len(self._cpu([3], [95.0], [700])), 1)
+
+    def test_hysteresis(self):
+        """测试数值在滞回区间内不会结束违反状态"""
+        self._cpu([3], [80.0], [0])
+        self._cpu([3], [72.0], [30])  # 高于 75-5，违反状态保持
+        self.assertEqual(len(self._cpu([3], [80.0], [60])), 1)
+
+        self.engine.reset()
+        self._cpu([3], [80.0], [0])
+        self._cpu([3], [60.0], [30])  # 低于 75-5，违反状态结束
+        self.assertEqual(self._cpu([3], [80.0], [60]), [])
+
+    def test_batch_with_repeated_device(self):
+        """测试同一批次包含同一设备的多个采样时按时间顺序推进状态"""
+        events = self._cpu([3, 3, 1, 2], [80.0, 80.0, 50.0, None], [60, 0, 0, 0])
+        self.assertEqual([event['device_id'] for event in events], [3])
+
+    def test_unknown_metric_value_ignored(self):
+        """测试没有采集到的指标不参与判断"""
+        self.assertEqual(self._cpu([1], [None], [0]), [])
+
+
+
+class TestThresholdSync(unittest.TestCase):
+    """阈值表与规则索引同步测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import Threshold
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__, Threshold.__table__])
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+        db.session.add(Threshold(device_id=1, metric_name='cpu_usage', warning_threshold=50.0, critical_threshold=60.0))
+        db.session.commit()
+
+        self.Threshold = Threshold
+        get_local_store().configure(None)
+        ThresholdManager.load_stored_rules()
+
+    def tearDown(self):
+        """测试后清理"""
+        ThresholdManager.stored_rules = {}
+        ThresholdManager.compile_rules()
+        ThresholdManager.engine.reset()
+        get_local_store().configure(None)
+        db.session.remove()
+        self.ctx.pop()
+
+    def _cpu_rule(self):
+        return ThresholdManager.get_rules_for_device(1)[0]
+
+    def test_load_and_incremental_update(self):
+        """测试启动时加载阈值表，修改、删除提交后增量更新规则"""
+        self.assertEqual(self._cpu_rule().warning_threshold, 50.0)
+        self.assertEqual(self._cpu_rule().duration, 60)  # 沿用默认规则的持续时间
+
+        threshold = self.Threshold.query.first()
+        threshold.warning_threshold = 40.0
+        db.session.commit()
+        self.assertEqual(self._cpu_rule().warning_threshold, 40.0)
+
+        db.session.delete(threshold)
+        db.session.commit()
+        self.assertEqual(self._cpu_rule().warning_threshold, 75.0)
+
+    def test_rollback_not_applied(self):
+        """测试回滚的修改不会进入规则索引"""
+        threshold = self.Threshold.query.first()
+        threshold.warning_threshold = 10.0
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self._cpu_rule().warning_threshold, 50.0)
+
+    def test_changes_from_other_worker(self):
+        """测试应用其他进程写入共享存储的变更"""
+        get_local_store().append_change(THRESHOLD_TOPIC, {'op': 'put', 'threshold': {
+            'id': 99, 'device_id': 1, 'metric_name': 'memory_usage',
+            'warning_threshold': 30.0, 'critical_threshold': 40.0
+        }})
+        self.assertEqual(ThresholdManager.sync_stored_rules(force=True), 1)
+        self.assertEqual(ThresholdManager.get_rules_for_device(1)[1].warning_threshold, 30.0)
+
+    def test_savepoint_rollback_keeps_outer_changes(self):
+        """测试回滚保存点只丢弃保存点内的修改，外层事务提交后仍然生效"""
+        threshold = self.Threshold.query.first()
+        threshold.warning_threshold = 40.0
+        db.session.flush()
+        with db.session.begin_nested() as savepoint:
+            db.session.add(self.Threshold(device_id=1, metric_name='memory_usage',
+                                          warning_threshold=10.0, critical_threshold=20.0))
+            db.session.flush()
+            savepoint.rollback()
+        db.session.commit()
+        self.assertEqual(self._cpu_rule().warning_threshold, 40.0)
+        self.assertEqual(ThresholdManager.get_rules_for_device(1)[1].warning_threshold, 80.0)
+
+    def test_alert_claim_after_validation(self):
+        """测试被丢弃或写入失败的告警不占用静默期"""
+        from unittest.mock import patch
+
+        event = {'device_id': 1, 'device_name': None, 'threshold_type': ThresholdType.CPU,
+                 'level': AlertLevel.WARNING, 'value': 80.0, 'threshold': 75.0, 'timestamp': 1000.0}
+        self.assertEqual(ThresholdManager._create_alerts([event]), 0)
+
+        event['device_name'] = 'sw1'
+        with patch('src.modules.performance.threshold.get_write_buffer') as buffer:
+            buffer.return_value.add_many.side_effect = RuntimeError('database is locked')
+            self.assertEqual(ThresholdManager._create_alerts([event]), 0)
+        self.assertTrue(ThresholdManager._claim_alert(event))
+
+    def test_device_cache_not_poisoned(self):
+        """测试查询设备表失败或设备尚不存在时不缓存，设备创建、改名后下次判断使用新信息"""
+        from unittest.mock import patch
+        from src.models.device import Device
+
+        def names(device_ids, start=0):
+            # 默认CPU规则需要持续60秒
+            engine.evaluate(device_ids, {'cpu_usage': [99.0] * len(device_ids)}, [start] * len(device_ids))
+            events = engine.evaluate(device_ids, {'cpu_usage': [99.0] * len(device_ids)}, [start + 60] * len(device_ids))
+            return {event['device_id']: event['device_name'] for event in events}
+
+        engine = ThresholdManager.engine
+        db.session.add(Device(id=2, name='sw2', ip_address='10.0.0.2'))
+        db.session.commit()
+        with patch.object(db.session, 'query', side_effect=RuntimeError('database is locked')):
+            self.assertEqual(names([2]), {})
+        self.assertEqual(names([3]), {})
+
+        db.session.add(Device(id=3, name='sw3', ip_address='10.0.0.3'))
+        db.session.commit()
+        self.assertEqual(names([2, 3]), {2: 'sw2', 3: 'sw3'})
+
+        device = db.session.get(Device, 3)
+        device.name = 'core-sw3'
+        db.session.commit()
+        engine.reset()
+        self.assertEqual(names([3]), {3: 'core-sw3'})
+
+    def test_shared_alert_silence(self):
+        """测试其他进程已在静默期内发出同一告警时不再重复告警"""
+        event = {'device_id': 1, 'threshold_type': ThresholdType.CPU, 'timestamp': 1000.0}
+        get_local_store().claim('alert_silence', '1:cpu_usage', now=990.0, ttl=0)  # 模拟其他进程
+        self.assertFalse(ThresholdManager._claim_alert(event))
+        self.assertTrue(ThresholdManager._claim_alert(dict(event, timestamp=990.0 + ThresholdManager.alert_silence_period)))
+
+
+if __name__ == '__main__':
+    unittest.main()
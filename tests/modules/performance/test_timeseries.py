@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能时序存储单元测试
+"""
+
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from src.core.db import db
+from src.modules.performance.timeseries import (
+    TimeSeriesStore, floor_time, interface_metrics, RAW_RESOLUTION, RECORD_METRICS
+)
+
+NOW = datetime(2026, 10, 18, 12, 0, 40)
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    """时序存储测试类"""
+
+    def setUp(self):
+        """测试前准备：内存数据库，并写入3小时、每10秒一次的采样"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import PerformanceRecord, MetricSample, PerformanceRollup
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[
+            DeviceType.__table__, Device.__table__, PerformanceRecord.__table__,
+            MetricSample.__table__, PerformanceRollup.__table__
+        ])
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+        db.session.commit()
+
+        self.PerformanceRecord = PerformanceRecord
+        self.PerformanceRollup = PerformanceRollup
+        self.store = TimeSeriesStore(raw_retention_hours=4)
+
+        # 每分钟内6个采样，CPU依次为 0,10,...,50，接口入方向速率固定1000bps
+        self.start = datetime(2026, 10, 18, 9, 0, 0)
+        sample_time = self.start
+        i = 0
+        while sample_time < NOW:
+            self.store.record(1, {
+                'cpu_usage': float((i % 6) * 10),
+                'memory_usage': 40.0,
+                'if:GE0/0/1:in': 1000.0
+            }, recorded_at=sample_time, commit=False)
+            sample_time += timedelta(seconds=10)
+            i += 1
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        self.ctx.pop()
+
+    def _rollups(self, resolution, metric='cpu_usage'):
+        return self.PerformanceRollup.query.filter_by(
+            device_id=1, resolution=resolution, metric=metric
+        ).order_by(self.PerformanceRollup.bucket_start).all()
+
+    def test_floor_time(self):
+        """测试时间桶取整"""
+        self.assertEqual(floor_time(datetime(2026, 10, 18, 10, 4, 59, 999999), 300), datetime(2026, 10, 18, 10, 0))
+        self.assertEqual(floor_time(datetime(2026, 10, 18, 10, 59, 0), 3600), datetime(2026, 10, 18, 10, 0))
+
+    def test_rollup_tiers(self):
+        """测试逐级降采样的最小/平均/最大值和样本数"""
+        written = self.store.rollup(now=NOW)
+
+        # 12:00:40 减去等待时间后，1分钟桶汇总到11:59，5分钟桶到11:55，1小时桶到11:00
+        self.assertEqual(written[60], 180 * 3)
+        minute = self._rollups(60)
+        self.assertEqual(len(minute), 180)
+        self.assertEqual((minute[0].min_value, minute[0].avg_value, minute[0].max_value), (0.0, 25.0, 50.0))
+        self.assertEqual(minute[0].sample_count, 6)
+
+        five = self._rollups(300)
+        self.assertEqual(len(five), 36)
+        self.assertEqual(five[0].sample_count, 30)
+        self.assertAlmostEqual(five[0].avg_value, 25.0)
+
+        hour = self._rollups(3600)
+        self.assertEqual([row.bucket_start.hour for row in hour], [9, 10, 11])
+        self.assertEqual(hour[0].sample_count, 360)
+        self.assertEqual(self._rollups(3600, 'if:GE0/0/1:in')[0].max_value, 1000.0)
+
+        # 重复执行不会重复写入
+        self.assertEqual(self.store.rollup(now=NOW), {60: 0, 300: 0, 3600: 0})
+
+    def test_choose_resolution(self):
+        """测试根据时间范围选择分辨率"""
+        self.assertEqual(self.store.choose_resolution(NOW - timedelta(minutes=30), NOW, now=NOW), RAW_RESOLUTION)
+        self.assertEqual(self.store.choose_resolution(NOW - timedelta(hours=24), NOW, now=NOW), 60)
+        self.assertEqual(self.store.choose_resolution(NOW - timedelta(days=30), NOW, now=NOW), 3600)
+
+    def test_query_uses_rollups_and_raw_tail(self):
+        """测试查询读取降采样数据，并用原始采样补齐尚未汇总的时间段"""
+        self.store.rollup(now=NOW - timedelta(minutes=30))
+
+        result = self.store.query(1, RECORD_METRICS, self.start, NOW, resolution=300)
+        self.assertEqual(result['resolution'], 300)
+        self.assertEqual(len(result['timestamps']), 37)
+        self.assertEqual(result['timestamps'][-1], datetime(2026, 10, 18, 12, 0))
+        self.assertEqual(result['series']['cpu_usage']['min'][0], 0.0)
+        self.assertEqual(result['series']['cpu_usage']['max'][0], 50.0)
+        self.assertTrue(all(value == 40.0 for value in result['series']['memory_usage']['avg']))
+        self.assertEqual(result['series']['bandwidth_usage']['avg'][0], None)
+
+    def test_query_raw(self):
+        """测试短时间范围返回原始采样"""
+        result = self.store.query(1, ['cpu_usage', 'if:GE0/0/1:in'], NOW - timedelta(minutes=1), NOW)
+        self.assertEqual(result['resolution'], RAW_RESOLUTION)
+        self.assertEqual(len(result['timestamps']), 6)
+        self.assertEqual(result['series']['if:GE0/0/1:in']['avg'][0], 1000.0)
+
+    def test_purge_keeps_unrolled_raw(self):
+        """测试只清理已汇总且超过保留时间的原始采样"""
+        self.store.raw_retention = timedelta(hours=2)
+        self.assertEqual(self.store.purge(now=NOW)['performance_records'], 0)
+
+        self.store.rollup(now=NOW)
+        deleted = self.store.purge(now=NOW)
+        # 保留2小时：删除边界 10:00:40 对齐到分钟，删除 9:00:00 ~ 9:59:50 的采样
+        self.assertEqual(deleted['performance_records'], 360)
+        self.assertEqual(deleted['metric_samples'], 360)
+        self.assertEqual(len(self._rollups(60)), 180)
+
+    def test_purge_rolls_up_late_rows(self):
+        """测试汇总之后才写入的迟到采样在清理前计入降采样数据"""
+        self.store.rollup(now=NOW)
+        self.store.record(1, {'cpu_usage': 100.0}, recorded_at=datetime(2026, 10, 18, 9, 0, 5))
+        self.store.raw_retention = timedelta(hours=2)
+        self.store.purge(now=NOW)
+
+        minute = self._rollups(60)[0]
+        self.assertEqual((minute.max_value, minute.sample_count), (100.0, 7))
+        self.assertEqual(self._rollups(300)[0].max_value, 100.0)
+        self.assertEqual(self._rollups(3600)[0].sample_count, 361)
+
+    def test_load_history_uses_rollups_before_raw_retention(self):
+        """测试原始采样保留期之前的部分读取降采样数据，之后读取原始采样"""
+        self.store.rollup(now=NOW)
+        self.store.raw_retention = timedelta(hours=1)
+        self.store.purge(now=NOW)
+
+        history = self.store.load_history(1, ['cpu_usage'], self.start, NOW, now=NOW)
+        # 9:00 ~ 11:00 的分钟桶来自降采样数据，11:01:00 之后来自原始采样
+        raw_since = datetime(2026, 10, 18, 11, 1, 0)
+        older = [point for point in history if point[0] < raw_since]
+        recent = [point for point in history if point[0] >= raw_since]
+        self.assertEqual(len(older), 121)
+        self.assertEqual(older[0], (self.start, {'cpu_usage': 25.0}))
+        self.assertEqual(len(recent), 358)
+        self.assertEqual([point[0] for point in history], sorted(point[0] for point in history))
+
+    def test_scheduled_maintenance_runs_once_per_interval(self):
+        """测试多个工作进程注册的定时任务在同一周期只有一个执行"""
+        from src.core.local_store import LocalStore
+
+        local_store = LocalStore()
+        with patch('src.core.local_store.get_local_store', return_value=local_store), \
+                patch.object(self.store, 'run_maintenance', return_value={'status': 'success'}) as run:
+            self.assertEqual(self.store.run_scheduled_maintenance(), {'status': 'success'})
+            self.assertIsNone(TimeSeriesStore().run_scheduled_maintenance())
+        run.assert_called_once_with()
+
+    def test_interface_metrics(self):
+        """测试接口速率转换为时序指标"""
+        metrics = interface_metrics({
+            'GE0/0/1': {'input_rate': 800, 'output_rate': 1600},
+            'GE0/0/2': {'status': 'down'}
+        })
+        self.assertEqual(metrics, {'if:GE0/0/1:in': 800, 'if:GE0/0/1:out': 1600})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量写入缓冲单元测试
+"""
+
+import os
+import time
+import tempfile
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from src.core.db import db
+from src.modules.performance.write_buffer import WriteBuffer
+
+
+class TestWriteBuffer(unittest.TestCase):
+    """批量写入缓冲测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.models.device import Device, DeviceType
+        from src.models.performance import PerformanceRecord, MetricSample
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[
+            DeviceType.__table__, Device.__table__, PerformanceRecord.__table__, MetricSample.__table__
+        ])
+        db.session.add(Device(id=1, name='sw1', ip_address='10.0.0.1'))
+        db.session.commit()
+
+        self.PerformanceRecord = PerformanceRecord
+        self.MetricSample = MetricSample
+        self.spill_path = os.path.join(tempfile.mkdtemp(), 'spill.jsonl')
+        self.buffer = WriteBuffer(batch_size=50, flush_interval=60, max_pending=100,
+                                  block_timeout=0.1, spill_path=self.spill_path)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.buffer.stop(flush=False)
+        db.session.remove()
+        self.ctx.pop()
+        if os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def _row(self, i=0):
+        return {'device_id': 1, 'cpu_usage': float(i), 'memory_usage': 50.0, 'recorded_at': datetime.now()}
+
+    def _count(self, model):
+        db.session.expire_all()
+        return model.query.count()
+
+    def test_direct_write_when_not_running(self):
+        """测试未启动后台线程时直接写入"""
+        self.assertTrue(self.buffer.add(self.PerformanceRecord, self._row()))
+        self.assertEqual(self._count(self.PerformanceRecord), 1)
+
+    def test_batch_flush_on_size(self):
+        """测试达到批量大小时由后台线程一次写入"""
+        self.buffer.start(self.app)
+        self.buffer.add_many(self.PerformanceRecord, [self._row(i) for i in range(50)])
+        self.buffer.add(self.MetricSample, {
+            'device_id': 1, 'metric': 'if:GE0/0/1:in', 'value': 1000.0, 'recorded_at': datetime.now()
+        })
+
+        deadline = time.time() + 5
+        while self.buffer.get_stats()['written'] < 50 and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(self._count(self.PerformanceRecord), 50)
+        self.assertGreaterEqual(self.buffer.get_stats()['batches'], 1)
+
+        # 停止时写入剩余的数据
+        self.buffer.stop()
+        self.assertEqual(self._count(self.MetricSample), 1)
+
+    def test_overflow_spills_and_replays(self):
+        """测试队列满时溢出到文件，重新启动后写回数据库"""
+        self.buffer.batch_size = 1000  # 不触发后台写入
+        self.buffer.start(self.app)
+        self.assertEqual(self.buffer.add_many(self.PerformanceRecord, [self._row(i) for i in range(100)]), 100)
+        self.assertTrue(self.buffer.add(self.PerformanceRecord, self._row(100)))
+
+        stats = self.buffer.get_stats()
+        self.assertEqual(stats['spilled'], 1)
+        self.assertEqual(stats['blocked'], 1)
+        self.assertTrue(os.path.exists(self.spill_path))
+
+        self.buffer.stop()
+        self.assertEqual(self._count(self.PerformanceRecord), 100)
+
+        self.buffer.start(self.app)
+        self.buffer.flush()
+        self.assertEqual(self.buffer.get_stats()['replayed'], 1)
+        self.assertEqual(self._count(self.PerformanceRecord), 101)
+        self.assertFalse(os.path.exists(self.spill_path))
+
+    def test_bad_row_quarantined(self):
+        """测试一行坏数据不影响同批其他行写入，坏数据移入隔离文件且不再溢出重放"""
+        self.buffer.start(self.app)
+        self.buffer.add_many(self.PerformanceRecord, [self._row(i) for i in range(3)])
+        self.buffer.add(self.MetricSample, {'device_id': 1, 'metric': None, 'value': 1.0, 'recorded_at': datetime.now()})
+        self.buffer.add(self.MetricSample, {'device_id': 1, 'metric': 'cpu', 'value': 1.0, 'recorded_at': datetime.now()})
+
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(self._count(self.PerformanceRecord), 3)
+        self.assertEqual(self._count(self.MetricSample), 1)
+        stats = self.buffer.get_stats()
+        self.assertEqual((stats['quarantined'], stats['spilled']), (1, 0))
+        self.assertFalse(os.path.exists(self.spill_path))
+        with open(self.spill_path + '.quarantine', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+        os.remove(self.spill_path + '.quarantine')
+
+    def test_spill_replayed_by_one_process(self):
+        """测试多个进程启动时溢出文件只被一个进程认领并重放"""
+        with open(self.spill_path, 'w', encoding='utf-8') as f:
+            f.write('{"table": "performance_records", "row": {"device_id": 1, "cpu_usage": 1.0, '
+                    '"recorded_at": "2026-10-18T10:00:00"}}\n')
+        other = WriteBuffer(spill_path=self.spill_path)
+
+        self.buffer.start(self.app)
+        other.start(self.app)
+        other.stop()
+        self.buffer.flush()
+        self.assertEqual(self.buffer.get_stats()['replayed'] + other.get_stats()['replayed'], 1)
+        self.assertEqual(self._count(self.PerformanceRecord), 1)
+        self.assertEqual(os.listdir(os.path.dirname(self.spill_path)), [])
+
+    def test_drop_without_spill_file(self):
+        """测试没有溢出文件时丢弃并计数"""
+        self.buffer.spill_path = None
+        self.buffer.batch_size = 1000
+        self.buffer.start(self.app)
+        self.buffer.add_many(self.PerformanceRecord, [self._row(i) for i in range(100)])
+
+        self.assertFalse(self.buffer.add(self.PerformanceRecord, self._row(100)))
+        self.assertEqual(self.buffer.get_stats()['dropped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -206,6 +206,72 @@ class TestPolicyDeployService(unittest.TestCase):
         mock_factory.create_and_connect.assert_called_once_with(self.mock_device)
         self.mock_connector.get_policy_status.assert_called_once_with('1')
         self.mock_connector.disconnect.assert_called_once()
+    
+    @patch('src.modules.policy.services.policy_deploy_service.ConfigSnapshotService')
+    @patch('src.modules.policy.services.policy_deploy_service.Device')
+    @patch('src.modules.policy.services.policy_deploy_service.ConnectorFactory')
+    def test_sync_policy_status_grouped_by_device(self, mock_factory, mock_device_model, mock_snapshot_service):
+        """测试同步按设备分组：每台设备连接一次，多个策略共享一次状态查询，配置未变化的设备跳过"""
+        devices = {}
+        for device_id in (1, 2):
+            devices[device_id] = MagicMock(id=device_id)
+            devices[device_id].name = f"fw{device_id}"
+        mock_device_model.query.get.side_effect = devices.get
+        policies = {}
+        for policy_id in (1, 2):
+            policies[policy_id] = MagicMock(id=policy_id)
+            policies[policy_id].name = f"policy{policy_id}"
+        self.mock_policy_repo.get_by_id.side_effect = policies.get
+        self.mock_deployment_repo.get_all.return_value = [
+            MagicMock(id=10, policy_id=1, device_id=1),
+            MagicMock(id=11, policy_id=2, device_id=1),
+            MagicMock(id=12, policy_id=1, device_id=2),
+        ]
+        mock_factory.create_and_connect.return_value = self.mock_connector
+        self.mock_connector.get_running_config.return_value = "hostname fw\n!\naccess-list ACL-1 permit ip any any"
+        mock_snapshot_service.return_value.check_policy.return_value = {'status': 'present'}
+        self.mock_connector.get_policy_statuses.return_value = {'1': {'status': 'active'}, '2': {'status': 'active'}}
+        
+        checksums = {}
+        result = self.deploy_service.sync_policy_status(checksums=checksums, max_workers=2)
+        
+        self.assertEqual((result['devices'], result['success'], result['skipped']), (2, 3, 0))
+        self.assertEqual(mock_factory.create_and_connect.call_count, 2)
+        self.mock_connector.get_policy_statuses.assert_called_once_with(['1', '2'])
+        self.assertEqual(self.mock_connector.disconnect.call_count, 2)
+        self.assertEqual(self.mock_policy_repo.get_by_id.call_count, 2)
+        self.assertEqual(set(checksums), {1, 2})
+        self.assertEqual(len(checksums[1]), 64)
+        self.assertEqual(mock_snapshot_service.return_value.record.call_count, 2)
+        self.assertEqual({detail['drift'] for detail in result['details']}, {'present'})
+        
+        # 配置校验和没有变化，第二次同步不再查询状态、不更新部署记录
+        self.mock_deployment_repo.update.reset_mock()
+        result = self.deploy_service.sync_policy_status(checksums=checksums, max_workers=2)
+        self.assertEqual((result['success'], result['skipped']), (0, 3))
+        self.mock_connector.get_policy_statuses.assert_called_once()
+        self.mock_deployment_repo.update.assert_not_called()
+    
+    @patch('src.modules.policy.services.policy_deploy_service.ConfigSnapshotService')
+    @patch('src.modules.policy.services.policy_deploy_service.Device')
+    @patch('src.modules.policy.services.policy_deploy_service.ConnectorFactory')
+    def test_sync_error_status_not_checksummed(self, mock_factory, mock_device_model, mock_snapshot_service):
+        """测试状态查询出错时不记录配置校验和，下次同步重新查询"""
+        mock_device_model.query.get.return_value = self.mock_device
+        mock_factory.create_and_connect.return_value = self.mock_connector
+        self.mock_deployment_repo.get_all.return_value = [self.mock_deployment]
+        self.mock_connector.get_running_config.return_value = "hostname fw"
+        self.mock_connector.get_policy_status.return_value = {'status': 'error', 'error': '命令超时'}
+        mock_snapshot_service.return_value.check_policy.return_value = {'status': 'present'}
+        
+        checksums = {}
+        self.deploy_service.sync_policy_status(checksums=checksums)
+        self.assertEqual(checksums, {})
+        
+        self.mock_connector.get_policy_status.return_value = {'status': 'active'}
+        result = self.deploy_service.sync_policy_status(checksums=checksums)
+        self.assertEqual((result['success'], result['skipped']), (1, 0))
+        self.assertIn(self.mock_device.id, checksums)
 
 
 if __name__ == '__main__':
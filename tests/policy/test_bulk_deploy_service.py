@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+策略批量下发服务单元测试
+"""
+
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from src.core.db import db
+from src.core.job_queue import JobCancelled
+from src.modules.policy.services.policy_bulk_deploy_service import PolicyBulkDeployService
+from src.modules.policy.services.policy_deploy_service import PolicyDeployService
+
+
+class FakeDeploy:
+    """模拟单台设备下发：耗时固定，记录并发数，指定设备失败"""
+
+    def __init__(self, failing=(), delay=0.05):
+        self.failing = set(failing)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+
+    def __call__(self, service, policy_id, device_id, user_id, options=None):
+        with self.lock:
+            self.calls.append(device_id)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        if device_id in self.failing:
+            return False, {'error': '策略部署失败: 命令执行错误', 'deployment_id': device_id}
+        return True, {'message': '策略部署成功', 'deployment_id': device_id}
+
+
+class FakeJob:
+    """模拟后台任务句柄：记录进度，达到指定完成数后请求取消"""
+
+    def __init__(self, cancel_after=None):
+        self.cancel_after = cancel_after
+        self.updates = []
+
+    def update(self, progress=None, message=None, data=None):
+        self.updates.append((progress, data))
+
+    @property
+    def cancelled(self):
+        return self.cancel_after is not None and len(self.updates) >= self.cancel_after
+
+
+class TestPolicyBulkDeployService(unittest.TestCase):
+    """策略批量下发服务测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.models.device import Device, DeviceType
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__])
+        for device_id in range(1, 11):
+            db.session.add(Device(id=device_id, name=f'fw{device_id}', ip_address=f'10.0.0.{device_id}'))
+        db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def run_deploy(self, fake, **kwargs):
+        service = PolicyBulkDeployService(**kwargs)
+        with patch.object(PolicyDeployService, 'deploy_policy', autospec=True, side_effect=fake):
+            return list(service.deploy(1, list(range(1, 11)), user_id=1))
+
+    def test_plan_waves(self):
+        """测试金丝雀批次和波次划分"""
+        service = PolicyBulkDeployService(canary_size=1, wave_size=3)
+        self.assertEqual(service.plan_waves(list(range(1, 9))), [[1], [2, 3, 4], [5, 6, 7], [8]])
+        service = PolicyBulkDeployService(canary_size=0, wave_size=0)
+        self.assertEqual(service.plan_waves([1, 2, 3]), [[1, 2, 3]])
+
+    def test_bulk_options_coerced(self):
+        """测试接口参数转换为数字，非法值报错"""
+        from src.modules.policy.routes.policy_deploy_routes import _bulk_options, _bulk_target
+
+        self.assertEqual(_bulk_options({'max_workers': '4', 'canary_size': 1, 'failure_threshold': '0.5'}),
+                         {'max_workers': 4, 'canary_size': 1, 'wave_size': None, 'failure_threshold': 0.5})
+        for data in ({'max_workers': 'abc'}, {'max_workers': 0}, {'wave_size': -1}, {'canary_size': True},
+                     {'failure_threshold': 2}, {'failure_threshold': 'nan'}, {'wave_size': [3]}):
+            with self.assertRaises(ValueError):
+                _bulk_options(data)
+
+        self.assertEqual(_bulk_target({'policy_id': '7', 'device_ids': [3, '1', 3]}), (7, [3, 1]))
+        for data in ({'policy_id': 'abc', 'device_ids': [1]}, {'policy_id': 1, 'device_ids': '12'},
+                     {'policy_id': 1, 'device_ids': []}, {'policy_id': 1, 'device_ids': [1, 'x']},
+                     {'policy_id': 1, 'device_ids': [True]}, {'policy_id': 1.5, 'device_ids': [1]}):
+            with self.assertRaises(ValueError):
+                _bulk_target(data)
+
+    def test_parallel_with_bounded_workers(self):
+        """测试金丝雀批次先完成，其余设备并行下发且并发数不超过上限"""
+        fake = FakeDeploy(delay=0.1)
+        start = time.time()
+        events = self.run_deploy(fake, max_workers=4, canary_size=1, wave_size=0)
+        elapsed = time.time() - start
+
+        self.assertEqual(events[0], {'event': 'wave', 'wave': 0, 'canary': True, 'devices': [1]})
+        self.assertEqual(events[1]['device_id'], 1)
+        self.assertEqual(events[1]['device_name'], 'fw1')
+        self.assertEqual(fake.calls[0], 1)
+        self.assertEqual(fake.max_running, 4)
+        self.assertLess(elapsed, 0.1 * 10)
+
+        results = [event for event in events if event['event'] == 'result']
+        self.assertEqual(sorted(result['device_id'] for result in results), list(range(1, 11)))
+        done = events[-1]
+        self.assertEqual((done['event'], done['success'], done['failed'], done['skipped']), ('done', 10, 0, 0))
+        self.assertIsNone(done['aborted'])
+
+    def test_canary_failure_stops_rollout(self):
+        """测试金丝雀批次失败时不再下发其余设备"""
+        fake = FakeDeploy(failing=[1])
+        events = self.run_deploy(fake, canary_size=1)
+
+        self.assertEqual(fake.calls, [1])
+        skipped = [event for event in events if event['event'] == 'result' and event['skipped']]
+        self.assertEqual(len(skipped), 9)
+        self.assertEqual(events[-1]['skipped'], 9)
+        self.assertIn('金丝雀', events[-1]['aborted'])
+
+    def test_wave_failure_threshold(self):
+        """测试波次失败比例超过阈值时停止后续波次"""
+        fake = FakeDeploy(failing=[2, 3])
+        events = self.run_deploy(fake, canary_size=1, wave_size=3, failure_threshold=0.5)
+
+        self.assertEqual(sorted(fake.calls), [1, 2, 3, 4])
+        done = events[-1]
+        self.assertEqual((done['success'], done['failed'], done['skipped']), (2, 2, 6))
+
+    def test_run_job_progress_and_cancel(self):
+        """测试作为后台任务运行时报告进度，取消后不再开始新的设备下发"""
+        service = PolicyBulkDeployService(max_workers=2, canary_size=1, wave_size=2)
+        job = FakeJob()
+        with patch.object(PolicyDeployService, 'deploy_policy', autospec=True, side_effect=FakeDeploy()):
+            summary = service.run_job(job, 1, list(range(1, 11)), user_id=1)
+        self.assertEqual((summary['success'], len(summary['results'])), (10, 10))
+        self.assertEqual(job.updates[-1][0], 1.0)
+
+        # 重复的设备ID只下发一次，进度仍能到达1.0
+        job = FakeJob()
+        with patch.object(PolicyDeployService, 'deploy_policy', autospec=True, side_effect=FakeDeploy()):
+            summary = service.run_job(job, 1, [1, 2, 2, 3, 1], user_id=1)
+        self.assertEqual((summary['success'], job.updates[-1][0]), (3, 1.0))
+
+        fake = FakeDeploy()
+        with patch.object(PolicyDeployService, 'deploy_policy', autospec=True, side_effect=fake):
+            with self.assertRaises(JobCancelled):
+                service.run_job(FakeJob(cancel_after=3), 1, list(range(1, 11)), user_id=1)
+        self.assertEqual(len(fake.calls), 3)
+
+        # 最后一台设备完成后才收到的取消不影响结果
+        with patch.object(PolicyDeployService, 'deploy_policy', autospec=True, side_effect=FakeDeploy()):
+            summary = service.run_job(FakeJob(cancel_after=10), 1, list(range(1, 11)), user_id=1)
+        self.assertEqual((summary['success'], summary['skipped']), (10, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
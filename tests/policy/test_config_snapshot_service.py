@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+设备配置快照服务单元测试
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from flask import Flask
+
+from src.core.db import db
+from src.modules.policy.models.config_snapshot import ConfigSnapshot
+from src.modules.policy.services.config_snapshot_service import (
+    ConfigSnapshotService, ConfigIndex, compute_delta, apply_delta, normalize_config, SECRET_PLACEHOLDER
+)
+from src.modules.policy.connectors.generic_connector import GenericFirewallConnector
+
+POLICY_CONFIG = {
+    'type': 'ipsec',
+    'ipsec_settings': {
+        'encryption': {'phase1': ['aes-256', 'sha256', 'dh-group14'], 'phase2': ['aes-256', 'sha256']},
+        'authentication': {'method': 'psk', 'psk': 'secret'},
+        'lifetime': {'phase1': 86400, 'phase2': 3600}
+    },
+    'tunnel_settings': {
+        'local_subnet': '192.168.1.0/24',
+        'remote_subnet': '192.168.2.0/24',
+        'remote_gateway': '203.0.113.1'
+    }
+}
+
+
+def make_config(lines, extra=''):
+    """生成运行配置文本，带易变行和分隔行"""
+    return '\n'.join(['Building configuration...', f'! Last configuration change at {extra or "10:00"}',
+                      'hostname fw1', '!'] + list(lines)) + '\n'
+
+
+class TestConfigSnapshotService(unittest.TestCase):
+    """设备配置快照服务测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        from src.models.device import Device, DeviceType
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.metadata.create_all(db.engine, tables=[DeviceType.__table__, Device.__table__,
+                                                  ConfigSnapshot.__table__])
+        self.device = Device(id=1, name='fw1', ip_address='10.0.0.1')
+        db.session.add(self.device)
+        db.session.commit()
+        self.service = ConfigSnapshotService()
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_delta_roundtrip(self):
+        """测试差异计算与还原"""
+        old = ['a', 'b', 'c', 'd']
+        new = ['a', 'x', 'c', 'd', 'e']
+        self.assertEqual(apply_delta(old, compute_delta(old, new)), new)
+        self.assertEqual(normalize_config(make_config(['a  '])), ['hostname fw1', 'a'])
+
+    def test_record_only_on_change(self):
+        """测试配置不变时不新增快照，变化时保存差异，恢复旧配置时复用原快照"""
+        base = [f'access-list ACL-1 permit ip host 10.0.0.{i} any' for i in range(50)]
+        first, changed = self.service.record(1, make_config(base))
+        self.assertTrue(changed)
+        self.assertTrue(first.is_full)
+
+        same, changed = self.service.record(1, make_config(base, extra='11:00'))
+        self.assertFalse(changed)
+        self.assertEqual(same.id, first.id)
+
+        modified = base + ['access-list ACL-1 permit ip host 10.0.1.1 any']
+        second, changed = self.service.record(1, make_config(modified))
+        self.assertTrue(changed)
+        self.assertEqual(second.base_id, first.id)
+        self.assertLess(len(second.content), len(first.content))
+        self.assertEqual(self.service.load_lines(second), ['hostname fw1'] + modified)
+
+        reverted, changed = self.service.record(1, make_config(base))
+        self.assertTrue(changed)
+        self.assertEqual(reverted.id, first.id)
+        self.assertEqual(ConfigSnapshot.query.count(), 2)
+        self.assertEqual(self.service.get_latest(1).id, first.id)
+
+    def test_check_policy_drift(self):
+        """测试根据配置索引判断策略配置存在、部分缺失和缺失"""
+        policy = SimpleNamespace(id=1, config=POLICY_CONFIG)
+        expected = GenericFirewallConnector().get_expected_config(POLICY_CONFIG)
+        self.assertTrue(expected)
+
+        self.service.record(1, make_config(expected))
+        self.assertEqual(self.service.check_policy(policy, self.device)['status'], 'present')
+
+        self.service.record(1, make_config(expected[:-1]))
+        result = self.service.check_policy(policy, self.device)
+        self.assertEqual(result['status'], 'drifted')
+        self.assertEqual(result['missing'], expected[-1:])
+
+        self.service.record(1, make_config(['interface GigabitEthernet0/0']))
+        self.assertEqual(self.service.check_policy(policy, self.device)['status'], 'absent')
+
+    def test_secrets_redacted(self):
+        """测试密钥保存前替换为占位符，设备加密显示的密钥不算作漂移"""
+        policy = SimpleNamespace(id=1, config=POLICY_CONFIG)
+        expected = GenericFirewallConnector().get_expected_config(POLICY_CONFIG)
+        running = [line.replace('key secret address', 'key 0 s3cr3t-on-device address') for line in expected]
+        running += ['username admin privilege 15 secret 5 $1$abcd', 'snmp-server community public RO',
+                    'service password-encryption']
+
+        snapshot, _ = self.service.record(1, make_config(running))
+        lines = self.service.load_lines(snapshot)
+        self.assertNotIn('s3cr3t-on-device', '\n'.join(lines))
+        self.assertNotIn('$1$abcd', '\n'.join(lines))
+        self.assertIn(f'crypto isakmp key {SECRET_PLACEHOLDER} address 203.0.113.1', lines)
+        self.assertIn(f'snmp-server community {SECRET_PLACEHOLDER} RO', lines)
+        self.assertIn('service password-encryption', lines)
+        self.assertEqual(self.service.check_policy(policy, self.device)['status'], 'present')
+
+        index = ConfigIndex(normalize_config('ike peer p1\n pre-shared-key cipher %^%#Xy1%^%#\n'))
+        self.assertEqual(index.presence(['ike peer p1', 'pre-shared-key secret'])['missing'], [])
+
+    def test_index_blocks(self):
+        """测试块内子命令按所属顶层命令查找"""
+        index = ConfigIndex(['crypto map CM 10 ipsec-isakmp', ' set peer 203.0.113.1',
+                             'crypto map CM 20 ipsec-isakmp', ' set peer 203.0.113.2'])
+        self.assertEqual(index.presence(['crypto map CM 20 ipsec-isakmp', 'set peer 203.0.113.2'])['missing'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+通用防火墙连接器命令读取单元测试（模拟设备的shell通道）
+"""
+
+import time
+import unittest
+from unittest.mock import patch
+
+from src.core.ssh_pool import get_ssh_pool
+from src.modules.policy.connectors.generic_connector import GenericFirewallConnector, ShellSession
+from src.modules.policy.connectors.firewall_connector import FirewallDeployError, FirewallConfirmError
+
+
+class FakeDevice:
+    """模拟设备"""
+
+    def __init__(self, device_id):
+        self.id = device_id
+        self.name = f'fw{device_id}'
+        self.ip_address = '192.0.2.1'
+        self.port = 22
+        self.username = 'admin'
+        self.password = 'admin'
+        self.connection_protocol = 'ssh'
+
+
+class FakeTransport:
+    def is_active(self):
+        return True
+
+
+class FakeClient:
+    def get_transport(self):
+        return FakeTransport()
+
+    def close(self):
+        pass
+
+
+class FakeChannel:
+    """模拟Cisco风格的设备：逐行回显命令，分页输出，保存配置需要确认，输出分小块到达"""
+
+    def __init__(self, hang_on=None):
+        self.pending = ''
+        self.closed = False
+        self.mode = ''
+        self.paging = True
+        self.hang_on = hang_on
+        self.confirming = False
+        self.more = None
+        self.received = []
+
+    @property
+    def prompt(self):
+        return f'\r\nfw{self.mode}#'
+
+    def send(self, data):
+        if data == ' ' and self.more:
+            self.pending += self.more + self.prompt
+            self.more = None
+            return
+        for line in data.split('\n')[:-1]:
+            self._handle(line)
+
+    sendall = send
+
+    def _handle(self, line):
+        self.received.append(line)
+        if self.confirming:
+            self.confirming = False
+            self.pending += '\r\nBuilding configuration...\r\n[OK]' + self.prompt
+            return
+        self.pending += line + '\r\n'
+        if line == self.hang_on:
+            return
+        if line == 'terminal length 0':
+            self.paging = False
+        elif line == 'configure terminal':
+            self.mode = '(config)'
+        elif line == 'end':
+            self.mode = ''
+        elif line == 'write memory':
+            self.pending += 'Overwrite the previous NVRAM configuration?[confirm]'
+            self.confirming = True
+            return
+        elif line == 'reload':
+            self.pending += 'Proceed with reload? [confirm]'
+            self.confirming = True
+            return
+        elif line.startswith('show'):
+            if self.paging:
+                self.pending += 'line1\r\n --More-- '
+                self.more = '\r\nline2'
+                return
+            self.pending += 'line1\r\nline2'
+        self.pending += self.prompt
+
+    def recv_ready(self):
+        return bool(self.pending)
+
+    def recv(self, size):
+        chunk, self.pending = self.pending[:7], self.pending[7:]
+        return chunk.encode('utf-8')
+
+    def close(self):
+        self.closed = True
+
+
+class TestGenericConnectorReader(unittest.TestCase):
+    """按提示符读取命令输出的测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.connector = GenericFirewallConnector(timeout=1, retry_count=1, retry_interval=0)
+        self.channel = FakeChannel()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.connector.disconnect()
+        get_ssh_pool().close_device(901)
+
+    def connect(self):
+        with patch.object(GenericFirewallConnector, '_open_shell', return_value=ShellSession(FakeClient(), self.channel)):
+            self.assertTrue(self.connector.connect(FakeDevice(901)))
+
+    def test_batch_until_prompt(self):
+        """测试关闭分页后批量下发配置，按提示符结束而不是固定等待"""
+        self.connect()
+        self.assertFalse(self.channel.paging)
+
+        commands = ['configure terminal'] + [f'access-list ACL-1 permit ip host 10.0.0.{i} any' for i in range(100)] \
+            + ['end', 'write memory']
+        start = time.time()
+        output = self.connector._execute_commands(commands)
+        self.assertLess(time.time() - start, 5)
+
+        self.assertEqual(self.channel.received[-1], '')  # 保存配置的确认已应答
+        self.assertIn('access-list ACL-1 permit ip host 10.0.0.99 any', output)
+        self.assertTrue(output.endswith('[OK]\r\nfw#'))
+        self.assertTrue(self.connector._check_deployment_result(output))
+
+    def test_unknown_confirm_rejected(self):
+        """测试保存配置以外的确认提示被拒绝，命令失败"""
+        self.connect()
+        with self.assertRaises(FirewallConfirmError):
+            self.connector._execute_commands(['reload'])
+        self.assertEqual(self.channel.received[-1], 'n')
+        self.assertTrue(self.connector._broken)
+
+    def test_more_prompt(self):
+        """测试分页提示自动翻页"""
+        self.connector.DISABLE_PAGING_COMMANDS = []
+        self.connect()
+        output = self.connector._execute_commands(['show crypto ipsec sa'])
+        self.assertIn('line2', output)
+        self.assertTrue(output.endswith('fw#'))
+
+    def test_running_config_and_shared_status(self):
+        """测试读取运行配置时去掉命令回显和提示符，多个策略共享一次状态查询"""
+        self.connect()
+        self.assertEqual(self.connector.get_running_config(), 'line1\nline2')
+
+        sent = len(self.channel.received)
+        statuses = self.connector.get_policy_statuses(['1', '2'])
+        self.assertEqual(set(statuses), {'1', '2'})
+        self.assertEqual(statuses['1'], statuses['2'])
+        self.assertEqual(len(self.channel.received) - sent, 2)
+
+    def test_command_timeout(self):
+        """测试命令没有返回提示符时超时并标记会话损坏"""
+        self.channel.hang_on = 'show crypto isakmp sa'
+        self.connect()
+        self.connector.COMMAND_TIMEOUT = 0.2
+        with self.assertRaises(FirewallDeployError):
+            self.connector._execute_commands(['show crypto ipsec sa', 'show crypto isakmp sa'])
+        self.assertTrue(self.connector._broken)
+        self.connector.disconnect()
+        self.assertTrue(self.channel.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()